@@ -1,4 +1,5 @@
 from bs4 import BeautifulSoup
+import numpy as np
 import pandas as pd
 import re
 from difflib import get_close_matches
@@ -98,6 +99,31 @@ def html_table_to_markdown(html):
     )
 
 
+def _split_markdown_rows(body, n_cols):
+    """
+    Split the data lines of a Markdown table into stripped cells with one str.split.
+
+    :param body: the data lines of the table, joined by "\\n"
+    :param n_cols: the number of headers
+    :return: 2D object ndarray of the cells, or None if a line isn't "|...|" with n_cols cells
+    """
+    if n_cols == 0:
+        return None
+    n_pipes = n_cols + 1
+    n_lines = body.count("\n") + 1
+    # "|a|b|\n|c|d|" splits into "", "a", "b", "\n", "c", "d", "", so every line is "|...|"
+    # with n_cols cells if and only if the tokens between the lines are exactly "\n"
+    tokens = body.split("|")
+    if (
+        len(tokens) != n_lines * n_pipes + 1
+        or tokens[0] != ""
+        or tokens[n_pipes::n_pipes] != ["\n"] * (n_lines - 1) + [""]
+    ):
+        return None
+    cells = np.array(list(map(str.strip, tokens[1:])), dtype=object)
+    return cells.reshape(n_lines, n_pipes)[:, :n_cols]
+
+
 def markdown_to_dataframe(md_table):
     """
     Convert a Markdown table to a Pandas DataFrame, treating all values as strings.
@@ -105,13 +131,21 @@ def markdown_to_dataframe(md_table):
     :param md_table: A string containing the Markdown table.
     :return: Pandas DataFrame representing the table with all values as strings.
     """
-    lines = md_table.strip().split("\n")
+    # header line, separator line and the data lines
+    lines = md_table.strip().split("\n", 2)
     if len(lines) < 3:
         return pd.DataFrame()  # Return empty DataFrame if table is invalid
 
-    # Extract header and data rows, skipping the separator line
+    # Extract header, skipping the separator line
     headers = lines[0].split("|")[1:-1]  # Remove leading and trailing empty parts
-    data_rows = [line.split("|")[1:-1] for line in lines[2:]]
+    headers = [h.strip() for h in headers]
+
+    cells = _split_markdown_rows(lines[2], len(headers))
+    if cells is not None:
+        return pd.DataFrame(cells, columns=headers)
+
+    # irregular rows, split them line by line
+    data_rows = [line.split("|")[1:-1] for line in lines[2].split("\n")]
 
     for i in range(len(data_rows)):
         row = data_rows[i]
@@ -120,8 +154,7 @@ def markdown_to_dataframe(md_table):
             logger.warning(f"The number of cells in row {i} is {cell_num} and the number of headers is {len(headers)}. \n\nrow: {row}")
             # return pd.DataFrame()
 
-    # Trim whitespace from headers and data cells
-    headers = [h.strip() for h in headers]
+    # Trim whitespace from data cells
     data_rows = [[cell.strip() for cell in row] for row in data_rows]
 
     # Create DataFrame treating all values as strings
@@ -129,6 +162,29 @@ def markdown_to_dataframe(md_table):
     return df
 
 
+# the inferred types of object columns whose rows iterrows() leaves as they are
+_ITERROWS_SAFE_INFERRED_TYPES = {
+    "string", "bytes", "empty", "integer", "floating", "mixed-integer-float",
+    "decimal", "complex", "boolean",
+}
+
+def _is_iterrows_needed(values: np.ndarray) -> bool:
+    """
+    Whether the cells of df.values.tolist() may differ from the cells of df.iterrows().
+
+    iterrows() turns every row into a Series, it boxes datetime rows into Timestamp/Timedelta
+    and infers datetime-like object rows (e.g. None becomes NaT next to a Timestamp).
+    """
+    if values.dtype.kind in "mM":
+        return True
+    if values.dtype != object:
+        return False
+    for j in range(values.shape[1]):
+        if pd.api.types.infer_dtype(values[:, j], skipna=True) not in _ITERROWS_SAFE_INFERRED_TYPES:
+            return True
+    return False
+
+
 def dataframe_to_markdown(df_table):
     """
     Convert a Pandas DataFrame to a Markdown-formatted table.
@@ -152,10 +208,13 @@ def dataframe_to_markdown(df_table):
     separator_line = "| " + " | ".join(["---"] * len(headers)) + " |"
 
     # Prepare data rows
-    data_lines = []
-    for _, row in df_table.iterrows():
-        row_str = "| " + " | ".join(str(cell) for cell in row) + " |"
-        data_lines.append(row_str)
+    values = df_table.values
+    if _is_iterrows_needed(values):
+        rows = [list(row) for _, row in df_table.iterrows()]
+    else:
+        rows = values.tolist()
+    columns = [list(map(str, column)) for column in zip(*rows)]
+    data_lines = ["| " + " | ".join(cells) + " |" for cells in zip(*columns)]
 
     # Combine into final Markdown table
     md_table = "\n".join([header_line, separator_line] + data_lines)
@@ -163,6 +222,76 @@ def dataframe_to_markdown(df_table):
     return md_table
 
 
+class ParsedTable:
+    """
+    A table passed between workflow steps, parsed from markdown and rendered to markdown
+    at most once.
+
+    A table is a value: its DataFrame must not be modified in place, a step that changes
+    the table creates a new ParsedTable from the changed DataFrame.
+
+    Usage:
+    table = ParsedTable.from_markdown(md_table)
+    table.n_rows  # parsed on the first use
+    table.md  # the original markdown, a table from a DataFrame is rendered on the first use
+    """
+
+    __slots__ = ("_df", "_md")
+
+    def __init__(self, df: pd.DataFrame | None = None, md: str | None = None):
+        self._df = df
+        self._md = md
+
+    @classmethod
+    def from_markdown(cls, md_table: str) -> "ParsedTable":
+        return cls(md=md_table)
+
+    @classmethod
+    def from_dataframe(cls, df_table: pd.DataFrame) -> "ParsedTable":
+        """
+        :param df_table: DataFrame of str cells, as markdown_to_dataframe returns
+        """
+        if df_table is None or df_table.empty:
+            # an empty table renders to "", which parses to an empty DataFrame
+            return cls(df=pd.DataFrame(), md="")
+        return cls(df=df_table)
+
+    @classmethod
+    def of(cls, table: "str | ParsedTable | None") -> "ParsedTable | None":
+        """
+        return table itself if it's a ParsedTable, otherwise parse it from the markdown
+        """
+        if table is None or isinstance(table, ParsedTable):
+            return table
+        return cls.from_markdown(table)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        if self._df is None:
+            self._df = markdown_to_dataframe(self._md)
+        return self._df
+
+    @property
+    def md(self) -> str:
+        if self._md is None:
+            self._md = dataframe_to_markdown(self._df)
+        return self._md
+
+    @property
+    def n_rows(self) -> int:
+        return self.df.shape[0]
+
+    @property
+    def n_cols(self) -> int:
+        return self.df.shape[1]
+
+    def __str__(self) -> str:
+        return self.md
+
+    def __repr__(self) -> str:
+        return repr(self.md)
+
+
 def stack_md_table_headers(md_table):
     """
     Detects multi-line headers in a Markdown table and merges them by column, separating names with .,
@@ -355,7 +484,7 @@ def display_md_table(md_table):
 
 
 def fix_col_name(col_name, md_table):
-    df_table = markdown_to_dataframe(md_table)
+    df_table = ParsedTable.of(md_table).df
     col_names = [col.strip() for col in df_table.columns.tolist()]
 
     if col_name in col_names:
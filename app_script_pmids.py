@@ -3,25 +3,22 @@ import csv
 import logging
 import os
 from pathlib import Path
-import time
 from dotenv import load_dotenv
 
 from extractor.agents.pk_pe_agents.pk_pe_agents_types import PKPECuratedTables
+from extractor.constants import MAX_PAPER_CONCURRENCY, MAX_PIPELINE_CONCURRENCY, PipelineTypeEnum
 from extractor.log_utils import initialize_logger
 from extractor.agents_manager.pk_pe_manager import PKPEManager
+from extractor.agents_manager.pk_pe_batch_runner import PKPEBatchRunner
 from extractor.agents.agent_factory import get_pipeline_llm, get_agent_llm
+from extractor.database.batch_checkpoint_db import BatchCheckpointDB
 from extractor.database.pmid_db import PMIDDB
 from extractor.request_deepseek import get_deepseek
 from extractor.request_geminiai import get_gemini
 from extractor.request_openai import get_openai
 from extractor.request_sonnet import get_sonnet
 from extractor.request_metallama import get_meta_llama
-from extractor.pmid_extractor.html_table_extractor import HtmlTableExtractor
-from extractor.utils import (
-    convert_html_to_text_no_table,
-    convert_sections_to_full_text,
-    remove_references,
-)
+from extractor.pmid_extractor.pmid_ingestion import ingest_pmid_html_files
 from TabFuncFlow.utils.table_utils import markdown_to_dataframe
 load_dotenv()
 
@@ -60,15 +57,22 @@ def get_pmid_db():
     db_path = db_path / "pmid_info.db"
     return PMIDDB(db_path)
 
-def prepare_data_by_pmids_csv_file(csv_pmids_fn: str, pmid_db: PMIDDB) -> list[str]:
+def prepare_data_by_pmids_csv_file(
+    csv_pmids_fn: str,
+    pmid_db: PMIDDB,
+    max_workers: int | None = None,
+) -> list[str]:
+    """
+    parse the html files listed in csv file (pmid, html file path) and insert the papers into pmid db
+
+    Return:
+    the pmids in db, in csv order
+    """
     csv_path = Path(csv_pmids_fn)
     base_dir = csv_path.parent
-    extractor = HtmlTableExtractor()
-    inserted = 0
     skipped = 0
-    failed = 0
 
-    pmids = []
+    pmid_html_files = []
     with open(csv_pmids_fn, "r") as fobj:
         reader = csv.reader(fobj)
         for row_idx, row in enumerate(reader, start=1):
@@ -86,65 +90,51 @@ def prepare_data_by_pmids_csv_file(csv_pmids_fn: str, pmid_db: PMIDDB) -> list[s
                 skipped += 1
                 continue
 
-            if pmid_db.select_pmid_info(pmid) is not None:
-                pmids.append(pmid)
-                logger.info(f"PMID {pmid} already exists in DB. Skipping.")
-                skipped += 1
-                continue
-
             html_file = Path(html_path)
             if not html_file.is_absolute():
                 html_file = (base_dir / html_file).resolve()
+            pmid_html_files.append((pmid, str(html_file)))
 
-            if not html_file.exists():
-                logger.error(f"Row {row_idx}: HTML file not found for PMID {pmid}: {html_file}")
-                failed += 1
-                continue
-
-            try:
-                html_content = html_file.read_text(encoding="utf-8", errors="ignore")
-            except Exception as e:
-                logger.error(f"Row {row_idx}: failed to read {html_file}: {e}")
-                failed += 1
-                continue
-
-            try:
-                tables = extractor.extract_tables(html_content) or []
-                sections = extractor.extract_sections(html_content) or []
-                abstract = extractor.extract_abstract(html_content)
-                title = extractor.extract_title(html_content)
-
-                if sections:
-                    full_text = convert_sections_to_full_text(sections)
-                else:
-                    full_text = remove_references(convert_html_to_text_no_table(html_content))
-
-                ok = pmid_db.insert_pmid_info(
-                    pmid=pmid,
-                    title=title,
-                    abstract=abstract,
-                    full_text=full_text,
-                    tables=tables,
-                    sections=sections,
-                )
-                if ok:
-                    inserted += 1
-                    pmids.append(pmid)
-                else:
-                    failed += 1
-            except Exception as e:
-                logger.error(f"Row {row_idx}: failed to parse HTML for PMID {pmid}: {e}")
-                failed += 1
-                continue
-
-    logger.info(f"prepare_data_by_pmids_csv_file completed: inserted={inserted}, skipped={skipped}, failed={failed}")
-    return pmids
+    report = ingest_pmid_html_files(pmid_html_files, pmid_db, max_workers=max_workers)
+    logger.info(
+        f"prepare_data_by_pmids_csv_file completed: inserted={report.inserted}, "
+        f"skipped={report.skipped + skipped}, failed={report.failed}"
+    )
+    return report.pmids
         
  
-def extract_by_csv_file(interval_time=0.0):
+def save_curated_table(out_dir: str, pmid: str, k: PipelineTypeEnum, value: PKPECuratedTables) -> str | None:
+    """
+    write the curated table of the pipeline to out_dir
+
+    Return:
+    None if the curated table is correct, otherwise the error
+    """
+    if not "curated_table" in value or value["curated_table"] is None:
+        logger.error(f"No curated table found for {pmid} {k}")
+        return f"No curated table found for {pmid} {k}"
+    df = markdown_to_dataframe(value["curated_table"])
+    if df.empty:
+        return None
+    out_fn = Path(out_dir) / f"{pmid}_{k}.csv"
+    df.to_csv(out_fn, index=False)
+    if not value["correct"]:
+        logger.error(f"Curated table for {pmid} {k} is not correct")
+        error_fn = Path(out_dir) / f"{pmid}_{k}_error.txt"
+        error_fn.write_text(f"Curated table for {pmid} {k} is not correct\nExplanation: {value['explanation']}\nSuggested fix: {value['suggested_fix']}\n")
+        return f"Curated table for {pmid} {k} is not correct"
+    return None
+
+
+def extract_by_csv_file():
     parser = argparse.ArgumentParser()
     parser.add_argument("-f", "--pmids_fn", help="csv file path containing pmids to extract")
     parser.add_argument("-o", "--out_dir", required=True, help="output directory")
+    parser.add_argument("-c", "--concurrency", type=int, default=MAX_PIPELINE_CONCURRENCY, help=f"number of curation pipelines running at the same time for one paper, default is {MAX_PIPELINE_CONCURRENCY}.")
+    parser.add_argument("-p", "--papers", type=int, default=MAX_PAPER_CONCURRENCY, help=f"max number of papers curated at the same time, default is {MAX_PAPER_CONCURRENCY}.")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint db file to resume from, default is batch_checkpoint.db in the output directory (-o)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="number of processes parsing the html files, default is the number of cpus.")
+    parser.add_argument("--ingest_only", action="store_true", help="only insert the papers into pmid db, don't curate them.")
     
     args = vars(parser.parse_args())
     
@@ -155,46 +145,42 @@ def extract_by_csv_file(interval_time=0.0):
         return
     
     pmid_db = get_pmid_db()
-    pmids = prepare_data_by_pmids_csv_file(pmids_fn, pmid_db)
+    pmids = prepare_data_by_pmids_csv_file(pmids_fn, pmid_db, max_workers=args["workers"])
+    if args["ingest_only"]:
+        return
     pipeline_llm = get_pipeline_llm()
     agent_llm = get_agent_llm()
     
-    mgr = PKPEManager(
-        pipeline_llm=pipeline_llm, 
-        agent_llm=agent_llm, 
-        pmid_db=pmid_db
-    )
+    def create_manager():
+        return PKPEManager(
+            pipeline_llm=pipeline_llm, 
+            agent_llm=agent_llm, 
+            pmid_db=pmid_db,
+            max_concurrency=args["concurrency"],
+        )
             
     out_dir = args["out_dir"]
+    os.makedirs(out_dir, exist_ok=True)
     error_report = []
-    for pmid in pmids:
-        try:
-            res = mgr.run(pmid)
-            for k, value in res.items():
-                value: PKPECuratedTables = value
-                if not "curated_table" in value or value["curated_table"] is None:
-                    logger.error(f"No curated table found for {pmid} {k}")
-                    error_report.append((pmid, f"No curated table found for {pmid} {k}"))
-                    continue
-                df = markdown_to_dataframe(value["curated_table"])
-                if df.empty:
-                    continue
-                out_fn = Path(out_dir) / f"{pmid}_{k}.csv"
-                df.to_csv(out_fn, index=False)
-                if not value["correct"]:
-                    logger.error(f"Curated table for {pmid} {k} is not correct")
-                    error_report.append((pmid, f"Curated table for {pmid} {k} is not correct"))
-                    error_fn = Path(out_dir) / f"{pmid}_{k}_error.txt"
-                    error_fn.write_text(f"Curated table for {pmid} {k} is not correct\nExplanation: {value['explanation']}\nSuggested fix: {value['suggested_fix']}\n")
-                    
-            time.sleep(interval_time)
-        except Exception as e:
-            logger.error(f"Error ocurred in curating paper {pmid}")
-            logger.error(str(e))
-            print(f"Error ocurred in curating paper {pmid}")
-            print(str(e))
-            error_report.append((pmid, str(e)))
-            continue
+
+    def on_curation_end(pmid: str, k: PipelineTypeEnum, value: PKPECuratedTables):
+        error = save_curated_table(out_dir, pmid, k, value)
+        if error is not None:
+            error_report.append((pmid, error))
+
+    checkpoint_fn = args["checkpoint"] if args["checkpoint"] is not None \
+        else Path(out_dir) / "batch_checkpoint.db"
+    runner = PKPEBatchRunner(
+        manager_factory=create_manager,
+        checkpoint_db=BatchCheckpointDB(Path(checkpoint_fn)),
+        max_papers=args["papers"],
+        curation_end_callback=on_curation_end,
+    )
+    report = runner.run(pmids)
+    for pmid, error in report.errors:
+        print(f"Error ocurred in curating paper {pmid}")
+        print(error)
+        error_report.append((pmid, error))
 
     if len(error_report) == 0:
         logger.info("All PMIDs are successfully curated.")
@@ -206,4 +192,4 @@ def extract_by_csv_file(interval_time=0.0):
 
 
 if __name__ == "__main__":
-    extract_by_csv_file(interval_time=5.0)
+    extract_by_csv_file()
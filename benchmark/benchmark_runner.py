@@ -0,0 +1,274 @@
+"""
+Scores the tables of several models against the baseline in one run, with the pmids
+scored in a worker pool.
+
+The scores are written to {result_dir}/scores.json and {result_dir}/scores.csv, each file
+is written to a temporary file first and then renamed, so a reader never sees a partial
+result.
+
+Usage:
+python -m benchmark.benchmark_runner -t pk-summary --target 2025-09-22 [-m gpt4o gemini15] [-w 8] [-s separate]
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any, Callable, Literal, Tuple
+import logging
+
+import pandas as pd
+
+from benchmark.comm_llm import rate_tables_with_llm
+from benchmark.comm_semantic import evaluate_semantic_score
+from benchmark.common import (
+    LLMClient,
+    ensure_target_result_directory_existed,
+    prepare_dataset_for_benchmark,
+)
+from benchmark.constant import (
+    BASELINE,
+    BENCHMARK_MAX_WORKERS,
+    BenchmarkType,
+    LLModelType,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BenchmarkScore:
+    """score of a model on a pmid"""
+
+    pmid: str
+    model: str
+    score: int | Tuple[int, int] | str | None = None  # None if the scoring failed
+    error: str | None = None
+    token_usage: Any = None  # llm benchmark only
+
+
+# scores the target table file of a model against the baseline, called as
+# scorer(pmid, baseline_fn, target_fn, cache) where cache is shared by the models of the pmid,
+# returns (score, token usage)
+Scorer = Callable[[str, str, str, dict], tuple[Any, Any]]
+
+
+def semantic_scorer(
+    benchmark_type: BenchmarkType,
+    score_mode: Literal["combined", "separate"] | None = "combined",
+) -> Scorer:
+    def score(pmid: str, baseline: str, target: str, cache: dict):
+        # the baseline of a pmid is read once for all the models
+        if "df_baseline" not in cache:
+            cache["df_baseline"] = pd.read_csv(baseline)
+        score = evaluate_semantic_score(
+            baseline=cache["df_baseline"],
+            target=target,
+            benchmark_type=benchmark_type,
+            score_mode=score_mode,
+        )
+        return score, None
+    return score
+
+
+def llm_scorer(benchmark_type: BenchmarkType, client: LLMClient) -> Scorer:
+    def score(pmid: str, baseline: str, target: str, cache: dict):
+        msg, score, usage = rate_tables_with_llm(
+            client=client,
+            benchmark_type=benchmark_type,
+            baseline=baseline,
+            target=target,
+        )
+        if score is None:
+            raise ValueError(f"Can't find [[score]] in llm message: {msg}")
+        return score, usage
+    return score
+
+
+class BenchmarkRunner:
+    """
+    Scores every (pmid, model) of the dataset with the scorer, several pmids at a time.
+
+    The scorers share one text comparer (see benchmark.evaluate.get_text_comparer), so the
+    embedding model is loaded once for the whole run.
+    """
+    def __init__(
+        self,
+        scorer: Scorer,
+        max_workers: int = BENCHMARK_MAX_WORKERS,
+    ):
+        self.scorer = scorer
+        self.max_workers = max(1, max_workers)
+
+    def score_pmid(self, pmid: str, pmid_dict: dict, models: list[str]) -> list[BenchmarkScore]:
+        scores = []
+        cache = {}
+        for model in models:
+            if model not in pmid_dict:
+                continue
+            logger.info(f"Processing {pmid} with model {model}")
+            res = BenchmarkScore(pmid=pmid, model=model)
+            try:
+                res.score, res.token_usage = self.scorer(
+                    pmid, pmid_dict[BASELINE], pmid_dict[model], cache
+                )
+            except Exception as e:
+                logger.error(f"Error ocurred in scoring {pmid} with model {model}: {e}")
+                res.error = str(e)
+            scores.append(res)
+        return scores
+
+    def run(
+        self,
+        dataset: dict,
+        models: list[LLModelType] | None = None,
+    ) -> list[BenchmarkScore]:
+        """
+        score the models on every pmid of the dataset (see prepare_dataset_for_benchmark),
+        all the models found in the dataset if models is None
+
+        Returns:
+        the scores, sorted by model and pmid
+        """
+        if models is None:
+            models = sorted({
+                model for pmid_dict in dataset.values() for model in pmid_dict if model != BASELINE
+            })
+        else:
+            models = [model.value for model in models]
+
+        start = time.perf_counter()
+        scores = []
+        lock = threading.Lock()
+
+        def run_one(pmid: str):
+            res = self.score_pmid(pmid, dataset[pmid], models)
+            with lock:
+                scores.extend(res)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="benchmark") as executor:
+            for future in [executor.submit(run_one, pmid) for pmid in dataset]:
+                future.result()
+
+        logger.info(
+            f"Benchmark completed in {time.perf_counter() - start:.1f}s: "
+            f"{len(scores)} scores, {sum(1 for s in scores if s.error is not None)} failed"
+        )
+        return sorted(scores, key=lambda s: (s.model, s.pmid))
+
+
+def _write_atomic(path: Path, content: str):
+    # write to a temporary file first, a reader never sees a partial result
+    tmp_path = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+    tmp_path.write_text(content)
+    os.replace(tmp_path, path)
+
+
+def _score_columns(score: BenchmarkScore) -> dict:
+    if isinstance(score.score, tuple):
+        return {"text_score": score.score[0], "numeric_score": score.score[1]}
+    return {"score": score.score}
+
+
+def summarize_scores(scores: list[BenchmarkScore]) -> dict[str, dict]:
+    """
+    return {model: {"count", "failed", mean of each score column}}
+    """
+    summary = {}
+    for model in dict.fromkeys(s.model for s in scores):
+        model_scores = [s for s in scores if s.model == model]
+        df = pd.DataFrame([
+            _score_columns(s) for s in model_scores if s.error is None
+        ])
+        summary[model] = {
+            "count": len(model_scores),
+            "failed": sum(1 for s in model_scores if s.error is not None),
+            **{
+                f"mean_{c}": float(pd.to_numeric(df[c], errors="coerce").mean())
+                for c in df.columns
+            },
+        }
+    return summary
+
+
+def write_benchmark_scores(
+    result_dir: str | Path,
+    scores: list[BenchmarkScore],
+    metadata: dict | None = None,
+) -> tuple[Path, Path]:
+    """
+    write the scores to {result_dir}/scores.json, with their summary, and {result_dir}/scores.csv
+
+    Returns:
+    (json path, csv path)
+    """
+    result_dir = Path(result_dir)
+    json_path = result_dir / "scores.json"
+    csv_path = result_dir / "scores.csv"
+    _write_atomic(json_path, json.dumps(
+        {
+            **(metadata or {}),
+            "summary": summarize_scores(scores),
+            "scores": [asdict(s) for s in scores],
+        },
+        indent=2,
+        default=str,
+    ))
+    df = pd.DataFrame([
+        {"pmid": s.pmid, "model": s.model, **_score_columns(s), "error": s.error}
+        for s in scores
+    ])
+    _write_atomic(csv_path, df.to_csv(index=False))
+    return json_path, csv_path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-t", "--type", default=BenchmarkType.PK_SUMMARY.value,
+        choices=[BenchmarkType.PK_SUMMARY.value, BenchmarkType.PK_INDIVIDUAL.value, BenchmarkType.PE.value],
+        help="benchmark type",
+    )
+    parser.add_argument("--baseline", default=BASELINE, help="baseline directory in ./benchmark/data/{type}")
+    parser.add_argument("--target", required=True, help="target directory in ./benchmark/data/{type}")
+    parser.add_argument("-m", "--models", nargs="+", help="models to score, all the models in target by default")
+    parser.add_argument("-w", "--workers", type=int, default=BENCHMARK_MAX_WORKERS, help="number of pmids scored at the same time")
+    parser.add_argument("-s", "--score-mode", default="combined", choices=["combined", "separate"])
+    args = parser.parse_args()
+
+    benchmark_type = BenchmarkType(args.type)
+    dataset = prepare_dataset_for_benchmark(
+        baseline_dir=os.path.join("./benchmark/data", benchmark_type.value, args.baseline),
+        target_dir=os.path.join("./benchmark/data", benchmark_type.value, args.target),
+        benchmark_type=benchmark_type,
+    )
+    runner = BenchmarkRunner(
+        scorer=semantic_scorer(benchmark_type, args.score_mode),
+        max_workers=args.workers,
+    )
+    models = None if args.models is None else [LLModelType(m) for m in args.models]
+    scores = runner.run(dataset, models)
+    result_dir = ensure_target_result_directory_existed(
+        baseline=args.baseline,
+        target=args.target,
+        benchmark_type=benchmark_type,
+    )
+    json_path, _ = write_benchmark_scores(
+        result_dir,
+        scores,
+        metadata={
+            "benchmark_type": benchmark_type.value,
+            "baseline": args.baseline,
+            "target": args.target,
+            "score_mode": args.score_mode,
+        },
+    )
+    print(json.dumps(summarize_scores(scores), indent=2))
+    print(f"scores are written to {json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import re
-from typing import Union
+from typing import Any, Union
 from string import Template
 import logging
 
@@ -58,6 +58,40 @@ def write_LLM_score(
             fobj.write(f"{model}, {pmid}, {score}, {token_usage}")
 
 
+LLM_SCORE_PATTERN = re.compile(r"\[\[\d+(.+\d+)?\]\]")
+
+
+def rate_tables_with_llm(
+    client: LLMClient,
+    benchmark_type: Union[BenchmarkType.PE, BenchmarkType.PK_SUMMARY],
+    baseline: str,
+    target: str,
+) -> tuple[str, str | None, Any]:
+    """
+    ask the llm to rate the target table file against the baseline table file
+
+    Returns:
+    (llm message, score in the format [[{score}]] or None if not found, token usage)
+    """
+    with open(baseline, "r") as fobj:
+        table_baseline = fobj.read()
+    with open(target, "r") as fobj:
+        table_target = fobj.read()
+    user_message = table_prompt_template.substitute(
+        {
+            "table_baseline": table_baseline,
+            "table_generated": table_target,
+        }
+    )
+    cols_definition = generate_columns_definition(benchmark_type)
+    system_prompts = system_prompts_template.substitute(
+        {"columns_definition": cols_definition}
+    )
+    msg, usage = client.create(system_prompts, user_message)
+    res = LLM_SCORE_PATTERN.search(msg)
+    return msg, (None if res is None else res[0]), usage
+
+
 def run_llm_benchmark(
     dataset: dict,
     benchmark_type: Union[BenchmarkType.PE, BenchmarkType.PK_SUMMARY],
@@ -66,28 +100,17 @@ def run_llm_benchmark(
     client: LLMClient,
 ):
     scores = []
-    pat = re.compile(r"\[\[\d+(.+\d+)?\]\]")
     for id in dataset:
         the_dict = dataset[id]
         baseline = the_dict["baseline"]
         if model.value not in the_dict:
             continue
-        gpt4o = the_dict[model.value]
-        with open(baseline, "r") as fobj:
-            table_baseline = fobj.read()
-        with open(gpt4o, "r") as fobj:
-            table_gpt4o = fobj.read()
-        user_message = user_message = table_prompt_template.substitute(
-            {
-                "table_baseline": table_baseline,
-                "table_generated": table_gpt4o,
-            }
-        )
-        cols_definition = generate_columns_definition(benchmark_type)
-        system_prompts = system_prompts_template.substitute(
-            {"columns_definition": cols_definition}
+        msg, score, usage = rate_tables_with_llm(
+            client=client,
+            benchmark_type=benchmark_type,
+            baseline=baseline,
+            target=the_dict[model.value],
         )
-        msg, usage = client.create(system_prompts, user_message)
         write_LLM_score(
             output_fn=result_file,
             model=model.value,
@@ -95,14 +118,13 @@ def run_llm_benchmark(
             score=msg,
             token_usage=usage,
         )
-        res = pat.search(msg)
-        if res is None:
+        if score is None:
             logger.error(f"Can't find [[score]] for pmid {id}")
             continue
         scores.append(
             {
                 "pmid": id,
-                "score": res[0],
+                "score": score,
                 "token_usage": usage,
             }
         )
@@ -33,6 +33,30 @@ def get_preprocess_and_evaluate_function(benchmark_type: BenchmarkType):
     else:
         raise ValueError(f"Unsupported benchmark type: {benchmark_type}")
 
+def evaluate_semantic_score(
+    baseline: str | pd.DataFrame,
+    target: str,
+    benchmark_type: Union[BenchmarkType.PE, BenchmarkType.PK_SUMMARY],
+    score_mode: Literal["combined", "separate"] | None = "combined",
+) -> int | Tuple[int, int]:
+    """
+    score the target table file against the baseline table (file or dataframe)
+    """
+    preprocess_table, evaluate_dataframe = get_preprocess_and_evaluate_function(benchmark_type)
+    # check if target is empty
+    target_path = Path(target)
+    content = target_path.read_text()
+    if content.strip().strip('"') == "":
+        return 0
+
+    df_baseline = baseline if isinstance(baseline, pd.DataFrame) else pd.read_csv(baseline)
+    df_target = preprocess_table(target)
+    return evaluate_dataframe(
+        df_baseline=df_baseline,
+        df=df_target,
+        score_mode=score_mode,
+    )
+
 def run_semantic_benchmark(
     dataset: dict,
     benchmark_type: Union[BenchmarkType.PE, BenchmarkType.PK_SUMMARY],
@@ -47,32 +71,15 @@ def run_semantic_benchmark(
     result_file: str,
     score_mode: Literal["combined", "separate"] | None = "combined",
 ):
-    preprocess_table, evaluate_dataframe = get_preprocess_and_evaluate_function(benchmark_type)
     for id in dataset:
         the_dict = dataset[id]
         if model.value not in the_dict:
             continue
         logger.info(f"Processing {id} with model {model.value}")
-        baseline = the_dict[BASELINE]
-        target = the_dict[model.value]
-        # check if target is empty
-        target_path = Path(target)
-        content = target_path.read_text()
-        if content.strip().strip('"') == "":
-            score = 0
-            write_semantic_score(
-                output_fn=result_file,
-                model=model.value,
-                pmid=id,
-                score=score,
-            )
-            continue
-
-        df_baseline = pd.read_csv(baseline)
-        df_target = preprocess_table(target)
-        score = evaluate_dataframe(
-            df_baseline=df_baseline,
-            df=df_target,
+        score = evaluate_semantic_score(
+            baseline=the_dict[BASELINE],
+            target=the_dict[model.value],
+            benchmark_type=benchmark_type,
             score_mode=score_mode,
         )
         write_semantic_score(
@@ -27,3 +27,5 @@ class LLModelType(Enum):
     GPTOSS="gpt-oss"
     QWEN3="qwen3"
     CODEX="codex"
+
+BENCHMARK_MAX_WORKERS = 8 # number of pmids scored at the same time by the benchmark runner
@@ -1,12 +1,15 @@
-from typing import Any, Literal, Tuple
+from typing import Any, Callable, Iterable, Literal, Tuple
+import numpy as np
 import pandas as pd
 from pandas import DataFrame, Series
 import math
 import functools
+import threading
 import logging
 
 from benchmark.common import ColumnType
-from benchmark.utils import is_digit
+from benchmark.utils import is_digit, max_weight_assignment
+from extractor.database.embedding_cache_db import EmbeddingCacheDB, get_embedding_cache_db
 from extractor.utils import (
     extract_float_value,
     extract_float_values,
@@ -27,6 +30,8 @@ Drug Name:      15/100
 
 DELTA_VALUE = 0.000001
 SIMILARITY_DISTANCE_THRESHOLD = 0.42
+EMBEDDING_MODEL_NAME = "FremyCompany/BioLORD-2023" # "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BATCH_SIZE = 64
 
 
 def is_abbreviation_or_contraction(a, b):
@@ -74,11 +79,128 @@ def is_values_in_strings_equaled(a: str, b: str):
     return True
 
 
+def _abbreviation_matrix(texts1: list[str], texts2: list[str]) -> np.ndarray:
+    """
+    is_abbreviation_or_contraction() of every pair of texts.
+    The letters of the shorter text must be in the longer one, so the pairs failing the
+    letter counts are ruled out at once and only the others are checked in order.
+    """
+    letters = np.frombuffer(b"abcdefghijklmnopqrstuvwxyz", dtype=np.uint8)
+
+    def _features(texts: list[str]):
+        stripped = [t.strip().lower() for t in texts]
+        lengths = np.array([len(t) for t in stripped], dtype=int)
+        counts = np.array(
+            [[t.count(chr(c)) for c in letters] for t in stripped], dtype=int
+        ).reshape(len(texts), len(letters))
+        return lengths, counts
+
+    len1, counts1 = _features(texts1)
+    len2, counts2 = _features(texts2)
+    # the first text is the shorter one if it is strictly shorter
+    first_is_short = len1[:, None] < len2[None, :]
+    short_counts_fit = np.ones((len(texts1), len(texts2)), dtype=bool)
+    short_has_letter = np.zeros((len(texts1), len(texts2)), dtype=bool)
+    for k in range(len(letters)):
+        c1 = counts1[:, k][:, None]
+        c2 = counts2[:, k][None, :]
+        short_counts_fit &= np.where(first_is_short, c1 <= c2, c2 <= c1)
+        short_has_letter |= np.where(first_is_short, c1 > 0, c2 > 0)
+    both_empty = (len1[:, None] == 0) & (len2[None, :] == 0)
+    matrix = both_empty.copy()
+    for i, j in zip(*np.nonzero(short_counts_fit & short_has_letter & ~both_empty)):
+        matrix[i, j] = is_abbreviation_or_contraction(texts1[i], texts2[j])
+    return matrix
+
+
+def _values_key(text: str):
+    values = extract_float_values(text)
+    return None if values is None else tuple(values)
+
+
+def _factorize(values: Iterable) -> tuple[np.ndarray, list]:
+    """
+    return (codes, uniques) of the values, the NaN values share one code
+    """
+    index = {}
+    uniques = []
+    codes = []
+    for v in values:
+        key = None if _is_nan(v) else (type(v), v)
+        if key not in index:
+            index[key] = len(uniques)
+            uniques.append(math.nan if key is None else v)
+        codes.append(index[key])
+    return np.array(codes, dtype=int), uniques
+
+
+def _is_nan(v) -> bool:
+    return v is None or (isinstance(v, float) and math.isnan(v))
+
+
+def _numbers_equal(nums1: np.ndarray, nums2: np.ndarray) -> np.ndarray:
+    """two numbers are equal if both are NaN or they differ by less than DELTA_VALUE"""
+    nan1 = np.isnan(nums1)[:, None]
+    nan2 = np.isnan(nums2)[None, :]
+    return (nan1 & nan2) | (np.abs(nums1[:, None] - nums2[None, :]) < DELTA_VALUE)
+
+
 class TextComparer:
-    def __init__(self) -> None:
-        from sentence_transformers import SentenceTransformer
+    """
+    Compares texts by the cosine similarity of their embeddings.
 
-        self.model = SentenceTransformer("FremyCompany/BioLORD-2023") # SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+    The embeddings are normalized and kept in memory and in the embedding cache db, each
+    text is encoded once. encode_texts() encodes the texts of a table in batches before
+    they are compared, compare() then only looks up the embeddings.
+    """
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        model: Any | None = None,
+        embedding_cache_db: EmbeddingCacheDB | None = None,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+    ) -> None:
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+
+            model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.model = model
+        self.embedding_cache_db = (
+            embedding_cache_db
+            if embedding_cache_db is not None
+            else get_embedding_cache_db()
+        )
+        self.batch_size = batch_size
+        self.embeddings: dict[str, np.ndarray] = {}
+        self._lock = threading.Lock() # guards self.embeddings
+
+    def encode_texts(self, texts: Iterable[str]):
+        """
+        encode the texts that have no embedding yet, in batches
+        """
+        with self._lock:
+            missing = list(dict.fromkeys(
+                text for text in texts if isinstance(text, str) and text not in self.embeddings
+            ))
+            if len(missing) == 0:
+                return
+            if self.embedding_cache_db is not None:
+                cached = self.embedding_cache_db.select_embeddings(self.model_name, missing)
+                self.embeddings.update(cached)
+                missing = [text for text in missing if text not in cached]
+            if len(missing) == 0:
+                return
+            encoded = self.model.encode(
+                missing,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            )
+            encoded = dict(zip(missing, np.asarray(encoded, dtype=np.float32)))
+            self.embeddings.update(encoded)
+            if self.embedding_cache_db is not None:
+                self.embedding_cache_db.insert_embeddings(self.model_name, encoded)
 
     def compare(self, a, b) -> float:
         if is_abbreviation_or_contraction(a, b):
@@ -86,12 +208,37 @@ class TextComparer:
         if not is_values_in_strings_equaled(a, b):
             return 0.0
 
-        from sentence_transformers import util
+        self.encode_texts([a, b])
+        # the embeddings are normalized, the cosine similarity is the dot product
+        return float(np.dot(self.embeddings[a], self.embeddings[b]))
+
+    def compare_matrix(self, texts1: list[str], texts2: list[str]) -> np.ndarray:
+        """
+        compare() of every pair of texts, in a matrix of shape (len(texts1), len(texts2))
+        """
+        if len(texts1) == 0 or len(texts2) == 0:
+            return np.zeros((len(texts1), len(texts2)))
+        self.encode_texts(texts1 + texts2)
+        embeddings1 = np.stack([self.embeddings[t] for t in texts1])
+        embeddings2 = np.stack([self.embeddings[t] for t in texts2])
+        similarity = embeddings1 @ embeddings2.T
+
+        codes, _ = _factorize(_values_key(t) for t in texts1 + texts2)
+        values_equaled = codes[:len(texts1), None] == codes[None, len(texts1):]
+        similarity = np.where(values_equaled, similarity, 0.0)
+        return np.where(_abbreviation_matrix(texts1, texts2), 1.0, similarity)
+
+
+_text_comparer: TextComparer | None = None
+_text_comparer_lock = threading.Lock()
 
-        embedding_1 = self.model.encode(a, convert_to_tensor=True)
-        embedding_2 = self.model.encode(b, convert_to_tensor=True)
-        dist = util.pytorch_cos_sim(embedding_1, embedding_2)
-        return dist[0][0].item()
+def get_text_comparer() -> TextComparer:
+    """return the shared text comparer, so the model is loaded once per process"""
+    global _text_comparer
+    with _text_comparer_lock:
+        if _text_comparer is None:
+            _text_comparer = TextComparer()
+        return _text_comparer
 
 
 class TablesEvaluator:
@@ -100,12 +247,13 @@ class TablesEvaluator:
         rating_cols: list[str] | list[tuple[str, float]], 
         anchor_cols: list[str],
         columns_type: dict[str, ColumnType] | None = None,
+        text_cmpr: TextComparer | None = None,
     ):
         self.rating_cols = rating_cols
         self.anchor_cols = anchor_cols
         self.columns_type = columns_type
         
-        self.text_cmpr = TextComparer()
+        self.text_cmpr = text_cmpr if text_cmpr is not None else get_text_comparer()
 
     def anchor_row(self, row1: Series, row2: Series):
         # locate row by anchor columns
@@ -271,25 +419,208 @@ class TablesEvaluator:
             100.0 * (sum / (10.0 * less_row_num + 1 * (more_row_num - less_row_num)))
         )
 
+    def _get_compared_texts(self, tables: list[DataFrame]) -> list[str]:
+        """
+        collect the texts of the anchor and rating columns, as they are passed to
+        self.text_cmpr.compare()
+        """
+        columns = list(self.anchor_cols) + [
+            c[0] if isinstance(c, tuple) else c for c in self.rating_cols
+        ]
+        texts = set()
+        for table in tables:
+            for c in dict.fromkeys(columns):
+                if c not in table.columns:
+                    continue
+                for v in table[c]:
+                    if not isinstance(v, str):
+                        continue
+                    texts.update((v, v.strip(), v.strip().strip("\"'")))
+        return list(texts)
+
+    @staticmethod
+    def _pairwise(values1: Iterable, values2: Iterable, equal_matrix: Callable) -> np.ndarray:
+        """
+        evaluate equal_matrix(uniques1, uniques2) on the distinct values only and expand it
+        to a boolean matrix of shape (len(values1), len(values2))
+        """
+        codes1, uniques1 = _factorize(values1)
+        codes2, uniques2 = _factorize(values2)
+        return equal_matrix(uniques1, uniques2)[np.ix_(codes1, codes2)]
+
+    def _is_equal_matrix(self, values1: list, values2: list) -> np.ndarray:
+        """_is_equal() of every pair of values"""
+        def _features(values: list):
+            is_num = np.array(
+                [not isinstance(v, str) or is_digit(v) for v in values], dtype=bool
+            )
+            nums = np.array(
+                [float(v) if num else math.nan for v, num in zip(values, is_num)], dtype=float
+            )
+            strs = [v for v, num in zip(values, is_num) if not num]
+            # a text equals NaN if it is empty or not a number, and equals the number it starts with
+            equals_nan = []
+            extracted = []
+            for v in strs:
+                sval = v.strip()
+                fv = extract_float_value(sval) if len(sval) > 0 else math.nan
+                try:
+                    float(sval)
+                    equals_nan.append(fv is None)
+                except ValueError:
+                    equals_nan.append(True)
+                extracted.append(math.nan if fv is None else fv)
+            return (
+                np.flatnonzero(is_num), nums[is_num], np.flatnonzero(~is_num), strs,
+                np.array(equals_nan, dtype=bool), np.array(extracted, dtype=float),
+            )
+
+        num_ix1, nums1, str_ix1, strs1, equals_nan1, extracted1 = _features(values1)
+        num_ix2, nums2, str_ix2, strs2, equals_nan2, extracted2 = _features(values2)
+        matrix = np.zeros((len(values1), len(values2)), dtype=bool)
+        with np.errstate(invalid="ignore"):
+            matrix[np.ix_(num_ix1, num_ix2)] = _numbers_equal(nums1, nums2)
+            matrix[np.ix_(str_ix1, num_ix2)] = np.where(
+                np.isnan(nums2)[None, :],
+                equals_nan1[:, None],
+                np.abs(extracted1[:, None] - nums2[None, :]) < DELTA_VALUE,
+            )
+            matrix[np.ix_(num_ix1, str_ix2)] = np.where(
+                np.isnan(nums1)[:, None],
+                equals_nan2[None, :],
+                np.abs(nums1[:, None] - extracted2[None, :]) < DELTA_VALUE,
+            )
+        matrix[np.ix_(str_ix1, str_ix2)] = (
+            (np.array(strs1, dtype=object)[:, None] == np.array(strs2, dtype=object)[None, :])
+            | (self.text_cmpr.compare_matrix(strs1, strs2) >= SIMILARITY_DISTANCE_THRESHOLD)
+        )
+        return matrix
+
+    def _is_equal_text_matrix(self, values1: list, values2: list) -> np.ndarray:
+        """_is_equal_text() of every pair of values"""
+        def _features(values: list):
+            is_str = np.array([isinstance(v, str) for v in values], dtype=bool)
+            is_nan = np.array([_is_nan(v) for v in values], dtype=bool)
+            texts = [v.strip().strip("\"'") for v in values if isinstance(v, str)]
+            return np.flatnonzero(is_str), is_nan, texts
+
+        str_ix1, is_nan1, texts1 = _features(values1)
+        str_ix2, is_nan2, texts2 = _features(values2)
+        matrix = is_nan1[:, None] & is_nan2[None, :]
+        # NaN equals the empty text
+        empty1 = np.array([len(t) == 0 for t in texts1], dtype=bool)
+        empty2 = np.array([len(t) == 0 for t in texts2], dtype=bool)
+        matrix[np.ix_(str_ix1, np.flatnonzero(is_nan2))] = empty1[:, None]
+        matrix[np.ix_(np.flatnonzero(is_nan1), str_ix2)] = empty2[None, :]
+        lowered1 = np.array([t.lower() for t in texts1], dtype=object)
+        lowered2 = np.array([t.lower() for t in texts2], dtype=object)
+        matrix[np.ix_(str_ix1, str_ix2)] = (
+            (lowered1[:, None] == lowered2[None, :])
+            | (self.text_cmpr.compare_matrix(texts1, texts2) > SIMILARITY_DISTANCE_THRESHOLD)
+        )
+        return matrix
+
+    @staticmethod
+    def _is_equal_numeric_matrix(values1: list, values2: list) -> np.ndarray:
+        """_is_equal_numeric() of every pair of values"""
+        def _to_float(v) -> float:
+            try:
+                v = extract_float_value(v.strip().strip("\"'")) \
+                    if isinstance(v, str) else v
+                return float(v)
+            except (
+                ValueError,
+                TypeError
+            ):
+                return math.nan
+
+        nums1 = np.array([_to_float(v) for v in values1], dtype=float)
+        nums2 = np.array([_to_float(v) for v in values2], dtype=float)
+        with np.errstate(invalid="ignore"):
+            return _numbers_equal(nums1, nums2)
+
+    def rate_row_matrix(self, rows1: DataFrame, rows2: DataFrame) -> np.ndarray:
+        """
+        rate_row() of every pair of rows, in a matrix of shape (len(rows1), len(rows2))
+        """
+        sum = np.zeros((rows1.shape[0], rows2.shape[0]))
+        total_weight = 0.0
+        for c in self.rating_cols:
+            if isinstance(c, tuple):
+                c, weight = c
+            else:
+                weight = 1.0
+            if self.columns_type[c] == ColumnType.Text:
+                equal = self._pairwise(rows1[c], rows2[c], self._is_equal_text_matrix)
+            else:
+                equal = self._pairwise(rows1[c], rows2[c], self._is_equal_numeric_matrix)
+            sum = sum + weight * equal
+            total_weight += weight
+        return (10.0 * sum / total_weight).astype(int)
+
+    def anchor_rows_matrix(self, rows1: DataFrame, rows2: DataFrame) -> np.ndarray:
+        """
+        anchor_row_from_rows() of every row of rows1, in a boolean matrix of shape
+        (len(rows1), len(rows2)): the rows of rows2 each row of rows1 can be anchored to
+        """
+        n1, n2 = rows1.shape[0], rows2.shape[0]
+        candidates = np.ones((n1, n2), dtype=bool)
+        anchored = np.zeros(n1, dtype=bool) # a single row is found
+        found = np.zeros(n1, dtype=bool) # the last anchor column matched some rows
+        for c in self.anchor_cols:
+            values = [v.strip() if isinstance(v, str) else v for v in rows1[c]]
+            skipped = np.array(
+                [v is None or (isinstance(v, str) and len(v) == 0) for v in values],
+                dtype=bool,
+            ).reshape(n1)
+            active = ~anchored & ~skipped
+            similar = candidates & self._pairwise(values, rows2[c], self._is_equal_matrix)
+            n_similar = similar.sum(axis=1)
+            reset = active & (n_similar == 0)
+            narrowed = active & (n_similar > 0)
+            candidates[reset] = True
+            candidates[narrowed] = similar[narrowed]
+            found[reset] = False
+            found[narrowed] = True
+            anchored |= active & (n_similar == 1)
+        candidates[~found] = False
+        return candidates
+
     def rate_rows(self, baseline: DataFrame, target: DataFrame) -> int | Tuple[int, int]:
         bshape = baseline.shape
         tshape = target.shape
         if bshape[1] != tshape[1]:
             return 0
 
+        # encode the cells of both tables at once, the comparisons below are lookups
+        self.text_cmpr.encode_texts(self._get_compared_texts([baseline, target]))
+
         less = baseline if bshape[0] <= tshape[0] else target
         much = baseline if bshape[0] > tshape[0] else target
         less_row_num = less.shape[0]
         more_row_num = much.shape[0]
+
+        # rate every pair of anchored rows, then pair the rows one to one
+        # with the highest total rating
+        candidates = self.anchor_rows_matrix(less, much)
+        rates = self.rate_row_matrix(less, much)
+        weights = rates if rates.ndim == 2 else rates.sum(axis=2)
+        weights = np.where(candidates, weights, 0)
+        # only the rows and columns with a positive weight take part in the assignment
+        row_ix = np.flatnonzero((weights > 0).any(axis=1))
+        col_ix = np.flatnonzero((weights > 0).any(axis=0))
+        pairs = {
+            int(row_ix[i]): int(col_ix[j])
+            for i, j in max_weight_assignment(weights[np.ix_(row_ix, col_ix)])
+        }
+        zero = np.zeros(rates.shape[2:], dtype=rates.dtype).tolist()
         scores = []
-        much_rows = much.to_dict("records")
-        for index, row in less.iterrows():
-            much_row = self.anchor_row_from_rows(row, much_rows)
-            
-            if much_row is None:
-                scores.append(0)
+        for ix in range(less_row_num):
+            j = pairs.get(ix)
+            if j is None or not candidates[ix, j]:
+                scores.append(zero)
                 continue
-            scores.append(self.rate_row(row, much_row))
+            scores.append(rates[ix, j].tolist())
 
         logger.info(f"scores: {scores}")
         logger.info(f"less row number: {less_row_num}, much row number: {more_row_num}")
@@ -339,6 +670,19 @@ class TablesSeparateEvaluator(TablesEvaluator):
             10.0 * sum_numeric / float(self.sum_num_rating_cols)
         )
     
+    def rate_row_matrix(self, rows1, rows2):
+        sum_text = np.zeros((rows1.shape[0], rows2.shape[0]))
+        sum_numeric = np.zeros((rows1.shape[0], rows2.shape[0]))
+        for c in self.rating_cols:
+            if self.columns_type[c] == ColumnType.Text:
+                sum_text = sum_text + self._pairwise(rows1[c], rows2[c], self._is_equal_text_matrix)
+            else:
+                sum_numeric = sum_numeric + self._pairwise(rows1[c], rows2[c], self._is_equal_numeric_matrix)
+        return np.stack([
+            10.0 * sum_text / float(self.sum_text_rating_cols),
+            10.0 * sum_numeric / float(self.sum_num_rating_cols),
+        ], axis=2)
+
     def sum_scores(self, scores: list[Tuple[int, int]], less_row_num, more_row_num) -> Tuple[int, int]:
         text_sum = functools.reduce(lambda s, i: s + i[0], scores, 0)
         numeric_sum = functools.reduce(lambda s, i: s + i[1], scores, 0)
@@ -0,0 +1,64 @@
+"""
+Micro-benchmark of the markdown/DataFrame conversion in TabFuncFlow.utils.table_utils.
+
+Usage:
+python -m benchmark.table_utils_benchmark [-r 10 100 1000 5000] [-c 8] [-n 20]
+"""
+import argparse
+import time
+from typing import Callable
+
+import pandas as pd
+
+from TabFuncFlow.utils.table_utils import dataframe_to_markdown, markdown_to_dataframe
+
+
+def _make_table(n_rows: int, n_cols: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        f"Parameter {j}": [f"{i * 0.25:.2f} ± {j}" for i in range(n_rows)]
+        for j in range(n_cols)
+    })
+
+
+def _time_call(fn: Callable, arg, repeat: int) -> float:
+    """return the best time of `repeat` calls, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run_benchmark(rows: list[int], n_cols: int, repeat: int) -> list[dict]:
+    results = []
+    for n_rows in rows:
+        df = _make_table(n_rows, n_cols)
+        md_table = dataframe_to_markdown(df)
+        results.append({
+            "rows": n_rows,
+            "cols": n_cols,
+            "dataframe_to_markdown_ms": _time_call(dataframe_to_markdown, df, repeat),
+            "markdown_to_dataframe_ms": _time_call(markdown_to_dataframe, md_table, repeat),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-r", "--rows", type=int, nargs="+", default=[10, 100, 1000, 5000], help="table sizes in rows")
+    parser.add_argument("-c", "--cols", type=int, default=8, help="number of columns")
+    parser.add_argument("-n", "--repeat", type=int, default=20, help="number of timed calls per size, the best is reported")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, args.cols, args.repeat)
+    print(f"{'rows':>6} {'cols':>5} {'df->md (ms)':>12} {'md->df (ms)':>12}")
+    for res in results:
+        print(
+            f"{res['rows']:>6} {res['cols']:>5} "
+            f"{res['dataframe_to_markdown_ms']:>12.3f} {res['markdown_to_dataframe_ms']:>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import json
 from typing import Union
 import re
+import numpy as np
 
 from .constant import BenchmarkType
 
@@ -47,4 +48,52 @@ def is_digit(s: str) -> bool:
 
     # Regular expression for integer or decimal number with optional sign
     pattern = r'^[+-]?\d+(\.\d+)?$'
-    return bool(re.match(pattern, s))
\ No newline at end of file
+    return bool(re.match(pattern, s))
+
+
+def max_weight_assignment(weights: np.ndarray) -> list[tuple[int, int]]:
+    """
+    Assign the rows of the weight matrix to distinct columns, maximizing the total weight
+    (Hungarian algorithm, shortest augmenting paths).
+    Each row is assigned if there are at least as many columns as rows, otherwise each column.
+    Returns:
+        [(row, column)], sorted by row
+    """
+    weights = np.asarray(weights, dtype=float)
+    if weights.shape[0] > weights.shape[1]:
+        return sorted((r, c) for c, r in max_weight_assignment(weights.T))
+    n, m = weights.shape
+    cost = -weights
+    # potentials, column 0 is the dummy column the augmenting paths start from
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int) # p[j]: 1-based row assigned to column j, 0 if free
+    way = np.zeros(m + 1, dtype=int)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            improved = free[1:] & (cur < minv[1:])
+            minv[1:][improved] = cur[improved]
+            way[1:][improved] = j0
+            masked = np.where(free, minv, np.inf)
+            j1 = int(np.argmin(masked))
+            delta = masked[j1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        # augment along the path
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    return sorted((int(p[j]) - 1, j - 1) for j in range(1, m + 1) if p[j] > 0)
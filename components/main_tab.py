@@ -12,6 +12,7 @@ import ast
 from extractor.agents.pk_pe_agents.pk_pe_agents_types import PKPECuratedTables
 from extractor.database.pmid_db import PMIDDB
 from extractor.pmid_extractor.article_retriever import ArticleRetriever
+from extractor.pmid_extractor.html_document import HtmlDocument
 from extractor.pmid_extractor.html_table_extractor import HtmlTableExtractor
 from extractor.utils import (
     convert_html_to_text_no_table,
@@ -47,6 +48,7 @@ from extractor.agents.pk_population_individual.pk_popu_ind_workflow import PKPop
 from extractor.agents.pk_drug_individual.pk_drug_ind_workflow import PKDrugIndWorkflow
 from extractor.agents.pe_study_info.pe_study_info_workflow import PEStudyInfoWorkflow
 from extractor.agents.pe_study_outcome_ver2.pe_study_out_workflow import PEStudyOutWorkflow
+from extractor.agents.workflow_factory import get_workflow
 from extractor.request_openai import get_5_openai, get_openai, get_client_and_model
 from extractor.agents.agent_factory import get_pipeline_llm, get_agent_llm
 from extractor.request_deepseek import get_deepseek
@@ -208,10 +210,11 @@ def retrieve_article(pmid: str) -> Tuple[bool, str | None, str]:
 def extract_article_assets(html: str):
     """Return tables, title, abstract, and section list from raw HTML."""
     extractor = HtmlTableExtractor()
-    tables = extractor.extract_tables(html)
-    title = extractor.extract_title(html)
-    abstract = extractor.extract_abstract(html)
-    sections = extractor.extract_sections(html)
+    doc = HtmlDocument(html)
+    tables = extractor.extract_tables(doc)
+    title = extractor.extract_title(doc)
+    abstract = extractor.extract_abstract(doc)
+    sections = extractor.extract_sections(doc)
     return tables, title, abstract, sections
 
 def prettify_md(md_text: str) -> str:
@@ -401,8 +404,7 @@ def run_curation(
         wf_cls = PKSumWorkflow if task == PROMPTS_NAME_PK_SUM else PKIndWorkflow
         for tbl in selected_tables:
             caption = "\n".join([tbl.get("caption", ""), tbl.get("footnote", "")])
-            wf = wf_cls(llm=llm)
-            wf.build()
+            wf = get_workflow(wf_cls, llm=llm)
             try:
                 if task == PROMPTS_NAME_PK_SUM:
                     df = wf.go_md_table(
@@ -440,8 +442,7 @@ def run_curation(
                 PROMPTS_NAME_PK_POPU_IND: PKPopuIndWorkflow,
             }
             wf_cls = full_mapping.get(task)
-            wf = wf_cls(llm=llm)
-            wf.build()
+            wf = get_workflow(wf_cls, llm=llm)
             result_df = wf.go_full_text(
                 title=title,
                 full_text=article_text,
@@ -455,8 +456,7 @@ def run_curation(
             wf_cls = PKPopuSumWorkflow if task == PROMPTS_NAME_PK_POPU_SUM else PKPopuIndWorkflow
             for tbl in selected_tables:
                 caption = "\n".join([tbl.get("caption", ""), tbl.get("footnote", "")])
-                wf = wf_cls(llm=llm)
-                wf.build()
+                wf = get_workflow(wf_cls, llm=llm)
                 try:
                     df = wf.go_full_text(
                         title=title,
@@ -486,8 +486,7 @@ def run_curation(
         wf_cls = PEStudyOutWorkflow if task == PROMPTS_NAME_PE_STUDY_OUT else None
         for tbl in selected_tables:
             caption = "\n".join([tbl.get("caption", ""), tbl.get("footnote", "")])
-            wf = wf_cls(llm=llm)
-            wf.build()
+            wf = get_workflow(wf_cls, llm=llm)
             try:
                 df = wf.go_md_table(
                     title=title,
@@ -518,8 +517,7 @@ def run_curation(
             PROMPTS_NAME_PE_STUDY_INFO: PEStudyInfoWorkflow
         }
         wf_cls = full_mapping.get(task)
-        wf = wf_cls(llm=llm)
-        wf.build()
+        wf = get_workflow(wf_cls, llm=llm)
         result_df = wf.go_full_text(
             title=title,
             full_text=article_text,
@@ -1,13 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 import re
-from typing import Optional, Protocol
+from typing import Any, Callable, Iterable, Optional, Protocol
 from langchain_core.prompts import (
     PromptTemplate,
     SystemMessagePromptTemplate,
     ChatPromptTemplate,
 )
 
+from extractor.constants import MAX_SUB_TABLE_CONCURRENCY
 from extractor.database.pmid_db import PMIDDB
 from extractor.pmid_extractor.article_retriever import ArticleRetriever
+from extractor.pmid_extractor.html_document import HtmlDocument
 from extractor.pmid_extractor.html_table_extractor import HtmlTableExtractor
 from extractor.utils import convert_html_to_text_no_table, remove_references
 
@@ -74,6 +78,26 @@ def increase_token_usage(
     return token_usage
 
 
+def map_concurrently(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_concurrency: int = MAX_SUB_TABLE_CONCURRENCY,
+) -> list[Any]:
+    """
+    Apply func to every item with at most max_concurrency worker threads.
+
+    The results are in the same order as items. If func raises, the exception of
+    the first failed item (in item order) is re-raised. The workers run in a copy of
+    the caller's context, so they share its retry budget.
+    """
+    items = list(items)
+    if max_concurrency <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(items))) as executor:
+        futures = [executor.submit(copy_context().run, func, item) for item in items]
+        return [future.result() for future in futures]
+
+
 def extract_integers(text):
     """
     Extract only "pure integers":
@@ -119,11 +143,12 @@ def extract_pmid_info_to_db(
         if not res:
             return None, None, None, None, None, None
     extractor = HtmlTableExtractor()
-    tables = extractor.extract_tables(html_content)
-    sections = extractor.extract_sections(html_content)
-    abstract = extractor.extract_abstract(html_content)
-    title = extractor.extract_title(html_content)
-    full_text = convert_html_to_text_no_table(html_content)
+    doc = HtmlDocument(html_content)
+    tables = extractor.extract_tables(doc)
+    sections = extractor.extract_sections(doc)
+    abstract = extractor.extract_abstract(doc)
+    title = extractor.extract_title(doc)
+    full_text = convert_html_to_text_no_table(doc)
     full_text = remove_references(full_text)
     pmid_db.insert_pmid_info(pmid, title, abstract, full_text, tables, sections)
     return pmid, title, abstract, full_text, tables, sections
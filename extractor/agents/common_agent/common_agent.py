@@ -1,14 +1,18 @@
 
 from typing import Any, Callable, Optional
+import hashlib
+import json
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from langchain_community.callbacks.openai_info import OpenAICallbackHandler
 from langchain_core.messages import SystemMessage, HumanMessage
 from pydantic import BaseModel, Field
-from tenacity import retry, stop_after_attempt, wait_incrementing
 import logging
 
-from extractor.agents.agent_utils import increase_token_usage
+from extractor.agents.retry_policy import agent_retry, get_retry_budget
+from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE, TOTAL_TOKENS, increase_token_usage
+from extractor.database.llm_cache_db import get_llm_cache_db
+from extractor.llm_rate_limiter import estimate_text_tokens, get_llm_rate_limiter
 from extractor.llm_utils import structured_output_llm
 from extractor.utils import escape_braces_for_format
 
@@ -24,6 +28,41 @@ class CommonAgentResult(BaseModel):
         description="A concise explanation of the thought process or reasoning steps taken to reach a conclusion in 1-2 sentences."
     )
 
+# the llm attributes that affect the response, they are part of the cache key
+LLM_CACHE_KEY_PARAMS = [
+    "model_name",
+    "deployment_name",
+    "model",
+    "temperature",
+    "top_p",
+    "seed",
+    "max_tokens",
+    "max_completion_tokens",
+    "num_ctx",
+    "num_predict",
+    "reasoning_effort",
+]
+
+def _get_schema_for_cache_key(schema: Any):
+    if schema is None or isinstance(schema, dict):
+        return schema
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        return schema.model_json_schema()
+    return str(schema)
+
+def _serialize_response(res: Any) -> str:
+    if isinstance(res, BaseModel):
+        return json.dumps({"type": "model", "data": res.model_dump(mode="json")})
+    return json.dumps({"type": "json", "data": res})
+
+def _deserialize_response(response_json: str, schema: Any) -> Any:
+    response = json.loads(response_json)
+    if response["type"] == "model":
+        if not (isinstance(schema, type) and issubclass(schema, BaseModel)):
+            raise ValueError(f"Can't restore cached response with schema {schema}")
+        return schema.model_validate(response["data"])
+    return response["data"]
+
 class CommonAgent:
     def __init__(self, llm: BaseChatOpenAI):
         self.llm = llm
@@ -102,11 +141,106 @@ class CommonAgent:
         self.token_usage = increase_token_usage(
             self.token_usage, incremental_token_usage
         )
+        budget = get_retry_budget()
+        if budget is not None:
+            budget.add_tokens(incremental_token_usage[TOTAL_TOKENS])
 
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_incrementing(start=1.0, increment=3, max=10),
-    )
+    def _get_cache_key(self, messages: list, schema: Any) -> str:
+        params = {}
+        for name in LLM_CACHE_KEY_PARAMS:
+            value = getattr(self.llm, name, None)
+            if value is None or isinstance(value, (str, int, float, bool)):
+                params[name] = value
+            else:
+                params[name] = str(value)
+        key = {
+            "llm": self.llm.__class__.__name__,
+            "params": params,
+            "schema": _get_schema_for_cache_key(schema),
+            "messages": [(msg.type, msg.content) for msg in messages],
+        }
+        key_json = json.dumps(key, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(key_json.encode("utf-8")).hexdigest()
+
+    def _rate_limited_invoke(self, messages: list, invoke: Callable[[], Any]) -> Any:
+        """
+        invoke llm once the call fits in the rate limits of the llm (see get_llm_rate_limiter)
+
+        Args:
+        messages list: the messages sent to llm, to estimate the prompt tokens
+        invoke Callable: invoke llm, increase self.token_usage and return the response
+        """
+        rate_limiter = get_llm_rate_limiter(self.llm)
+        if rate_limiter is None:
+            return invoke()
+        estimated_tokens = estimate_text_tokens("".join(str(msg.content) for msg in messages))
+        rate_limiter.acquire(estimated_tokens)
+        used_before = 0 if self.token_usage is None else self.token_usage[TOTAL_TOKENS]
+        try:
+            return invoke()
+        finally:
+            used_tokens = (0 if self.token_usage is None else self.token_usage[TOTAL_TOKENS]) - used_before
+            if used_tokens > 0:
+                rate_limiter.record_usage(estimated_tokens, used_tokens)
+
+    def _cached_invoke(
+        self,
+        messages: list,
+        schema: Any,
+        invoke: Callable[[], Any],
+    ) -> tuple[Any, str | None]:
+        """
+        invoke llm through the llm response cache, the cache is only used if it is
+        enabled by env LLM_CACHE=true. The calls that miss the cache are rate limited.
+
+        The new response is not cached here, the caller caches it with _cache_response
+        once it passes post_process, and drops a cached one that fails it with
+        _drop_cached_response, so the retries don't replay a bad response.
+
+        Args:
+        messages list[BaseMessage]: the rendered messages sent to llm
+        schema pydantic.BaseModel, json schema or None: llm output result schema
+        invoke Callable: invoke llm, increase self.token_usage and return the response
+
+        Return:
+        the llm response and the cache key to cache it under, None if the cache is
+        disabled or the response is from the cache
+        """
+        cache_db = get_llm_cache_db()
+        if cache_db is None:
+            return self._rate_limited_invoke(messages, invoke), None
+
+        cache_key = self._get_cache_key(messages, schema)
+        cached = cache_db.select_response(cache_key)
+        if cached is not None:
+            try:
+                res = _deserialize_response(cached, schema)
+                self._incre_token_usage({**DEFAULT_TOKEN_USAGE})
+                return res, None
+            except Exception as e:
+                logger.error(f"Failed to restore cached llm response: {e}")
+
+        res = self._rate_limited_invoke(messages, invoke)
+        return res, cache_key
+
+    def _cache_response(self, cache_key: str | None, res: Any):
+        """cache the response returned by _cached_invoke once it is validated"""
+        cache_db = get_llm_cache_db()
+        if cache_db is None or cache_key is None:
+            return
+        try:
+            cache_db.insert_response(cache_key, _serialize_response(res))
+        except Exception as e:
+            logger.error(f"Failed to cache llm response: {e}")
+
+    def _drop_cached_response(self, messages: list, schema: Any):
+        """drop the cached response of the messages that failed post_process"""
+        cache_db = get_llm_cache_db()
+        if cache_db is None:
+            return
+        cache_db.delete_response(self._get_cache_key(messages, schema))
+
+    @agent_retry()
     def _invoke_agent(
         self,
         system_prompt: str,
@@ -128,7 +262,7 @@ class CommonAgent:
         updated_prompt = self._process_retryexception_message(prompt)
         agent = structured_output_llm(self.llm, schema, updated_prompt)
         # agent = updated_prompt | self.llm.with_structured_output(schema)
-        try:
+        def invoke():
             res = agent.invoke(
                 input={},
                 config={
@@ -136,6 +270,10 @@ class CommonAgent:
                 },
             )
             self._incre_token_usage(callback_handler)
+            return res
+        msgs = updated_prompt.format_messages()
+        try:
+            res, cache_key = self._cached_invoke(msgs, schema, invoke)
         except Exception as e:
             logger.error(str(e))
             raise e
@@ -145,6 +283,7 @@ class CommonAgent:
                 processed_res = post_process(res, **kwargs)
             except RetryException as e:
                 logger.error(str(e))
+                self._drop_cached_response(msgs, schema)
                 if self.try_fix_error is not None and self.exceptions is not None and len(self.exceptions) == 4:
                     fixed_res = self.try_fix_error(res, **kwargs)
                     if fixed_res is not None:
@@ -156,6 +295,8 @@ class CommonAgent:
                 raise e
             except Exception as e:
                 logger.error(str(e))
+                self._drop_cached_response(msgs, schema)
                 raise e
+        self._cache_response(cache_key, res)
         return res, processed_res, self.token_usage, None
     
\ No newline at end of file
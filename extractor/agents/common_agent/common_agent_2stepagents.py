@@ -5,9 +5,9 @@ from langchain_openai.chat_models.base import BaseChatOpenAI
 from langchain_openai.chat_models import AzureChatOpenAI
 from langchain_community.callbacks.openai_info import OpenAICallbackHandler
 from pydantic import BaseModel, Field
-from tenacity import retry, stop_after_attempt, wait_incrementing
 import logging
 
+from extractor.agents.retry_policy import agent_retry
 from extractor.agents.agent_utils import escape_braces_for_format
 from extractor.agents.common_agent.common_agent_2steps import CommonAgentTwoSteps
 from extractor.llm_utils import structured_output_llm
@@ -79,10 +79,7 @@ class CommonAgentTwoChainStepAgents(CommonAgent):
         )]
         return ChatPromptTemplate.from_messages(msgs)
 
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_incrementing(start=1.0, increment=3, max=10),
-    )
+    @agent_retry()
     def _invoke_agent(
         self,
         system_prompt: str,
@@ -102,19 +99,21 @@ class CommonAgentTwoChainStepAgents(CommonAgent):
             # First, use llm to do CoT
             msgs = cot_prompt.invoke(input={}).to_messages()
             
-            # cot_res = self.llm.generate(messages=[msgs])
-            cot_res = self.llm.invoke(msgs)
-            reasoning_process = cot_res.content # cot_res.generations[0][0].text
-            token_usage = cot_res.usage_metadata # cot_res.llm_output.get("token_usage")
-            input_tokens = token_usage.get("input_tokens", 0)
-            output_tokens = token_usage.get("output_tokens", 0)
-            total_tokens = token_usage.get("total_tokens", 0)
-            cot_tokens = {
-                "total_tokens": total_tokens,
-                "prompt_tokens": input_tokens,
-                "completion_tokens": output_tokens,
-            }
-            self._incre_token_usage(cot_tokens)
+            def invoke_cot():
+                # cot_res = self.llm.generate(messages=[msgs])
+                cot_res = self.llm.invoke(msgs)
+                token_usage = cot_res.usage_metadata # cot_res.llm_output.get("token_usage")
+                input_tokens = token_usage.get("input_tokens", 0)
+                output_tokens = token_usage.get("output_tokens", 0)
+                total_tokens = token_usage.get("total_tokens", 0)
+                cot_tokens = {
+                    "total_tokens": total_tokens,
+                    "prompt_tokens": input_tokens,
+                    "completion_tokens": output_tokens,
+                }
+                self._incre_token_usage(cot_tokens)
+                return cot_res.content # cot_res.generations[0][0].text
+            reasoning_process = self._rate_limited_invoke(msgs, invoke_cot)
         except Exception as e:
             logger.error(str(e))
             raise e
@@ -126,7 +125,7 @@ class CommonAgentTwoChainStepAgents(CommonAgent):
         )
         # agent = updated_prompt | self.azure_llm.with_structured_output(schema)
         agent = structured_output_llm(self.llm, schema, updated_prompt)
-        try:
+        def invoke():
             res = agent.invoke(
                 input={},
                 config={
@@ -134,6 +133,9 @@ class CommonAgentTwoChainStepAgents(CommonAgent):
                 },
             )
             self._incre_token_usage(callback_handler)
+            return res
+        try:
+            res = self._rate_limited_invoke(updated_prompt.format_messages(), invoke)
         except Exception as e:
             logger.error(str(e))
             raise e
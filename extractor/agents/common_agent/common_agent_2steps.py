@@ -3,9 +3,9 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from langchain_community.callbacks.openai_info import OpenAICallbackHandler
 from pydantic import BaseModel, Field
-from tenacity import retry, stop_after_attempt, wait_incrementing
 import logging
 
+from extractor.agents.retry_policy import agent_retry
 from extractor.llm_utils import structured_output_llm
 from extractor.utils import escape_braces_for_format
 from .common_agent import (
@@ -50,10 +50,7 @@ class CommonAgentTwoSteps(CommonAgent):
         )]
         return ChatPromptTemplate.from_messages(msgs)
 
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_incrementing(start=1.0, increment=3, max=10),
-    )
+    @agent_retry()
     def _invoke_agent(
         self,
         system_prompt: str,
@@ -74,19 +71,21 @@ class CommonAgentTwoSteps(CommonAgent):
             # First, use llm to do CoT
             msgs = cot_prompt.invoke(input={}).to_messages()
             
-            # cot_res = self.llm.generate(messages=[msgs])
-            cot_res = self.llm.invoke(msgs)
-            reasoning_process = cot_res.content # cot_res.generations[0][0].text
-            token_usage = cot_res.usage_metadata # cot_res.llm_output.get("token_usage")
-            input_tokens = token_usage.get("input_tokens", 0)
-            output_tokens = token_usage.get("output_tokens", 0)
-            total_tokens = token_usage.get("total_tokens", 0)
-            cot_tokens = {
-                "total_tokens": total_tokens,
-                "prompt_tokens": input_tokens,
-                "completion_tokens": output_tokens,
-            }
-            self._incre_token_usage(cot_tokens)
+            def invoke_cot():
+                # cot_res = self.llm.generate(messages=[msgs])
+                cot_res = self.llm.invoke(msgs)
+                token_usage = cot_res.usage_metadata # cot_res.llm_output.get("token_usage")
+                input_tokens = token_usage.get("input_tokens", 0)
+                output_tokens = token_usage.get("output_tokens", 0)
+                total_tokens = token_usage.get("total_tokens", 0)
+                cot_tokens = {
+                    "total_tokens": total_tokens,
+                    "prompt_tokens": input_tokens,
+                    "completion_tokens": output_tokens,
+                }
+                self._incre_token_usage(cot_tokens)
+                return cot_res.content # cot_res.generations[0][0].text
+            reasoning_process, cot_cache_key = self._cached_invoke(msgs, None, invoke_cot)
         except Exception as e:
             logger.error(str(e))
             raise e
@@ -97,11 +96,9 @@ class CommonAgentTwoSteps(CommonAgent):
             cot_msg=reasoning_process,
         )
         # agent = updated_prompt | self.llm.with_structured_output(schema)
-        if schema_basemodel is not None:
-            agent = structured_output_llm(self.llm, schema_basemodel, updated_prompt)
-        else:
-            agent = structured_output_llm(self.llm, schema, updated_prompt)
-        try:
+        output_schema = schema_basemodel if schema_basemodel is not None else schema
+        agent = structured_output_llm(self.llm, output_schema, updated_prompt)
+        def invoke():
             res = agent.invoke(
                 input={},
                 config={
@@ -109,6 +106,10 @@ class CommonAgentTwoSteps(CommonAgent):
                 },
             )
             self._incre_token_usage(callback_handler)
+            return res
+        final_msgs = updated_prompt.format_messages()
+        try:
+            res, cache_key = self._cached_invoke(final_msgs, output_schema, invoke)
         except Exception as e:
             logger.error(str(e))
             raise e
@@ -116,13 +117,16 @@ class CommonAgentTwoSteps(CommonAgent):
         if post_process is not None:
             try:
                 processed_res = post_process(res, **kwargs)
-            except RetryException as e:
-                logger.error(str(e))
-                self.exceptions = [e] if self.exceptions is None else self.exceptions + [e]
-                raise e
             except Exception as e:
                 logger.error(str(e))
+                # the bad answer may come from the reasoning, drop both
+                self._drop_cached_response(msgs, None)
+                self._drop_cached_response(final_msgs, output_schema)
+                if isinstance(e, RetryException):
+                    self.exceptions = [e] if self.exceptions is None else self.exceptions + [e]
                 raise e
+        self._cache_response(cot_cache_key, reasoning_process)
+        self._cache_response(cache_key, res)
         return res, processed_res, self.token_usage, reasoning_process
     
 FINAL_STEP_SYSTEM_PROMPTS = ChatPromptTemplate.from_template("""
@@ -151,10 +155,7 @@ class CommonAgentTwoChainSteps(CommonAgentTwoSteps):
     def __init__(self, llm):
         super().__init__(llm)
 
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_incrementing(start=1.0, increment=3, max=10),
-    )
+    @agent_retry()
     def _invoke_agent(
         self, 
         system_prompt: str, 
@@ -176,17 +177,19 @@ class CommonAgentTwoChainSteps(CommonAgentTwoSteps):
             # First, use llm to do CoT
             msgs = cot_prompt.invoke(input={}).to_messages()
             
-            cot_res = self.llm.generate(messages=[msgs])
-            if cot_res is None or cot_res.llm_output is None:
-                raise Exception("llm generate invalid output")
-            reasoning_process = cot_res.generations[0][0].text
-            token_usage: Any = cot_res.llm_output.get("token_usage")
-            cot_tokens = {
-                "total_tokens": token_usage.get("total_tokens", 0),
-                "prompt_tokens": token_usage.get("prompt_tokens", 0),
-                "completion_tokens": token_usage.get("completion_tokens", 0),
-            }
-            self._incre_token_usage(cot_tokens)
+            def invoke_cot():
+                cot_res = self.llm.generate(messages=[msgs])
+                if cot_res is None or cot_res.llm_output is None:
+                    raise Exception("llm generate invalid output")
+                token_usage: Any = cot_res.llm_output.get("token_usage")
+                cot_tokens = {
+                    "total_tokens": token_usage.get("total_tokens", 0),
+                    "prompt_tokens": token_usage.get("prompt_tokens", 0),
+                    "completion_tokens": token_usage.get("completion_tokens", 0),
+                }
+                self._incre_token_usage(cot_tokens)
+                return cot_res.generations[0][0].text
+            reasoning_process = self._rate_limited_invoke(msgs, invoke_cot)
         except Exception as e:
             logger.error(str(e))
             raise e
@@ -207,13 +210,16 @@ class CommonAgentTwoChainSteps(CommonAgentTwoSteps):
                 agent = structured_output_llm(self.llm, schema_basemodel, final_prompt)
             else:
                 agent = structured_output_llm(self.llm, schema, final_prompt)
-            res = agent.invoke(
-                input={},
-                config={
-                    "callbacks": [callback_handler],
-                },
-            )
-            self._incre_token_usage(callback_handler)
+            def invoke():
+                res = agent.invoke(
+                    input={},
+                    config={
+                        "callbacks": [callback_handler],
+                    },
+                )
+                self._incre_token_usage(callback_handler)
+                return res
+            res = self._rate_limited_invoke(final_prompt.format_messages(), invoke)
         except Exception as e:
             logger.error(str(e))
             raise e
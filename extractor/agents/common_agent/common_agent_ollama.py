@@ -6,9 +6,9 @@ from langchain_core.runnables import RunnableLambda
 from langchain_ollama.chat_models import ChatOllama
 from langchain_community.callbacks.openai_info import OpenAICallbackHandler
 from pydantic import BaseModel, Field
-from tenacity import retry, stop_after_attempt, wait_incrementing
 import logging
 
+from extractor.agents.retry_policy import agent_retry
 from extractor.agents.agent_utils import COMPLETION_TOKENS, DEFAULT_TOKEN_USAGE, PROMPT_TOKENS, TOTAL_TOKENS
 from extractor.llm_utils import get_format_instructions, structured_output_llm
 from extractor.utils import escape_braces_for_format
@@ -101,10 +101,7 @@ class CommonAgentOllama(CommonAgent):
         return RunnableLambda(runnable_agent)
         
         
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_incrementing(start=1.0, increment=3, max=10),
-    )
+    @agent_retry()
     def _invoke_agent(
         self,
         system_prompt: str,
@@ -132,12 +129,17 @@ class CommonAgentOllama(CommonAgent):
         agent = CommonAgentOllama.get_runnable_agent(updated_prompt, self.llm, schema, schema_basemodel)
         # agent = updated_prompt | self.llm.with_structured_output(schema)
 
-        try:
+        def invoke():
             # res = agent.invoke({"input": instruction_prompt})
             res, token_usage = agent.invoke(
                 {"input": instruction_prompt},
             )
             self._incre_token_usage(token_usage)
+            return res
+        try:
+            output_schema = schema_basemodel if schema_basemodel is not None else schema
+            msgs = updated_prompt.format_messages(input=instruction_prompt)
+            res, cache_key = self._cached_invoke(msgs, output_schema, invoke)
         except Exception as e:
             logger.error(f"Error executing chain: {e}")
             raise e
@@ -147,6 +149,7 @@ class CommonAgentOllama(CommonAgent):
                 processed_res = post_process(res, **kwargs)
             except RetryException as e:
                 logger.error(str(e))
+                self._drop_cached_response(msgs, output_schema)
                 if self.try_fix_error is not None and self.exceptions is not None and len(self.exceptions) == 4:
                     logger.info(f"Try to fix the error: {e}")
                     fixed_res = self.try_fix_error(res, **kwargs)
@@ -159,7 +162,9 @@ class CommonAgentOllama(CommonAgent):
                 raise e
             except Exception as e:
                 logger.error(str(e))
+                self._drop_cached_response(msgs, output_schema)
                 raise e
+        self._cache_response(cache_key, res)
         return res, processed_res, self.token_usage, None
 
 
@@ -186,37 +191,44 @@ class CommonAgentOllamaTwoSteps(CommonAgentTwoSteps):
         )
         
         cot_prompt = cot_prompt + "\n\n" + format_instructions
-        cot_res = self.llm.invoke(
-            cot_prompt.invoke(input={}).to_messages(),
-            config={
-                "callbacks": [callback_handler],
-            },
-        )
-        reasoning_process = cot_res.content
-        token_usage = cot_res.usage_metadata
-        input_tokens = token_usage.get("input_tokens", 0)
-        output_tokens = token_usage.get("output_tokens", 0)
-        total_tokens = token_usage.get("total_tokens", 0)
-        cot_tokens = {
-            "total_tokens": total_tokens,
-            "prompt_tokens": input_tokens,
-            "completion_tokens": output_tokens,
-        }
-        self._incre_token_usage(cot_tokens)
+        cot_msgs = cot_prompt.invoke(input={}).to_messages()
+        def invoke_cot():
+            cot_res = self.llm.invoke(
+                cot_msgs,
+                config={
+                    "callbacks": [callback_handler],
+                },
+            )
+            token_usage = cot_res.usage_metadata
+            input_tokens = token_usage.get("input_tokens", 0)
+            output_tokens = token_usage.get("output_tokens", 0)
+            total_tokens = token_usage.get("total_tokens", 0)
+            cot_tokens = {
+                "total_tokens": total_tokens,
+                "prompt_tokens": input_tokens,
+                "completion_tokens": output_tokens,
+            }
+            self._incre_token_usage(cot_tokens)
+            return cot_res.content
+        reasoning_process = self._rate_limited_invoke(cot_msgs, invoke_cot)
         updated_prompt = self._build_prompt_for_final_step(
             system_prompt=system_prompt,
             cot_msg=reasoning_process,
         )
         updated_prompt = updated_prompt + "\n\n" + format_instructions
         agent = structured_output_llm(self.llm, schema, updated_prompt)
-        try:
+        final_input = {"input": "Now, let's provide the final answer."}
+        def invoke():
             res = agent.invoke(
-                input={"input": "Now, let's provide the final answer."},
+                input=final_input,
                 config={
                     "callbacks": [callback_handler],
                 },
             )
             self._incre_token_usage(callback_handler)
+            return res
+        try:
+            res = self._rate_limited_invoke(updated_prompt.format_messages(**final_input), invoke)
         except Exception as e:
             logger.error(str(e))
             raise e
@@ -237,10 +249,7 @@ class CommonAgentOllamaTwoChainSteps(CommonAgentTwoChainSteps):
     def __init__(self, llm: ChatOllama):
         super().__init__(llm)
 
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_incrementing(start=1.0, increment=3, max=10),
-    )
+    @agent_retry()
     def _invoke_agent(
         self, 
         system_prompt: str, 
@@ -262,20 +271,22 @@ class CommonAgentOllamaTwoChainSteps(CommonAgentTwoChainSteps):
         )
         try:
             msgs = cot_prompt.invoke(input={}).to_messages()
-            cot_res = self.llm.invoke(msgs, config={
-                "callbacks": [callback_handler],
-            })
-            reasoning_process = cot_res.content
-            token_usage = cot_res.usage_metadata
-            input_tokens = token_usage.get("input_tokens", 0)
-            output_tokens = token_usage.get("output_tokens", 0)
-            total_tokens = token_usage.get("total_tokens", 0)
-            cot_tokens = {
-                "total_tokens": total_tokens,
-                "prompt_tokens": input_tokens,
-                "completion_tokens": output_tokens,
-            }
-            self._incre_token_usage(cot_tokens)
+            def invoke_cot():
+                cot_res = self.llm.invoke(msgs, config={
+                    "callbacks": [callback_handler],
+                })
+                token_usage = cot_res.usage_metadata
+                input_tokens = token_usage.get("input_tokens", 0)
+                output_tokens = token_usage.get("output_tokens", 0)
+                total_tokens = token_usage.get("total_tokens", 0)
+                cot_tokens = {
+                    "total_tokens": total_tokens,
+                    "prompt_tokens": input_tokens,
+                    "completion_tokens": output_tokens,
+                }
+                self._incre_token_usage(cot_tokens)
+                return cot_res.content
+            reasoning_process = self._rate_limited_invoke(msgs, invoke_cot)
         except Exception as e:
             logger.error(str(e))
             raise e
@@ -294,13 +305,16 @@ class CommonAgentOllamaTwoChainSteps(CommonAgentTwoChainSteps):
                 agent = structured_output_llm(self.llm, schema_basemodel, final_prompt)
             else:
                 agent = structured_output_llm(self.llm, schema, final_prompt)
-            res = agent.invoke(
-                input={"input": "Now, let's provide the final answer."},
-                config={
-                    "callbacks": [callback_handler],
-                },
-            )
-            self._incre_token_usage(callback_handler)
+            def invoke():
+                res = agent.invoke(
+                    input={"input": "Now, let's provide the final answer."},
+                    config={
+                        "callbacks": [callback_handler],
+                    },
+                )
+                self._incre_token_usage(callback_handler)
+                return res
+            res = self._rate_limited_invoke(final_prompt.format_messages(), invoke)
         except Exception as e:
             logger.error(str(e))
             raise e
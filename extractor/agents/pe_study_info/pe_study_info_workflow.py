@@ -1,4 +1,3 @@
-import time
 from typing import Callable
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from langgraph.graph import StateGraph, START
@@ -14,6 +13,7 @@ from extractor.agents.pe_study_info.pe_study_info_design_info_step import Design
 from extractor.agents.pe_study_info.pe_study_info_design_info_refine_step import DesignInfoRefinementStep
 from extractor.agents.pe_study_info.pe_study_info_assembly_step import AssemblyStep
 from extractor.agents.pe_study_info.pe_study_info_row_cleanup_step import RowCleanupStep
+from extractor.agents.workflow_progress import stream_workflow
 
 logger = logging.getLogger(__name__)
 
@@ -56,7 +56,8 @@ class PEStudyInfoWorkflow:
     ):
         config = {"recursion_limit": 500}
         previous_errors = previous_errors if previous_errors is not None else "N/A"
-        for s in self.graph.stream(
+        s = stream_workflow(
+            self.graph,
             input={
                 "title": title,
                 "full_text": full_text,
@@ -65,11 +66,9 @@ class PEStudyInfoWorkflow:
                 "previous_errors": previous_errors,
             },
             config=config,
-            stream_mode="values",
-        ):
-            if sleep_time is not None:
-                time.sleep(sleep_time)
-            print(s)
+            workflow_name=self.__class__.__name__,
+            sleep_time=sleep_time,
+        )
 
         df_combined = s["df_combined"]
         column_mapping = {
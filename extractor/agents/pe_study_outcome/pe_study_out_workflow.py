@@ -1,4 +1,3 @@
-import time
 from typing import Callable
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from langgraph.graph import StateGraph, START
@@ -20,6 +19,7 @@ from extractor.agents.pe_study_outcome.pe_study_out_param_value_step import Para
 from extractor.agents.pe_study_outcome.pe_study_out_row_cleanup_step import RowCleanupStep
 
 from extractor.agents.pe_study_outcome.pe_study_out_workflow_utils import PEStudyOutWorkflowState
+from extractor.agents.workflow_progress import stream_workflow
 
 logger = logging.getLogger(__name__)
 
@@ -90,7 +90,8 @@ class PEStudyOutWorkflow:
         config = {"recursion_limit": 500}
         previous_errors = previous_errors if previous_errors is not None else "N/A"
 
-        for s in self.graph.stream(
+        s = stream_workflow(
+            self.graph,
             input={
                 "md_table": md_table,
                 "caption": caption_and_footnote,
@@ -100,11 +101,9 @@ class PEStudyOutWorkflow:
                 "previous_errors": previous_errors,
             },
             config=config,
-            stream_mode="values",
-        ):
-            if sleep_time is not None:
-                time.sleep(sleep_time)
-            print(s)
+            workflow_name=self.__class__.__name__,
+            sleep_time=sleep_time,
+        )
 
         df_combined = s["df_combined"]
         # import pandas as pd
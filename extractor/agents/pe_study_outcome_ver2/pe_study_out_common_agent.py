@@ -3,9 +3,9 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from langchain_community.callbacks.openai_info import OpenAICallbackHandler
 from pydantic import BaseModel, Field
-from tenacity import retry, stop_after_attempt, wait_incrementing
 import logging
 
+from extractor.agents.retry_policy import agent_retry
 from extractor.agents.agent_utils import (
     increase_token_usage,
 )
@@ -96,10 +96,7 @@ class PEStudyOutCommonAgent:
             },
         )
 
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_incrementing(start=1.0, increment=3, max=10),
-    )
+    @agent_retry()
     def _invoke_agent(
         self,
         prompt: ChatPromptTemplate,
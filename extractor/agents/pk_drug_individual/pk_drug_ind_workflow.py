@@ -1,4 +1,3 @@
-import time
 from typing import Callable
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from langgraph.graph import StateGraph, START
@@ -14,6 +13,7 @@ from extractor.agents.pk_drug_individual.pk_drug_ind_drug_info_refine_step impor
 from extractor.agents.pk_drug_individual.pk_drug_ind_drug_info_step import DrugInfoExtractionStep
 from extractor.agents.pk_drug_individual.pk_drug_ind_row_cleanup_step import RowCleanupStep
 from extractor.agents.pk_drug_individual.pk_drug_ind_workflow_utils import PKDrugIndWorkflowState
+from extractor.agents.workflow_progress import stream_workflow
 
 logger = logging.getLogger(__name__)
 
@@ -59,7 +59,8 @@ class PKDrugIndWorkflow:
     ):
         config = {"recursion_limit": 500}
         previous_errors = previous_errors if previous_errors is not None else "N/A"
-        for s in self.graph.stream(
+        s = stream_workflow(
+            self.graph,
             input={
                 "title": title,
                 "full_text": full_text,
@@ -68,11 +69,9 @@ class PKDrugIndWorkflow:
                 "previous_errors": previous_errors,
             },
             config=config,
-            stream_mode="values",
-        ):
-            if sleep_time is not None:
-                time.sleep(sleep_time)
-            print(s)
+            workflow_name=self.__class__.__name__,
+            sleep_time=sleep_time,
+        )
 
         df_combined = s["df_combined"]
         column_mapping = {
@@ -2,7 +2,7 @@ from typing import List, Tuple
 import pandas as pd
 
 from TabFuncFlow.utils.table_utils import dataframe_to_markdown
-from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE, get_reasoning_process, increase_token_usage
+from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE, get_reasoning_process, increase_token_usage, map_concurrently
 from extractor.agents.pk_individual.pk_ind_common_step import PKIndCommonAgentStep
 from extractor.agents.pk_individual.pk_ind_param_type_unit_extract_agent import (
     ExtractedParamTypeUnits,
@@ -36,29 +36,21 @@ class ExtractParamTypeAndUnitStep(PKIndCommonAgentStep):
         col_mapping["Parameter type"] = "Parameter type"
         # Note: Ensure 'Parameter type' is present in col_mapping for type-unit extraction.
         # Note: This is also handled in 'split_by_col_step' — this serves as a double-check for robustness.
-        type_unit_list: list[str] = []
+        llm = state["llm"]
+        md_table_aligned = state["md_table_aligned"]
+        caption = state["caption"]
+        schema = self.get_schema()
+        previous_errors_prompt = self._get_previous_errors_prompt(state)
+        instruction_prompt = self.get_instruction_prompt(state)
 
-        round = 0
-        total_token_usage = {**DEFAULT_TOKEN_USAGE}
-        for md in md_table_list:
-            # df = markdown_to_dataframe(md)
-            round += 1
-            step_name = f" (Trial {str(round)})"
-            self._step_output(state, step_output=step_name)
-            llm = state["llm"]
-            llm2 = state["llm2"] if "llm2" in state else None
-            md_table_aligned = state["md_table_aligned"]
-            caption = state["caption"]
-            schema = self.get_schema()
+        def extract_type_unit(md: str):
             system_prompt = get_param_type_unit_extraction_prompt(
                 md_table_aligned, md, col_mapping, caption
             )
-            previous_errors_prompt = self._get_previous_errors_prompt(state)
             system_prompt = system_prompt + previous_errors_prompt
-            instruction_prompt = self.get_instruction_prompt(state)
-            agent = self.get_agent(state['llm']) # PKIndCommonAgent(llm=llm, llm2=llm2)
-            
-            result = agent.go(
+            # the agent keeps the retry state of one call, so every sub-table needs its own agent
+            agent = self.get_agent(llm) # PKIndCommonAgent(llm=llm, llm2=llm2)
+            return agent.go(
                 system_prompt=system_prompt,
                 instruction_prompt=instruction_prompt,
                 schema=schema,
@@ -67,6 +59,15 @@ class ExtractParamTypeAndUnitStep(PKIndCommonAgentStep):
                 md_table=md,
                 col_mapping=col_mapping,
             )
+
+        # the sub-tables are independent, send them to llm concurrently
+        results = map_concurrently(extract_type_unit, md_table_list)
+
+        type_unit_list: list[str] = []
+        total_token_usage = {**DEFAULT_TOKEN_USAGE}
+        for round, result in enumerate(results, start=1):
+            step_name = f" (Trial {str(round)})"
+            self._step_output(state, step_output=step_name)
             res: ParamTypeUnitExtractionResult = result[0]
             processed_res = result[1]
             token_usage = result[2]
@@ -1,4 +1,3 @@
-import time
 from typing import Callable
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from langgraph.graph import StateGraph, START
@@ -46,6 +45,7 @@ from extractor.agents.pk_individual.pk_ind_row_cleanup_step import RowCleanupSte
 from extractor.agents.pk_individual.pk_ind_split_by_col_step import SplitByColumnsStep
 from extractor.agents.pk_individual.pk_ind_time_unit_step import TimeExtractionStep
 from extractor.agents.pk_individual.pk_ind_workflow_utils import PKIndWorkflowState
+from extractor.agents.workflow_progress import stream_workflow
 
 logger = logging.getLogger(__name__)
 
@@ -172,7 +172,8 @@ class PKIndWorkflow:
     ):
         config = {"recursion_limit": 500}
         previous_errors = previous_errors if previous_errors is not None else "N/A"
-        for s in self.graph.stream(
+        s = stream_workflow(
+            self.graph,
             input={
                 "md_table": md_table,
                 "caption": caption_and_footnote,
@@ -184,12 +185,9 @@ class PKIndWorkflow:
                 "llm2": self.llm2,
             },
             config=config,
-            stream_mode="values",
-        ):
-            if sleep_time is not None:
-                time.sleep(sleep_time)
-            # print(s)
-            continue
+            workflow_name=self.__class__.__name__,
+            sleep_time=sleep_time,
+        )
 
         df_combined = s["df_combined"]
         # column_mapping = {
@@ -5,28 +5,58 @@ import pandas as pd
 import logging
 
 from TabFuncFlow.utils.table_utils import dataframe_to_markdown
+from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE, map_concurrently
 from extractor.agents.pe_study_outcome_ver2.pe_study_out_workflow import PEStudyOutWorkflow
 from extractor.agents.pk_individual.pk_ind_workflow import PKIndWorkflow
 from extractor.agents.pk_population_summary.pk_popu_sum_workflow import PKPopuSumWorkflow
 from extractor.agents.pk_summary.pk_sum_workflow import PKSumWorkflow, PKSumWorkflowState
 from extractor.agents.pk_population_individual.pk_popu_ind_workflow import PKPopuIndWorkflow
-from extractor.constants import PipelineTypeEnum
+from extractor.agents.workflow_factory import get_workflow
+from extractor.constants import FULL_TEXT_MAX_TOKENS, MAX_TABLE_CURATION_CONCURRENCY, PipelineTypeEnum
 from extractor.database.pmid_db import PMIDDB
-from extractor.pmid_extractor.table_utils import select_pe_tables, select_pk_demographic_tables, select_pk_summary_tables
+from extractor.llm_rate_limiter import estimate_text_tokens, get_llm_model_name
+from extractor.pmid_extractor.table_utils import (
+    get_tables_hash,
+    select_pe_tables,
+    select_pk_demographic_tables,
+    select_pk_summary_tables,
+    select_tables_by_indexes,
+)
 from extractor.utils import convert_html_to_text_no_table, convert_sections_to_full_text, remove_references
 
 logger = logging.getLogger(__name__)
 
+SPECIMEN_QUERY = "specimen sample samples sampling collected collection plasma serum blood urine cord milk concentration time"
+DRUG_QUERY = "drug dose doses dosing dosage mg kg administered administration route oral intravenous infusion regimen"
+POPULATION_QUERY = "patients subjects participants population enrolled age weight gestational pregnant women infants children demographic characteristics"
+PE_STUDY_INFO_QUERY = "study design randomized controlled trial cohort participants enrolled inclusion exclusion criteria intervention outcome follow-up"
+
+# the retrieval queries of the full-text workflows, by workflow class name
+FULL_TEXT_QUERIES = {
+    "PKSpecSumWorkflow": SPECIMEN_QUERY,
+    "PKSpecIndWorkflow": SPECIMEN_QUERY,
+    "PKDrugSumWorkflow": DRUG_QUERY,
+    "PKDrugIndWorkflow": DRUG_QUERY,
+    "PKPopuSumWorkflow": POPULATION_QUERY,
+    "PKPopuIndWorkflow": POPULATION_QUERY,
+    "PEStudyInfoWorkflow": PE_STUDY_INFO_QUERY,
+}
+
 class AgentTool(ABC):
+    # the article text of longer papers is cut to the passages relevant to the workflow, None to send it whole
+    max_text_tokens: int | None = FULL_TEXT_MAX_TOKENS
+
     def __init__(
         self,
         llm: BaseChatOpenAI | None = None,
         output_callback:Callable[[dict], None] = None,
         llm2: BaseChatOpenAI | None = None,
+        max_concurrency: int = MAX_TABLE_CURATION_CONCURRENCY,
     ):
         self.llm = llm
         self.llm2 = llm2
         self.output_callback = output_callback
+        self.max_concurrency = max(1, max_concurrency)
 
     def _print_token_usage(self, token_usage: dict):
         if self.output_callback is not None:
@@ -40,6 +70,89 @@ class AgentTool(ABC):
             self.output_callback(step_name=self.__class__.__name__)
 
     
+    def _curate_tables(
+        self,
+        tables: list[dict],
+        curate_table: Callable[[dict], pd.DataFrame],
+    ) -> list[pd.DataFrame | None]:
+        """
+        Curate the tables with a bounded worker pool.
+
+        The results are in the same order as the tables, the result of the table failed to be curated is None.
+        """
+        pmid = getattr(self, "pmid", None)
+        def curate_one(table: dict) -> pd.DataFrame | None:
+            try:
+                return curate_table(table)
+            except Exception as e:
+                logger.error(f"Error occurred in curating table {table['caption']} in paper {pmid}")
+                logger.error(str(e))
+                print(f"Error occurred in curating table {table['caption']} in paper {pmid}")
+                print(str(e))
+                return None
+
+        return map_concurrently(curate_one, tables, self.max_concurrency)
+
+    def _select_tables(
+        self,
+        tables: list[dict],
+        select_tables: Callable[[list[dict], BaseChatOpenAI], tuple[list[dict], list[str], str, dict]],
+    ) -> tuple[list[dict], list[str], str, dict]:
+        """
+        Select the tables with llm, the selection is cached in pmid db by (pmid, selector, tables hash, model),
+        so the sibling pipelines and the correction re-runs reuse the selected table indexes.
+        """
+        pmid = getattr(self, "pmid", None)
+        pmid_db: PMIDDB | None = getattr(self, "pmid_db", None)
+        if pmid is None or pmid_db is None:
+            return select_tables(tables, self.llm)
+
+        selector = select_tables.__name__
+        tables_hash = get_tables_hash(tables)
+        model = get_llm_model_name(self.llm) or self.llm.__class__.__name__
+        cached = pmid_db.select_table_selection(pmid, selector, tables_hash, model)
+        if cached is not None:
+            indexes, reasoning_process = cached
+            try:
+                selected_tables = select_tables_by_indexes(tables, indexes)
+                logger.info(f"Use cached table selection ({selector}) of paper {pmid}: {indexes}")
+                return selected_tables, indexes, reasoning_process, {**DEFAULT_TOKEN_USAGE}
+            except Exception as e:
+                logger.error(f"Invalid cached table selection ({selector}) of paper {pmid}: {e}")
+
+        selected_tables, indexes, reasoning_process, token_usage = select_tables(tables, self.llm)
+        pmid_db.insert_table_selection(pmid, selector, tables_hash, model, indexes, reasoning_process)
+        return selected_tables, indexes, reasoning_process, token_usage
+
+    def _get_article_text(self, pmid_info: tuple, query: str) -> str:
+        """
+        Return the article text of the full-text workflows. The papers longer than max_text_tokens
+        are cut to the passages of their sections most relevant to the query, ranked by the
+        BM25 index of the paper in pmid db.
+        """
+        title, abstract, sections = pmid_info[1], pmid_info[2], pmid_info[5]
+        if sections:
+            article_text = convert_sections_to_full_text(sections)
+        else:
+            article_text = f"{title}\n{abstract}"
+            article_text = convert_html_to_text_no_table(article_text)
+            article_text = remove_references(article_text)
+        pmid = getattr(self, "pmid", None)
+        pmid_db: PMIDDB | None = getattr(self, "pmid_db", None)
+        if not sections or self.max_text_tokens is None or pmid is None or pmid_db is None \
+            or estimate_text_tokens(article_text) <= self.max_text_tokens:
+            return article_text
+
+        index = pmid_db.select_section_index(pmid)
+        if index is None or len(index.passages) == 0:
+            return article_text
+        retrieved_text = index.get_text(query, self.max_text_tokens)
+        logger.info(
+            f"Retrieved {estimate_text_tokens(retrieved_text)} of {estimate_text_tokens(article_text)} "
+            f"tokens of the full text of paper {pmid}"
+        )
+        return f"{title}\n{retrieved_text}"
+
     @abstractmethod
     def _run(self, previous_errors: str | None = None) -> tuple[pd.DataFrame | None, list[str] | str | None]:
         pass
@@ -60,8 +173,9 @@ class PKSummaryTablesCurationTool(AgentTool):
         llm2: BaseChatOpenAI | None = None,
         output_callback:Callable[[dict], None] = None,
         pmid_db: PMIDDB | None = None,
+        max_concurrency: int = MAX_TABLE_CURATION_CONCURRENCY,
     ):
-        super().__init__(llm, output_callback, llm2)
+        super().__init__(llm, output_callback, llm2, max_concurrency)
         self.pmid = pmid
         self.pmid_db = pmid_db if pmid_db is not None else PMIDDB()
 
@@ -77,33 +191,31 @@ class PKSummaryTablesCurationTool(AgentTool):
         if pmid_info is None:
             return None, None
         tables = pmid_info[4]
-        selected_tables, indexes, reasoning_process, token_usage = select_pk_summary_tables(tables, self.llm)
+        selected_tables, indexes, reasoning_process, token_usage = self._select_tables(tables, select_pk_summary_tables)
         self._print_step_output(reasoning_process)
         self._print_token_usage(token_usage)
         title = pmid_info[1]
-        workflow = PKSumWorkflow(llm=self.llm)
-        workflow.build()
+
+        def curate_table(table: dict) -> pd.DataFrame:
+            caption = "\n".join([table["caption"], table["footnote"]])
+            source_table = dataframe_to_markdown(table["table"])
+            workflow = get_workflow(PKSumWorkflow, llm=self.llm)
+            return workflow.go_md_table(
+                title=title,
+                md_table=source_table,
+                caption_and_footnote=caption,
+                step_callback=self.output_callback,
+                previous_errors=previous_errors,
+            )
+
         dfs: list[pd.DataFrame] = []
         source_tables = []
-        for table in selected_tables:
+        for table, df in zip(selected_tables, self._curate_tables(selected_tables, curate_table)):
+            if df is None:
+                continue
             caption = "\n".join([table["caption"], table["footnote"]])
             source_table = dataframe_to_markdown(table["table"])
-            try:
-                df = workflow.go_md_table(
-                    title=title,
-                    md_table=source_table,
-                    caption_and_footnote=caption,
-                    step_callback=self.output_callback,
-                    previous_errors=previous_errors,
-                )
-                source_tables.append(f"caption: \n{caption}\n\n table: \n{source_table}")
-            except Exception as e:
-                logger.error(f"Error occurred in curating table {table['caption']} in paper {self.pmid}")
-                logger.error(str(e))
-                print(f"Error occurred in curating table {table['caption']} in paper {self.pmid}")
-                print(str(e))
-                continue
-            
+            source_tables.append(f"caption: \n{caption}\n\n table: \n{source_table}")
             dfs.append(df)
 
         # combine dfs
@@ -122,8 +234,9 @@ class PKIndividualTablesCurationTool(AgentTool):
         llm2: BaseChatOpenAI | None = None,
         output_callback:Callable[[dict], None] = None,
         pmid_db: PMIDDB | None = None,
+        max_concurrency: int = MAX_TABLE_CURATION_CONCURRENCY,
     ):
-        super().__init__(llm, output_callback, llm2)
+        super().__init__(llm, output_callback, llm2, max_concurrency)
         self.pmid = pmid
         self.pmid_db = pmid_db if pmid_db is not None else PMIDDB()
     
@@ -144,35 +257,29 @@ class PKIndividualTablesCurationTool(AgentTool):
         tables = pmid_info[4]
         title = pmid_info[1]
         full_text = pmid_info[3]
-        selected_tables, indexes, reasoning_process, token_usage = select_pk_summary_tables(tables, self.llm)
+        selected_tables, indexes, reasoning_process, token_usage = self._select_tables(tables, select_pk_summary_tables)
         self._print_step_output(reasoning_process)
         self._print_token_usage(token_usage)
         if not selected_tables:
             return None, None
-        workflow = PKIndWorkflow(llm=self.llm, llm2=self.llm2)
-        workflow.build()
-        dfs: list[pd.DataFrame] = []
-        source_tables = []
-        for table in selected_tables:
+
+        def curate_table(table: dict) -> pd.DataFrame:
             caption = "\n".join([table["caption"], table["footnote"]])
             source_table = dataframe_to_markdown(table["table"])
-            source_tables.append(source_table)
-            try:
-                df = workflow.go_md_table(
-                    title=title,
-                    md_table=source_table,
-                    caption_and_footnote=caption,
-                    step_callback=self.output_callback,
-                    previous_errors=previous_errors,
-                    full_text=full_text,
-                )
-            except Exception as e:
-                logger.error(f"Error occurred in curating table {table['caption']} in paper {self.pmid}")
-                logger.error(str(e))
-                print(f"Error occurred in curating table {table['caption']} in paper {self.pmid}")
-                print(str(e))
-                continue
-            dfs.append(df)
+            workflow = get_workflow(PKIndWorkflow, llm=self.llm, llm2=self.llm2)
+            return workflow.go_md_table(
+                title=title,
+                md_table=source_table,
+                caption_and_footnote=caption,
+                step_callback=self.output_callback,
+                previous_errors=previous_errors,
+                full_text=full_text,
+            )
+
+        source_tables = [dataframe_to_markdown(table["table"]) for table in selected_tables]
+        dfs: list[pd.DataFrame] = [
+            df for df in self._curate_tables(selected_tables, curate_table) if df is not None
+        ]
         df_combined = (
             pd.concat(dfs, axis=0).reset_index(drop=True)
             if len(dfs) > 0
@@ -188,8 +295,9 @@ class PKPopulationSummaryCurationTool(AgentTool):
         llm2: BaseChatOpenAI | None = None,
         output_callback:Callable[[dict], None] = None,
         pmid_db: PMIDDB | None = None,
+        max_concurrency: int = MAX_TABLE_CURATION_CONCURRENCY,
     ):
-        super().__init__(llm, output_callback, llm2)
+        super().__init__(llm, output_callback, llm2, max_concurrency)
         self.pmid = pmid
         self.pmid_db = pmid_db if pmid_db is not None else PMIDDB()
         
@@ -209,23 +317,15 @@ class PKPopulationSummaryCurationTool(AgentTool):
         sections = pmid_info[5]
         abstract = pmid_info[2]
         tables = pmid_info[4]
-        selected_tables, indexes, reasoning_process, token_usage = select_pk_demographic_tables(tables, self.llm)
+        selected_tables, indexes, reasoning_process, token_usage = self._select_tables(tables, select_pk_demographic_tables)
         self._print_step_output(reasoning_process)
         self._print_token_usage(token_usage)
         
         if not selected_tables:
             logger.info("No PK demographic table detected. Use full text as the input.")
 
-            if sections:
-                article_text = "\n".join(
-                    f"{sec['section']}\n{sec['content']}" for sec in sections
-                )
-            else:
-                article_text = f"{title}\n{abstract}"
-            article_text = convert_html_to_text_no_table(article_text)
-            article_text = remove_references(article_text)
-            workflow = PKPopuSumWorkflow(llm=self.llm)
-            workflow.build()
+            article_text = self._get_article_text(pmid_info, POPULATION_QUERY)
+            workflow = get_workflow(PKPopuSumWorkflow, llm=self.llm)
             result_df = workflow.go_full_text(
                 title=title,
                 full_text=article_text,
@@ -235,27 +335,24 @@ class PKPopulationSummaryCurationTool(AgentTool):
             return result_df, article_text
         else:
             logger.info("Detected PK demographic table. Use the table as the input.")
-            workflow = PKPopuIndWorkflow(llm=self.llm)
-            workflow.build()
-            dfs: list[pd.DataFrame] = []
-            source_tables = []
-            for table in selected_tables:
+            def get_source_table(table: dict) -> str:
                 caption = "\n".join([table["caption"], table["footnote"]])
-                source_table = dataframe_to_markdown(table["table"])+"\n\n"+caption
-                source_tables.append(source_table)
-                try:
-                    df = workflow.go_full_text(
-                        title=title,
-                        full_text=source_table,
-                        step_callback=self.output_callback,
-                    )
-                except Exception as e:
-                    logger.error(f"Error occurred in curating table {table['caption']} in paper {self.pmid}")
-                    logger.error(str(e))
-                    print(f"Error occurred in curating table {table['caption']} in paper {self.pmid}")
-                    print(str(e))
-                    continue
-                dfs.append(df)
+                return dataframe_to_markdown(table["table"])+"\n\n"+caption
+
+            source_tables = [get_source_table(table) for table in selected_tables]
+
+            def curate_table(table: dict) -> pd.DataFrame:
+                source_table = get_source_table(table)
+                workflow = get_workflow(PKPopuIndWorkflow, llm=self.llm)
+                return workflow.go_full_text(
+                    title=title,
+                    full_text=source_table,
+                    step_callback=self.output_callback,
+                )
+
+            dfs: list[pd.DataFrame] = [
+                df for df in self._curate_tables(selected_tables, curate_table) if df is not None
+            ]
             result_df = pd.concat(dfs, ignore_index=True)
         return result_df, source_tables
 
@@ -268,8 +365,9 @@ class PKPopulationIndividualCurationTool(AgentTool):
         llm2: BaseChatOpenAI | None = None,
         output_callback:Callable[[dict], None] = None,
         pmid_db: PMIDDB | None = None,
+        max_concurrency: int = MAX_TABLE_CURATION_CONCURRENCY,
     ):
-        super().__init__(llm, output_callback, llm2)
+        super().__init__(llm, output_callback, llm2, max_concurrency)
         self.pmid = pmid
         self.pmid_db = pmid_db if pmid_db is not None else PMIDDB()
         
@@ -289,22 +387,14 @@ class PKPopulationIndividualCurationTool(AgentTool):
         sections = pmid_info[5]
         abstract = pmid_info[2]
         tables = pmid_info[4]
-        selected_tables, indexes, reasoning_process, token_usage = select_pk_demographic_tables(tables, self.llm)
+        selected_tables, indexes, reasoning_process, token_usage = self._select_tables(tables, select_pk_demographic_tables)
         self._print_step_output(reasoning_process)
         self._print_token_usage(token_usage)
 
         if not selected_tables:
             logger.info("No PK demographic table detected. Use full text as the input.")
-            if sections:
-                article_text = "\n".join(
-                    f"{sec['section']}\n{sec['content']}" for sec in sections
-                )
-            else:
-                article_text = f"{title}\n{abstract}"
-            article_text = convert_html_to_text_no_table(article_text)
-            article_text = remove_references(article_text)
-            workflow = PKPopuIndWorkflow(llm=self.llm)
-            workflow.build()
+            article_text = self._get_article_text(pmid_info, POPULATION_QUERY)
+            workflow = get_workflow(PKPopuIndWorkflow, llm=self.llm)
             result_df = workflow.go_full_text(
                 title=title,
                 full_text=article_text,
@@ -314,28 +404,25 @@ class PKPopulationIndividualCurationTool(AgentTool):
             return result_df, article_text
         else:
             logger.info("Detected PK demographic table. Use the table as the input.")
-            workflow = PKPopuIndWorkflow(llm=self.llm)
-            workflow.build()
-            dfs: list[pd.DataFrame] = []
-            source_tables = []
-            for table in selected_tables:
+            def get_source_table(table: dict) -> str:
                 caption = "\n".join([table["caption"], table["footnote"]])
-                source_table = dataframe_to_markdown(table["table"])+"\n\n"+caption
-                source_tables.append(source_table)
-                try:
-                    df = workflow.go_full_text(
+                return dataframe_to_markdown(table["table"])+"\n\n"+caption
+
+            source_tables = [get_source_table(table) for table in selected_tables]
+
+            def curate_table(table: dict) -> pd.DataFrame:
+                source_table = get_source_table(table)
+                workflow = get_workflow(PKPopuIndWorkflow, llm=self.llm)
+                return workflow.go_full_text(
                     title=title,
                     full_text=source_table,
                     step_callback=self.output_callback,
                     previous_errors=previous_errors,
-                    )
-                except Exception as e:
-                    logger.error(f"Error occurred in curating table {table['caption']} in paper {self.pmid}")
-                    logger.error(str(e))
-                    print(f"Error occurred in curating table {table['caption']} in paper {self.pmid}")
-                    print(str(e))
-                    continue
-                dfs.append(df)
+                )
+
+            dfs: list[pd.DataFrame] = [
+                df for df in self._curate_tables(selected_tables, curate_table) if df is not None
+            ]
             result_df = pd.concat(dfs, ignore_index=True)
             return result_df, source_tables
 
@@ -347,8 +434,9 @@ class PEStudyOutcomeCurationTool(AgentTool):
         llm2: BaseChatOpenAI | None = None,
         output_callback:Callable[[dict], None] = None,
         pmid_db: PMIDDB | None = None,
+        max_concurrency: int = MAX_TABLE_CURATION_CONCURRENCY,
     ):
-        super().__init__(llm, output_callback, llm2)
+        super().__init__(llm, output_callback, llm2, max_concurrency)
         self.pmid = pmid
         self.pmid_db = pmid_db if pmid_db is not None else PMIDDB()
     
@@ -368,34 +456,28 @@ class PEStudyOutcomeCurationTool(AgentTool):
         sections = pmid_info[5]
         abstract = pmid_info[2]
         tables = pmid_info[4]
-        selected_tables, indexes, reasoning_process, token_usage = select_pe_tables(tables, self.llm)
+        selected_tables, indexes, reasoning_process, token_usage = self._select_tables(tables, select_pe_tables)
         self._print_step_output(reasoning_process)
         self._print_token_usage(token_usage)
         if not selected_tables:
             return None, None
-        workflow = PEStudyOutWorkflow(llm=self.llm)
-        workflow.build()
-        dfs: list[pd.DataFrame] = []
-        source_tables = []
-        for table in selected_tables:
+
+        def curate_table(table: dict) -> pd.DataFrame:
             caption = "\n".join([table["caption"], table["footnote"]])
             source_table = dataframe_to_markdown(table["table"])
-            source_tables.append(source_table)
-            try:
-                df = workflow.go_md_table(
+            workflow = get_workflow(PEStudyOutWorkflow, llm=self.llm)
+            return workflow.go_md_table(
                 title=title,
                 md_table=source_table,
                 caption_and_footnote=caption,
                 step_callback=self.output_callback,
                 previous_errors=previous_errors,
-                )
-            except Exception as e:
-                logger.error(f"Error occurred in curating table {table['caption']} in paper {self.pmid}")
-                logger.error(str(e))
-                print(f"Error occurred in curating table {table['caption']} in paper {self.pmid}")
-                print(str(e))
-                continue
-            dfs.append(df)
+            )
+
+        source_tables = [dataframe_to_markdown(table["table"]) for table in selected_tables]
+        dfs: list[pd.DataFrame] = [
+            df for df in self._curate_tables(selected_tables, curate_table) if df is not None
+        ]
         df_combined = (
             pd.concat(dfs, axis=0).reset_index(drop=True)
             if len(dfs) > 0
@@ -443,16 +525,9 @@ class FullTextCurationTool(AgentTool):
         title = pmid_info[1]
         sections = pmid_info[5]
         abstract = pmid_info[2] 
-        wf = self.cls(llm=self.llm)
-        wf.build()
-        if sections:
-            article_text = "\n".join(
-                f"{sec['section']}\n{sec['content']}" for sec in sections
-            )
-        else:
-            article_text = f"{title}\n{abstract}"
-        article_text = convert_html_to_text_no_table(article_text)
-        article_text = remove_references(article_text)
+        wf = get_workflow(self.cls, llm=self.llm)
+        query = FULL_TEXT_QUERIES.get(self.cls.__name__, self.tool_description)
+        article_text = self._get_article_text(pmid_info, query)
         return wf.go_full_text(
             title=title,
             full_text=article_text,
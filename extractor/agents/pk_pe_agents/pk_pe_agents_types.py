@@ -28,6 +28,8 @@ class PKPECurationWorkflowState(TypedDict):
     suggested_fix: Optional[str] = None
     explanation: Optional[str] = None
     verification_reasoning_process: Optional[str] = None
+    verified_table: Optional[str] = None # the curated table as of the last verification
+    incorrect_rows: Optional[list[int]] = None # the 0-based rows of verified_table found wrong
     previous_errors: Optional[str] = None
     step_output_callback: Optional[Callable] = None
     step_count: Optional[int] = 0
@@ -1,4 +1,11 @@
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+import pandas as pd
+import logging
 
+from TabFuncFlow.utils.table_utils import dataframe_to_markdown, markdown_to_dataframe
+
+logger = logging.getLogger(__name__)
 
 def format_source_tables(source_tables: list[str] | str) -> str:
     if isinstance(source_tables, list):
@@ -7,4 +14,50 @@ def format_source_tables(source_tables: list[str] | str) -> str:
         return source_tables if source_tables is not None else "N / A"
 
 
+@dataclass
+class TableRowDelta:
+    changed_rows: list[int]  # rows of the current table that are added or modified
+    removed_rows: list[int]  # rows of the previous table that are removed or modified
+    unchanged_rows: dict[int, int]  # row of the current table -> the same row of the previous table
+
+    @property
+    def unchanged(self) -> bool:
+        return len(self.changed_rows) == 0 and len(self.removed_rows) == 0
+
+def _get_row_values(df: pd.DataFrame) -> list[tuple[str, ...]]:
+    return [tuple(str(v).strip() for v in row) for row in df.itertuples(index=False)]
+
+def diff_table_rows(previous_table: str, current_table: str) -> TableRowDelta | None:
+    """
+    diff the rows of two markdown tables, None if either table can't be parsed or the columns differ
+    """
+    try:
+        previous_df = markdown_to_dataframe(previous_table)
+        current_df = markdown_to_dataframe(current_table)
+    except Exception as e:
+        logger.info(f"Can't diff the rows of the curated tables: {e}")
+        return None
+    if [str(c).strip() for c in previous_df.columns] != [str(c).strip() for c in current_df.columns]:
+        return None
+
+    matcher = SequenceMatcher(None, _get_row_values(previous_df), _get_row_values(current_df), autojunk=False)
+    delta = TableRowDelta(changed_rows=[], removed_rows=[], unchanged_rows={})
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            delta.unchanged_rows.update({j: i for i, j in zip(range(i1, i2), range(j1, j2))})
+        else:
+            delta.removed_rows.extend(range(i1, i2))
+            delta.changed_rows.extend(range(j1, j2))
+    return delta
 
+def select_table_rows(table: str, rows: list[int]) -> str:
+    """
+    return the rows of the markdown table as a markdown table, with their 1-based row number in
+    the first column "Row"
+    """
+    if len(rows) == 0:
+        return "N / A"
+    df = markdown_to_dataframe(table)
+    selected = df.iloc[rows].copy()
+    selected.insert(0, "Row", [ix + 1 for ix in rows], allow_duplicates=True)
+    return dataframe_to_markdown(selected)
@@ -1,6 +1,7 @@
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from extractor.agents.common_agent.common_step import CommonStep
 from extractor.agents.agent_factory import get_common_agent
+from extractor.agents.prompt_packer import PromptSegment, get_prompt_packer
 
 class PKPECommonStep(CommonStep):
     def __init__(self, llm: BaseChatOpenAI):
@@ -8,3 +9,12 @@ class PKPECommonStep(CommonStep):
 
     def get_agent(self, llm:BaseChatOpenAI):
         return get_common_agent(llm=llm)
+
+    def _pack_prompt(self, state, template: str, segments: list[PromptSegment], **kwargs) -> str:
+        """
+        fill the system prompt template, shrinking the segments to fit in the context of the llm
+        """
+        prompt, report = get_prompt_packer(self.llm).pack(template, segments, **kwargs)
+        if report.total_dropped_tokens > 0 or report.overflow:
+            self._print_step(state, step_output=f"Packed {self.step_name} prompt: {report.describe()}")
+        return prompt
@@ -9,6 +9,7 @@ from extractor.agents.common_agent.common_agent import RetryException
 from TabFuncFlow.utils.table_utils import markdown_to_dataframe, dataframe_to_markdown
 from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE, display_md_table, increase_token_usage
 from extractor.agents.pk_pe_agents.pk_pe_common_step import PKPECommonStep
+from extractor.agents.prompt_packer import PromptSegment
 from extractor.agents.common_agent.common_agent import CommonAgent
 from extractor.agents.common_agent.common_agent_2steps import CommonAgentTwoSteps
 from extractor.agents.pk_pe_agents.pk_pe_agents_types import PKPECurationWorkflowState
@@ -133,12 +134,16 @@ class PKPECuratedTablesCorrectionCodeStep(PKPECommonStep):
         error_history = []
         
         for attempt in range(max_retries):
-            system_prompt = PKPE_CORRECTION_SYSTEM_PROMPT.format(
+            system_prompt = self._pack_prompt(
+                state,
+                PKPE_CORRECTION_SYSTEM_PROMPT,
+                [
+                    PromptSegment("paper_abstract", state["paper_abstract"], priority=0),
+                    PromptSegment("reasoning_process", verification_reasoning_process, priority=1, min_tokens=512),
+                    PromptSegment("source_tables", source_tables, priority=2, min_tokens=1024),
+                    PromptSegment("curated_table", curated_md, truncatable=False),
+                ],
                 paper_title=state["paper_title"],
-                paper_abstract=state["paper_abstract"],
-                source_tables=source_tables,
-                curated_table=curated_md,
-                reasoning_process=verification_reasoning_process,
                 domain=self.domain,
             )
             
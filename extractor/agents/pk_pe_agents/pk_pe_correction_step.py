@@ -8,6 +8,7 @@ from extractor.agents.common_agent.common_agent import RetryException
 from TabFuncFlow.utils.table_utils import markdown_to_dataframe
 from extractor.agents.agent_utils import display_md_table
 from extractor.agents.pk_pe_agents.pk_pe_common_step import PKPECommonStep
+from extractor.agents.prompt_packer import PromptSegment
 from extractor.agents.common_agent.common_agent import CommonAgent
 from extractor.agents.common_agent.common_agent_2steps import CommonAgentTwoSteps
 from extractor.agents.pk_pe_agents.pk_pe_agents_types import PKPECurationWorkflowState
@@ -133,12 +134,16 @@ class PKPECuratedTablesCorrectionStep(PKPECommonStep):
         source_tables = state["source_tables"] if "source_tables" in state else None
         source_tables = format_source_tables(source_tables)
         verification_reasoning_process = state["verification_reasoning_process"] if "verification_reasoning_process" in state else "N / A"
-        system_prompt = PKPE_CORRECTION_SYSTEM_PROMPT.format(
+        system_prompt = self._pack_prompt(
+            state,
+            PKPE_CORRECTION_SYSTEM_PROMPT,
+            [
+                PromptSegment("paper_abstract", state["paper_abstract"], priority=0),
+                PromptSegment("reasoning_process", verification_reasoning_process, priority=1, min_tokens=512),
+                PromptSegment("source_tables", source_tables, priority=2, min_tokens=1024),
+                PromptSegment("curated_table", state["curated_table"], truncatable=False),
+            ],
             paper_title=state["paper_title"],
-            paper_abstract=state["paper_abstract"],
-            source_tables=source_tables,
-            curated_table=state["curated_table"],
-            reasoning_process=verification_reasoning_process,
             domain=self.domain,
         )
         instruction_prompt = COT_USER_INSTRUCTION
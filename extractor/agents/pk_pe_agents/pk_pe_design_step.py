@@ -14,6 +14,7 @@ from extractor.agents.pk_pe_agents.pk_pe_agent_tools import (
 from extractor.agents.pk_pe_agents.pk_pe_agents_types import PKPECurationWorkflowState
 from extractor.constants import COT_USER_INSTRUCTION, PipelineTypeEnum
 from extractor.agents.pk_pe_agents.pk_pe_common_step import PKPECommonStep
+from extractor.agents.prompt_packer import PromptSegment
 
 logger = logging.getLogger(__name__)
 
@@ -202,9 +203,11 @@ class PKPEDesignStep(PKPECommonStep):
 
     def _execute_directly(self, state: PKPECurationWorkflowState) -> tuple[dict, dict[str, int]]:
         state: PKPECurationWorkflowState = state
-        system_prompt = PKPE_DESIGN_SYSTEM_PROMPT.format(
+        system_prompt = self._pack_prompt(
+            state,
+            PKPE_DESIGN_SYSTEM_PROMPT,
+            [PromptSegment("full_text", state["full_text"])],
             paper_title=state["paper_title"],
-            full_text=state["full_text"],
             paper_type=state["paper_type"].value,
             tools_descriptions=self.tools_descriptions,
         )
@@ -5,6 +5,7 @@ from pydantic import BaseModel, Field
 import logging
 
 from extractor.agents.pk_pe_agents.pk_pe_common_step import PKPECommonStep
+from extractor.agents.prompt_packer import PromptSegment
 from extractor.agents.common_agent.common_agent import CommonAgent
 from extractor.agents.common_agent.common_agent_2steps import CommonAgentTwoSteps
 from extractor.agents.common_agent.common_step import CommonStep,CommonState
@@ -77,9 +78,11 @@ class PKPEIdentificationStep(PKPECommonStep):
         self.step_name = "PK PE Identification Step"
 
     def _execute_directly(self, state: PKPECurationWorkflowState):
-        system_prompt = PKPE_IDENTIFICATION_SYSTEM_PROMPT.format(
+        system_prompt = self._pack_prompt(
+            state,
+            PKPE_IDENTIFICATION_SYSTEM_PROMPT,
+            [PromptSegment("abstract", state["paper_abstract"])],
             title=state["paper_title"],
-            abstract=state["paper_abstract"],
         )
         instruction_prompt = COT_USER_INSTRUCTION
         agent = self.get_agent(self.llm) # CommonAgent(llm=self.llm)
@@ -6,10 +6,16 @@ from pydantic import BaseModel, Field
 from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE
 from extractor.agents.common_agent.common_agent import CommonAgent
 from extractor.agents.pk_pe_agents.pk_pe_common_step import PKPECommonStep
+from extractor.agents.prompt_packer import PromptSegment
 from extractor.agents.common_agent.common_agent_2steps import CommonAgentTwoSteps
 from extractor.agents.pk_pe_agents.pk_pe_agents_types import PKPECurationWorkflowState, FinalAnswerEnum
-from extractor.agents.pk_pe_agents.pk_pe_agents_utils import format_source_tables
-from extractor.constants import COT_USER_INSTRUCTION
+from extractor.agents.pk_pe_agents.pk_pe_agents_utils import (
+    TableRowDelta,
+    diff_table_rows,
+    format_source_tables,
+    select_table_rows,
+)
+from extractor.constants import COT_USER_INSTRUCTION, ROW_DELTA_CONTEXT_ROWS, ROW_DELTA_MAX_FRACTION
 from extractor.request_gpt_oss import get_gpt_qwen_30b
 
 logger = logging.getLogger(__name__)
@@ -49,7 +55,8 @@ You must respond using the **exact json compact format** below:
   "reasoning_process": <string, a concise explanation of the thought process or reasoning steps taken to reach a conclusion (no more than 200 words)>,
   "correct": <boolean, True / False>,
   "explanation": <string, brief explanation of whether the curated table is accurate. If incorrect, explain what is wrong, including specific mismatched values or structure issues>,
-  "suggested_fix": <string or None, if incorrect, provide a corrected version of the curated table or the corrected values/rows/columns.>
+  "suggested_fix": <string or None, if incorrect, provide a corrected version of the curated table or the corrected values/rows/columns.>,
+  "incorrect_rows": <list of integers, the row numbers (1 is the first row under the header) of the curated table rows that are wrong, [] if the table is correct or the problems are not in specific rows (e.g. missing rows)>
 }}
 ```
 
@@ -87,11 +94,88 @@ You must respond using the **exact json compact format** below:
 
 """
 
+PKPE_ROW_DELTA_VERIFICATION_SYSTEM_PROMPT = """
+You are a biomedical data verification assistant with expertise in {domain} and data accuracy validation. 
+The **curated {domain} data table** was verified against the **source paper title and tables**, found incorrect, and then corrected.
+Your task is to verify the **correction only**: determine whether the rows changed by the correction and the rows found wrong before are now an accurate and faithful representation of the information provided in the source.
+The rows of the curated table not listed below already passed the verification, you **should not doubt** them.
+
+---
+
+### **Input**
+
+You will be given:
+
+* **Paper Title**: The title of the publication.
+* **Source Table(s) or full text**: Table(s) extracted directly from the publication, preserving structure and labels, or the full text of the publication.
+* **Previous Verification**: What was found wrong in the curated table before the correction.
+* **Removed Rows**: The rows of the curated table before the correction that were removed or modified.
+* **Rows to Verify**: The rows of the corrected table that were added or modified, or found wrong before, with their row number in the first column "Row".
+* **Context Rows**: The verified rows around the rows to verify, for reference only.
+
+---
+
+### **Your Output**
+
+You must respond using the **exact json compact format** below:
+
+```
+{{
+  "reasoning_process": <string, a concise explanation of the thought process or reasoning steps taken to reach a conclusion (no more than 200 words)>,
+  "correct": <boolean, True if the rows to verify are correct and the problems of the previous verification are fixed, otherwise False>,
+  "explanation": <string, brief explanation of whether the rows to verify are accurate. If incorrect, explain what is wrong, including specific mismatched values or structure issues>,
+  "suggested_fix": <string or None, if incorrect, provide the corrected values/rows.>,
+  "incorrect_rows": <list of integers, the row numbers (column "Row") of the rows that are still wrong, [] if the problems are not in specific rows (e.g. missing rows)>
+}}
+```
+
+---
+
+### **Important Notes**
+
+* The columns in the curated table are fixed, so you **should not doubt** the columns in the curated table.
+* Focus on **substantial mismatches** in values or structure that could affect the meaning or interpretation. Minor typos, slight wording differences, or small formatting variations are acceptable.
+* Check that the problems listed in the previous verification are fixed, including the rows that should have been added or removed.
+* Your response will be used to correct the curated table, so you should be **very specific and detailed** in your explanation. **Do not give any general explanation.**
+* when values in text and table disagree, treat the table values as the ground truth (even if the text mentions slightly different ones).
+---
+
+### **Input**
+
+#### **Paper Title**
+
+{paper_title}
+
+#### **Source Table(s) or full text**
+
+{source_tables}
+
+#### **Previous Verification**
+
+{previous_explanation}
+
+#### **Removed Rows**
+
+{removed_rows}
+
+#### **Rows to Verify**
+
+{rows_to_verify}
+
+#### **Context Rows**
+
+{context_rows}
+
+---
+
+"""
+
 class PKPEVerificationStepResult(BaseModel):
     reasoning_process: str = Field(description="A **concise explanation** of the thought process or reasoning steps taken to reach a conclusion (no more than 200 words).")
     correct: bool = Field(description="Whether the curated table is accurate and faithful to the source table(s).")
     explanation: str = Field(description="Brief explanation of whether the curated table is accurate. If incorrect, explain what is wrong, including specific mismatched values or structure issues.")
     suggested_fix: Optional[str] = Field(description="If incorrect, provide a corrected version of the curated table or the corrected values/rows/columns.")
+    incorrect_rows: Optional[list[int]] = Field(default=None, description="The row numbers (1 is the first row under the header) of the curated table rows that are wrong.")
     
 class PKPECuratedTablesVerificationStep(PKPECommonStep):
     def __init__(
@@ -132,13 +216,36 @@ Suggested fix:
             state["suggested_fix"] = "N/A"
             return state, {**DEFAULT_TOKEN_USAGE}
 
-        system_prompt = PKPE_VERIFICATION_SYSTEM_PROMPT.format(
-            paper_title=state["paper_title"],
-            paper_abstract=state["paper_abstract"],
-            source_tables=source_tables,
-            curated_table=state["curated_table"],
-            domain=self.domain,
-        )
+        delta = None
+        if state.get("verified_table") is not None:
+            delta = diff_table_rows(state["verified_table"], curated_table)
+        if delta is not None and delta.unchanged:
+            # the correction changed nothing, the previous verification stands
+            self._print_step(state, step_output="The curated table is unchanged since the last verification.")
+            return state, {**DEFAULT_TOKEN_USAGE}
+        rows_to_verify = self._get_rows_to_verify(state, delta) if delta is not None else None
+
+        if rows_to_verify is not None:
+            n_rows = len(delta.changed_rows) + len(delta.unchanged_rows)
+            self._print_step(
+                state,
+                step_output=f"Verifying {len(rows_to_verify)} changed or wrong rows of {n_rows}, "
+                f"the other {n_rows - len(rows_to_verify)} rows stay verified.",
+            )
+            system_prompt = self._get_row_delta_prompt(state, source_tables, curated_table, delta, rows_to_verify)
+        else:
+            # the curated table is what is verified, it is never cut
+            system_prompt = self._pack_prompt(
+                state,
+                PKPE_VERIFICATION_SYSTEM_PROMPT,
+                [
+                    PromptSegment("paper_abstract", state["paper_abstract"], priority=0),
+                    PromptSegment("source_tables", source_tables, priority=1, min_tokens=1024),
+                    PromptSegment("curated_table", state["curated_table"], truncatable=False),
+                ],
+                paper_title=state["paper_title"],
+                domain=self.domain,
+            )
         instruction_prompt = COT_USER_INSTRUCTION
 
         agent = self.get_agent(llm=self.llm) # CommonAgent(llm=self.llm) # CommonAgentTwoSteps(llm=self.llm)
@@ -169,9 +276,58 @@ Suggested fix:
         if not res.correct:
             self._update_intermediate_output(state, res.explanation, res.suggested_fix)
         state["verification_reasoning_process"] = reasoning_process
+        # the row numbers are 1-based in the prompts
+        state["verified_table"] = curated_table
+        state["incorrect_rows"] = sorted({r - 1 for r in (res.incorrect_rows or []) if r >= 1}) \
+            if not res.correct else []
 
         return state, token_usage
 
+    def _get_rows_to_verify(self, state, delta: TableRowDelta) -> list[int] | None:
+        """
+        return the rows of the corrected table to verify: the changed rows and the rows found wrong
+        before, None if the table is to be verified in full
+        """
+        incorrect_rows = set(state.get("incorrect_rows") or [])
+        if len(incorrect_rows) == 0:
+            # the problems found before are not in specific rows
+            return None
+        rows = set(delta.changed_rows)
+        rows.update(new for new, old in delta.unchanged_rows.items() if old in incorrect_rows)
+        n_rows = len(delta.changed_rows) + len(delta.unchanged_rows)
+        if len(rows) > ROW_DELTA_MAX_FRACTION * n_rows:
+            return None
+        return sorted(rows)
+
+    def _get_row_delta_prompt(
+        self,
+        state,
+        source_tables: str,
+        curated_table: str,
+        delta: TableRowDelta,
+        rows_to_verify: list[int],
+    ) -> str:
+        n_rows = len(delta.changed_rows) + len(delta.unchanged_rows)
+        context_rows = sorted({
+            ix
+            for row in rows_to_verify
+            for ix in range(row - ROW_DELTA_CONTEXT_ROWS, row + ROW_DELTA_CONTEXT_ROWS + 1)
+            if 0 <= ix < n_rows
+        } - set(rows_to_verify))
+        return self._pack_prompt(
+            state,
+            PKPE_ROW_DELTA_VERIFICATION_SYSTEM_PROMPT,
+            [
+                PromptSegment("context_rows", select_table_rows(curated_table, context_rows), priority=0),
+                PromptSegment("source_tables", source_tables, priority=1, min_tokens=1024),
+                PromptSegment("previous_explanation", state.get("explanation") or "N / A", priority=2, min_tokens=256),
+                PromptSegment("removed_rows", select_table_rows(state["verified_table"], delta.removed_rows), truncatable=False),
+                PromptSegment("rows_to_verify", select_table_rows(curated_table, rows_to_verify), truncatable=False),
+            ],
+            paper_title=state["paper_title"],
+            domain=self.domain,
+        )
+
     def leave_step(self, state, token_usage: Optional[dict[str, int]] = None):
         return super().leave_step(state, token_usage)
 
@@ -1,4 +1,3 @@
-import time
 from typing import Callable
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from langgraph.graph import StateGraph, START
@@ -14,6 +13,7 @@ from extractor.agents.pk_population_summary.pk_popu_sum_characteristic_info_step
 from extractor.agents.pk_population_summary.pk_popu_sum_row_cleanup_step import RowCleanupStep
 from extractor.agents.pk_population_summary.pk_popu_sum_characteristic_info_refine_step import CharacteristicInfoRefinementStep
 from extractor.agents.pk_population_summary.pk_popu_sum_workflow_utils import PKPopuSumWorkflowState
+from extractor.agents.workflow_progress import stream_workflow
 
 logger = logging.getLogger(__name__)
 
@@ -60,7 +60,8 @@ class PKPopuSumWorkflow:
         previous_errors = previous_errors if previous_errors is not None else "N/A"
         config = {"recursion_limit": 500}
 
-        for s in self.graph.stream(
+        s = stream_workflow(
+            self.graph,
             input={
                 "title": title,
                 "full_text": full_text,
@@ -69,11 +70,9 @@ class PKPopuSumWorkflow:
                 "previous_errors": previous_errors,
             },
             config=config,
-            stream_mode="values",
-        ):
-            if sleep_time is not None:
-                time.sleep(sleep_time)
-            print(s)
+            workflow_name=self.__class__.__name__,
+            sleep_time=sleep_time,
+        )
 
         df_combined = s["df_combined"]
         column_mapping = {
@@ -1,9 +1,10 @@
 import pandas as pd
 
-from TabFuncFlow.utils.table_utils import dataframe_to_markdown, markdown_to_dataframe
+from TabFuncFlow.utils.table_utils import dataframe_to_markdown
 from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE, display_md_table
 from extractor.agents.pk_summary.pk_sum_common_agent import PKSumCommonAgentResult
 from extractor.agents.pk_summary.pk_sum_common_step import PKSumCommonStep
+from extractor.agents.pk_summary.pk_sum_workflow_utils import get_state_table_list
 
 
 class AssemblyStep(PKSumCommonStep):
@@ -15,10 +16,10 @@ class AssemblyStep(PKSumCommonStep):
         self.end_title = "Completed Assembly"
 
     def execute_directly(self, state):
-        drug_list = state["drug_list"]
-        value_list = state["value_list"]
-        patient_list = state["patient_list"]
-        type_unit_list = state["type_unit_list"]
+        drug_list = get_state_table_list(state, "drug_list")
+        value_list = get_state_table_list(state, "value_list")
+        patient_list = get_state_table_list(state, "patient_list")
+        type_unit_list = get_state_table_list(state, "type_unit_list")
 
         df_list = []
         assert (
@@ -28,10 +29,10 @@ class AssemblyStep(PKSumCommonStep):
             == len(value_list)
         )  # == len(time_list)
         for i in range(len(drug_list)):
-            df_drug = markdown_to_dataframe(drug_list[i])
-            df_table_patient = markdown_to_dataframe(patient_list[i])
-            df_type_unit = markdown_to_dataframe(type_unit_list[i])
-            df_value = markdown_to_dataframe(value_list[i])
+            df_drug = drug_list[i].df
+            df_table_patient = patient_list[i].df
+            df_type_unit = type_unit_list[i].df
+            df_value = value_list[i].df
             # df_time = markdown_to_dataframe(time_list[i])
             # df_combined = pd.concat([df_drug, df_table_patient, df_time, df_type_unit, df_value], axis=1)
             df_combined = pd.concat(
@@ -4,6 +4,7 @@ from typing import Any, Callable, Optional
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import AzureChatOpenAI
 from langchain_openai.chat_models.base import BaseChatOpenAI
+from extractor.agents.retry_policy import agent_retry
 from extractor.llm_utils import structured_output_llm
 from langchain_anthropic.chat_models import ChatAnthropic
 from langchain_google_genai.chat_models import ChatGoogleGenerativeAI
@@ -13,7 +14,6 @@ from langchain_meta import (
     meta_agent_factory,
 )
 from pydantic import BaseModel, Field
-from tenacity import retry, stop_after_attempt, wait_incrementing
 import logging
 
 from extractor.utils import escape_braces_for_format
@@ -168,10 +168,7 @@ class PKSumCommonAgent(CommonAgent):
             logger.error(str(e))
             raise e
 
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_incrementing(start=1.0, increment=3, max=10),
-    )
+    @agent_retry()
     def _invoke_agent(
         self,
         system_prompt: str,
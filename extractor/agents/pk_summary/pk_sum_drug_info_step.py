@@ -1,3 +1,4 @@
+from TabFuncFlow.utils.table_utils import ParsedTable
 from extractor.agents.agent_utils import (
     display_md_table,
 )
@@ -40,7 +41,7 @@ class DrugInfoExtractionStep(PKSumCommonAgentStep):
         token_usage=None,
     ):
         if processed_res is not None:
-            state["md_table_drug"] = processed_res
+            state["md_table_drug"] = ParsedTable.from_markdown(processed_res)
             self._step_output(state, step_output="Result (md_table_drug):")
             self._step_output(state, step_output=processed_res)
         super().leave_step(state, res, processed_res, token_usage)
@@ -2,7 +2,7 @@ from typing import List
 from pydantic import Field
 import logging
 
-from TabFuncFlow.utils.table_utils import markdown_to_dataframe
+from TabFuncFlow.utils.table_utils import ParsedTable
 from extractor.agents.agent_utils import display_md_table, from_system_template
 from extractor.agents.common_agent.common_agent import RetryException
 from extractor.agents.pk_summary.pk_sum_common_agent import (
@@ -112,32 +112,25 @@ SUBTABLE 2 (Drug-Analyte-Specimen Combinations):
 
 
 def get_matching_drug_prompt(
-    md_table_aligned: str,
-    md_table_aligned_with_1_param_type_and_value: str,
-    drug_md_table: str,
+    md_table_aligned: str | ParsedTable,
+    md_table_aligned_with_1_param_type_and_value: str | ParsedTable,
+    drug_md_table: str | ParsedTable,
     caption: str,
 ):
-    first_line = md_table_aligned_with_1_param_type_and_value.strip().split("\n")[0]
+    sub_table = ParsedTable.of(md_table_aligned_with_1_param_type_and_value)
+    first_line = sub_table.md.strip().split("\n")[0]
     headers = [col.strip() for col in first_line.split("|") if col.strip()]
     extracted_param_types = f""" "{'", "'.join(headers)}" """
-    df_aligned_with_1_param_type_and_value = markdown_to_dataframe(
-        md_table_aligned_with_1_param_type_and_value
-    )
     return MATCHING_DRUG_PROMPT.format(
-        processed_md_table_aligned=display_md_table(md_table_aligned),
+        processed_md_table_aligned=display_md_table(ParsedTable.of(md_table_aligned).md),
         caption=caption,
         # extracted_param_types=extracted_param_types,
         processed_md_table_aligned_with_1_param_type_and_value=display_md_table(
-            md_table_aligned_with_1_param_type_and_value
+            sub_table.md
         ),
-        processed_drug_md_table=display_md_table(drug_md_table),
-        max_md_table_aligned_with_1_param_type_and_value_row_index=df_aligned_with_1_param_type_and_value.shape[
-            0
-        ]
-        - 1,
-        md_table_aligned_with_1_param_type_and_value_row_num=df_aligned_with_1_param_type_and_value.shape[
-            0
-        ],
+        processed_drug_md_table=display_md_table(ParsedTable.of(drug_md_table).md),
+        max_md_table_aligned_with_1_param_type_and_value_row_index=sub_table.n_rows - 1,
+        md_table_aligned_with_1_param_type_and_value_row_num=sub_table.n_rows,
     )
 
 
@@ -149,13 +142,13 @@ class MatchedDrugResult(PKSumCommonAgentResult):
 
 def post_process_validate_matched_rows(
     res: MatchedDrugResult,
-    md_table1: str,
-    md_table2: str,
+    md_table1: str | ParsedTable,
+    md_table2: str | ParsedTable,
 ):
     match_list = res.matched_row_indices
-    expected_rows = markdown_to_dataframe(md_table1).shape[0]
+    expected_rows = ParsedTable.of(md_table1).n_rows
 
-    matched_row_max_index = markdown_to_dataframe(md_table2).shape[0] - 1
+    matched_row_max_index = ParsedTable.of(md_table2).n_rows - 1
     if len(match_list) != expected_rows:
         raise RetryException(f"""
 The provided answer `{match_list}` appears incorrect because:  
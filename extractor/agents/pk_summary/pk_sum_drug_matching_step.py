@@ -1,6 +1,6 @@
 import pandas as pd
 
-from TabFuncFlow.utils.table_utils import dataframe_to_markdown, markdown_to_dataframe
+from TabFuncFlow.utils.table_utils import ParsedTable
 from extractor.agents.agent_prompt_utils import INSTRUCTION_PROMPT
 from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE, increase_token_usage
 from extractor.agents.pk_summary.pk_sum_common_agent import PKSumCommonAgent
@@ -12,6 +12,10 @@ from extractor.agents.pk_summary.pk_sum_drug_matching_agent import (
     MatchedDrugResult,
     post_process_validate_matched_rows,
 )
+from extractor.agents.pk_summary.pk_sum_workflow_utils import (
+    get_state_table,
+    get_state_table_list,
+)
 from extractor.agents.agent_factory import get_common_agent
 
 
@@ -23,15 +27,12 @@ class DrugMatchingAutomaticStep(PKSumCommonStep):
 
     def execute_directly(self, state):
         drug_list = []
-        md_table_list = state["md_table_list"]
-        md_table_drug = state["md_table_drug"]
-        for md in md_table_list:
-            df = markdown_to_dataframe(md)
-            row_num = df.shape[0]
-            df_expanded = pd.concat(
-                [markdown_to_dataframe(md_table_drug)] * row_num, ignore_index=True
-            )
-            drug_list.append(dataframe_to_markdown(df_expanded))
+        md_table_list = get_state_table_list(state, "md_table_list")
+        table_drug = get_state_table(state, "md_table_drug")
+        for table in md_table_list:
+            row_num = table.n_rows
+            df_expanded = pd.concat([table_drug.df] * row_num, ignore_index=True)
+            drug_list.append(ParsedTable.from_dataframe(df_expanded))
 
         return None, drug_list, {**DEFAULT_TOKEN_USAGE}
 
@@ -53,18 +54,18 @@ class DrugMatchingAgentStep(PKSumCommonStep):
     def execute_directly(self, state):
         drug_list = []
         round = 0
-        md_table_drug = state["md_table_drug"]
-        md_table_list = state["md_table_list"]
+        table_drug = get_state_table(state, "md_table_drug")
+        md_table_list = get_state_table_list(state, "md_table_list")
         total_token_usage = {**DEFAULT_TOKEN_USAGE}
         llm = state["llm"]
         caption = state["caption"]
-        md_table_aligned = state["md_table_aligned"]
-        for md in md_table_list:
+        table_aligned = get_state_table(state, "md_table_aligned")
+        for table in md_table_list:
             round += 1
             self._step_output(state, step_output="=" * 64)
             self._step_output(state, f"Trial {round}")
             system_prompt = get_matching_drug_prompt(
-                md_table_aligned, md, md_table_drug, caption
+                table_aligned, table, table_drug, caption
             )
             previous_errors_prompt = self._get_previous_errors_prompt(state)
             system_prompt = system_prompt + previous_errors_prompt
@@ -74,18 +75,17 @@ class DrugMatchingAgentStep(PKSumCommonStep):
                 instruction_prompt=INSTRUCTION_PROMPT,
                 schema=MatchedDrugResult,
                 post_process=post_process_validate_matched_rows,
-                md_table1=md,
-                md_table2=md_table_drug,
+                md_table1=table,
+                md_table2=table_drug,
             )
             self._step_output(
                 state,
                 step_reasoning_process=reasoning_process,
             )
             drug_match_list: list[int] = processed_res
-            df_table_drug = markdown_to_dataframe(md_table_drug)
             df_table_drug = pd.concat(
                 [
-                    df_table_drug,
+                    table_drug.df,
                     pd.DataFrame(
                         [
                             {
@@ -101,7 +101,7 @@ class DrugMatchingAgentStep(PKSumCommonStep):
             df_table_drug_reordered = df_table_drug.iloc[drug_match_list].reset_index(
                 drop=True
             )
-            drug_list.append(dataframe_to_markdown(df_table_drug_reordered))
+            drug_list.append(ParsedTable.from_dataframe(df_table_drug_reordered))
             total_token_usage = increase_token_usage(total_token_usage, token_usage)
 
         return None, drug_list, total_token_usage
@@ -3,7 +3,7 @@ from langchain_core.prompts import ChatPromptTemplate
 from pydantic import Field, ValidationError
 import logging
 
-from TabFuncFlow.utils.table_utils import markdown_to_dataframe
+from TabFuncFlow.utils.table_utils import ParsedTable
 from extractor.agents.agent_utils import display_md_table
 from extractor.agents.common_agent.common_agent import RetryException
 from extractor.agents.pk_summary.pk_sum_common_agent import PKSumCommonAgentResult
@@ -27,9 +27,10 @@ Carefully analyze the table and follow these steps:
 """)
 
 
-def get_header_categorize_prompt(md_table_aligned: str):
-    df_table = markdown_to_dataframe(md_table_aligned)
-    processed_md_table_aligned = display_md_table(md_table_aligned)
+def get_header_categorize_prompt(md_table_aligned: str | ParsedTable):
+    table_aligned = ParsedTable.of(md_table_aligned)
+    df_table = table_aligned.df
+    processed_md_table_aligned = display_md_table(table_aligned.md)
     column_headers_str = "These are all its column headers: " + ", ".join(
         f'"{col}"' for col in df_table.columns
     )
@@ -75,7 +76,7 @@ HeaderCategorizeJsonSchema = {
 
 def post_process_validate_categorized_result(
     result: HeaderCategorizeResult | dict,
-    md_table_aligned: str,
+    md_table_aligned: str | ParsedTable,
 ) -> HeaderCategorizeResult:
     if isinstance(result, dict):
         try:
@@ -91,7 +92,7 @@ def post_process_validate_categorized_result(
             logger.error(e)
             raise e
     # Ensure column count matches the table
-    expected_columns = markdown_to_dataframe(md_table_aligned).shape[1]
+    expected_columns = ParsedTable.of(md_table_aligned).n_cols
     match_dict = res.categorized_headers
     if len(match_dict.keys()) != expected_columns:
         error_msg = f"Mismatch: Expected {expected_columns} columns, but got {len(match_dict.keys())} in match_dict."
@@ -5,6 +5,7 @@ from extractor.agents.pk_summary.pk_sum_header_categorize_agent import (
     HeaderCategorizeJsonSchema,
     post_process_validate_categorized_result,
 )
+from extractor.agents.pk_summary.pk_sum_workflow_utils import get_state_table
 
 
 class HeaderCategorizeStep(PKSumCommonAgentStep):
@@ -15,8 +16,8 @@ class HeaderCategorizeStep(PKSumCommonAgentStep):
         self.end_title = "Completed to Categorize Column Header"
 
     def get_system_prompt(self, state):
-        md_table_aligned = state["md_table_aligned"]
-        system_prompt = get_header_categorize_prompt(md_table_aligned)
+        table_aligned = get_state_table(state, "md_table_aligned")
+        system_prompt = get_header_categorize_prompt(table_aligned)
         previous_errors_prompt = self._get_previous_errors_prompt(state)
         return system_prompt + previous_errors_prompt
 
@@ -24,9 +25,9 @@ class HeaderCategorizeStep(PKSumCommonAgentStep):
         return HeaderCategorizeJsonSchema
 
     def get_post_processor_and_kwargs(self, state):
-        md_table_aligned = state["md_table_aligned"]
+        table_aligned = get_state_table(state, "md_table_aligned")
         return post_process_validate_categorized_result, {
-            "md_table_aligned": md_table_aligned
+            "md_table_aligned": table_aligned
         }
 
     def leave_step(self, state, res, processed_res=None, token_usage=None):
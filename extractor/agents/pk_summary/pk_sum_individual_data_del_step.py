@@ -1,3 +1,4 @@
+from TabFuncFlow.utils.table_utils import ParsedTable
 from extractor.agents.agent_utils import display_md_table
 from extractor.agents.pk_summary.pk_sum_common_step import PKSumCommonAgentStep
 from extractor.agents.pk_summary.pk_sum_individual_data_del_agent import (
@@ -32,7 +33,7 @@ class IndividualDataDelStep(PKSumCommonAgentStep):
 
     def leave_step(self, state, res, processed_res=None, token_usage=None):
         if processed_res is not None:
-            state["md_table_summary"] = processed_res
+            state["md_table_summary"] = ParsedTable.from_markdown(processed_res)
             self._step_output(state, step_output="Result (md_table_summary):")
             self._step_output(state, step_output=processed_res)
         return super().leave_step(state, res, processed_res, token_usage)
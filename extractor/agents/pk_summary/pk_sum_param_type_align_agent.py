@@ -2,8 +2,8 @@ from langchain_core.prompts import ChatPromptTemplate
 from pydantic import Field
 
 from TabFuncFlow.utils.table_utils import (
+    ParsedTable,
     fix_col_name,
-    markdown_to_dataframe,
     dataframe_to_markdown,
 )
 from TabFuncFlow.operations.f_transpose import f_transpose
@@ -33,19 +33,20 @@ class ParameterTypeAlignResult(PKSumCommonAgentResult):
 If the PK parameter type is represented as column headers, this value will be None."""
     )
 
-def get_parameter_type_align_prompt(md_table_summary: str):
-    df = markdown_to_dataframe(md_table_summary)
-    headers = [f'"{col}"' for col in df.columns]
+def get_parameter_type_align_prompt(md_table_summary: str | ParsedTable):
+    table_summary = ParsedTable.of(md_table_summary)
+    headers = [f'"{col}"' for col in table_summary.df.columns]
     headers = ",".join(headers)
     return PARAMETER_TYPE_ALIGN_PROMPT.format(
-        md_table_summary=md_table_summary,
+        md_table_summary=table_summary.md,
         md_table_summary_header=headers,
     )
 
 def post_process_parameter_type_align(
-    res: ParameterTypeAlignResult, md_table_summary: str
+    res: ParameterTypeAlignResult, md_table_summary: str | ParsedTable
 ):
-    df_table = markdown_to_dataframe(md_table_summary)
+    table_summary = ParsedTable.of(md_table_summary)
+    df_table = table_summary.df
     if res.col_name is None:
         df_table = f_transpose(df_table)
         df_table.columns = ["Parameter type"] + list(df_table.columns[1:])
@@ -53,6 +54,6 @@ def post_process_parameter_type_align(
             fill_empty_headers(remove_empty_col_row(dataframe_to_markdown(df_table)))
         )
     else:
-        col_name = fix_col_name(res.col_name, md_table_summary)
+        col_name = fix_col_name(res.col_name, table_summary)
         df_table = df_table.rename(columns={f"{col_name}": "Parameter type"})
         return dataframe_to_markdown(df_table)
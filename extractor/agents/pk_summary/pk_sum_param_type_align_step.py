@@ -1,9 +1,11 @@
+from TabFuncFlow.utils.table_utils import ParsedTable
 from extractor.agents.pk_summary.pk_sum_common_step import PKSumCommonAgentStep
 from extractor.agents.pk_summary.pk_sum_param_type_align_agent import (
     ParameterTypeAlignResult,
     get_parameter_type_align_prompt,
     post_process_parameter_type_align,
 )
+from extractor.agents.pk_summary.pk_sum_workflow_utils import get_state_table
 
 
 class ParametertypeAlignStep(PKSumCommonAgentStep):
@@ -13,8 +15,8 @@ class ParametertypeAlignStep(PKSumCommonAgentStep):
         self.end_title = "Completed to Align Parameter Type"
 
     def get_system_prompt(self, state):
-        md_table_summary = state["md_table_summary"]
-        system_prompt = get_parameter_type_align_prompt(md_table_summary)
+        table_summary = get_state_table(state, "md_table_summary")
+        system_prompt = get_parameter_type_align_prompt(table_summary)
         previous_errors_prompt = self._get_previous_errors_prompt(state)
         return system_prompt + previous_errors_prompt
 
@@ -22,12 +24,12 @@ class ParametertypeAlignStep(PKSumCommonAgentStep):
         return ParameterTypeAlignResult
 
     def get_post_processor_and_kwargs(self, state):
-        md_table_summary = state["md_table_summary"]
-        return post_process_parameter_type_align, {"md_table_summary": md_table_summary}
+        table_summary = get_state_table(state, "md_table_summary")
+        return post_process_parameter_type_align, {"md_table_summary": table_summary}
 
     def leave_step(self, state, res, processed_res=None, token_usage=None):
         if processed_res is not None:
-            state["md_table_aligned"] = processed_res
+            state["md_table_aligned"] = ParsedTable.from_markdown(processed_res)
             self._step_output(state, step_output="Result (md_table_aligned):")
             self._step_output(state, step_output=processed_res)
         return super().leave_step(state, res, processed_res, token_usage)
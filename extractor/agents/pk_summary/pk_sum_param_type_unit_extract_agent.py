@@ -2,7 +2,7 @@ from typing import List
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 
-from TabFuncFlow.utils.table_utils import markdown_to_dataframe
+from TabFuncFlow.utils.table_utils import ParsedTable
 from extractor.agents.agent_utils import display_md_table
 from extractor.agents.pk_summary.pk_sum_common_agent import PKSumCommonAgentResult
 
@@ -44,7 +44,10 @@ class ParamTypeUnitExtractionResult(PKSumCommonAgentResult):
 
 
 def get_param_type_unit_extraction_prompt(
-    md_table_aligned: str, md_sub_table: str, col_mapping: dict, caption: str
+    md_table_aligned: str | ParsedTable,
+    md_sub_table: str | ParsedTable,
+    col_mapping: dict,
+    caption: str,
 ) -> str | None:
     parameter_type_count = list(col_mapping.values()).count("Parameter type")
     # parameter_unit_count = list(match_dict.values()).count("Parameter unit")
@@ -52,12 +55,13 @@ def get_param_type_unit_extraction_prompt(
         key_with_parameter_type = [
             key for key, value in col_mapping.items() if value == "Parameter type"
         ][0]
+        sub_table = ParsedTable.of(md_sub_table)
         return UNIT_EXTRACTION_PROMPT.format(
-            processed_md_table_aligned=display_md_table(md_table_aligned),
+            processed_md_table_aligned=display_md_table(ParsedTable.of(md_table_aligned).md),
             caption=caption,
-            processed_md_sub_table=display_md_table(md_sub_table),
+            processed_md_sub_table=display_md_table(sub_table.md),
             key_with_parameter_type=key_with_parameter_type,
-            row_max_index=markdown_to_dataframe(md_sub_table).shape[0] - 1,
+            row_max_index=sub_table.n_rows - 1,
         )
     return None
 
@@ -72,14 +76,14 @@ def pre_process_param_type_unit(md_table: str, col_mapping: dict):
 
 def post_process_validate_matched_tuple(
     res: ParamTypeUnitExtractionResult,
-    md_table: str,
+    md_table: str | ParsedTable,
     col_mapping: dict,
 ):
     matched_tuple = (
         res.extracted_param_units.parameter_types,
         res.extracted_param_units.parameter_units,
     )
-    expected_rows = markdown_to_dataframe(md_table).shape[0]
+    expected_rows = ParsedTable.of(md_table).n_rows
     if len(matched_tuple[0]) != expected_rows or len(matched_tuple[1]) != expected_rows:
         error_msg = (
             f"Mismatch: Expected {expected_rows} rows, but got {len(matched_tuple[0])} (types) and {len(matched_tuple[1])} (units).",
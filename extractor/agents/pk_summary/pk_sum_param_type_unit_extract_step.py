@@ -1,7 +1,7 @@
 from typing import List, Tuple
 import pandas as pd
 
-from TabFuncFlow.utils.table_utils import dataframe_to_markdown, markdown_to_dataframe
+from TabFuncFlow.utils.table_utils import ParsedTable, dataframe_to_markdown
 from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE, increase_token_usage
 from extractor.agents.pk_summary.pk_sum_common_agent import PKSumCommonAgent
 from extractor.agents.pk_summary.pk_sum_common_step import PKSumCommonAgentStep
@@ -11,6 +11,10 @@ from extractor.agents.pk_summary.pk_sum_param_type_unit_extract_agent import (
     ParamTypeUnitExtractionResult,
     post_process_validate_matched_tuple,
 )
+from extractor.agents.pk_summary.pk_sum_workflow_utils import (
+    get_state_table,
+    get_state_table_list,
+)
 from extractor.agents.agent_factory import get_common_agent
 
 class ExtractParamTypeAndUnitStep(PKSumCommonAgentStep):
@@ -31,14 +35,14 @@ class ExtractParamTypeAndUnitStep(PKSumCommonAgentStep):
         return post_process_validate_matched_tuple, None
 
     def execute_directly(self, state):
-        md_table_list = state["md_table_list"]
+        md_table_list = get_state_table_list(state, "md_table_list")
         col_mapping = state["col_mapping"]
-        type_unit_list: list[str] = []
+        type_unit_list: list[ParsedTable] = []
         type_unit_cache: dict = {}
         round = 0
         total_token_usage = {**DEFAULT_TOKEN_USAGE}
-        for md in md_table_list:
-            df = markdown_to_dataframe(md)
+        for table in md_table_list:
+            df = table.df
             col_name_of_parameter_type = [
                 col for col in df.columns if col_mapping.get(col) == "Parameter type"
             ][0]
@@ -66,17 +70,17 @@ class ExtractParamTypeAndUnitStep(PKSumCommonAgentStep):
                         }
                     )
 
-                    type_unit_list.append(dataframe_to_markdown(df_selected))
+                    type_unit_list.append(ParsedTable.from_dataframe(df_selected))
                 else:
                     round += 1
                     step_name = f" (Trial {str(round)})"
                     self._step_output(state, step_output=step_name)
                     llm = state["llm"]
-                    md_table_aligned = state["md_table_aligned"]
+                    md_table_aligned = get_state_table(state, "md_table_aligned")
                     caption = state["caption"]
                     schema = self.get_schema()
                     system_prompt = get_param_type_unit_extraction_prompt(
-                        md_table_aligned, md, col_mapping, caption
+                        md_table_aligned, table, col_mapping, caption
                     )
                     previous_errors_prompt = self._get_previous_errors_prompt(state)
                     system_prompt = system_prompt + previous_errors_prompt
@@ -87,7 +91,7 @@ class ExtractParamTypeAndUnitStep(PKSumCommonAgentStep):
                         instruction_prompt=instruction_prompt,
                         schema=schema,
                         post_process=post_process_validate_matched_tuple,
-                        md_table=md,
+                        md_table=table,
                         col_mapping=col_mapping,
                     )
                     self._step_output(
@@ -102,7 +106,8 @@ class ExtractParamTypeAndUnitStep(PKSumCommonAgentStep):
                             index=["Parameter type", "Parameter unit"],
                         ).T
                     )
-                    type_unit_list.append(md_type_unit)
+                    # the cells come from llm, parse them as the other tables
+                    type_unit_list.append(ParsedTable.from_markdown(md_type_unit))
                     total_token_usage = increase_token_usage(
                         total_token_usage, token_usage
                     )
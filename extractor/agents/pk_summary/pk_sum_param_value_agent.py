@@ -3,7 +3,7 @@ from pydantic import Field
 import pandas as pd
 import logging
 
-from TabFuncFlow.utils.table_utils import dataframe_to_markdown, markdown_to_dataframe
+from TabFuncFlow.utils.table_utils import ParsedTable, dataframe_to_markdown
 from extractor.agents.agent_utils import display_md_table
 from extractor.agents.common_agent.common_agent import RetryException
 from extractor.agents.pk_summary.pk_sum_common_agent import (
@@ -51,23 +51,22 @@ Please Note:
 
 
 def get_parameter_value_prompt(
-    md_table_aligned: str,
-    md_table_aligned_with_1_param_type_and_value: str,
+    md_table_aligned: str | ParsedTable,
+    md_table_aligned_with_1_param_type_and_value: str | ParsedTable,
     caption: str,
 ):
+    sub_table = ParsedTable.of(md_table_aligned_with_1_param_type_and_value)
     # Extract the first line (headers) from the provided subtable
-    first_line = md_table_aligned_with_1_param_type_and_value.strip().split("\n")[0]
+    first_line = sub_table.md.strip().split("\n")[0]
     headers = [col.strip() for col in first_line.split("|") if col.strip()]
     extracted_param_types = f""" "{'", "'.join(headers)}" """
-    rows_num = markdown_to_dataframe(
-        md_table_aligned_with_1_param_type_and_value
-    ).shape[0]
+    rows_num = sub_table.n_rows
     return PARAMETER_VALUE_PROMPT.format(
-        processed_md_table_aligned=display_md_table(md_table_aligned),
+        processed_md_table_aligned=display_md_table(ParsedTable.of(md_table_aligned).md),
         caption=caption,
         extracted_param_types=extracted_param_types,
         processed_md_table_aligned_with_1_param_type_and_value=display_md_table(
-            md_table_aligned_with_1_param_type_and_value
+            sub_table.md
         ),
         md_table_aligned_with_1_param_type_and_value_max_row_index=rows_num - 1,
         md_table_aligned_with_1_param_type_and_value_rows=rows_num,
@@ -89,7 +88,7 @@ class ParameterValueResult(PKSumCommonAgentResult):
 def post_process_matched_list(
     res: ParameterValueResult,
     expected_rows: int,
-) -> str:
+) -> ParsedTable:
     matched_values = res.extracted_param_values
 
     # validation
@@ -132,4 +131,5 @@ Please make sure the inner list have {COLUMN_NUMBER} values, the result should b
             + str(res.extracted_param_values)
             + f"\nWhy it's wrong:\nMismatch: Expected {expected_rows} rows, but got {df_table.shape[0]} extracted values."
         )
-    return dataframe_to_markdown(df_table)
+    # the cells come from llm, parse them as the other tables
+    return ParsedTable.from_markdown(dataframe_to_markdown(df_table))
@@ -1,6 +1,6 @@
-from TabFuncFlow.utils.table_utils import markdown_to_dataframe
+from TabFuncFlow.utils.table_utils import ParsedTable
 from extractor.agents.agent_prompt_utils import INSTRUCTION_PROMPT
-from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE, increase_token_usage
+from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE, increase_token_usage, map_concurrently
 from extractor.agents.common_agent.common_agent_2steps import CommonAgentTwoSteps
 from extractor.agents.pk_summary.pk_sum_common_agent import PKSumCommonAgent
 from extractor.agents.pk_summary.pk_sum_common_step import PKSumCommonStep
@@ -9,6 +9,10 @@ from extractor.agents.pk_summary.pk_sum_param_value_agent import (
     ParameterValueResult,
     post_process_matched_list,
 )
+from extractor.agents.pk_summary.pk_sum_workflow_utils import (
+    get_state_table,
+    get_state_table_list,
+)
 from extractor.agents.agent_factory import get_common_agent
 
 
@@ -19,34 +23,38 @@ class ParameterValueExtractionStep(PKSumCommonStep):
         self.end_title = "Completed Parameter Value Extraction"
 
     def execute_directly(self, state):
-        md_table_aligned = state["md_table_aligned"]
+        table_aligned = get_state_table(state, "md_table_aligned")
         llm = state["llm"]
-        md_table_list = state["md_table_list"]
+        md_table_list = get_state_table_list(state, "md_table_list")
         caption = state["caption"]
+        previous_errors_prompt = self._get_previous_errors_prompt(state)
 
-        value_list = []
-        round = 0
-        total_token_usage = {**DEFAULT_TOKEN_USAGE}
-        for md in md_table_list:
-            round += 1
-            self._step_output(f"Trial {round}")
-            system_prompt = get_parameter_value_prompt(md_table_aligned, md, caption)
-            previous_errors_prompt = self._get_previous_errors_prompt(state)
+        def extract_values(table: ParsedTable):
+            system_prompt = get_parameter_value_prompt(table_aligned, table, caption)
             system_prompt = system_prompt + previous_errors_prompt
+            # the agent keeps the retry state of one call, so every sub-table needs its own agent
             agent = get_common_agent(llm=llm) # PKSumCommonAgent(llm=llm)
-            res, processed_res, token_usage, reasoning_process = agent.go(
+            return agent.go(
                 system_prompt=system_prompt,
                 instruction_prompt=INSTRUCTION_PROMPT,
                 schema=ParameterValueResult,
                 post_process=post_process_matched_list,
-                expected_rows=markdown_to_dataframe(md).shape[0],
+                expected_rows=table.n_rows,
             )
+
+        # the sub-tables are independent, send them to llm concurrently
+        results = map_concurrently(extract_values, md_table_list)
+
+        value_list = []
+        total_token_usage = {**DEFAULT_TOKEN_USAGE}
+        for round, (res, processed_res, token_usage, reasoning_process) in enumerate(results, start=1):
+            self._step_output(state, step_output=f"Trial {round}")
             self._step_output(
                 state,
                 step_reasoning_process=reasoning_process if reasoning_process is not None else "",
             )
             value_list.append(processed_res)
-            total_token_usage = increase_token_usage(token_usage)
+            total_token_usage = increase_token_usage(total_token_usage, token_usage)
 
         return (
             ParameterValueResult(reasoning_process="", extracted_param_values=[[]]),
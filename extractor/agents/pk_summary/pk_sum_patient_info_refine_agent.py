@@ -3,7 +3,7 @@ from pydantic import Field
 import pandas as pd
 import logging
 
-from TabFuncFlow.utils.table_utils import dataframe_to_markdown, markdown_to_dataframe
+from TabFuncFlow.utils.table_utils import ParsedTable, dataframe_to_markdown
 from extractor.agents.agent_utils import display_md_table
 from extractor.agents.common_agent.common_agent import RetryException
 from extractor.agents.pk_summary.pk_sum_common_agent import (
@@ -64,12 +64,15 @@ Carefully analyze the tables and follow these steps to refine Subtable 1 into a
 """)
 
 
-def get_patient_info_refine_prompt(md_table: str, md_table_patient: str, caption: str):
-    row_num = markdown_to_dataframe(md_table_patient).shape[0]
+def get_patient_info_refine_prompt(
+    md_table: str, md_table_patient: str | ParsedTable, caption: str
+):
+    table_patient = ParsedTable.of(md_table_patient)
+    row_num = table_patient.n_rows
     return PATIENT_INFO_REFINE_PROMPT.format(
         processed_md_table=display_md_table(md_table),
         caption=caption,
-        processed_md_table_patient=display_md_table(md_table_patient),
+        processed_md_table_patient=display_md_table(table_patient.md),
         md_table_patient_max_row_index=row_num - 1,
         md_table_patient_row_num=row_num,
     )
@@ -85,7 +88,7 @@ class PatientInfoRefinedResult(PKSumCommonAgentResult):
 
 def post_process_refined_patient_info(
     res: PatientInfoRefinedResult,
-    md_table_patient: str,
+    md_table_patient: str | ParsedTable,
 ) -> str:
     match_list = res.refined_patient_combinations
     if not match_list:
@@ -93,7 +96,8 @@ def post_process_refined_patient_info(
         logger.error(error_msg)
         raise ValueError(error_msg)
 
-    expected_rows = markdown_to_dataframe(md_table_patient).shape[0]
+    table_patient = ParsedTable.of(md_table_patient)
+    expected_rows = table_patient.n_rows
     if len(match_list) != expected_rows:
         error_msg = (
             "Wrong answer example:\n"
@@ -113,7 +117,7 @@ def post_process_refined_patient_info(
         ],
     ).astype(str)
 
-    df_patient = markdown_to_dataframe(md_table_patient)
+    df_patient = table_patient.df
     if not df_table["Subject N"].equals(df_patient["Subject N"]):
         error_msg = (
             "Wrong answer example:\n"
@@ -2,7 +2,11 @@ from extractor.agents.pk_summary.pk_sum_common_step import PKSumCommonAgentStep
 from extractor.agents.pk_summary.pk_sum_common_agent import (
     PKSumCommonAgentResult,
 )
-from extractor.agents.pk_summary.pk_sum_workflow_utils import PKSumWorkflowState
+from TabFuncFlow.utils.table_utils import ParsedTable
+from extractor.agents.pk_summary.pk_sum_workflow_utils import (
+    PKSumWorkflowState,
+    get_state_table,
+)
 
 from extractor.agents.pk_summary.pk_sum_patient_info_refine_agent import (
     PatientInfoRefinedResult,
@@ -19,9 +23,9 @@ class PatientInfoRefinementStep(PKSumCommonAgentStep):
 
     def get_system_prompt(self, state: PKSumWorkflowState):
         md_table = state["md_table"]
-        md_table_patient = state["md_table_patient"]
+        table_patient = get_state_table(state, "md_table_patient")
         caption = state["caption"]
-        system_prompt = get_patient_info_refine_prompt(md_table, md_table_patient, caption)
+        system_prompt = get_patient_info_refine_prompt(md_table, table_patient, caption)
         previous_errors_prompt = self._get_previous_errors_prompt(state)
         return system_prompt + previous_errors_prompt
 
@@ -33,7 +37,7 @@ class PatientInfoRefinementStep(PKSumCommonAgentStep):
         token_usage=None,
     ):
         if processed_res is not None:
-            state["md_table_patient_refined"] = processed_res
+            state["md_table_patient_refined"] = ParsedTable.from_markdown(processed_res)
             self._step_output(state, step_output="Result (md_table_patient_refined):")
             self._step_output(state, step_output=processed_res)
         return super().leave_step(state, res, processed_res, token_usage)
@@ -42,5 +46,5 @@ class PatientInfoRefinementStep(PKSumCommonAgentStep):
         return PatientInfoRefinedResult
 
     def get_post_processor_and_kwargs(self, state: PKSumWorkflowState):
-        md_table_patient = state["md_table_patient"]
-        return post_process_refined_patient_info, {"md_table_patient": md_table_patient}
+        table_patient = get_state_table(state, "md_table_patient")
+        return post_process_refined_patient_info, {"md_table_patient": table_patient}
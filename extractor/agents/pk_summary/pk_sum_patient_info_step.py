@@ -1,3 +1,4 @@
+from TabFuncFlow.utils.table_utils import ParsedTable
 from extractor.agents.agent_utils import (
     display_md_table,
     extract_integers,
@@ -32,7 +33,7 @@ class PatientInfoExtractionStep(PKSumCommonAgentStep):
 
     def leave_step(self, state, res, processed_res=None, token_usage=None):
         if processed_res is not None:
-            state["md_table_patient"] = processed_res
+            state["md_table_patient"] = ParsedTable.from_markdown(processed_res)
             self._step_output(state, step_output="Result (md_table_patient):")
             self._step_output(state, step_output=processed_res)
         return super().leave_step(state, res, processed_res, token_usage)
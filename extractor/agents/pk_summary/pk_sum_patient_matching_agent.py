@@ -2,7 +2,7 @@ from typing import List
 from pydantic import Field
 import logging
 
-from TabFuncFlow.utils.table_utils import markdown_to_dataframe
+from TabFuncFlow.utils.table_utils import ParsedTable
 from extractor.agents.agent_utils import display_md_table, from_system_template
 from extractor.agents.common_agent.common_agent import RetryException
 from extractor.agents.pk_summary.pk_sum_common_agent import (
@@ -57,26 +57,24 @@ Carefully analyze the tables and follow these instructions step by step:
 """)
 
 def get_matching_patient_prompt(
-    md_table_aligned: str,
-    md_table_aligned_with_1_param_type_and_value: str,
-    patient_md_table: str,
+    md_table_aligned: str | ParsedTable,
+    md_table_aligned_with_1_param_type_and_value: str | ParsedTable,
+    patient_md_table: str | ParsedTable,
     caption: str,
 ):
-    first_line = md_table_aligned_with_1_param_type_and_value.strip().split("\n")[0]
+    sub_table = ParsedTable.of(md_table_aligned_with_1_param_type_and_value)
+    first_line = sub_table.md.strip().split("\n")[0]
     headers = [col.strip() for col in first_line.split("|") if col.strip()]
     extracted_param_types = f""" "{'", "'.join(headers)}" """
     return MATCHING_PATIENT_SYSTEM_PROMPT.format(
-        processed_md_table_aligned=display_md_table(md_table_aligned),
+        processed_md_table_aligned=display_md_table(ParsedTable.of(md_table_aligned).md),
         caption=caption,
         extracted_param_types=extracted_param_types,
         processed_md_table_aligned_with_1_param_type_and_value=display_md_table(
-            md_table_aligned_with_1_param_type_and_value
+            sub_table.md
         ),
-        processed_patient_md_table=display_md_table(patient_md_table),
-        max_md_table_aligned_with_1_param_type_and_value_row_index=markdown_to_dataframe(
-            md_table_aligned_with_1_param_type_and_value
-        ).shape[0]
-        - 1,
+        processed_patient_md_table=display_md_table(ParsedTable.of(patient_md_table).md),
+        max_md_table_aligned_with_1_param_type_and_value_row_index=sub_table.n_rows - 1,
     )
 
 
@@ -88,10 +86,10 @@ class MatchedPatientResult(PKSumCommonAgentResult):
 
 def post_process_validate_matched_patients(
     res: MatchedPatientResult,
-    md_table: str,
+    md_table: str | ParsedTable,
 ):
     match_list = res.matched_row_indices
-    expected_rows = markdown_to_dataframe(md_table).shape[0]
+    expected_rows = ParsedTable.of(md_table).n_rows
     if len(match_list) != expected_rows:
         error_msg = f"""
 **Error Identification:**
@@ -1,6 +1,6 @@
 import pandas as pd
 
-from TabFuncFlow.utils.table_utils import dataframe_to_markdown, markdown_to_dataframe
+from TabFuncFlow.utils.table_utils import ParsedTable
 from extractor.agents.agent_prompt_utils import INSTRUCTION_PROMPT
 from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE, increase_token_usage
 from extractor.agents.pk_summary.pk_sum_common_agent import PKSumCommonAgent
@@ -12,6 +12,10 @@ from extractor.agents.pk_summary.pk_sum_patient_matching_agent import (
     MatchedPatientResult,
     post_process_validate_matched_patients,
 )
+from extractor.agents.pk_summary.pk_sum_workflow_utils import (
+    get_state_table,
+    get_state_table_list,
+)
 from extractor.agents.agent_factory import get_common_agent
 
 
@@ -23,17 +27,16 @@ class PatientMatchingAutomaticStep(PKSumCommonStep):
 
     def execute_directly(self, state):
         patient_list = []
-        md_table_list = state["md_table_list"]
-        md_table_patient_refined = state["md_table_patient_refined"]
+        md_table_list = get_state_table_list(state, "md_table_list")
+        table_patient_refined = get_state_table(state, "md_table_patient_refined")
 
-        for md in md_table_list:
-            df = markdown_to_dataframe(md)
-            row_num = df.shape[0]
+        for table in md_table_list:
+            row_num = table.n_rows
             df_expanded = pd.concat(
-                [markdown_to_dataframe(md_table_patient_refined)] * row_num,
+                [table_patient_refined.df] * row_num,
                 ignore_index=True,
             )  # 这
-            patient_list.append(dataframe_to_markdown(df_expanded))
+            patient_list.append(ParsedTable.from_dataframe(df_expanded))
 
         return None, patient_list, {**DEFAULT_TOKEN_USAGE}
 
@@ -53,20 +56,19 @@ class PatientMatchingAgentStep(PKSumCommonStep):
 
     def execute_directly(self, state):
         patient_list = []
-        md_table_list = state["md_table_list"]
-        md_table_patient = state["md_table_patient"]
-        md_table_patient_refined = state["md_table_patient_refined"]
-        df_table_patient_refined = markdown_to_dataframe(md_table_patient_refined)
-        md_table_aligned = state["md_table_aligned"]
+        md_table_list = get_state_table_list(state, "md_table_list")
+        table_patient = get_state_table(state, "md_table_patient")
+        df_table_patient_refined = get_state_table(state, "md_table_patient_refined").df
+        table_aligned = get_state_table(state, "md_table_aligned")
         llm = state["llm"]
         caption = state["caption"]
         total_token_usage = {**DEFAULT_TOKEN_USAGE}
         round = 0
-        for md in md_table_list:
+        for table in md_table_list:
             round += 1
             self._step_output(f"Trial {round}")
             system_prompt = get_matching_patient_prompt(
-                md_table_aligned, md, md_table_patient, caption
+                table_aligned, table, table_patient, caption
             )
             previous_errors_prompt = self._get_previous_errors_prompt(state)
             system_prompt = system_prompt + previous_errors_prompt
@@ -77,7 +79,7 @@ class PatientMatchingAgentStep(PKSumCommonStep):
                 instruction_prompt=instruction_prompt,
                 schema=MatchedPatientResult,
                 post_process=post_process_validate_matched_patients,
-                md_table=md,
+                md_table=table,
             )
             self._step_output(
                 state,
@@ -104,7 +106,7 @@ class PatientMatchingAgentStep(PKSumCommonStep):
             df_table_patient_reordered = df_table_patient.iloc[
                 patient_match_list
             ].reset_index(drop=True)
-            patient_list.append(dataframe_to_markdown(df_table_patient_reordered))
+            patient_list.append(ParsedTable.from_dataframe(df_table_patient_reordered))
             total_token_usage = increase_token_usage(total_token_usage, token_usage)
 
         return (
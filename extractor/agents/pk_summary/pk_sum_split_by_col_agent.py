@@ -2,11 +2,7 @@ from langchain_core.prompts import ChatPromptTemplate
 from pydantic import Field
 
 from TabFuncFlow.operations.f_split_by_cols import f_split_by_cols
-from TabFuncFlow.utils.table_utils import (
-    dataframe_to_markdown,
-    fix_col_name,
-    markdown_to_dataframe,
-)
+from TabFuncFlow.utils.table_utils import ParsedTable, fix_col_name
 from extractor.agents.agent_utils import display_md_table
 from extractor.agents.pk_summary.pk_sum_common_agent import PKSumCommonAgentResult
 
@@ -27,12 +23,12 @@ Return the results as a list of lists, where each inner list represents a sub-ta
 """)
 
 
-def get_split_by_columns_prompt(md_table: str, col_mapping: dict) -> str:
+def get_split_by_columns_prompt(md_table: str | ParsedTable, col_mapping: dict) -> str:
     """
     get system prompt for splitting by columns
 
     Args:
-    md_table str: aligned table in markdown
+    md_table str | ParsedTable: aligned table
     col_mapping dict: mapped columns, like {'Parameter type': 'Parameter type',
         'N': 'Uncategorized', 'Range': 'Parameter value',
         'Mean ± s.d.': 'Parameter value', 'Median': 'Parameter value'}
@@ -58,7 +54,7 @@ def get_split_by_columns_prompt(md_table: str, col_mapping: dict) -> str:
         situation_str = ""
 
     return SPLIT_BY_COLUMNS_PROMPT.format(
-        processed_md_table=display_md_table(md_table),
+        processed_md_table=display_md_table(ParsedTable.of(md_table).md),
         mapping_str=mapping_str,
         situation_str=situation_str,
     )
@@ -77,23 +73,21 @@ class SplitByColumnsResult(PKSumCommonAgentResult):
 
 def post_process_split_by_columns(
     res: SplitByColumnsResult,
-    md_table_aligned: str,
-) -> list[str]:
+    md_table_aligned: str | ParsedTable,
+) -> list[ParsedTable]:
     """
     split table to sub-tables according res.sub_tables_columns
 
     Return:
-    a list of sub-tables in markdown string
+    a list of sub-tables, rendered to markdown when a prompt needs them
     """
+    table_aligned = ParsedTable.of(md_table_aligned)
     col_groups = res.sub_tables_columns
     # Fix column names before using them
     col_groups = [
-        [fix_col_name(item, md_table_aligned) for item in group] for group in col_groups
+        [fix_col_name(item, table_aligned) for item in group] for group in col_groups
     ]
     # Perform the actual column splitting
-    df_table = f_split_by_cols(col_groups, markdown_to_dataframe(md_table_aligned))
+    df_table = f_split_by_cols(col_groups, table_aligned.df)
 
-    # Convert the resulting DataFrames to markdown
-    return_md_table_list = [dataframe_to_markdown(d) for d in df_table]
-
-    return return_md_table_list
+    return [ParsedTable.from_dataframe(d) for d in df_table]
@@ -1,4 +1,4 @@
-from TabFuncFlow.utils.table_utils import dataframe_to_markdown, markdown_to_dataframe
+from TabFuncFlow.utils.table_utils import ParsedTable
 from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE
 from extractor.agents.pk_summary.pk_sum_common_step import PKSumCommonAgentStep
 from extractor.agents.pk_summary.pk_sum_split_by_col_agent import (
@@ -6,6 +6,7 @@ from extractor.agents.pk_summary.pk_sum_split_by_col_agent import (
     SplitByColumnsResult,
     post_process_split_by_columns,
 )
+from extractor.agents.pk_summary.pk_sum_workflow_utils import get_state_table
 
 
 class SplitByColumnsStep(PKSumCommonAgentStep):
@@ -15,9 +16,9 @@ class SplitByColumnsStep(PKSumCommonAgentStep):
         self.end_title = "Completed Sub-table Creation"
 
     def get_system_prompt(self, state):
-        md_table_aligned = state["md_table_aligned"]
+        table_aligned = get_state_table(state, "md_table_aligned")
         col_mapping = state["col_mapping"]
-        system_prompt = get_split_by_columns_prompt(md_table_aligned, col_mapping)
+        system_prompt = get_split_by_columns_prompt(table_aligned, col_mapping)
         previous_errors_prompt = self._get_previous_errors_prompt(state)
         return system_prompt + previous_errors_prompt
 
@@ -25,24 +26,19 @@ class SplitByColumnsStep(PKSumCommonAgentStep):
         return SplitByColumnsResult
 
     def get_post_processor_and_kwargs(self, state):
-        md_table_aligned = state["md_table_aligned"]
-        return post_process_split_by_columns, {"md_table_aligned": md_table_aligned}
+        table_aligned = get_state_table(state, "md_table_aligned")
+        return post_process_split_by_columns, {"md_table_aligned": table_aligned}
 
     def leave_step(self, state, res, processed_res=None, token_usage=None):
         col_mapping = state["col_mapping"]
-        tmp_md_table_list = []
-        md_table_list = processed_res
-        for md in md_table_list:
-            df = markdown_to_dataframe(md)
+        md_table_list = []
+        for table in processed_res:
+            # the sub-tables are shared, don't drop the columns in place
+            df = table.df
             cols_to_drop = [
                 col for col in df.columns if col_mapping.get(col) == "Uncategorized"
             ]
-            df.drop(columns=cols_to_drop, inplace=True)
-            tmp_md_table_list.append(dataframe_to_markdown(df))
-        # md_table_list = _md_table_list
-        tmp_md_table_list_1 = []
-        for md in tmp_md_table_list:
-            df = markdown_to_dataframe(md)
+            df = df.drop(columns=cols_to_drop)
             cols_to_split = [
                 col for col in df.columns if col_mapping.get(col) == "Parameter value"
             ]
@@ -52,10 +48,9 @@ class SplitByColumnsStep(PKSumCommonAgentStep):
                     selected_cols = [
                         c for c in df.columns if c in common_cols or c == col
                     ]
-                    tmp_md_table_list_1.append(
-                        dataframe_to_markdown(df[selected_cols].copy())
+                    md_table_list.append(
+                        ParsedTable.from_dataframe(df[selected_cols].copy())
                     )
-        md_table_list = tmp_md_table_list_1
         state["md_table_list"] = md_table_list
         self._step_output(state, step_output="Result (md_table_list):")
         self._step_output(state, step_output=str(md_table_list))
@@ -64,7 +59,7 @@ class SplitByColumnsStep(PKSumCommonAgentStep):
     # override super().execute_directly
     def execute_directly(self, state):
         col_mapping = state["col_mapping"]
-        md_table_aligned = state["md_table_aligned"]
+        table_aligned = get_state_table(state, "md_table_aligned")
         parameter_type_count = list(col_mapping.values()).count("Parameter type")
         parameter_pvalue_count = list(col_mapping.values()).count("P value")
 
@@ -76,6 +71,6 @@ class SplitByColumnsStep(PKSumCommonAgentStep):
                 sub_tables_columns=[[]],
             )
             processed_res = [
-                md_table_aligned,
+                table_aligned,
             ]
             return res, processed_res, {**DEFAULT_TOKEN_USAGE}
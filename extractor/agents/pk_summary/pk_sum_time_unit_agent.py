@@ -3,7 +3,7 @@ from pydantic import Field
 import pandas as pd
 import logging
 
-from TabFuncFlow.utils.table_utils import dataframe_to_markdown, markdown_to_dataframe
+from TabFuncFlow.utils.table_utils import ParsedTable, dataframe_to_markdown, markdown_to_dataframe
 from extractor.agents.agent_utils import display_md_table
 from extractor.agents.common_agent.common_agent import RetryException
 from extractor.agents.pk_summary.pk_sum_common_agent import (
@@ -49,11 +49,11 @@ Do NOT include:
 
 
 def get_time_and_unit_prompt(
-    md_table_aligned: str, md_table_post_processed: str, caption: str
+    md_table_aligned: str | ParsedTable, md_table_post_processed: str, caption: str
 ):
     row_num = markdown_to_dataframe(md_table_post_processed).shape[0]
     return TIME_AND_UNIT_PROMPT.format(
-        processed_md_table=display_md_table(md_table_aligned),
+        processed_md_table=display_md_table(ParsedTable.of(md_table_aligned).md),
         caption=caption,
         processed_md_table_post_processed=display_md_table(md_table_post_processed),
         md_data_post_processed_max_row_index=row_num - 1,
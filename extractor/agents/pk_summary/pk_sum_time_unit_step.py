@@ -8,6 +8,7 @@ from extractor.agents.pk_summary.pk_sum_time_unit_agent import (
     post_process_time_and_unit,
 )
 from extractor.agents.pk_summary.pk_sum_common_step import PKSumCommonAgentStep
+from extractor.agents.pk_summary.pk_sum_workflow_utils import get_state_table
 
 
 class TimeExtractionStep(PKSumCommonAgentStep):
@@ -18,30 +19,32 @@ class TimeExtractionStep(PKSumCommonAgentStep):
         self.start_title = "Time Extraction"
         self.end_title = "Completed Time Extraction"
 
-    def get_system_prompt(self, state):
-        md_table_aligned = state["md_table_aligned"]
-        caption = state["caption"]
+    @staticmethod
+    def _get_md_data_lines_after_post_process(state) -> str:
         df_combined = state["df_combined"]
         if df_combined.shape[0] == 0:
-            self.md_data_lines_after_post_process = dataframe_to_markdown(df_combined)
-        else:
-            self.md_data_lines_after_post_process = dataframe_to_markdown(
-                df_combined[
-                    [
-                        "Main value",
-                        "Statistics type",
-                        "Variation type",
-                        "Variation value",
-                        "Interval type",
-                        "Lower bound",
-                        "Upper bound",
-                        "P value",
-                    ]
+            return dataframe_to_markdown(df_combined)
+        return dataframe_to_markdown(
+            df_combined[
+                [
+                    "Main value",
+                    "Statistics type",
+                    "Variation type",
+                    "Variation value",
+                    "Interval type",
+                    "Lower bound",
+                    "Upper bound",
+                    "P value",
                 ]
-            )
+            ]
+        )
+
+    def get_system_prompt(self, state):
+        table_aligned = get_state_table(state, "md_table_aligned")
+        caption = state["caption"]
         system_prompt = get_time_and_unit_prompt(
-            md_table_aligned=md_table_aligned,
-            md_table_post_processed=self.md_data_lines_after_post_process,
+            md_table_aligned=table_aligned,
+            md_table_post_processed=self._get_md_data_lines_after_post_process(state),
             caption=caption,
         )
         previous_errors_prompt = self._get_previous_errors_prompt(state)
@@ -52,7 +55,7 @@ class TimeExtractionStep(PKSumCommonAgentStep):
 
     def get_post_processor_and_kwargs(self, state):
         return post_process_time_and_unit, {
-            "md_table_post_processed": self.md_data_lines_after_post_process
+            "md_table_post_processed": self._get_md_data_lines_after_post_process(state)
         }
 
     def leave_step(self, state, res, processed_res=None, token_usage=None):
@@ -1,13 +1,9 @@
-import time
 from typing import Callable
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from langgraph.graph import StateGraph, START
 import logging
 
-from TabFuncFlow.utils.table_utils import (
-    markdown_to_dataframe,
-    single_html_table_to_markdown,
-)
+from TabFuncFlow.utils.table_utils import single_html_table_to_markdown
 from extractor.agents.pk_summary.pk_sum_assembly_step import AssemblyStep
 from extractor.agents.pk_summary.pk_sum_drug_matching_step import (
     DrugMatchingAgentStep,
@@ -43,7 +39,11 @@ from extractor.agents.pk_summary.pk_sum_patient_matching_step import (
 from extractor.agents.pk_summary.pk_sum_row_cleanup_step import RowCleanupStep
 from extractor.agents.pk_summary.pk_sum_split_by_col_step import SplitByColumnsStep
 from extractor.agents.pk_summary.pk_sum_time_unit_step import TimeExtractionStep
-from extractor.agents.pk_summary.pk_sum_workflow_utils import PKSumWorkflowState
+from extractor.agents.pk_summary.pk_sum_workflow_utils import (
+    PKSumWorkflowState,
+    get_state_table,
+)
+from extractor.agents.workflow_progress import stream_workflow
 
 logger = logging.getLogger(__name__)
 
@@ -56,9 +56,8 @@ class PKSumWorkflow:
 
     def build(self):
         def select_drug_matching_step(state: PKSumWorkflowState):
-            md_table_drug = state["md_table_drug"]
-            df = markdown_to_dataframe(md_table_drug)
-            need_drug_matching = not df.shape[0] == 1
+            table_drug = get_state_table(state, "md_table_drug")
+            need_drug_matching = not table_drug.n_rows == 1
             return (
                 "drug_matching_agent_step"
                 if need_drug_matching
@@ -66,9 +65,8 @@ class PKSumWorkflow:
             )
 
         def select_patient_matching_step(state: PKSumWorkflowState):
-            md_table_patient = state["md_table_patient"]
-            df = markdown_to_dataframe(md_table_patient)
-            need_patient_matching = not df.shape[0] == 1
+            table_patient = get_state_table(state, "md_table_patient")
+            need_patient_matching = not table_patient.n_rows == 1
             return (
                 "patient_matching_agent_step"
                 if need_patient_matching
@@ -163,7 +161,8 @@ class PKSumWorkflow:
         config = {"recursion_limit": 500}
         previous_errors = previous_errors if previous_errors is not None else "N/A"
 
-        for s in self.graph.stream(
+        s = stream_workflow(
+            self.graph,
             input={
                 "md_table": md_table,
                 "caption": caption_and_footnote,
@@ -173,11 +172,9 @@ class PKSumWorkflow:
                 "previous_errors": previous_errors,
             },
             config=config,
-            stream_mode="values",
-        ):
-            if sleep_time is not None:
-                time.sleep(sleep_time)
-            print(s)
+            workflow_name=self.__class__.__name__,
+            sleep_time=sleep_time,
+        )
 
         df_combined = s["df_combined"]
         column_mapping = {
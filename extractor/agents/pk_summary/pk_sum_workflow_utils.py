@@ -3,6 +3,8 @@ from typing import Optional, TypedDict
 from langchain_openai.chat_models.base import BaseChatOpenAI
 import pandas as pd
 
+from TabFuncFlow.utils.table_utils import ParsedTable
+
 
 class PKSumWorkflowState(TypedDict):
     """state data"""
@@ -12,16 +14,17 @@ class PKSumWorkflowState(TypedDict):
     caption: str
     title: Optional[str] # paper title
     col_mapping: Optional[dict]
-    md_table_drug: Optional[str]
-    md_table_patient: Optional[str]
-    md_table_patient_refined: Optional[str]
-    md_table_summary: Optional[str]
-    md_table_aligned: Optional[str]
-    md_table_list: Optional[list[str]]
-    type_unit_list: Optional[list[str]]
-    drug_list: Optional[list[str]]
-    patient_list: Optional[list[str]]
-    value_list: Optional[list[str]]  # value table list
+    # the tables are parsed once and shared by the steps, see get_state_table
+    md_table_drug: Optional[ParsedTable]
+    md_table_patient: Optional[ParsedTable]
+    md_table_patient_refined: Optional[ParsedTable]
+    md_table_summary: Optional[ParsedTable]
+    md_table_aligned: Optional[ParsedTable]
+    md_table_list: Optional[list[ParsedTable]]
+    type_unit_list: Optional[list[ParsedTable]]
+    drug_list: Optional[list[ParsedTable]]
+    patient_list: Optional[list[ParsedTable]]
+    value_list: Optional[list[ParsedTable]]  # value table list
     df_combined: Optional[pd.DataFrame]
     previous_errors: Optional[str]
 
@@ -50,3 +53,28 @@ def pk_sum_leave_step(
         token_usage=token_usage,
     )
 
+
+
+def get_state_table(state: PKSumWorkflowState, key: str) -> ParsedTable | None:
+    """
+    get the table of state[key]
+
+    A markdown table (e.g. set by the caller) is replaced by its ParsedTable, so the
+    following steps share the parsed table.
+    """
+    table = state.get(key)
+    if table is None or isinstance(table, ParsedTable):
+        return table
+    table = ParsedTable.of(table)
+    state[key] = table
+    return table
+
+
+def get_state_table_list(state: PKSumWorkflowState, key: str) -> list[ParsedTable] | None:
+    """get the table list of state[key], see get_state_table"""
+    tables = state.get(key)
+    if tables is None or all(isinstance(table, ParsedTable) for table in tables):
+        return tables
+    tables = [ParsedTable.of(table) for table in tables]
+    state[key] = tables
+    return tables
@@ -0,0 +1,142 @@
+"""
+Fit the prompts into the context window of the llm.
+
+A prompt template is filled with segments (abstract, full text, source tables, ...), each with
+a priority. When the filled prompt doesn't fit in the context of the llm, the segments of the
+lowest priority are shrunk first, by truncation or by the shrink function of the segment (e.g.
+a summary), and the report tells how many tokens of each segment were dropped.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+import logging
+
+from extractor.constants import (
+    LLM_CHARS_PER_TOKEN,
+    LLM_DEFAULT_CONTEXT_TOKENS,
+    PROMPT_RESERVED_TOKENS,
+)
+from extractor.llm_rate_limiter import estimate_text_tokens
+
+logger = logging.getLogger(__name__)
+
+TRUNCATION_MARKER = "\n[... {n_tokens} tokens truncated ...]"
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """
+    keep the head of the text within max_tokens, cut at a line end if there is one near the
+    limit, so the rows of the markdown tables are kept whole
+    """
+    n_tokens = estimate_text_tokens(text)
+    if n_tokens <= max_tokens:
+        return text
+    marker = TRUNCATION_MARKER.format(n_tokens=n_tokens)
+    max_chars = max(0, (max_tokens - estimate_text_tokens(marker)) * LLM_CHARS_PER_TOKEN)
+    head = text[:max_chars]
+    ix = head.rfind("\n")
+    if ix >= max_chars * 0.8:
+        head = head[:ix]
+    return head + TRUNCATION_MARKER.format(n_tokens=n_tokens - estimate_text_tokens(head))
+
+
+@dataclass
+class PromptSegment:
+    name: str  # the name of the template field
+    text: str
+    priority: int = 0  # the segments of lower priority are shrunk first
+    min_tokens: int = 0  # the segment is not shrunk below this size
+    truncatable: bool = True  # False for the segments the prompt is useless without
+    shrink: Callable[[str, int], str] = truncate_text  # (text, max_tokens) -> text of up to max_tokens
+
+    def __post_init__(self):
+        # same as str.format, e.g. a missing abstract is filled in as None
+        if not isinstance(self.text, str):
+            self.text = str(self.text)
+
+
+@dataclass
+class PackReport:
+    max_tokens: int  # the tokens available to the prompt
+    prompt_tokens: int = 0
+    dropped_tokens: dict[str, int] = field(default_factory=dict)  # segment name -> dropped tokens
+
+    @property
+    def total_dropped_tokens(self) -> int:
+        return sum(self.dropped_tokens.values())
+
+    @property
+    def overflow(self) -> bool:
+        """the prompt doesn't fit even with all the truncatable segments shrunk"""
+        return self.prompt_tokens > self.max_tokens
+
+    def describe(self) -> str:
+        dropped = ", ".join(f"{name}: {n}" for name, n in self.dropped_tokens.items() if n > 0)
+        return (
+            f"prompt of {self.prompt_tokens} tokens (limit {self.max_tokens}), "
+            f"dropped {self.total_dropped_tokens} tokens ({dropped if dropped else 'none'})"
+        )
+
+
+class PromptPacker:
+    def __init__(self, max_tokens: int, reserved_tokens: int = PROMPT_RESERVED_TOKENS):
+        """
+        max_tokens: the context window of the llm
+        reserved_tokens: the tokens kept for the instruction prompt, the format instructions
+        and the answer
+        """
+        self.max_tokens = max_tokens
+        self.reserved_tokens = reserved_tokens
+
+    def pack(self, template: str, segments: list[PromptSegment], **kwargs: Any) -> tuple[str, PackReport]:
+        """
+        fill the template with the segments and kwargs, shrinking the segments to fit
+
+        Return:
+        the prompt and the report of the dropped tokens
+        """
+        max_prompt_tokens = max(0, self.max_tokens - self.reserved_tokens)
+        overhead = estimate_text_tokens(template.format(**kwargs, **{s.name: "" for s in segments}))
+        texts = {s.name: s.text for s in segments}
+        sizes = {s.name: estimate_text_tokens(s.text) for s in segments}
+        excess = overhead + sum(sizes.values()) - max_prompt_tokens
+
+        report = PackReport(max_tokens=max_prompt_tokens)
+        # the segments of lowest priority are shrunk first
+        for seg in sorted(segments, key=lambda s: s.priority):
+            if excess <= 0:
+                break
+            if not seg.truncatable or sizes[seg.name] <= seg.min_tokens:
+                continue
+            target = max(seg.min_tokens, sizes[seg.name] - excess)
+            text = seg.shrink(seg.text, target)
+            size = estimate_text_tokens(text)
+            if size >= sizes[seg.name]:
+                continue
+            excess -= sizes[seg.name] - size
+            report.dropped_tokens[seg.name] = sizes[seg.name] - size
+            texts[seg.name] = text
+            sizes[seg.name] = size
+
+        prompt = template.format(**kwargs, **texts)
+        report.prompt_tokens = estimate_text_tokens(prompt)
+        if report.overflow:
+            logger.warning(f"The prompt doesn't fit in the context of the llm: {report.describe()}")
+        elif report.total_dropped_tokens > 0:
+            logger.info(f"Packed the prompt into the context of the llm: {report.describe()}")
+        return prompt, report
+
+
+def get_llm_context_tokens(llm: Any) -> int:
+    """
+    return the context window of the llm, num_ctx of the ollama models. Ollama truncates the
+    prompts longer than num_ctx silently, so they must be packed within it.
+    """
+    num_ctx = getattr(llm, "num_ctx", None)
+    if isinstance(num_ctx, int) and num_ctx > 0:
+        return num_ctx
+    return LLM_DEFAULT_CONTEXT_TOKENS
+
+def get_prompt_packer(llm: Any, reserved_tokens: Optional[int] = None) -> PromptPacker:
+    return PromptPacker(
+        get_llm_context_tokens(llm),
+        reserved_tokens if reserved_tokens is not None else PROMPT_RESERVED_TOKENS,
+    )
@@ -0,0 +1,247 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import Enum
+import functools
+import inspect
+import json
+import random
+import threading
+from typing import Callable, Optional
+import logging
+
+from pydantic import ValidationError
+from tenacity import RetryCallState, retry, retry_if_exception
+
+from extractor.constants import (
+    RETRY_BUDGET_MAX_RETRIES,
+    RETRY_BUDGET_MAX_TOKENS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorCategory(Enum):
+    TRANSIENT = "transient" # timeouts, connection errors, server errors
+    RATE_LIMIT = "rate_limit" # 429, quota exhausted
+    SEMANTIC = "semantic" # the llm output can't be parsed or doesn't pass the post-process
+    FATAL = "fatal" # bad request, authentication, retrying doesn't help
+
+
+FATAL_STATUS_CODES = {400, 401, 403, 404, 422}
+
+def _get_status_code(e: BaseException) -> int | None:
+    for obj in [e, getattr(e, "response", None)]:
+        for name in ["status_code", "status", "code"]:
+            code = getattr(obj, name, None)
+            if isinstance(code, int) and 100 <= code < 600:
+                return code
+    return None
+
+def classify_error(e: BaseException) -> ErrorCategory:
+    """
+    classify an exception raised by an agent call, the unknown exceptions are transient
+    """
+    from extractor.agents.common_agent.common_agent import RetryException
+
+    if isinstance(e, (RetryException, ValidationError, json.JSONDecodeError)):
+        return ErrorCategory.SEMANTIC
+    status_code = _get_status_code(e)
+    if status_code == 429:
+        return ErrorCategory.RATE_LIMIT
+    if status_code is not None and status_code >= 500:
+        return ErrorCategory.TRANSIENT
+    if status_code in FATAL_STATUS_CODES:
+        return ErrorCategory.FATAL
+
+    names = " ".join(cls.__name__ for cls in type(e).__mro__)
+    message = str(e).lower()
+    if "RateLimit" in names or "ResourceExhausted" in names \
+        or "rate limit" in message or "too many requests" in message:
+        return ErrorCategory.RATE_LIMIT
+    if "Timeout" in names or "Connection" in names or isinstance(e, (TimeoutError, ConnectionError)):
+        return ErrorCategory.TRANSIENT
+    if "OutputParser" in names or isinstance(e, (ValueError, KeyError, TypeError, AssertionError)):
+        return ErrorCategory.SEMANTIC
+    if "Authentication" in names or "PermissionDenied" in names or "BadRequest" in names:
+        return ErrorCategory.FATAL
+    return ErrorCategory.TRANSIENT
+
+
+@dataclass
+class Backoff:
+    """attempts and waits of one error category, the wait doubles after each attempt"""
+
+    max_attempts: int
+    initial_wait: float = 0.0  # seconds
+    max_wait: float = 0.0  # seconds
+    jitter: float = 0.0  # the wait is randomized by up to this fraction
+
+    def get_wait(self, attempt_number: int) -> float:
+        wait = min(self.max_wait, self.initial_wait * 2 ** (attempt_number - 1))
+        if self.jitter > 0:
+            wait *= 1.0 + random.uniform(-self.jitter, self.jitter)
+        return max(0.0, wait)
+
+
+def _default_backoffs() -> dict[ErrorCategory, Backoff]:
+    return {
+        # the llm isn't busy, retry at once. The 5th attempt is where the agents try to fix the error
+        ErrorCategory.SEMANTIC: Backoff(max_attempts=5),
+        ErrorCategory.TRANSIENT: Backoff(max_attempts=5, initial_wait=1.0, max_wait=30.0, jitter=0.2),
+        ErrorCategory.RATE_LIMIT: Backoff(max_attempts=8, initial_wait=2.0, max_wait=60.0, jitter=0.5),
+        ErrorCategory.FATAL: Backoff(max_attempts=1),
+    }
+
+
+@dataclass
+class RetryPolicy:
+    """how the agent calls are retried, per error category"""
+
+    backoffs: dict[ErrorCategory, Backoff] = field(default_factory=_default_backoffs)
+    classify: Callable[[BaseException], ErrorCategory] = classify_error
+
+    def get_backoff(self, e: BaseException) -> Backoff:
+        return self.backoffs[self.classify(e)]
+
+    def get_wait(self, e: BaseException, attempt_number: int) -> float:
+        wait = self.get_backoff(e).get_wait(attempt_number)
+        # the provider tells how long to wait
+        retry_after = _get_retry_after(e)
+        return wait if retry_after is None else max(wait, retry_after)
+
+
+def _get_retry_after(e: BaseException) -> float | None:
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    if headers is None:
+        return None
+    try:
+        value = headers.get("retry-after")
+        return None if value is None else float(value)
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+_retry_policy = RetryPolicy()
+
+def set_retry_policy(policy: Optional[RetryPolicy] = None):
+    """set the process-wide retry policy of the agents, None restores the default one"""
+    global _retry_policy
+    _retry_policy = policy if policy is not None else RetryPolicy()
+
+def get_retry_policy() -> RetryPolicy:
+    return _retry_policy
+
+
+class RetryBudget:
+    """
+    Retries and tokens a paper may spend. Once either is spent, the failed agent calls and
+    the correction rounds of the paper are not retried anymore.
+    """
+    def __init__(
+        self,
+        max_retries: int | None = RETRY_BUDGET_MAX_RETRIES,
+        max_tokens: int | None = RETRY_BUDGET_MAX_TOKENS,
+    ):
+        self.max_retries = max_retries
+        self.max_tokens = max_tokens
+        self.retries = 0
+        self.tokens = 0
+        self._lock = threading.Lock()
+
+    def exhausted(self) -> bool:
+        with self._lock:
+            return (self.max_retries is not None and self.retries >= self.max_retries) or \
+                (self.max_tokens is not None and self.tokens >= self.max_tokens)
+
+    def spend_retry(self) -> bool:
+        """take one retry, return False if the budget is exhausted"""
+        if self.exhausted():
+            return False
+        with self._lock:
+            self.retries += 1
+        return True
+
+    def add_tokens(self, tokens: int):
+        with self._lock:
+            self.tokens += tokens
+
+
+_retry_budget: ContextVar[RetryBudget | None] = ContextVar("retry_budget", default=None)
+
+def get_retry_budget() -> RetryBudget | None:
+    """return the retry budget of the paper being curated, None outside of a paper"""
+    return _retry_budget.get()
+
+@contextmanager
+def use_retry_budget(budget: RetryBudget):
+    """make budget the retry budget of the calls inside the with block"""
+    token = _retry_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _retry_budget.reset(token)
+
+def with_retry_budget(func: Callable) -> Callable:
+    """
+    run func with a new retry budget, unless it is called inside one already.
+    The budget follows the context into asyncio tasks and the worker threads started by
+    map_concurrently.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if get_retry_budget() is not None:
+                return await func(*args, **kwargs)
+            with use_retry_budget(RetryBudget()):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if get_retry_budget() is not None:
+            return func(*args, **kwargs)
+        with use_retry_budget(RetryBudget()):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _stop(retry_state: RetryCallState) -> bool:
+    e = retry_state.outcome.exception()
+    backoff = get_retry_policy().get_backoff(e)
+    if retry_state.attempt_number >= backoff.max_attempts:
+        return True
+    budget = get_retry_budget()
+    if budget is not None and budget.exhausted():
+        logger.warning(f"Retry budget of the paper is exhausted, giving up: {e}")
+        return True
+    return False
+
+def _wait(retry_state: RetryCallState) -> float:
+    e = retry_state.outcome.exception()
+    return get_retry_policy().get_wait(e, retry_state.attempt_number)
+
+def _before_sleep(retry_state: RetryCallState):
+    e = retry_state.outcome.exception()
+    budget = get_retry_budget()
+    if budget is not None:
+        budget.spend_retry()
+    logger.info(
+        f"Retrying {retry_state.fn.__qualname__ if retry_state.fn else 'agent call'} "
+        f"({get_retry_policy().classify(e).value} error) in {retry_state.upcoming_sleep:.1f}s, "
+        f"attempt {retry_state.attempt_number}: {e}"
+    )
+
+def agent_retry() -> Callable[[Callable], Callable]:
+    """
+    retry decorator of the agent calls, following the process-wide retry policy and the
+    retry budget of the paper
+    """
+    return retry(
+        retry=retry_if_exception(
+            lambda e: get_retry_policy().classify(e) != ErrorCategory.FATAL
+        ),
+        stop=_stop,
+        wait=_wait,
+        before_sleep=_before_sleep,
+    )
@@ -0,0 +1,31 @@
+import threading
+from typing import Any
+
+_compiled_graphs: dict[type, Any] = {}
+_compiled_graphs_lock = threading.Lock()
+
+
+def get_workflow(workflow_cls: type, **kwargs):
+    """
+    Create a workflow whose graph is compiled only once per process.
+
+    The workflow steps don't keep any state of a run and the llms are passed to the
+    graph through the workflow state, so all the workflows of the same class can share
+    the compiled graph.
+
+    Args:
+    workflow_cls type: the workflow class, like PKSumWorkflow, PKIndWorkflow, ...
+    kwargs dict: args of the workflow constructor, like llm, llm2
+
+    Return:
+    the workflow instance that is ready to go
+    """
+    workflow = workflow_cls(**kwargs)
+    with _compiled_graphs_lock:
+        graph = _compiled_graphs.get(workflow_cls)
+        if graph is None:
+            workflow.build()
+            _compiled_graphs[workflow_cls] = workflow.graph
+        else:
+            workflow.graph = graph
+    return workflow
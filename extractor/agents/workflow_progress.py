@@ -0,0 +1,130 @@
+from dataclasses import dataclass, field
+import threading
+import time
+from typing import Any, Callable, Optional, Protocol
+import logging
+import pandas as pd
+
+from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE, increase_token_usage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkflowProgressEvent:
+    """progress of one workflow step"""
+
+    workflow: str
+    step_name: str
+    step_index: int
+    duration: float  # seconds
+    row_counts: dict[str, int] = field(default_factory=dict)  # rows of the DataFrames in state
+    token_usage: dict = field(default_factory=lambda: {**DEFAULT_TOKEN_USAGE})
+
+
+class ProgressSink(Protocol):
+    def __call__(self, event: WorkflowProgressEvent) -> None: ...
+
+
+def null_progress_sink(event: WorkflowProgressEvent) -> None:
+    pass
+
+
+def logging_progress_sink(event: WorkflowProgressEvent) -> None:
+    logger.info(
+        f"{event.workflow} step {event.step_index} ({event.step_name}): "
+        f"{event.duration:.2f}s, rows: {event.row_counts}, tokens: {event.token_usage['total_tokens']}"
+    )
+
+
+_progress_sink: ProgressSink = null_progress_sink
+
+
+def set_progress_sink(sink: Optional[ProgressSink] = None):
+    """set the process-wide progress sink, None restores the no-op sink"""
+    global _progress_sink
+    _progress_sink = sink if sink is not None else null_progress_sink
+
+
+def get_progress_sink() -> ProgressSink:
+    return _progress_sink
+
+
+def _get_row_counts(state: dict) -> dict[str, int]:
+    return {
+        key: value.shape[0]
+        for key, value in state.items()
+        if isinstance(value, pd.DataFrame)
+    }
+
+
+def stream_workflow(
+    graph: Any,
+    input: dict,
+    config: dict,
+    workflow_name: str,
+    sleep_time: float | None = None,
+    progress_sink: Optional[ProgressSink] = None,
+) -> dict:
+    """
+    Run the compiled workflow graph and report a progress event after every step.
+
+    Args:
+    graph CompiledStateGraph: the compiled workflow graph
+    input dict: the initial workflow state
+    config dict: the graph config, like recursion_limit
+    workflow_name str: the workflow name in the progress events
+    sleep_time float or None: seconds to sleep after every step
+    progress_sink ProgressSink or None: where the events go, the process-wide sink is used if None
+
+    Return:
+    the final workflow state
+    """
+    sink = progress_sink if progress_sink is not None else get_progress_sink()
+    token_usage = {**DEFAULT_TOKEN_USAGE}
+    # the steps that fan out (map_concurrently) call step callback from several threads
+    token_usage_lock = threading.Lock()
+
+    # the steps report their token usage through step callback, count it on the way
+    step_callback: Callable | None = input.get("step_callback")
+    if step_callback is not None:
+        def counting_step_callback(**kwargs):
+            nonlocal token_usage
+            if isinstance(kwargs.get("token_usage"), dict):
+                with token_usage_lock:
+                    token_usage = increase_token_usage(token_usage, kwargs["token_usage"])
+            return step_callback(**kwargs)
+        input = {**input, "step_callback": counting_step_callback}
+
+    state = input
+    step_name = ""
+    step_index = 0
+    start = time.perf_counter()
+    for mode, chunk in graph.stream(
+        input=input,
+        config=config,
+        stream_mode=["updates", "values"],
+    ):
+        if mode == "updates":
+            step_name = ", ".join(chunk.keys())
+            continue
+        state = chunk
+        with token_usage_lock:
+            step_token_usage = token_usage
+            token_usage = {**DEFAULT_TOKEN_USAGE}
+        if step_index > 0:
+            # the first values chunk is the input state
+            sink(WorkflowProgressEvent(
+                workflow=workflow_name,
+                step_name=step_name,
+                step_index=step_index,
+                duration=time.perf_counter() - start,
+                row_counts=_get_row_counts(state),
+                token_usage=step_token_usage,
+            ))
+        step_index += 1
+        if sleep_time is not None:
+            time.sleep(sleep_time)
+        start = time.perf_counter()
+
+    return state
@@ -9,6 +9,7 @@ import logging
 from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE, increase_token_usage
 from extractor.agents.pk_pe_agents.pk_pe_execution_step import PKPEExecutionStep
 from extractor.agents.pk_pe_agents.pk_pe_verification_step import PKPECuratedTablesVerificationStep
+from extractor.agents.retry_policy import get_retry_budget, with_retry_budget
 from extractor.agents.pk_summary.pk_sum_workflow import PKSumWorkflow
 from extractor.constants import MAX_AGENTTOOL_TASK_STEP_COUNT
 from extractor.database.pmid_db import PMIDDB
@@ -85,6 +86,11 @@ class PKPEAgentToolTask(ABC):
             if not "curated_table" in state or (state["curated_table"] is None or len(state["curated_table"]) == 0):
                 self.print_step(step_name="No Curated Table")
                 return END
+            # every correction round is a retry of the paper
+            budget = get_retry_budget()
+            if budget is not None and not budget.spend_retry():
+                self.print_step(step_name="Retry Budget Exhausted")
+                return END
             return "correction_step"
         execution_step = PKPEExecutionStep(
             llm=self.agent_llm,
@@ -133,6 +139,7 @@ class PKPEAgentToolTask(ABC):
             continue
         return s
 
+    @with_retry_budget
     def run(self, pmid: str) -> tuple[bool, str | None, str | None, str | None]:
         self.print_step(step_name=f"Running {self.task_name} for pmid-{pmid}")
         state = self._run_workflow(pmid)
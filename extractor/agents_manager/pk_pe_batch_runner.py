@@ -0,0 +1,191 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import threading
+import time
+from typing import Callable, Optional
+import logging
+
+from extractor.agents.pk_pe_agents.pk_pe_agents_types import PKPECuratedTables
+from extractor.agents_manager.pk_pe_manager import PKPEManager
+from extractor.constants import (
+    BATCH_BACKOFF_SECONDS,
+    BATCH_MAX_BACKOFF_SECONDS,
+    MAX_PAPER_CONCURRENCY,
+    PipelineTypeEnum,
+)
+from extractor.database.batch_checkpoint_db import BatchCheckpointDB
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveBackpressure:
+    """
+    Limits the number of papers in flight.
+
+    The limit grows by one after a successful paper and halves after a failed one
+    (additive increase, multiplicative decrease), and no paper starts until an exponential
+    backoff after consecutive failures has passed, so the runner slows down by itself
+    when the llm provider starts rejecting requests.
+    """
+    def __init__(
+        self,
+        max_limit: int = MAX_PAPER_CONCURRENCY,
+        backoff_seconds: float = BATCH_BACKOFF_SECONDS,
+        max_backoff_seconds: float = BATCH_MAX_BACKOFF_SECONDS,
+    ):
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self._resume_time = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                wait_time = self._resume_time - time.monotonic()
+                if wait_time <= 0 and self.in_flight < self.limit:
+                    break
+                self._cond.wait(timeout=wait_time if wait_time > 0 else None)
+            self.in_flight += 1
+
+    def release(self, ok: bool):
+        with self._cond:
+            self.in_flight -= 1
+            if ok:
+                self.consecutive_failures = 0
+                self.limit = min(self.max_limit, self.limit + 1)
+            else:
+                self.consecutive_failures += 1
+                self.limit = max(1, self.limit // 2)
+                backoff = min(
+                    self.max_backoff_seconds,
+                    self.backoff_seconds * 2 ** (self.consecutive_failures - 1),
+                )
+                self._resume_time = max(self._resume_time, time.monotonic() + backoff)
+                logger.warning(
+                    f"Paper failed, {self.consecutive_failures} in a row, "
+                    f"limit {self.limit} papers, pausing {backoff:.1f}s"
+                )
+            self._cond.notify_all()
+
+
+@dataclass
+class BatchReport:
+    """result of a batch run"""
+
+    completed: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)  # finished in a previous run
+    errors: list[tuple[str, str]] = field(default_factory=list)  # (pmid, reason)
+    elapsed: float = 0.0  # seconds
+
+
+class PKPEBatchRunner:
+    """
+    Curates a list of papers with several papers in flight, each paper with its own PKPEManager.
+
+    The pipelines chosen for a paper and every finished (pmid, pipeline) are saved to the
+    checkpoint db, a restarted run only runs the unfinished pipelines.
+    """
+    def __init__(
+        self,
+        manager_factory: Callable[[], PKPEManager],
+        checkpoint_db: BatchCheckpointDB,
+        max_papers: int = MAX_PAPER_CONCURRENCY,
+        curation_end_callback: Optional[Callable[[str, PipelineTypeEnum, PKPECuratedTables], None]] = None,
+        backpressure: AdaptiveBackpressure | None = None,
+    ):
+        """
+        manager_factory: creates the PKPEManager of a paper
+        curation_end_callback: called with (pmid, pipeline type, curated tables) when a pipeline
+        finishes, before the pipeline is checkpointed. If it raises, the pipeline is run again
+        in the next run.
+        """
+        self.manager_factory = manager_factory
+        self.checkpoint_db = checkpoint_db
+        self.max_papers = max(1, max_papers)
+        self.curation_end_callback = curation_end_callback
+        self.backpressure = backpressure if backpressure is not None \
+            else AdaptiveBackpressure(max_limit=self.max_papers)
+
+    def _get_remaining_pipeline_types(self, pmid: str) -> list[PipelineTypeEnum] | None:
+        """
+        return the unfinished pipelines of the paper, None if the paper hasn't been planned
+        """
+        plan = self.checkpoint_db.select_paper_plan(pmid)
+        if plan is None:
+            return None
+        done = self.checkpoint_db.select_done_pipelines(pmid)
+        return [PipelineTypeEnum(pipeline_type) for pipeline_type in plan if pipeline_type not in done]
+
+    def _on_curation_end(self, pmid: str, pipeline_type: PipelineTypeEnum, result: PKPECuratedTables):
+        if self.curation_end_callback is not None:
+            self.curation_end_callback(pmid, pipeline_type, result)
+        self.checkpoint_db.insert_pipeline_done(pmid, pipeline_type.value, result["correct"])
+
+    def run_paper(self, pmid: str) -> str | None:
+        """
+        run the unfinished pipelines of the paper
+
+        Return:
+        None if all the pipelines of the paper are finished, otherwise the error
+        """
+        mgr = self.manager_factory()
+        pipeline_types = self._get_remaining_pipeline_types(pmid)
+        if pipeline_types is None:
+            pipeline_types = mgr.plan_pipeline_types(pmid)
+            self.checkpoint_db.insert_paper_plan(pmid, [pipeline_type.value for pipeline_type in pipeline_types])
+        if len(pipeline_types) == 0:
+            return None
+
+        res = mgr.run(
+            pmid,
+            curation_end_callback=self._on_curation_end,
+            pipeline_types=pipeline_types,
+        )
+        failed = [pipeline_type.value for pipeline_type in pipeline_types if pipeline_type not in res]
+        if len(failed) > 0:
+            return f"pipelines failed: {', '.join(failed)}"
+        return None
+
+    def run(self, pmids: list[str]) -> BatchReport:
+        report = BatchReport()
+        start = time.perf_counter()
+        lock = threading.Lock()
+
+        todo = []
+        for pmid in dict.fromkeys(pmids):
+            if self._get_remaining_pipeline_types(pmid) == []:
+                logger.info(f"PMID {pmid} was curated in a previous run. Skipping.")
+                report.skipped.append(pmid)
+                continue
+            todo.append(pmid)
+
+        def run_one(pmid: str):
+            error = None
+            try:
+                error = self.run_paper(pmid)
+            except Exception as e:
+                logger.error(f"Error ocurred in curating paper {pmid}: {e}")
+                error = str(e)
+            finally:
+                self.backpressure.release(error is None)
+            with lock:
+                if error is None:
+                    report.completed.append(pmid)
+                else:
+                    report.errors.append((pmid, error))
+
+        with ThreadPoolExecutor(max_workers=self.max_papers, thread_name_prefix="paper") as executor:
+            for pmid in todo:
+                self.backpressure.acquire()
+                executor.submit(run_one, pmid)
+
+        report.elapsed = time.perf_counter() - start
+        logger.info(
+            f"Batch completed in {report.elapsed:.1f}s: completed={len(report.completed)}, "
+            f"skipped={len(report.skipped)}, failed={len(report.errors)}"
+        )
+        return report
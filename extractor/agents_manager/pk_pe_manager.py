@@ -1,4 +1,7 @@
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+import threading
 from typing import Callable, Optional, Awaitable
 from langchain_openai.chat_models.base import BaseChatOpenAI
 
@@ -8,6 +11,7 @@ from TabFuncFlow.utils.table_utils import dataframe_to_markdown
 from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE, extract_pmid_info_to_db, increase_token_usage
 
 from extractor.agents.pk_pe_agents.pk_pe_design_step import PKPEDesignStep
+from extractor.agents.retry_policy import with_retry_budget
 from extractor.agents_manager.pe_study_task import (
     PEStudyInfoTask,
     PEStudyOutcomeTask,
@@ -22,7 +26,7 @@ from extractor.agents_manager.pk_individual_task import PKIndividualTask
 from extractor.agents_manager.pk_pe_agenttool_task import PKPEAgentToolTask
 from extractor.agents_manager.pk_populattion_task import PKPopulationIndividualTask, PKPopulationSummaryTask
 from extractor.agents_manager.pk_summary_task import PKSummaryTask
-from extractor.constants import PipelineTypeEnum
+from extractor.constants import MAX_PIPELINE_CONCURRENCY, PipelineTypeEnum
 from extractor.database.pmid_db import PMIDDB
 from extractor.pmid_extractor.article_retriever import ArticleRetriever
 from extractor.pmid_extractor.html_table_extractor import HtmlTableExtractor
@@ -33,17 +37,41 @@ from extractor.agents.pk_pe_agents.pk_pe_agents_types import PKPECuratedTables,
 
 logger = logging.getLogger(__name__)
 
+# the pipelines run for a PK or PE paper when the design step doesn't choose them,
+# plan_pipeline_types and run() both build from these
+PK_PIPELINE_TYPES = [
+    PipelineTypeEnum.PK_SUMMARY,
+    PipelineTypeEnum.PK_INDIVIDUAL,
+    PipelineTypeEnum.PK_SPEC_SUMMARY,
+    PipelineTypeEnum.PK_DRUG_SUMMARY,
+    PipelineTypeEnum.PK_SPEC_INDIVIDUAL,
+    PipelineTypeEnum.PK_DRUG_INDIVIDUAL,
+    PipelineTypeEnum.PK_POPU_SUMMARY,
+    PipelineTypeEnum.PK_POPU_INDIVIDUAL,
+]
+PE_PIPELINE_TYPES = [
+    PipelineTypeEnum.PE_STUDY_INFO,
+    PipelineTypeEnum.PE_STUDY_OUTCOME,
+]
+
 class PKPEManager:
     def __init__(
         self, 
         pipeline_llm: BaseChatOpenAI,
         agent_llm: BaseChatOpenAI,
-        pmid_db: PMIDDB | None = None
+        pmid_db: PMIDDB | None = None,
+        max_concurrency: int = MAX_PIPELINE_CONCURRENCY,
     ):
+        """
+        max_concurrency: the maximum number of curation pipelines running at the same time
+        for one paper, 1 means the pipelines run one after another
+        """
         self.pipeline_llm = pipeline_llm
         self.agent_llm = agent_llm
         self.pmid_db = pmid_db if pmid_db is not None else PMIDDB()
+        self.max_concurrency = max(1, max_concurrency)
         self.total_token_usage = {**DEFAULT_TOKEN_USAGE}
+        self._token_usage_lock = threading.Lock()
     
     def print_step(
         self,
@@ -62,10 +90,11 @@ class PKPEManager:
             logger.info(
                 f"step total tokens: {token_usage['total_tokens']}, step prompt tokens: {token_usage['prompt_tokens']}, step completion tokens: {token_usage['completion_tokens']}"
             )
-            self.total_token_usage = increase_token_usage(self.total_token_usage, token_usage)
-            logger.info(
-                f"overall total tokens: {self.total_token_usage['total_tokens']}, overall prompt tokens: {self.total_token_usage['prompt_tokens']}, overall completion tokens: {self.total_token_usage['completion_tokens']}"
-            )
+            with self._token_usage_lock:
+                self.total_token_usage = increase_token_usage(self.total_token_usage, token_usage)
+                logger.info(
+                    f"overall total tokens: {self.total_token_usage['total_tokens']}, overall prompt tokens: {self.total_token_usage['prompt_tokens']}, overall completion tokens: {self.total_token_usage['completion_tokens']}"
+                )
         if step_reasoning_process is not None:
             logger.info(f"\n\n{step_reasoning_process}\n\n")
         if step_output is not None:
@@ -210,7 +239,7 @@ class PKPEManager:
         else:
             raise ValueError(f"Invalid pipeline type: {pipeline_type}")
 
-    def _get_pipelines_dict(self, pipeline_types: list[str]) -> dict[PipelineTypeEnum, PKPEAgentToolTask]:
+    def _get_pipelines_dict(self, pipeline_types: list[str | PipelineTypeEnum]) -> dict[PipelineTypeEnum, PKPEAgentToolTask]:
         pipelines = {}
         for pipeline_type in pipeline_types:
             the_type = PipelineTypeEnum(pipeline_type)
@@ -218,6 +247,19 @@ class PKPEManager:
             pipelines[the_type] = pipeline
         return pipelines
 
+    def _run_pipeline(
+        self,
+        pmid: str,
+        pipeline: PKPEAgentToolTask,
+    ) -> PKPECuratedTables:
+        correct, curated_table, explanation, suggested_fix = pipeline.run(pmid)
+        return PKPECuratedTables(
+            correct=correct,
+            curated_table=curated_table,
+            explanation=explanation,
+            suggested_fix=suggested_fix,
+        )
+
     def _run_pipelines(
         self, 
         pmid: str, 
@@ -225,20 +267,32 @@ class PKPEManager:
         curation_start_callback: Optional[Callable[[str, str], None]] = None, 
         curation_end_callback: Optional[Callable[[str, str, PKPECuratedTables], None]] = None
     ):
-        curated_tables = {}
-        for pipeline_type, pipeline in pipelines.items():
+        def run_one(pipeline_type: PipelineTypeEnum, pipeline: PKPEAgentToolTask) -> PKPECuratedTables | None:
             try:
                 self._curating_start_job(pmid, pipeline_type, curation_start_callback)
-                correct, curated_table, explanation, suggested_fix = pipeline.run(pmid)
-                result = PKPECuratedTables(
-                    correct=correct,
-                    curated_table=curated_table,
-                    explanation=explanation,
-                    suggested_fix=suggested_fix,
-                )
+                result = self._run_pipeline(pmid, pipeline)
                 self._curating_end_job(pmid, pipeline_type, result, curation_end_callback)   
             except Exception as e:
                 logger.error(f"Error running pmid-{pmid} {pipeline_type} workflow: \n{e}")
+                return None
+            return result
+
+        if self.max_concurrency <= 1 or len(pipelines) <= 1:
+            results = [run_one(pipeline_type, pipeline) for pipeline_type, pipeline in pipelines.items()]
+        else:
+            max_workers = min(self.max_concurrency, len(pipelines))
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"pmid-{pmid}") as executor:
+                # the pipelines share the retry budget of the paper
+                futures = [
+                    executor.submit(copy_context().run, run_one, pipeline_type, pipeline)
+                    for pipeline_type, pipeline in pipelines.items()
+                ]
+                results = [future.result() for future in futures]
+
+        # keep the results in the same order as the pipelines
+        curated_tables = {}
+        for pipeline_type, result in zip(pipelines.keys(), results):
+            if result is None:
                 continue
             curated_tables[pipeline_type] = result
         return curated_tables
@@ -250,20 +304,28 @@ class PKPEManager:
         curation_start_callback: Awaitable[Callable[[str, str], None]] = None, 
         curation_end_callback: Awaitable[Callable[[str, str, PKPECuratedTables], None]] = None
     ):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_one(pipeline_type: PipelineTypeEnum, pipeline: PKPEAgentToolTask) -> PKPECuratedTables | None:
+            async with semaphore:
+                try:
+                    await self._curating_start_job_async(pmid, pipeline_type, curation_start_callback)
+                    # pipeline.run is blocking, run it in a worker thread to keep the event loop responsive
+                    result = await asyncio.to_thread(self._run_pipeline, pmid, pipeline)
+                    await self._curating_end_job_async(pmid, pipeline_type, result, curation_end_callback)   
+                except Exception as e:
+                    logger.error(f"Error running pmid-{pmid} {pipeline_type} workflow: \n{e}")
+                    return None
+                return result
+
+        results = await asyncio.gather(*[
+            run_one(pipeline_type, pipeline) for pipeline_type, pipeline in pipelines.items()
+        ])
+
+        # keep the results in the same order as the pipelines
         curated_tables = {}
-        for pipeline_type, pipeline in pipelines.items():
-            try:
-                await self._curating_start_job_async(pmid, pipeline_type, curation_start_callback)
-                correct, curated_table, explanation, suggested_fix = pipeline.run(pmid)
-                result = PKPECuratedTables(
-                    correct=correct,
-                    curated_table=curated_table,
-                    explanation=explanation,
-                    suggested_fix=suggested_fix,
-                )
-                await self._curating_end_job_async(pmid, pipeline_type, result, curation_end_callback)   
-            except Exception as e:
-                logger.error(f"Error running pmid-{pmid} {pipeline_type} workflow: \n{e}")
+        for pipeline_type, result in zip(pipelines.keys(), results):
+            if result is None:
                 continue
             curated_tables[pipeline_type] = result
         return curated_tables
@@ -274,16 +336,7 @@ class PKPEManager:
         curation_start_callback: Optional[Callable[[str, str], None]] = None, 
         curation_end_callback: Optional[Callable[[str, str, PKPECuratedTables], None]] = None
     ):
-        mgrs = {
-            PipelineTypeEnum.PK_SUMMARY: self._get_pipeline(PipelineTypeEnum.PK_SUMMARY),
-            PipelineTypeEnum.PK_INDIVIDUAL: self._get_pipeline(PipelineTypeEnum.PK_INDIVIDUAL),
-            PipelineTypeEnum.PK_SPEC_SUMMARY: self._get_pipeline(PipelineTypeEnum.PK_SPEC_SUMMARY),
-            PipelineTypeEnum.PK_DRUG_SUMMARY: self._get_pipeline(PipelineTypeEnum.PK_DRUG_SUMMARY),
-            PipelineTypeEnum.PK_SPEC_INDIVIDUAL: self._get_pipeline(PipelineTypeEnum.PK_SPEC_INDIVIDUAL),
-            PipelineTypeEnum.PK_DRUG_INDIVIDUAL: self._get_pipeline(PipelineTypeEnum.PK_DRUG_INDIVIDUAL),
-            PipelineTypeEnum.PK_POPU_SUMMARY: self._get_pipeline(PipelineTypeEnum.PK_POPU_SUMMARY),
-            PipelineTypeEnum.PK_POPU_INDIVIDUAL: self._get_pipeline(PipelineTypeEnum.PK_POPU_INDIVIDUAL),
-        }
+        mgrs = self._get_pipelines_dict(PK_PIPELINE_TYPES)
         return self._run_pipelines(pmid, mgrs, curation_start_callback, curation_end_callback)
 
     def _run_pe_workflows(
@@ -292,10 +345,7 @@ class PKPEManager:
         curation_start_callback: Optional[Callable[[str, str], None]] = None, 
         curation_end_callback: Optional[Callable[[str, str, PKPECuratedTables], None]] = None
     ):
-        mgrs = {
-            PipelineTypeEnum.PE_STUDY_INFO: self._get_pipeline(PipelineTypeEnum.PE_STUDY_INFO), # PEStudyInfoTask(self.pipeline_llm, self.pmid_db, self.print_step),
-            PipelineTypeEnum.PE_STUDY_OUTCOME: self._get_pipeline(PipelineTypeEnum.PE_STUDY_OUTCOME), # PEStudyOutcomeTask(self.pipeline_llm, self.pmid_db, self.print_step),
-        }
+        mgrs = self._get_pipelines_dict(PE_PIPELINE_TYPES)
         return self._run_pipelines(pmid, mgrs, curation_start_callback, curation_end_callback)
 
     def _run_pk_workflows_async(
@@ -304,16 +354,7 @@ class PKPEManager:
         curation_start_callback: Awaitable[Callable[[str, str], None]] = None, 
         curation_end_callback: Awaitable[Callable[[str, str, PKPECuratedTables], None]] = None
     ):
-        mgrs = {
-            PipelineTypeEnum.PK_SUMMARY: self._get_pipeline(PipelineTypeEnum.PK_SUMMARY), # PKSummaryTask(pipeline_llm=self.pipeline_llm, output_callback=self.print_step, pmid_db=self.pmid_db),
-            PipelineTypeEnum.PK_INDIVIDUAL: self._get_pipeline(PipelineTypeEnum.PK_INDIVIDUAL), # PKIndividualTask(llm=self.pipeline_llm, output_callback=self.print_step, pmid_db=self.pmid_db),
-            PipelineTypeEnum.PK_SPEC_SUMMARY: self._get_pipeline(PipelineTypeEnum.PK_SPEC_SUMMARY), # PKSpecimenSummaryTask(llm=self.pipeline_llm, output_callback=self.print_step, pmid_db=self.pmid_db),
-            PipelineTypeEnum.PK_DRUG_SUMMARY: self._get_pipeline(PipelineTypeEnum.PK_DRUG_SUMMARY), # PKDrugSummaryTask(llm=self.pipeline_llm, output_callback=self.print_step, pmid_db=self.pmid_db),
-            PipelineTypeEnum.PK_SPEC_INDIVIDUAL: self._get_pipeline(PipelineTypeEnum.PK_SPEC_INDIVIDUAL), # PKSpecimenIndividualTask(llm=self.pipeline_llm, output_callback=self.print_step, pmid_db=self.pmid_db),
-            PipelineTypeEnum.PK_DRUG_INDIVIDUAL: self._get_pipeline(PipelineTypeEnum.PK_DRUG_INDIVIDUAL), # PKDrugIndividualTask(llm=self.pipeline_llm, output_callback=self.print_step, pmid_db=self.pmid_db),
-            PipelineTypeEnum.PK_POPU_SUMMARY: self._get_pipeline(PipelineTypeEnum.PK_POPU_SUMMARY), # PKPopulationSummaryTask(llm=self.pipeline_llm, output_callback=self.print_step, pmid_db=self.pmid_db),
-            PipelineTypeEnum.PK_POPU_INDIVIDUAL: self._get_pipeline(PipelineTypeEnum.PK_POPU_INDIVIDUAL), # PKPopulationIndividualTask(llm=self.pipeline_llm, output_callback=self.print_step, pmid_db=self.pmid_db),
-        }
+        mgrs = self._get_pipelines_dict(PK_PIPELINE_TYPES)
         return self._run_pipelines_async(pmid, mgrs, curation_start_callback, curation_end_callback)
 
     def _run_pe_workflows_async(
@@ -322,13 +363,35 @@ class PKPEManager:
         curation_start_callback: Awaitable[Callable[[str, str], None]] = None, 
         curation_end_callback: Awaitable[Callable[[str, str, PKPECuratedTables], None]] = None
     ):
-        mgrs = {
-            PipelineTypeEnum.PE_STUDY_INFO: self._get_pipeline(PipelineTypeEnum.PE_STUDY_INFO), # PEStudyInfoTask(self.pipeline_llm, self.pmid_db, self.print_step),
-            PipelineTypeEnum.PE_STUDY_OUTCOME: self._get_pipeline(PipelineTypeEnum.PE_STUDY_OUTCOME), # PEStudyOutcomeTask(self.pipeline_llm, self.pmid_db, self.print_step),
-        }
+        mgrs = self._get_pipelines_dict(PE_PIPELINE_TYPES)
         return self._run_pipelines_async(pmid, mgrs, curation_start_callback, curation_end_callback)
 
 
+    def plan_pipeline_types(self, pmid: str, html_content: str | None = None) -> list[PipelineTypeEnum]:
+        """
+        identify the paper and return the curation pipelines that run() would run for it,
+        an empty list if the paper is neither PK nor PE
+        """
+        self._extract_pmid_info(
+            pmid=pmid,
+            html_content=html_content
+        )
+        state = self._identification_and_design_step(pmid)
+        paper_type = state["paper_type"]
+        if paper_type == PaperTypeEnum.Neither:
+            return []
+        pipeline_tools = state["pipeline_tools"] if "pipeline_tools" in state else None
+        if pipeline_tools is not None:
+            return [PipelineTypeEnum(pipeline_type) for pipeline_type in pipeline_tools]
+
+        pipeline_types = []
+        if paper_type == PaperTypeEnum.PK or paper_type == PaperTypeEnum.Both:
+            pipeline_types += PK_PIPELINE_TYPES
+        if paper_type == PaperTypeEnum.PE or paper_type == PaperTypeEnum.Both:
+            pipeline_types += PE_PIPELINE_TYPES
+        return pipeline_types
+
+    @with_retry_budget
     def run(
         self, 
         pmid: str,
@@ -377,6 +440,7 @@ class PKPEManager:
         return {**pk_dict, **pe_dict}
 
         
+    @with_retry_budget
     async def runAsync(
         self, 
         pmid: str, 
@@ -123,6 +123,62 @@ MAX_STEP_COUNT = 3 * 3 # 3 agent and max 3 loops
 
 MAX_AGENTTOOL_TASK_STEP_COUNT = 2 * 3 - 1 # 2 agent and max 3 loops
 
+MAX_PIPELINE_CONCURRENCY = 1 # 1 means the curation pipelines of a paper run one after another
+
+MAX_TABLE_CURATION_CONCURRENCY = 4 # max number of tables curated at the same time in one agent tool
+
+MAX_SUB_TABLE_CONCURRENCY = 4 # max number of sub-tables sent to llm at the same time in one workflow step
+
+LLM_CACHE_TTL_SECONDS = 30 * 24 * 3600 # cached llm responses expire after 30 days
+
+LLM_CACHE_MAX_ENTRIES = 100000 # the least recently used responses are evicted beyond it
+
+PMID_INFO_CACHE_MAX_BYTES = 256 * 1024 * 1024 # memory budget of the papers cached by PMIDDB
+
+SQLITE_POOL_SIZE = 8 # max number of open connections per sqlite db file
+
+SQLITE_BUSY_TIMEOUT_SECONDS = 30 # how long a connection waits for the lock held by other writers
+
+INGESTION_BATCH_SIZE = 50 # number of papers inserted in one transaction by bulk ingestion
+
+MAX_PAPER_CONCURRENCY = 4 # max number of papers curated at the same time by the batch runner
+
+BATCH_BACKOFF_SECONDS = 5 # the batch runner pauses at least this long after a failed paper
+
+BATCH_MAX_BACKOFF_SECONDS = 300 # upper bound of the pause after consecutive failed papers
+
+HTML_PARSER_FEATURES = "lxml" # BeautifulSoup tree builder of the paper html pages
+
+ARTICLE_MAX_CONNECTIONS = 10 # max number of open connections of the async article retriever
+
+ARTICLE_REQUESTS_PER_SECOND = 3 # global rate limit of the article requests, same as make_article_request
+
+ARTICLE_REQUEST_TIMEOUT_SECONDS = 60 # timeout of one article request
+
+ARTICLE_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024 # compressed size budget of the article cache
+
+ARTICLE_CACHE_MAX_AGE_SECONDS = 180 * 24 * 3600 # cached articles expire after 180 days
+
+RETRY_BUDGET_MAX_RETRIES = 40 # retries of the failed agent calls and correction rounds allowed per paper
+
+RETRY_BUDGET_MAX_TOKENS = 2000000 # no more retries once a paper has used this many tokens
+
+LLM_CHARS_PER_TOKEN = 4 # rough prompt size estimate taken from the llm rate limiter before a call
+
+FULL_TEXT_MAX_TOKENS = 8000 # longer papers are cut to their passages most relevant to the full-text workflow
+
+SECTION_PASSAGE_MAX_TOKENS = 200 # size of the passages the sections of a paper are split into for retrieval
+
+SECTION_INDEX_CACHE_SIZE = 256 # number of paper section indexes kept in memory by PMIDDB
+
+LLM_DEFAULT_CONTEXT_TOKENS = 128000 # context window of the llms that don't tell it (num_ctx of the ollama models)
+
+PROMPT_RESERVED_TOKENS = 4096 # context kept for the instruction, the format instructions and the answer when packing a prompt
+
+ROW_DELTA_MAX_FRACTION = 0.5 # a corrected table with more changed or wrong rows than this share is verified in full
+
+ROW_DELTA_CONTEXT_ROWS = 1 # verified rows shown around each row to verify after a correction
+
 class PipelineTypeEnum(Enum):
     PK_SUMMARY = "pk_summary"
     PK_INDIVIDUAL = "pk_individual"
@@ -0,0 +1,249 @@
+import hashlib
+from pathlib import Path
+import os
+import threading
+import time
+import logging
+import zstandard
+
+from extractor.constants import ARTICLE_CACHE_MAX_AGE_SECONDS, ARTICLE_CACHE_MAX_BYTES
+from extractor.database.sqlite_pool import PooledSQLiteDB
+
+logger = logging.getLogger(__name__)
+
+article_cache_table_name = "article_cache"
+
+article_cache_table_schema = f"""
+CREATE TABLE IF NOT EXISTS {article_cache_table_name} (
+    cache_key TEXT PRIMARY KEY,
+    content_hash TEXT,
+    size INTEGER,
+    created_at REAL,
+    accessed_at REAL
+)
+"""
+
+article_cache_index_schema = f"""
+CREATE INDEX IF NOT EXISTS {article_cache_table_name}_content_hash ON {article_cache_table_name} (content_hash)
+"""
+
+article_cache_table_insert_schema = f"""
+INSERT OR REPLACE INTO {article_cache_table_name} (cache_key, content_hash, size, created_at, accessed_at)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+article_cache_table_select_schema = f"""
+SELECT content_hash, created_at FROM {article_cache_table_name} WHERE cache_key = ?
+"""
+
+article_cache_table_touch_schema = f"""
+UPDATE {article_cache_table_name} SET accessed_at = ? WHERE cache_key = ?
+"""
+
+article_cache_table_delete_schema = f"""
+DELETE FROM {article_cache_table_name} WHERE cache_key = ?
+"""
+
+article_cache_table_select_expired_schema = f"""
+SELECT cache_key, content_hash FROM {article_cache_table_name} WHERE created_at < ?
+"""
+
+article_cache_table_select_lru_schema = f"""
+SELECT cache_key, content_hash, size FROM {article_cache_table_name} ORDER BY accessed_at ASC
+"""
+
+article_cache_table_total_schema = f"""
+SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {article_cache_table_name}
+"""
+
+article_cache_table_count_hash_schema = f"""
+SELECT COUNT(*) FROM {article_cache_table_name} WHERE content_hash = ?
+"""
+
+class ArticleCacheDB(PooledSQLiteDB):
+    """
+    On-disk cache of the retrieved article html pages.
+
+    The pages are stored zstd compressed under objects/, named by the sha256 of the page,
+    so the same page fetched by pmid and by url is stored once. The blobs are written and
+    removed within the write transaction of the manifest, so an insert can't lose its blob
+    to a concurrent removal. The manifest db maps a
+    cache key (pmid or url) to the page. Pages older than max_age_seconds are treated
+    as missing, and the least recently used pages are evicted once the pages take more
+    than max_bytes.
+    """
+    db_file_name = "manifest.db"
+    table_schemas = [article_cache_table_schema, article_cache_index_schema]
+
+    def __init__(
+        self,
+        cache_folder: Path | None = None,
+        max_bytes: int | None = ARTICLE_CACHE_MAX_BYTES,
+        max_age_seconds: float | None = ARTICLE_CACHE_MAX_AGE_SECONDS,
+    ):
+        if cache_folder is None:
+            cache_folder = Path(os.environ.get("DATA_FOLDER", "./data"), "article_cache")
+        self.cache_folder = Path(cache_folder)
+        os.makedirs(self.cache_folder / "objects", exist_ok=True)
+        super().__init__(self.cache_folder / self.db_file_name)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock() # guards the hit/miss counters
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _get_blob_path(self, content_hash: str) -> Path:
+        return self.cache_folder / "objects" / content_hash[:2] / f"{content_hash}.html.zst"
+
+    def _write_blob(self, content_hash: str, data: bytes) -> int:
+        blob_path = self._get_blob_path(content_hash)
+        if blob_path.exists():
+            return blob_path.stat().st_size
+        os.makedirs(blob_path.parent, exist_ok=True)
+        compressed = zstandard.ZstdCompressor().compress(data)
+        # write to a temporary file first, a reader never sees a partial page
+        tmp_path = blob_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(compressed)
+        os.replace(tmp_path, blob_path)
+        return len(compressed)
+
+    def _remove_unreferenced_blobs(self, cursor, content_hashes: set[str]):
+        """called before the commit, the references are counted under the write lock"""
+        for content_hash in content_hashes:
+            cursor.execute(article_cache_table_count_hash_schema, (content_hash,))
+            if cursor.fetchone()[0] > 0:
+                continue
+            try:
+                self._get_blob_path(content_hash).unlink(missing_ok=True)
+            except Exception as e:
+                logger.error(f"Failed to remove cached article: {e}")
+
+    def _evict(self, cursor, now: float) -> set[str]:
+        removed_hashes = set()
+        if self.max_age_seconds is not None:
+            cursor.execute(article_cache_table_select_expired_schema, (now - self.max_age_seconds,))
+            for cache_key, content_hash in cursor.fetchall():
+                cursor.execute(article_cache_table_delete_schema, (cache_key,))
+                removed_hashes.add(content_hash)
+        if self.max_bytes is not None:
+            cursor.execute(article_cache_table_total_schema)
+            _, total = cursor.fetchone()
+            if total > self.max_bytes:
+                cursor.execute(article_cache_table_select_lru_schema)
+                for cache_key, content_hash, size in cursor.fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    cursor.execute(article_cache_table_delete_schema, (cache_key,))
+                    removed_hashes.add(content_hash)
+                    total -= size
+        return removed_hashes
+
+    def get_article(self, cache_key: str) -> str | None:
+        res = self._connect_to_db()
+        if not res:
+            self._count(False)
+            return None
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(article_cache_table_select_schema, (cache_key,))
+            row = cursor.fetchone()
+            now = time.time()
+            text = None
+            if row is not None:
+                content_hash, created_at = row
+                blob_path = self._get_blob_path(content_hash)
+                expired = self.max_age_seconds is not None and now - created_at > self.max_age_seconds
+                if not expired and blob_path.exists():
+                    text = zstandard.ZstdDecompressor().decompress(blob_path.read_bytes()).decode("utf-8")
+                else:
+                    cursor.execute(article_cache_table_delete_schema, (cache_key,))
+                    self._remove_unreferenced_blobs(cursor, {content_hash})
+                    self.conn.commit()
+            if text is None:
+                self._count(False)
+                return None
+            cursor.execute(article_cache_table_touch_schema, (now, cache_key))
+            self.conn.commit()
+            self._count(True)
+            return text
+        except Exception as e:
+            logger.error(f"Failed to select cached article: {e}")
+            self._count(False)
+            return None
+        finally:
+            self._release_conn()
+
+    def insert_article(self, cache_key: str, text: str) -> bool:
+        if text is None or len(text) == 0:
+            return False
+        res = self._connect_to_db()
+        if not res:
+            return False
+        try:
+            data = text.encode("utf-8")
+            content_hash = hashlib.sha256(data).hexdigest()
+            size = self._write_blob(content_hash, data)
+            cursor = self.conn.cursor()
+            cursor.execute(article_cache_table_select_schema, (cache_key,))
+            row = cursor.fetchone()
+            removed_hashes = {row[0]} if row is not None and row[0] != content_hash else set()
+            now = time.time()
+            cursor.execute(article_cache_table_insert_schema, (cache_key, content_hash, size, now, now))
+            # the insert holds the write lock, write the blob again if a concurrent removal
+            # deleted it after it was found above
+            self._write_blob(content_hash, data)
+            removed_hashes |= self._evict(cursor, now)
+            self._remove_unreferenced_blobs(cursor, removed_hashes)
+            self.conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to insert cached article: {e}")
+            return False
+        finally:
+            self._release_conn()
+
+    def get_stats(self) -> dict:
+        entries, total_bytes = 0, 0
+        res = self._connect_to_db()
+        if res:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute(article_cache_table_total_schema)
+                entries, total_bytes = cursor.fetchone()
+            except Exception as e:
+                logger.error(f"Failed to count cached articles: {e}")
+            finally:
+                self._release_conn()
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total > 0 else 0.0,
+                "entries": entries,
+                "total_bytes": total_bytes,
+            }
+
+
+_article_cache_db: ArticleCacheDB | None = None
+_article_cache_db_lock = threading.Lock()
+
+def get_article_cache_db() -> ArticleCacheDB | None:
+    """
+    return the shared article cache, None if it is disabled by env ARTICLE_CACHE=false
+    """
+    global _article_cache_db
+    article_cache = os.environ.get("ARTICLE_CACHE", "true")
+    if article_cache.lower() != "true":
+        return None
+    with _article_cache_db_lock:
+        if _article_cache_db is None:
+            _article_cache_db = ArticleCacheDB()
+        return _article_cache_db
@@ -0,0 +1,121 @@
+import json
+from pathlib import Path
+import logging
+
+from extractor.database.sqlite_pool import PooledSQLiteDB
+
+logger = logging.getLogger(__name__)
+
+batch_paper_table_name = "batch_paper"
+batch_pipeline_table_name = "batch_pipeline"
+
+batch_paper_table_schema = f"""
+CREATE TABLE IF NOT EXISTS {batch_paper_table_name} (
+    pmid VARCHAR(64) PRIMARY KEY,
+    pipeline_types TEXT,
+    modified_time TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now'))
+)
+"""
+
+batch_pipeline_table_schema = f"""
+CREATE TABLE IF NOT EXISTS {batch_pipeline_table_name} (
+    pmid VARCHAR(64),
+    pipeline_type VARCHAR(64),
+    correct INTEGER,
+    modified_time TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+    PRIMARY KEY (pmid, pipeline_type)
+)
+"""
+
+batch_paper_table_insert_schema = f"""
+INSERT OR REPLACE INTO {batch_paper_table_name} (pmid, pipeline_types, modified_time)
+VALUES (?, ?, strftime('%Y-%m-%d %H:%M:%S', 'now'))
+"""
+
+batch_paper_table_select_schema = f"""
+SELECT pipeline_types FROM {batch_paper_table_name} WHERE pmid = ?
+"""
+
+batch_pipeline_table_insert_schema = f"""
+INSERT OR REPLACE INTO {batch_pipeline_table_name} (pmid, pipeline_type, correct, modified_time)
+VALUES (?, ?, ?, strftime('%Y-%m-%d %H:%M:%S', 'now'))
+"""
+
+batch_pipeline_table_select_schema = f"""
+SELECT pipeline_type FROM {batch_pipeline_table_name} WHERE pmid = ?
+"""
+
+class BatchCheckpointDB(PooledSQLiteDB):
+    """
+    Completion state of a batch curation run.
+
+    A paper row records the pipelines chosen for the paper, a pipeline row records a
+    finished (pmid, pipeline), so a restarted run skips the finished work.
+    """
+    db_file_name = "batch_checkpoint.db"
+    table_schemas = [batch_paper_table_schema, batch_pipeline_table_schema]
+
+    def __init__(self, db_path: Path | None = None):
+        super().__init__(db_path)
+
+    def insert_paper_plan(self, pmid: str, pipeline_types: list[str]) -> bool:
+        res = self._connect_to_db()
+        if not res:
+            return False
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(batch_paper_table_insert_schema, (pmid, json.dumps(pipeline_types)))
+            self.conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to insert paper plan: {e}")
+            return False
+        finally:
+            self._release_conn()
+
+    def select_paper_plan(self, pmid: str) -> list[str] | None:
+        """
+        return the pipeline types chosen for the paper, None if the paper hasn't been planned
+        """
+        res = self._connect_to_db()
+        if not res:
+            return None
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(batch_paper_table_select_schema, (pmid,))
+            row = cursor.fetchone()
+            return json.loads(row[0]) if row is not None else None
+        except Exception as e:
+            logger.error(f"Failed to select paper plan: {e}")
+            return None
+        finally:
+            self._release_conn()
+
+    def insert_pipeline_done(self, pmid: str, pipeline_type: str, correct: bool) -> bool:
+        res = self._connect_to_db()
+        if not res:
+            return False
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(batch_pipeline_table_insert_schema, (pmid, pipeline_type, int(bool(correct))))
+            self.conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to insert pipeline checkpoint: {e}")
+            return False
+        finally:
+            self._release_conn()
+
+    def select_done_pipelines(self, pmid: str) -> set[str]:
+        res = self._connect_to_db()
+        if not res:
+            return set()
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(batch_pipeline_table_select_schema, (pmid,))
+            return {row[0] for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"Failed to select pipeline checkpoints: {e}")
+            return set()
+        finally:
+            self._release_conn()
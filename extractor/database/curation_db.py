@@ -7,6 +7,8 @@ import os
 import logging
 from typing import Optional, List, Dict, Any
 
+from extractor.database.sqlite_pool import PooledSQLiteDB
+
 logger = logging.getLogger(__name__)
 
 curation_data_table_name = "CurationData"
@@ -49,54 +51,12 @@ SET source_tables = ?, logs = ?, md_table = ?, token_usage = ?,
 WHERE pmid = ? AND curation_type = ?
 """
 
-class CurationDB:
-    def __init__(self, db_path: Path | None = None):
-        self.conn: Connection | None = None
-        self.db_path = db_path
-        
-    def _ensure_table(self):
-        if self.conn is None:
-            return False
-        
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(curation_data_table_schema)
-            self.conn.commit()
-            return True
-        except Exception as e:
-            logger.error(f"Failed to ensure table: {e}")
-            return False
+class CurationDB(PooledSQLiteDB):
+    db_file_name = "curation_data.db"
+    table_schemas = [curation_data_table_schema]
 
-    def _get_db_path(self):
-        if self.db_path is not None:
-            return self.db_path
-        db_path = os.environ.get("DATA_FOLDER", "./data")
-        db_path = Path(db_path, "databases")
-        try:
-            os.makedirs(db_path, exist_ok=True)
-        except Exception as e:
-            logger.error(f"Failed to create db path: {e}")
-            raise e
-        return db_path / "curation_data.db"
-        
-    def _connect_to_db(self):
-        if self.conn is not None:
-            return True
-        
-        try:
-            db_path = self._get_db_path()
-            if not db_path.exists():
-                logger.info(f"Creating db file: {db_path}")
-                db_path.touch()
-            else:
-                logger.info(f"Using existing db file: {db_path}")
-                
-            self.conn = sqlite3.connect(db_path)
-            self._ensure_table()
-            return True
-        except Exception as e:
-            logger.error(f"Failed to connect to db: {e}")
-            return False
+    def __init__(self, db_path: Path | None = None):
+        super().__init__(db_path)
 
     def insert_curation_data(
         self, 
@@ -138,8 +98,7 @@ class CurationDB:
             logger.error(f"Failed to insert curation data: {e}")
             return False
         finally:
-            self.conn.close()
-            self.conn = None
+            self._release_conn()
 
     def update_curation_data(
         self, 
@@ -185,8 +144,7 @@ class CurationDB:
             logger.error(f"Failed to update curation data: {e}")
             return False
         finally:
-            self.conn.close()
-            self.conn = None
+            self._release_conn()
 
     def select_curation_data(self, pmid: str, curation_type: str) -> Optional[Dict[str, Any]]:
         """
@@ -223,8 +181,7 @@ class CurationDB:
             logger.error(f"Failed to select curation data: {e}")
             return None
         finally:
-            self.conn.close()
-            self.conn = None
+            self._release_conn()
 
     def select_all_curation_data(self) -> List[Dict[str, Any]]:
         """
@@ -259,8 +216,7 @@ class CurationDB:
             logger.error(f"Failed to select all curation data: {e}")
             return []
         finally:
-            self.conn.close()
-            self.conn = None
+            self._release_conn()
 
     def delete_curation_data(self, pmid: str, curation_type: str) -> bool:
         """
@@ -291,8 +247,7 @@ class CurationDB:
             logger.error(f"Failed to delete curation data: {e}")
             return False
         finally:
-            self.conn.close()
-            self.conn = None
+            self._release_conn()
 
     def get_curation_count(self) -> int:
         """
@@ -314,8 +269,7 @@ class CurationDB:
             logger.error(f"Failed to get curation count: {e}")
             return 0
         finally:
-            self.conn.close()
-            self.conn = None
+            self._release_conn()
 
     def select_curation_data_by_pmid(self, pmid: str) -> List[Dict[str, Any]]:
         """
@@ -356,8 +310,7 @@ class CurationDB:
             logger.error(f"Failed to select curation data by PMID: {e}")
             return []
         finally:
-            self.conn.close()
-            self.conn = None
+            self._release_conn()
 
     def search_by_curation_type(self, curation_type: str) -> List[Dict[str, Any]]:
         """
@@ -398,5 +351,4 @@ class CurationDB:
             logger.error(f"Failed to search by curation type: {e}")
             return []
         finally:
-            self.conn.close()
-            self.conn = None
+            self._release_conn()
@@ -0,0 +1,105 @@
+from pathlib import Path
+import os
+import threading
+import logging
+import numpy as np
+
+from extractor.database.sqlite_pool import PooledSQLiteDB
+
+logger = logging.getLogger(__name__)
+
+embedding_cache_table_name = "embedding_cache"
+
+embedding_cache_table_schema = f"""
+CREATE TABLE IF NOT EXISTS {embedding_cache_table_name} (
+    model TEXT,
+    text TEXT,
+    embedding BLOB,
+    PRIMARY KEY (model, text)
+)
+"""
+
+embedding_cache_table_insert_schema = f"""
+INSERT OR REPLACE INTO {embedding_cache_table_name} (model, text, embedding)
+VALUES (?, ?, ?)
+"""
+
+class EmbeddingCacheDB(PooledSQLiteDB):
+    """
+    Persistent cache of the text embeddings, keyed by the model name and the text.
+
+    The embeddings are stored as float32 bytes, so a benchmark sweep only encodes the
+    texts it has never seen.
+    """
+    db_file_name = "embedding_cache.db"
+    table_schemas = [embedding_cache_table_schema]
+
+    def __init__(self, db_path: Path | None = None):
+        super().__init__(db_path)
+
+    def select_embeddings(self, model: str, texts: list[str]) -> dict[str, np.ndarray]:
+        """
+        return {text: embedding} of the cached texts, the texts not in cache are left out
+        """
+        res = self._connect_to_db()
+        if not res:
+            return {}
+        try:
+            cursor = self.conn.cursor()
+            embeddings = {}
+            # keep the number of sql variables under the sqlite limit
+            for i in range(0, len(texts), 500):
+                chunk = texts[i:i + 500]
+                placeholders = ", ".join(["?"] * len(chunk))
+                cursor.execute(
+                    f"SELECT text, embedding FROM {embedding_cache_table_name} WHERE model = ? AND text IN ({placeholders})",
+                    [model, *chunk],
+                )
+                for text, embedding in cursor.fetchall():
+                    embeddings[text] = np.frombuffer(embedding, dtype=np.float32)
+            return embeddings
+        except Exception as e:
+            logger.error(f"Failed to select embeddings: {e}")
+            return {}
+        finally:
+            self._release_conn()
+
+    def insert_embeddings(self, model: str, embeddings: dict[str, np.ndarray]) -> bool:
+        if len(embeddings) == 0:
+            return True
+        res = self._connect_to_db()
+        if not res:
+            return False
+        try:
+            cursor = self.conn.cursor()
+            cursor.executemany(
+                embedding_cache_table_insert_schema,
+                [
+                    (model, text, np.asarray(embedding, dtype=np.float32).tobytes())
+                    for text, embedding in embeddings.items()
+                ],
+            )
+            self.conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to insert embeddings: {e}")
+            return False
+        finally:
+            self._release_conn()
+
+
+_embedding_cache_db: EmbeddingCacheDB | None = None
+_embedding_cache_db_lock = threading.Lock()
+
+def get_embedding_cache_db() -> EmbeddingCacheDB | None:
+    """
+    return the shared embedding cache, None if it is disabled by env EMBEDDING_CACHE=false
+    """
+    global _embedding_cache_db
+    embedding_cache = os.environ.get("EMBEDDING_CACHE", "true")
+    if embedding_cache.lower() != "true":
+        return None
+    with _embedding_cache_db_lock:
+        if _embedding_cache_db is None:
+            _embedding_cache_db = EmbeddingCacheDB()
+        return _embedding_cache_db
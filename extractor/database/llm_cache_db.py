@@ -0,0 +1,175 @@
+from pathlib import Path
+import os
+import threading
+import time
+import logging
+
+from extractor.constants import LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS
+from extractor.database.sqlite_pool import PooledSQLiteDB
+
+logger = logging.getLogger(__name__)
+
+llm_cache_table_name = "llm_cache"
+
+llm_cache_table_schema = f"""
+CREATE TABLE IF NOT EXISTS {llm_cache_table_name} (
+    cache_key TEXT PRIMARY KEY,
+    response_json TEXT,
+    created_at REAL,
+    accessed_at REAL
+)
+"""
+
+llm_cache_table_insert_schema = f"""
+INSERT OR REPLACE INTO {llm_cache_table_name} (cache_key, response_json, created_at, accessed_at)
+VALUES (?, ?, ?, ?)
+"""
+
+llm_cache_table_select_schema = f"""
+SELECT response_json, created_at FROM {llm_cache_table_name} WHERE cache_key = ?
+"""
+
+llm_cache_table_touch_schema = f"""
+UPDATE {llm_cache_table_name} SET accessed_at = ? WHERE cache_key = ?
+"""
+
+llm_cache_table_delete_schema = f"""
+DELETE FROM {llm_cache_table_name} WHERE cache_key = ?
+"""
+
+llm_cache_table_delete_expired_schema = f"""
+DELETE FROM {llm_cache_table_name} WHERE created_at < ?
+"""
+
+llm_cache_table_evict_schema = f"""
+DELETE FROM {llm_cache_table_name} WHERE cache_key IN (
+    SELECT cache_key FROM {llm_cache_table_name} ORDER BY accessed_at ASC LIMIT ?
+)
+"""
+
+llm_cache_table_count_schema = f"""
+SELECT COUNT(*) FROM {llm_cache_table_name}
+"""
+
+class LLMCacheDB(PooledSQLiteDB):
+    """
+    Persistent cache of llm responses, keyed by the hash of model, sampling parameters,
+    schema and the rendered messages.
+
+    The responses older than ttl_seconds are treated as missing, and the least recently
+    used responses are evicted once the cache holds more than max_entries.
+    """
+    db_file_name = "llm_cache.db"
+    table_schemas = [llm_cache_table_schema]
+
+    def __init__(
+        self,
+        db_path: Path | None = None,
+        ttl_seconds: float | None = LLM_CACHE_TTL_SECONDS,
+        max_entries: int | None = LLM_CACHE_MAX_ENTRIES,
+    ):
+        super().__init__(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock() # guards the hit/miss counters
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def select_response(self, cache_key: str) -> str | None:
+        res = self._connect_to_db()
+        if not res:
+            self._count(False)
+            return None
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(llm_cache_table_select_schema, (cache_key,))
+            row = cursor.fetchone()
+            now = time.time()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                cursor.execute(llm_cache_table_delete_schema, (cache_key,))
+                self.conn.commit()
+                row = None
+            if row is None:
+                self._count(False)
+                return None
+            cursor.execute(llm_cache_table_touch_schema, (now, cache_key))
+            self.conn.commit()
+            self._count(True)
+            return row[0]
+        except Exception as e:
+            logger.error(f"Failed to select llm response: {e}")
+            self._count(False)
+            return None
+        finally:
+            self._release_conn()
+
+    def insert_response(self, cache_key: str, response_json: str):
+        res = self._connect_to_db()
+        if not res:
+            return False
+        try:
+            cursor = self.conn.cursor()
+            now = time.time()
+            cursor.execute(llm_cache_table_insert_schema, (cache_key, response_json, now, now))
+            if self.ttl_seconds is not None:
+                cursor.execute(llm_cache_table_delete_expired_schema, (now - self.ttl_seconds,))
+            if self.max_entries is not None:
+                cursor.execute(llm_cache_table_count_schema)
+                count = cursor.fetchone()[0]
+                if count > self.max_entries:
+                    cursor.execute(llm_cache_table_evict_schema, (count - self.max_entries,))
+            self.conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to insert llm response: {e}")
+            return False
+        finally:
+            self._release_conn()
+
+    def delete_response(self, cache_key: str) -> bool:
+        res = self._connect_to_db()
+        if not res:
+            return False
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(llm_cache_table_delete_schema, (cache_key,))
+            self.conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delete llm response: {e}")
+            return False
+        finally:
+            self._release_conn()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total > 0 else 0.0,
+            }
+
+
+_llm_cache_db: LLMCacheDB | None = None
+_llm_cache_db_lock = threading.Lock()
+
+def get_llm_cache_db() -> LLMCacheDB | None:
+    """
+    return the shared llm response cache if it is enabled by env LLM_CACHE=true, otherwise None
+    """
+    global _llm_cache_db
+    llm_cache = os.environ.get("LLM_CACHE", "false")
+    if llm_cache.lower() != "true":
+        return None
+    with _llm_cache_db_lock:
+        if _llm_cache_db is None:
+            _llm_cache_db = LLMCacheDB()
+        return _llm_cache_db
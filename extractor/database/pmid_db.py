@@ -1,12 +1,26 @@
 
+from collections import OrderedDict
+import copy
+import io
 import json
+import math
 from pathlib import Path
 import sqlite3
 from sqlite3 import Connection
 from time import strftime
 import os
+import threading
 import logging
 import pandas as pd
+import pyarrow as pa
+
+from extractor.constants import (
+    PMID_INFO_CACHE_MAX_BYTES,
+    SECTION_INDEX_CACHE_SIZE,
+    SECTION_PASSAGE_MAX_TOKENS,
+)
+from extractor.database.sqlite_pool import PooledSQLiteDB
+from extractor.pmid_extractor.section_index import SectionIndex
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +39,7 @@ CREATE TABLE IF NOT EXISTS {pmid_info_table_name} (
 """
 
 pmid_info_table_insert_schema = f"""
-INSERT INTO {pmid_info_table_name} (pmid, title, abstract, full_text, tables_json, sections_json, datetime) 
+INSERT OR REPLACE INTO {pmid_info_table_name} (pmid, title, abstract, full_text, tables_json, sections_json, datetime) 
 VALUES (?, ?, ?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%S', 'now'))
 """
 
@@ -33,55 +47,251 @@ pmid_info_table_select_schema = f"""
 SELECT * FROM {pmid_info_table_name} WHERE pmid = ?
 """
 
-class PMIDDB:
-    def __init__(self, db_path: Path | None = None):
-        self.conn: Connection | None = None
-        self.db_path = db_path
-        
-    def _ensure_table(self):
-        if self.conn is None:
-            return False
-        
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(pmid_info_table_schema)
-            self.conn.commit()
-            return True
-        except Exception as e:
-            logger.error(f"Failed to ensure table: {e}")
-            return False
+pmid_info_table_select_tables_json_schema = f"""
+SELECT tables_json FROM {pmid_info_table_name} WHERE pmid = ?
+"""
 
-    def _get_db_path(self):
-        if self.db_path is not None:
-            return self.db_path
-        db_path = os.environ.get("DATA_FOLDER", "./data")
-        db_path = Path(db_path, "databases")
-        try:
-            os.makedirs(db_path, exist_ok=True)
-        except Exception as e:
-            logger.error(f"Failed to create db path: {e}")
-            raise e
-        return db_path / "pmid_info.db"
-        
-    def _connect_to_db(self):
-        if self.conn is not None:
-            return True
-        
-        try:
-            db_path = self._get_db_path()
-            if not db_path.exists():
-                logger.info(f"Creating db file: {db_path}")
-                db_path.touch()
-            else:
-                logger.info(f"Using existing db file: {db_path}")
-                
-            self.conn = sqlite3.connect(db_path)
-            self._ensure_table()
-            return True
-        except Exception as e:
-            logger.error(f"Failed to connect to db: {e}")
-            return False
+pmid_info_table_clear_tables_json_schema = f"""
+UPDATE {pmid_info_table_name} SET tables_json = NULL WHERE pmid = ?
+"""
+
+table_selection_table_name = "table_selection"
 
+table_selection_table_schema = f"""
+CREATE TABLE IF NOT EXISTS {table_selection_table_name} (
+    pmid TEXT,
+    selector TEXT,
+    tables_hash TEXT,
+    model TEXT,
+    selected_indexes_json TEXT,
+    reasoning_process TEXT,
+    datetime TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+    PRIMARY KEY (pmid, selector, tables_hash, model)
+)
+"""
+
+table_selection_table_insert_schema = f"""
+INSERT OR REPLACE INTO {table_selection_table_name} (pmid, selector, tables_hash, model, selected_indexes_json, reasoning_process, datetime)
+VALUES (?, ?, ?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%S', 'now'))
+"""
+
+table_selection_table_select_schema = f"""
+SELECT selected_indexes_json, reasoning_process FROM {table_selection_table_name}
+WHERE pmid = ? AND selector = ? AND tables_hash = ? AND model = ?
+"""
+
+pmid_table_table_name = "pmid_table"
+
+# one row per table, the DataFrame is stored as a parquet blob
+pmid_table_table_schema = f"""
+CREATE TABLE IF NOT EXISTS {pmid_table_table_name} (
+    pmid TEXT,
+    table_index INTEGER,
+    meta_json TEXT,
+    n_rows INTEGER,
+    n_cols INTEGER,
+    table_format TEXT,
+    table_blob BLOB,
+    PRIMARY KEY (pmid, table_index)
+)
+"""
+
+pmid_table_table_insert_schema = f"""
+INSERT OR REPLACE INTO {pmid_table_table_name} (pmid, table_index, meta_json, n_rows, n_cols, table_format, table_blob)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+pmid_table_table_delete_schema = f"""
+DELETE FROM {pmid_table_table_name} WHERE pmid = ?
+"""
+
+pmid_table_table_select_schema = f"""
+SELECT table_index, meta_json, n_rows, n_cols, table_format, table_blob FROM {pmid_table_table_name}
+WHERE pmid = ? ORDER BY table_index
+"""
+
+pmid_table_table_select_one_schema = f"""
+SELECT table_index, meta_json, n_rows, n_cols, table_format, table_blob FROM {pmid_table_table_name}
+WHERE pmid = ? AND table_index = ?
+"""
+
+pmid_table_table_select_meta_schema = f"""
+SELECT table_index, meta_json, n_rows, n_cols FROM {pmid_table_table_name}
+WHERE pmid = ? ORDER BY table_index
+"""
+
+section_index_table_name = "section_index"
+
+# the retrieval index over the sections of a paper, built when the paper is inserted
+section_index_table_schema = f"""
+CREATE TABLE IF NOT EXISTS {section_index_table_name} (
+    pmid TEXT PRIMARY KEY,
+    index_json TEXT
+)
+"""
+
+section_index_table_insert_schema = f"""
+INSERT OR REPLACE INTO {section_index_table_name} (pmid, index_json) VALUES (?, ?)
+"""
+
+# a lazily built index doesn't replace the one of a paper inserted meanwhile
+section_index_table_insert_if_missing_schema = f"""
+INSERT OR IGNORE INTO {section_index_table_name} (pmid, index_json) VALUES (?, ?)
+"""
+
+section_index_table_delete_stale_schema = f"""
+DELETE FROM {section_index_table_name} WHERE pmid = ? AND index_json = ?
+"""
+
+section_index_table_select_schema = f"""
+SELECT index_json FROM {section_index_table_name} WHERE pmid = ?
+"""
+
+TABLE_FORMAT_PARQUET = "parquet"
+
+def _encode_column_name(name):
+    if isinstance(name, tuple):
+        return [_encode_column_name(n) for n in name]
+    if hasattr(name, "item"):
+        # numpy scalar
+        name = name.item()
+    return name if isinstance(name, (str, int, float, bool)) or name is None else str(name)
+
+def _decode_column_name(name):
+    return tuple(_decode_column_name(n) for n in name) if isinstance(name, list) else name
+
+def _to_str_or_null(value):
+    if value is None or value is pd.NA or isinstance(value, str) \
+        or (isinstance(value, float) and math.isnan(value)):
+        return value
+    return str(value)
+
+def _serialize_table(df: pd.DataFrame | None) -> tuple[str | None, bytes | None, list | None]:
+    """
+    return (table format, parquet blob, original column names). Parquet needs unique string column
+    names, the other tables are written with positional column names and the original names are
+    returned to be kept in the table metadata.
+    """
+    if df is None:
+        return None, None, None
+    column_names = None
+    if isinstance(df.columns, pd.MultiIndex) or not df.columns.is_unique \
+        or not all(isinstance(c, str) for c in df.columns):
+        column_names = [_encode_column_name(c) for c in df.columns]
+        df = df.set_axis([str(ix) for ix in range(df.shape[1])], axis=1)
+    buf = io.BytesIO()
+    try:
+        df.to_parquet(buf, compression="zstd")
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # arrow needs one type per column, write the values of the mixed columns as strings
+        df = df.apply(lambda col: col.map(_to_str_or_null) if col.dtype == object else col)
+        buf = io.BytesIO()
+        df.to_parquet(buf, compression="zstd")
+    return TABLE_FORMAT_PARQUET, buf.getvalue(), column_names
+
+def _deserialize_table(
+    table_format: str | None,
+    table_blob: bytes | None,
+    column_names: list | None = None,
+) -> pd.DataFrame | None:
+    if table_format is None or table_blob is None:
+        return None
+    if table_format != TABLE_FORMAT_PARQUET:
+        raise ValueError(f"Unknown table format: {table_format}")
+    df = pd.read_parquet(io.BytesIO(table_blob))
+    if column_names is not None:
+        names = [_decode_column_name(c) for c in column_names]
+        columns = pd.MultiIndex.from_tuples(names) if len(names) > 0 and all(isinstance(n, tuple) for n in names) \
+            else pd.Index(names, dtype=object)
+        df = df.set_axis(columns, axis=1)
+    return df
+
+def _copy_table(table: dict) -> dict:
+    df = table["table"]
+    return {**table, "table": df.copy() if df is not None else None}
+
+def _copy_pmid_info(info: tuple) -> tuple:
+    pmid, title, abstract, full_text, tables, sections = info
+    return pmid, title, abstract, full_text, [_copy_table(t) for t in tables], copy.deepcopy(sections)
+
+def _estimate_pmid_info_bytes(info: tuple) -> int:
+    pmid, title, abstract, full_text, tables, sections = info
+    size = sum(len(text) for text in [pmid, title, abstract, full_text] if text is not None)
+    size += len(json.dumps(sections))
+    for table in tables:
+        df = table["table"]
+        if df is not None:
+            size += int(df.memory_usage(index=True, deep=True).sum())
+    return size
+
+# the key of the original column names in the table metadata
+COLUMN_NAMES_KEY = "column_names"
+
+def _table_meta(row: tuple) -> dict:
+    table_index, meta_json, n_rows, n_cols = row[0], row[1], row[2], row[3]
+    meta = json.loads(meta_json)
+    meta.pop(COLUMN_NAMES_KEY, None)
+    return {**meta, "table_index": table_index, "n_rows": n_rows, "n_cols": n_cols}
+
+def _table_from_row(row: tuple) -> dict:
+    table = json.loads(row[1])
+    column_names = table.pop(COLUMN_NAMES_KEY, None)
+    table["table"] = _deserialize_table(row[4], row[5], column_names)
+    return table
+
+def _get_table_rows(pmid: str, tables: list[dict]) -> list[tuple]:
+    """the pmid_table rows of the tables of the paper, it raises if a table can't be serialized"""
+    table_rows = []
+    for ix, table in enumerate(tables):
+        df = table["table"]
+        meta = {k: v for k, v in table.items() if k != "table"}
+        table_format, table_blob, column_names = _serialize_table(df)
+        if column_names is not None:
+            meta[COLUMN_NAMES_KEY] = column_names
+        table_rows.append((
+            pmid,
+            ix,
+            json.dumps(meta),
+            df.shape[0] if df is not None else 0,
+            df.shape[1] if df is not None else 0,
+            table_format,
+            table_blob,
+        ))
+    return table_rows
+
+def _decode_legacy_tables(tables_json: str) -> list[dict]:
+    tables = json.loads(tables_json)
+    for table in tables:
+        table["table"] = pd.read_json(io.StringIO(table["table"]))
+    return tables
+
+class PMIDDB(PooledSQLiteDB):
+    db_file_name = "pmid_info.db"
+    table_schemas = [
+        pmid_info_table_schema,
+        pmid_table_table_schema,
+        table_selection_table_schema,
+        section_index_table_schema,
+    ]
+
+    def __init__(
+        self,
+        db_path: Path | None = None,
+        cache_max_bytes: int = PMID_INFO_CACHE_MAX_BYTES,
+    ):
+        super().__init__(db_path)
+        # the lock guards the in-memory cache, the db connections are per thread
+        self._lock = threading.RLock()
+        # LRU cache of the pmid info read from db, pmid -> (pmid info, estimated bytes)
+        self.cache_max_bytes = cache_max_bytes
+        self._info_cache: OrderedDict[str, tuple[tuple, int]] = OrderedDict()
+        self._info_cache_bytes = 0
+        # pmid -> number of writes of the paper, a read doesn't cache what it read if the paper
+        # was written meanwhile
+        self._generations: dict[str, int] = {}
+        # LRU cache of the section indexes of the papers, pmid -> SectionIndex
+        self._section_index_cache: OrderedDict[str, SectionIndex] = OrderedDict()
+        
     def insert_pmid_info(
         self, 
         pmid: str, 
@@ -91,27 +301,136 @@ class PMIDDB:
         tables: list[dict], 
         sections: list[str],
     ):
-        for table in tables:
-            if table["table"] is not None:
-                table["table"] = table["table"].to_json()
-        tables_json = json.dumps(tables)
-        sections_json = json.dumps(sections)
+        return self.insert_pmid_infos([{
+            "pmid": pmid,
+            "title": title,
+            "abstract": abstract,
+            "full_text": full_text,
+            "tables": tables,
+            "sections": sections,
+        }]) == 1
+
+    def insert_pmid_infos(self, pmid_infos: list[dict]) -> int:
+        """
+        insert the papers in one transaction
+
+        Args:
+        pmid_infos list[dict]: papers with keys pmid, title, abstract, full_text, tables and sections,
+        and optionally section_index_json (SectionIndex.to_json()), it is built here if missing
+
+        Return:
+        the number of inserted papers, 0 if the transaction failed
+        """
+        if len(pmid_infos) == 0:
+            return 0
+        info_rows = []
+        table_rows = []
+        index_rows = []
+        for info in pmid_infos:
+            pmid = info["pmid"]
+            # the tables are stored in pmid_table, the legacy rows with tables_json are migrated on their first read
+            info_rows.append((
+                pmid,
+                info["title"],
+                info["abstract"],
+                info["full_text"],
+                None,
+                json.dumps(info["sections"]),
+            ))
+            try:
+                table_rows.extend(_get_table_rows(pmid, info["tables"]))
+            except Exception as e:
+                logger.error(f"Failed to serialize the tables of paper {pmid}: {e}")
+                return 0
+            index_json = info.get("section_index_json")
+            if index_json is None:
+                try:
+                    index_json = SectionIndex(info["sections"] or []).to_json()
+                except Exception as e:
+                    # the index is built on the first read instead
+                    logger.error(f"Failed to build the section index of paper {pmid}: {e}")
+            index_rows.append((pmid, index_json))
+        pmids = [(info["pmid"],) for info in pmid_infos]
         res = self._connect_to_db()
         if not res:
-            return False
+            return 0
         
         try:
             cursor = self.conn.cursor()
-            cursor.execute(pmid_info_table_insert_schema, (pmid, title, abstract, full_text, tables_json, sections_json))
+            cursor.executemany(pmid_info_table_insert_schema, info_rows)
+            cursor.executemany(pmid_table_table_delete_schema, pmids)
+            cursor.executemany(pmid_table_table_insert_schema, table_rows)
+            cursor.executemany(section_index_table_insert_schema, index_rows)
             self.conn.commit()
-            return True
+            return len(pmid_infos)
         except Exception as e:
             logger.error(f"Failed to insert pmid info: {e}")
-            return False
+            return 0
+        finally:
+            self._release_conn()
+            # invalidate after the write, the reads started before it won't cache the old row
+            with self._lock:
+                for (pmid,) in pmids:
+                    self._invalidate_cache(pmid)
+
+    def select_existing_pmids(self, pmids: list[str]) -> set[str] | None:
+        """
+        return the pmids that are already in db, None if the query failed
+        """
+        res = self._connect_to_db()
+        if not res:
+            return None
+        try:
+            cursor = self.conn.cursor()
+            existing = set()
+            # keep the number of sql variables under the sqlite limit
+            for i in range(0, len(pmids), 500):
+                chunk = pmids[i:i + 500]
+                placeholders = ", ".join(["?"] * len(chunk))
+                cursor.execute(
+                    f"SELECT pmid FROM {pmid_info_table_name} WHERE pmid IN ({placeholders})",
+                    chunk,
+                )
+                existing.update(row[0] for row in cursor.fetchall())
+            return existing
+        except Exception as e:
+            logger.error(f"Failed to select existing pmids: {e}")
+            return None
         finally:
-            self.conn.close()
-            self.conn = None
+            self._release_conn()
         
+    def _get_generation(self, pmid: str) -> int:
+        return self._generations.get(pmid, 0)
+
+    def _invalidate_cache(self, pmid: str):
+        """drop the cached paper after it is written"""
+        self._generations[pmid] = self._get_generation(pmid) + 1
+        self._section_index_cache.pop(pmid, None)
+        self._remove_info_cache(pmid)
+
+    def _remove_info_cache(self, pmid: str):
+        cached = self._info_cache.pop(pmid, None)
+        if cached is not None:
+            self._info_cache_bytes -= cached[1]
+
+    def _put_cache(self, pmid: str, info: tuple):
+        size = _estimate_pmid_info_bytes(info)
+        if size > self.cache_max_bytes:
+            return
+        self._remove_info_cache(pmid)
+        self._info_cache[pmid] = (info, size)
+        self._info_cache_bytes += size
+        while self._info_cache_bytes > self.cache_max_bytes:
+            _, (_, evicted_size) = self._info_cache.popitem(last=False)
+            self._info_cache_bytes -= evicted_size
+
+    def _get_cache(self, pmid: str) -> tuple | None:
+        cached = self._info_cache.get(pmid)
+        if cached is None:
+            return None
+        self._info_cache.move_to_end(pmid)
+        return cached[0]
+
     def select_pmid_info(self, pmid: str) -> tuple[str, str, str, str, list[dict], list[str]] | None:
         """
         return (
@@ -122,7 +441,88 @@ class PMIDDB:
             tables,
             sections
         )
+
+        The pmid info is cached in memory, the returned tables and sections are copies,
+        so the callers are free to modify them.
+        """
+        with self._lock:
+            info = self._get_cache(pmid)
+            if info is not None:
+                return _copy_pmid_info(info)
+            generation = self._get_generation(pmid)
+        info = self._select_pmid_info_from_db(pmid)
+        if info is None:
+            return None
+        with self._lock:
+            # skip caching if the paper was inserted during the read
+            if generation == self._get_generation(pmid):
+                self._put_cache(pmid, info)
+            return _copy_pmid_info(info)
+
+    def select_section_index(self, pmid: str) -> SectionIndex | None:
+        """
+        return the retrieval index over the sections of the paper, None if the paper is not in db.
+        The index stored with the paper is kept in memory until the paper is inserted again. The
+        papers inserted without one, or with one of another passage size, get it built here once.
         """
+        with self._lock:
+            index = self._section_index_cache.get(pmid)
+            if index is not None:
+                self._section_index_cache.move_to_end(pmid)
+                return index
+            generation = self._get_generation(pmid)
+        index_json = self._select_section_index_json(pmid)
+        index = None
+        if index_json is not None:
+            try:
+                index = SectionIndex.from_json(index_json)
+            except Exception as e:
+                logger.error(f"Failed to load the section index of paper {pmid}: {e}")
+        if index is None or index.max_passage_tokens != SECTION_PASSAGE_MAX_TOKENS:
+            info = self.select_pmid_info(pmid)
+            if info is None:
+                return None
+            index = SectionIndex(info[5] or [])
+            self._insert_section_index_if_missing(pmid, index.to_json(), index_json)
+        with self._lock:
+            if generation == self._get_generation(pmid):
+                self._section_index_cache[pmid] = index
+                while len(self._section_index_cache) > SECTION_INDEX_CACHE_SIZE:
+                    self._section_index_cache.popitem(last=False)
+        return index
+
+    def _select_section_index_json(self, pmid: str) -> str | None:
+        res = self._connect_to_db()
+        if not res:
+            return None
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(section_index_table_select_schema, (pmid,))
+            row = cursor.fetchone()
+            return row[0] if row is not None else None
+        except Exception as e:
+            logger.error(f"Failed to select section index: {e}")
+            return None
+        finally:
+            self._release_conn()
+
+    def _insert_section_index_if_missing(self, pmid: str, index_json: str, stale_index_json: str | None):
+        """store the index built on read, stale_index_json is the one it replaces"""
+        res = self._connect_to_db()
+        if not res:
+            return
+        try:
+            cursor = self.conn.cursor()
+            if stale_index_json is not None:
+                cursor.execute(section_index_table_delete_stale_schema, (pmid, stale_index_json))
+            cursor.execute(section_index_table_insert_if_missing_schema, (pmid, index_json))
+            self.conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to insert section index: {e}")
+        finally:
+            self._release_conn()
+
+    def _select_pmid_info_from_db(self, pmid: str) -> tuple[str, str, str, str, list[dict], list[str]] | None:
         res = self._connect_to_db()
         if not res:
             return None
@@ -132,14 +532,159 @@ class PMIDDB:
             row = cursor.fetchone()
             if row is None:
                 return None
-            tables = json.loads(row[4])
-            for table in tables:
-                table["table"] = pd.read_json(table["table"])
+            if row[4] is not None:
+                # legacy row, the tables are stored as json
+                tables = self._migrate_legacy_tables(cursor, pmid, row[4])
+            else:
+                cursor.execute(pmid_table_table_select_schema, (pmid,))
+                tables = [_table_from_row(table_row) for table_row in cursor.fetchall()]
             sections = json.loads(row[5])
             return row[0], row[1], row[2], row[3], tables, sections
         except Exception as e:
             logger.error(f"Failed to select pmid info: {e}")
             return None
         finally:
-            self.conn.close()
-            self.conn = None
+            self._release_conn()
+
+    def _migrate_legacy_tables(self, cursor, pmid: str, tables_json: str) -> list[dict]:
+        """
+        move the json tables of a legacy row into pmid_table, so the per-table reads find them.
+        Return the tables, they are returned even if the migration fails.
+        """
+        tables = _decode_legacy_tables(tables_json)
+        try:
+            table_rows = _get_table_rows(pmid, tables)
+            cursor.execute(pmid_table_table_delete_schema, (pmid,))
+            cursor.executemany(pmid_table_table_insert_schema, table_rows)
+            cursor.execute(pmid_info_table_clear_tables_json_schema, (pmid,))
+            self.conn.commit()
+            logger.info(f"Migrated the tables of paper {pmid} to {pmid_table_table_name}")
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Failed to migrate the tables of paper {pmid}: {e}")
+        return tables
+
+    def _select_legacy_tables(self, cursor, pmid: str) -> list[dict] | None:
+        """return the tables of a legacy row after migrating them, None if it's not a legacy row"""
+        cursor.execute(pmid_info_table_select_tables_json_schema, (pmid,))
+        row = cursor.fetchone()
+        if row is None or row[0] is None:
+            return None
+        return self._migrate_legacy_tables(cursor, pmid, row[0])
+
+    def select_pmid_table(self, pmid: str, table_index: int) -> dict | None:
+        """
+        load one table of the paper, return the table dict (caption, footnote, table, ...) or None
+        """
+        with self._lock:
+            info = self._get_cache(pmid)
+            if info is not None:
+                tables = info[4]
+                return _copy_table(tables[table_index]) if 0 <= table_index < len(tables) else None
+        res = self._connect_to_db()
+        if not res:
+            return None
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(pmid_table_table_select_one_schema, (pmid, table_index))
+            row = cursor.fetchone()
+            if row is not None:
+                return _table_from_row(row)
+            tables = self._select_legacy_tables(cursor, pmid)
+            if tables is None or not 0 <= table_index < len(tables):
+                return None
+            return tables[table_index]
+        except Exception as e:
+            logger.error(f"Failed to select pmid table: {e}")
+            return None
+        finally:
+            self._release_conn()
+
+    def select_pmid_tables_meta(self, pmid: str) -> list[dict] | None:
+        """
+        return the metadata (caption, footnote, table_index, n_rows, n_cols, ...) of the tables
+        of the paper without loading the tables
+        """
+        res = self._connect_to_db()
+        if not res:
+            return None
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(pmid_table_table_select_meta_schema, (pmid,))
+            metas = [_table_meta(row) for row in cursor.fetchall()]
+            if len(metas) > 0:
+                return metas
+            tables = self._select_legacy_tables(cursor, pmid)
+            if tables is None:
+                return metas
+            return [{
+                **{k: v for k, v in table.items() if k != "table"},
+                "table_index": ix,
+                "n_rows": table["table"].shape[0],
+                "n_cols": table["table"].shape[1],
+            } for ix, table in enumerate(tables)]
+        except Exception as e:
+            logger.error(f"Failed to select pmid tables meta: {e}")
+            return None
+        finally:
+            self._release_conn()
+
+    def insert_table_selection(
+        self,
+        pmid: str,
+        selector: str,
+        tables_hash: str,
+        model: str,
+        selected_indexes: list[str],
+        reasoning_process: str | None,
+    ):
+        """
+        Cache the table indexes selected by llm, so that the sibling pipelines and
+        the re-runs on the same tables don't need to select them again.
+        """
+        selected_indexes_json = json.dumps(selected_indexes)
+        res = self._connect_to_db()
+        if not res:
+            return False
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                table_selection_table_insert_schema,
+                (pmid, selector, tables_hash, model, selected_indexes_json, reasoning_process),
+            )
+            self.conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to insert table selection: {e}")
+            return False
+        finally:
+            self._release_conn()
+
+    def select_table_selection(
+        self,
+        pmid: str,
+        selector: str,
+        tables_hash: str,
+        model: str,
+    ) -> tuple[list[str], str | None] | None:
+        """
+        return (
+            selected_indexes,
+            reasoning_process
+        )
+        """
+        res = self._connect_to_db()
+        if not res:
+            return None
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(table_selection_table_select_schema, (pmid, selector, tables_hash, model))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return json.loads(row[0]), row[1]
+        except Exception as e:
+            logger.error(f"Failed to select table selection: {e}")
+            return None
+        finally:
+            self._release_conn()
@@ -0,0 +1,215 @@
+from contextlib import contextmanager
+from pathlib import Path
+import os
+import queue
+import sqlite3
+from sqlite3 import Connection
+import threading
+import logging
+
+from extractor.constants import SQLITE_BUSY_TIMEOUT_SECONDS, SQLITE_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteConnectionPool:
+    """
+    A pool of sqlite connections to one db file.
+
+    The connections are in WAL mode with a busy timeout, so several processes (curation
+    workers, the streamlit app) can read and write the same db file without failing on
+    "database is locked". A connection is used by one thread at a time, it is handed back
+    to the pool after the operation instead of being closed.
+    """
+    def __init__(
+        self,
+        db_path: Path,
+        max_size: int = SQLITE_POOL_SIZE,
+        busy_timeout: float = SQLITE_BUSY_TIMEOUT_SECONDS,
+    ):
+        self.db_path = Path(db_path)
+        self.max_size = max(1, max_size)
+        self.busy_timeout = busy_timeout
+        self._idle: queue.LifoQueue[Connection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._lock = threading.Lock()
+        self._file_id = None
+
+    def _get_file_id(self):
+        try:
+            stat = os.stat(self.db_path)
+            return stat.st_dev, stat.st_ino
+        except FileNotFoundError:
+            return None
+
+    def _create_connection(self) -> Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-16000")  # 16MB page cache per connection
+        return conn
+
+    def _close_idle(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.close()
+            except Exception as e:
+                logger.error(f"Failed to close db connection: {e}")
+
+    def acquire(self) -> Connection:
+        self._slots.acquire()
+        try:
+            with self._lock:
+                # the idle connections are stale if the db file was removed or replaced
+                file_id = self._get_file_id()
+                if file_id != self._file_id:
+                    self._close_idle()
+                    self._file_id = file_id
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._create_connection()
+                with self._lock:
+                    self._file_id = self._get_file_id()
+                return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn: Connection):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+        except Exception as e:
+            logger.error(f"Failed to release db connection: {e}")
+            try:
+                conn.close()
+            except Exception:
+                pass
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """close the idle connections"""
+        with self._lock:
+            self._close_idle()
+
+
+_pools: dict[tuple[int, str], SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_connection_pool(db_path: Path) -> SQLiteConnectionPool:
+    """return the process-wide connection pool of the db file"""
+    # the connections can't be shared with forked processes, so the pools are per process
+    key = (os.getpid(), str(Path(db_path).resolve()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SQLiteConnectionPool(db_path)
+            _pools[key] = pool
+        return pool
+
+
+class PooledSQLiteDB:
+    """
+    Base class of the sqlite dbs, the connections come from the process-wide pool of
+    the db file.
+
+    The subclasses keep the pattern of `self._connect_to_db()` ... `self._release_conn()`,
+    `self.conn` is per thread, so an instance can be shared by concurrent pipelines.
+    """
+    db_file_name: str = ""
+    table_schemas: list[str] = []
+
+    def __init__(self, db_path: Path | None = None):
+        self._local = threading.local()
+        self.db_path = db_path
+        self._table_ensured = False
+
+    @property
+    def conn(self) -> Connection | None:
+        return getattr(self._local, "conn", None)
+
+    @conn.setter
+    def conn(self, conn: Connection | None):
+        self._local.conn = conn
+
+    def _ensure_table(self):
+        if self.conn is None:
+            return False
+        
+        try:
+            cursor = self.conn.cursor()
+            for schema in self.table_schemas:
+                cursor.execute(schema)
+            self.conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to ensure table: {e}")
+            return False
+
+    def _get_db_path(self):
+        if self.db_path is not None:
+            return Path(self.db_path)
+        db_path = os.environ.get("DATA_FOLDER", "./data")
+        db_path = Path(db_path, "databases")
+        try:
+            os.makedirs(db_path, exist_ok=True)
+        except Exception as e:
+            logger.error(f"Failed to create db path: {e}")
+            raise e
+        return db_path / self.db_file_name
+
+    def _get_pool(self) -> SQLiteConnectionPool:
+        return get_connection_pool(self._get_db_path())
+
+    def _connect_to_db(self):
+        if self.conn is not None:
+            return True
+        
+        try:
+            if not self._table_ensured:
+                db_path = self._get_db_path()
+                if not db_path.exists():
+                    logger.info(f"Creating db file: {db_path}")
+                else:
+                    logger.info(f"Using existing db file: {db_path}")
+            self.conn = self._get_pool().acquire()
+            if not self._table_ensured:
+                self._table_ensured = self._ensure_table()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to connect to db: {e}")
+            return False
+
+    def _release_conn(self):
+        if self.conn is None:
+            return
+        self._get_pool().release(self.conn)
+        self.conn = None
+
+    def close(self):
+        """close the idle pooled connections of the db file"""
+        try:
+            self._get_pool().close()
+        except Exception as e:
+            logger.error(f"Failed to close db: {e}")
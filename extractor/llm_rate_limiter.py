@@ -0,0 +1,161 @@
+"""
+Process-wide rate limits of the llm calls.
+
+The limits are configured per model or per provider by env LLM_RATE_LIMITS, a json object
+mapping a model name, a llm class name or "*" to its requests per minute and tokens per
+minute, for example:
+
+LLM_RATE_LIMITS='{"gpt-4o": {"rpm": 500, "tpm": 300000}, "ChatOllama": {"rpm": 60}}'
+
+The llms of the same provider and model share one limiter, so all the agents of all the
+papers in flight stay under the provider limits together.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any
+import logging
+
+from extractor.constants import LLM_CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    A bucket of `capacity` tokens, refilled continuously at `capacity` per `period` seconds.
+
+    A reservation is taken at once even if the bucket runs into debt, the caller waits until
+    the debt is refilled. So the reservations are served in order and a large one can't be
+    starved by the small ones.
+    """
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.balance = self.capacity
+        self._last_time = time.monotonic()
+
+    def _refill(self, now: float):
+        self.balance = min(self.capacity, self.balance + (now - self._last_time) * self.rate)
+        self._last_time = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """
+        take amount tokens, return the seconds to wait until they are available
+        """
+        self._refill(now)
+        self.balance -= amount
+        return 0.0 if self.balance >= 0 else -self.balance / self.rate
+
+    def give_back(self, amount: float, now: float):
+        """return unused tokens, a negative amount takes more"""
+        self._refill(now)
+        self.balance = min(self.capacity, self.balance + amount)
+
+
+class LLMRateLimiter:
+    """
+    Requests per minute and tokens per minute budgets of a llm.
+
+    acquire() blocks the calling thread and aacquire() suspends the calling task until the
+    call fits in both budgets. The buckets are guarded by a thread lock that is never held
+    while waiting, so one limiter can be shared by threads and event loops.
+    """
+    def __init__(
+        self,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+    ):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait_time = 0.0
+            if self.requests is not None:
+                wait_time = max(wait_time, self.requests.reserve(1, now))
+            if self.tokens is not None and tokens > 0:
+                wait_time = max(wait_time, self.tokens.reserve(tokens, now))
+            return wait_time
+
+    def acquire(self, tokens: int = 0):
+        """
+        wait until one request of `tokens` estimated tokens can be sent
+        """
+        wait_time = self._reserve(tokens)
+        if wait_time > 0:
+            logger.debug(f"Rate limited, waiting {wait_time:.2f}s")
+            time.sleep(wait_time)
+
+    async def aacquire(self, tokens: int = 0):
+        wait_time = self._reserve(tokens)
+        if wait_time > 0:
+            logger.debug(f"Rate limited, waiting {wait_time:.2f}s")
+            await asyncio.sleep(wait_time)
+
+    def record_usage(self, estimated_tokens: int, used_tokens: int):
+        """
+        correct the estimate taken by acquire() with the tokens the call actually used
+        """
+        if self.tokens is None or used_tokens == estimated_tokens:
+            return
+        with self._lock:
+            self.tokens.give_back(estimated_tokens - used_tokens, time.monotonic())
+
+
+def estimate_text_tokens(text: str) -> int:
+    return len(text) // LLM_CHARS_PER_TOKEN + 1
+
+
+def get_llm_model_name(llm: Any) -> str | None:
+    """the model name of the llm, None if the llm has none"""
+    for name in ["model_name", "deployment_name", "model"]:
+        value = getattr(llm, name, None)
+        if isinstance(value, str) and len(value) > 0:
+            return value
+    return None
+
+
+_rate_limiters: dict[tuple[str, str | None], LLMRateLimiter | None] = {}
+_rate_limiters_config: str | None = None
+_rate_limiters_lock = threading.Lock()
+
+def _get_rate_limits(limits: dict, provider: str, model: str | None) -> dict | None:
+    for key in [model, provider, "*"]:
+        if key is not None and key in limits:
+            return limits[key]
+    return None
+
+def get_llm_rate_limiter(llm: Any) -> LLMRateLimiter | None:
+    """
+    return the shared rate limiter of the llm provider and model, None if no limits are
+    configured for it in env LLM_RATE_LIMITS
+    """
+    global _rate_limiters_config
+    config = os.environ.get("LLM_RATE_LIMITS", "")
+    provider = llm.__class__.__name__
+    model = get_llm_model_name(llm)
+    with _rate_limiters_lock:
+        if config != _rate_limiters_config:
+            # the limits are changed, start over with new limiters
+            _rate_limiters.clear()
+            _rate_limiters_config = config
+        if (provider, model) in _rate_limiters:
+            return _rate_limiters[(provider, model)]
+        rate_limiter = None
+        if len(config.strip()) > 0:
+            try:
+                limits = _get_rate_limits(json.loads(config), provider, model)
+                if limits is not None:
+                    rate_limiter = LLMRateLimiter(
+                        requests_per_minute=limits.get("rpm"),
+                        tokens_per_minute=limits.get("tpm"),
+                    )
+            except Exception as e:
+                logger.error(f"Invalid LLM_RATE_LIMITS {config}: {e}")
+        _rate_limiters[(provider, model)] = rate_limiter
+        return rate_limiter
@@ -6,7 +6,9 @@ from langchain_openai.chat_models.base import BaseChatOpenAI
 from TabFuncFlow.utils.table_utils import dataframe_to_markdown
 from extractor.agents.agent_utils import DEFAULT_TOKEN_USAGE, increase_token_usage
 from extractor.agents.pk_summary.pk_sum_workflow import PKSumWorkflow
+from extractor.agents.workflow_factory import get_workflow
 from extractor.pmid_extractor.article_retriever import ArticleRetriever
+from extractor.pmid_extractor.html_document import HtmlDocument
 from extractor.pmid_extractor.html_table_extractor import HtmlTableExtractor
 from extractor.pmid_extractor.table_utils import select_pk_summary_tables
 
@@ -60,8 +62,9 @@ def extract_pk_summary(
 
     # step 2: extract tables from paper
     extractor = HtmlTableExtractor()
-    tables = extractor.extract_tables(html_content)
-    title = extractor.extract_title(html_content)
+    doc = HtmlDocument(html_content)
+    tables = extractor.extract_tables(doc)
+    title = extractor.extract_title(doc)
     if len(tables) == 0:
         return False, "No table found", None, None
 
@@ -75,8 +78,7 @@ def extract_pk_summary(
     for table in selected_tables:
         df_table = table["table"]
         caption = "\n".join([table["caption"], table["footnote"]])
-        workflow = PKSumWorkflow(llm=llm)
-        workflow.build()
+        workflow = get_workflow(PKSumWorkflow, llm=llm)
         try:
             df = workflow.go_md_table(
                 md_table=dataframe_to_markdown(df_table),
@@ -1,3 +1,4 @@
+import functools
 from pathlib import Path
 from fake_useragent import UserAgent
 from bs4 import BeautifulSoup
@@ -6,6 +7,7 @@ import os
 from requests import Response
 import shortuuid
 
+from extractor.database.article_cache_db import get_article_cache_db
 from extractor.make_request import make_article_request, make_get_request
 from extractor.constants import (
     headers,
@@ -14,14 +16,28 @@ from extractor.constants import (
 
 logger = logging.getLogger(__name__)
 
+def normalize_article_text(text: str) -> str:
+    return text.replace('\u2009', ' ').replace('\xa0', ' ')
+
 def article_processor(func):
     def wrapper(*args, **kwargs):
         res, text, code = func(*args, **kwargs)
         if res and text is not None and len(text) > 0:
-            text = text.replace('\u2009', ' ').replace('\xa0', ' ')
+            text = normalize_article_text(text)
         return res, text, code
     return wrapper
 
+@functools.lru_cache(maxsize=1)
+def get_chrome_user_agent() -> str:
+    # loading the user agent data is slow, do it once per process
+    return str(UserAgent().chrome)
+
+def get_request_headers() -> dict[str, str]:
+    """return a copy of the browser-like request headers with a chrome user agent"""
+    header = {k: v for k, v in headers.items() if k.lower() != "user-agent"}
+    header["User-Agent"] = get_chrome_user_agent()
+    return header
+
 class ArticleRetriever(object):
     def __init__(self):
         pass
@@ -66,9 +82,7 @@ class ArticleRetriever(object):
             url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/{pmid}"
         else:
             url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/pmid/{pmid}/"
-        header = headers
-        ua = UserAgent()
-        header["User-Agent"] = str(ua.chrome)
+        header = get_request_headers()
         res = make_get_request(
             url, headers=header, allow_redirects=True, cookies=cookies
         )
@@ -96,9 +110,7 @@ class ArticleRetriever(object):
         """
         extract full-text url from pmc abstract page (https://pubmed.ncbi.nlm.nih.gov/{pmid}/)
         """
-        ua = UserAgent()
-        header = headers
-        header["User-Agent"] = str(ua.chrome)
+        header = get_request_headers()
         url = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
         r = make_get_request(url, headers=header, allow_redirects=True, cookies=cookies)
         if r.status_code != 200:
@@ -115,7 +127,18 @@ class ArticleRetriever(object):
     @article_processor
     def request_article(self, pmid: str):
         pmid = pmid.strip()
+        article_cache = get_article_cache_db()
+        if article_cache is not None:
+            text = article_cache.get_article(pmid)
+            if text is not None:
+                logger.info(f"Found {pmid} paper from article cache")
+                return True, text, 200
+        res, text, code = self._request_article(pmid)
+        if res and article_cache is not None:
+            article_cache.insert_article(pmid, text)
+        return res, text, code
 
+    def _request_article(self, pmid: str):
         # support full-text url directly
         if pmid.startswith("http"):
             return self._request_full_text_from_url(pmid)
@@ -142,23 +165,24 @@ class ExtendArticleRetriever(ArticleRetriever):
     """
     Comparing to ArticleRetriever, ExtendArticleRetriever will check if the article already exists first,
     if yes, the existed article will be returned, otherwise, it will download the article.
+    The article found in TEMP_FOLDER/{pmid} is stored in the article cache like a downloaded one.
     """
 
     def __init__(self):
         super().__init__()
 
-    def request_article(self, pmid: str):
+    def _request_article(self, pmid: str):
         pmid_folder = os.environ.get("TEMP_FOLDER", "./tmp")
         pmid_folder = os.path.join(pmid_folder, pmid)
         if not os.path.exists(pmid_folder):
-            return super().request_article(pmid)
+            return super()._request_article(pmid)
         html_files = []
         for root, dirs, files in os.walk(pmid_folder):
             html_files = [f for f in files if f.endswith("html")]
             html_files.sort()
             break
         if len(html_files) == 0:
-            return super().request_article(pmid)
+            return super()._request_article(pmid)
         the_file = os.path.join(root, html_files[-1])
         with open(the_file, "r") as fobj:
             content = fobj.read()
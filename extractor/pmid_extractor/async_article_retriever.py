@@ -0,0 +1,227 @@
+import asyncio
+from pathlib import Path
+import os
+import threading
+import time
+import logging
+import httpx
+import shortuuid
+
+from extractor.constants import (
+    ARTICLE_MAX_CONNECTIONS,
+    ARTICLE_REQUEST_TIMEOUT_SECONDS,
+    ARTICLE_REQUESTS_PER_SECOND,
+    cookies,
+)
+from extractor.database.article_cache_db import get_article_cache_db
+from extractor.pmid_extractor.article_retriever import (
+    ArticleRetriever,
+    get_request_headers,
+    normalize_article_text,
+)
+
+logger = logging.getLogger(__name__)
+
+PMC_BASE_URL = "https://www.ncbi.nlm.nih.gov"
+PUBMED_BASE_URL = "https://pubmed.ncbi.nlm.nih.gov"
+
+
+class AsyncRateLimiter(object):
+    """
+    Spaces the request starts to at most `rate` per second.
+
+    It is guarded by a thread lock instead of an asyncio lock, so one limiter can be
+    shared by the retrievers of different event loops.
+    """
+    def __init__(self, rate: float = ARTICLE_REQUESTS_PER_SECOND):
+        self.interval = 1.0 / rate if rate is not None and rate > 0 else 0.0
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    async def wait(self):
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start_time = max(now, self._next_time)
+            self._next_time = start_time + self.interval
+        delay = start_time - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# the process-wide limit of the article requests
+article_rate_limiter = AsyncRateLimiter()
+
+
+class AsyncArticleRetriever(object):
+    """
+    Retrieves articles with a pooled http client, so many pmids can be fetched
+    concurrently over keep-alive connections under a global rate limit.
+
+    The flow is the same as ArticleRetriever: PMC full text first, otherwise the full-text
+    link on the PubMed abstract page is fetched by the article service (BASE_URL).
+
+    Usage:
+    async with AsyncArticleRetriever() as retriever:
+        results = await retriever.request_articles(pmids)
+    """
+    def __init__(
+        self,
+        max_connections: int = ARTICLE_MAX_CONNECTIONS,
+        timeout: float = ARTICLE_REQUEST_TIMEOUT_SECONDS,
+        rate_limiter: AsyncRateLimiter | None = None,
+        pmc_base_url: str = PMC_BASE_URL,
+        pubmed_base_url: str = PUBMED_BASE_URL,
+        article_service_url: str | None = None,
+    ):
+        self.max_connections = max(1, max_connections)
+        self.rate_limiter = rate_limiter if rate_limiter is not None else article_rate_limiter
+        self.pmc_base_url = pmc_base_url.rstrip("/")
+        self.pubmed_base_url = pubmed_base_url.rstrip("/")
+        self.article_service_url = (
+            article_service_url
+            if article_service_url is not None
+            else os.environ.get("BASE_URL", "http://127.0.0.1:3000")
+        ).rstrip("/")
+        self.client = httpx.AsyncClient(
+            headers=get_request_headers(),
+            cookies=cookies,
+            follow_redirects=True,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _get(self, url: str, **kwargs) -> tuple[bool, httpx.Response | str, int]:
+        await self.rate_limiter.wait()
+        logger.info(f"make get request to {url}")
+        try:
+            res = await self.client.get(url, **kwargs)
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to request {url}: {e}")
+            return False, str(e), -1
+        return True, res, res.status_code
+
+    async def _request_full_text_from_url(self, url: str) -> tuple[bool, str, int]:
+        """
+        request full-text by url through the article service
+        """
+        fn = os.path.join(os.environ.get("TEMP_FOLDER", "./tmp"), shortuuid.uuid())
+        ok, res, code = await self._get(
+            f"{self.article_service_url}/api/article",
+            params={"url": url, "output": fn},
+        )
+        if not ok:
+            return False, res, code
+        # the service writes the article to the output file
+        the_file = Path(fn)
+        if res.status_code == 200 and the_file.exists():
+            text = await asyncio.to_thread(the_file.read_text)
+            the_file.unlink()
+            return True, text, 200
+        return (
+            False,
+            res.text
+            if res.status_code != 200
+            else f"failed to request full-text article (temporary file does not exist) - {res.reason_phrase}",
+            res.status_code,
+        )
+
+    async def _request_pmc_full_text(self, pmid: str) -> tuple[bool, str, int]:
+        if pmid.upper().startswith("PMC"):
+            url = f"{self.pmc_base_url}/pmc/articles/{pmid.upper()}"
+        else:
+            url = f"{self.pmc_base_url}/pmc/articles/pmid/{pmid}/"
+        ok, res, code = await self._get(url)
+        if not ok:
+            return False, res, code
+        if res.status_code == 200:
+            return True, res.text, res.status_code
+        return False, res.reason_phrase, res.status_code
+
+    async def _extract_full_text_url_from_abstract_page(self, pmid: str) -> tuple[bool, str, int]:
+        url = f"{self.pubmed_base_url}/{pmid}/"
+        ok, res, code = await self._get(url)
+        if ok and res.status_code == 200:
+            html_content = res.text
+        else:
+            ok, text, code = await self._request_full_text_from_url(url)
+            if not ok:
+                return False, "", code
+            html_content = text
+        # parsing is cpu bound, keep the event loop free for the other requests
+        return await asyncio.to_thread(ArticleRetriever()._extract_full_text_link, html_content)
+
+    async def request_article(self, pmid: str) -> tuple[bool, str, int]:
+        pmid = pmid.strip()
+        article_cache = get_article_cache_db()
+        text = None
+        if article_cache is not None:
+            text = await asyncio.to_thread(article_cache.get_article, pmid)
+        if text is not None:
+            logger.info(f"Found {pmid} paper from article cache")
+            res, code = True, 200
+        else:
+            res, text, code = await self._request_article(pmid)
+            if res and article_cache is not None:
+                await asyncio.to_thread(article_cache.insert_article, pmid, text)
+        if res and text is not None and len(text) > 0:
+            text = normalize_article_text(text)
+        return res, text, code
+
+    async def _request_article(self, pmid: str) -> tuple[bool, str, int]:
+        pmid = pmid.strip()
+
+        # support full-text url directly
+        if pmid.startswith("http"):
+            return await self._request_full_text_from_url(pmid)
+
+        pmid_cache = os.environ.get("PMID_CACHE", "false")
+        if pmid_cache.lower() == "true":
+            data_folder = os.environ.get("DATA_FOLDER", "./data")
+            pmid_path = Path(data_folder) / f"{pmid}.html"
+            if pmid_path.exists():
+                logger.info(f"Found {pmid} paper from cache")
+                return True, await asyncio.to_thread(pmid_path.read_text), 200
+
+        res, pmc_article, code = await self._request_pmc_full_text(pmid)
+        if res:
+            return True, pmc_article, code
+        res, full_text_url, code = await self._extract_full_text_url_from_abstract_page(pmid)
+        if not res:
+            logger.error("Can't extract full-text url from abstract page")
+            return res, full_text_url, code
+        return await self._request_full_text_from_url(full_text_url)
+
+    async def request_articles(self, pmids: list[str]) -> dict[str, tuple[bool, str, int]]:
+        """
+        request the articles concurrently, at most max_connections at the same time
+
+        Return:
+        {pmid: (res, text or error, status code)} in the order of pmids
+        """
+        semaphore = asyncio.Semaphore(self.max_connections)
+
+        async def request_one(pmid: str):
+            async with semaphore:
+                try:
+                    return await self.request_article(pmid)
+                except Exception as e:
+                    logger.error(f"Failed to request article {pmid}: {e}")
+                    return False, str(e), -1
+
+        pmids = list(dict.fromkeys(pmids))
+        results = await asyncio.gather(*[request_one(pmid) for pmid in pmids])
+        return dict(zip(pmids, results))
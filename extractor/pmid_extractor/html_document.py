@@ -0,0 +1,86 @@
+import copy
+from typing import Iterator
+
+from bs4 import BeautifulSoup, NavigableString, PageElement, Tag
+
+from extractor.constants import HTML_PARSER_FEATURES
+
+
+class HtmlDocument(object):
+    """
+    An html page parsed once and shared by the table, title, abstract and section extractors.
+
+    `soup` is the shared tree, the extractors only read it. The extractors that leave out
+    elements (anchors, tables) skip them while walking the tree, see `get_text_without`.
+    """
+    def __init__(self, html: str, features: str = HTML_PARSER_FEATURES):
+        self.html = html
+        self.features = features
+        self._soup: BeautifulSoup | None = None
+        self._text_no_table: str | None = None
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        if self._soup is None:
+            self._soup = self.parse()
+        return self._soup
+
+    def parse(self) -> BeautifulSoup:
+        """return a new tree that the caller can modify"""
+        return BeautifulSoup(self.html, self.features)
+
+    def get_text_no_table(self) -> str:
+        if self._text_no_table is None:
+            self._text_no_table = get_text_without(self.soup, ["table"], separator="\n", strip=True)
+        return self._text_no_table
+
+
+def get_html_document(html: "str | HtmlDocument") -> HtmlDocument:
+    return html if isinstance(html, HtmlDocument) else HtmlDocument(html)
+
+
+def is_inside(el: PageElement, names: list[str], root: Tag | None = None) -> bool:
+    """whether el is, or is below, an element of the given names (below root)"""
+    if isinstance(el, Tag) and el.name in names:
+        return True
+    for parent in el.parents:
+        if parent is root:
+            break
+        if parent.name in names:
+            return True
+    return False
+
+
+def iter_strings_without(tag: Tag, names: list[str], strip: bool = False) -> Iterator[str]:
+    """the strings of tag.get_text(), but those below the elements of the given names"""
+    types = tag.interesting_string_types
+    for descendant in tag.descendants:
+        if not isinstance(descendant, NavigableString):
+            continue
+        if isinstance(types, type):
+            if type(descendant) is not types:
+                continue
+        elif types is not None and type(descendant) not in types:
+            continue
+        if is_inside(descendant, names, tag):
+            continue
+        text = descendant.strip() if strip else str(descendant)
+        if strip and len(text) == 0:
+            continue
+        yield text
+
+
+def get_text_without(tag: Tag, names: list[str], separator: str = "", strip: bool = False) -> str:
+    """
+    tag.get_text() as if the elements of the given names were decomposed, the tree is not
+    modified
+    """
+    return separator.join(iter_strings_without(tag, names, strip))
+
+
+def copy_without(tag: Tag, names: list[str]) -> Tag:
+    """a copy of tag with the elements of the given names decomposed"""
+    tag = copy.copy(tag)
+    for el in tag.find_all(names):
+        el.decompose()
+    return tag
@@ -4,6 +4,13 @@ from bs4 import BeautifulSoup, Tag
 from typing import Callable, Optional
 import pandas as pd
 from TabFuncFlow.utils.table_utils import html_table_to_markdown, dataframe_to_markdown
+from extractor.pmid_extractor.html_document import (
+    HtmlDocument,
+    copy_without,
+    get_html_document,
+    get_text_without,
+    is_inside,
+)
 from extractor.utils import convert_html_table_to_dataframe, escape_braces_for_format
 from typing import List, Optional, Dict
 
@@ -141,8 +148,8 @@ class HtmlTableParser(object):
         return None, None, None
         
 
-    def _extract_epub_tables(self, html: str) -> list[dict]:
-        soup = BeautifulSoup(html, "html.parser")
+    def _extract_epub_tables(self, html: str | HtmlDocument) -> list[dict]:
+        soup = get_html_document(html).soup
         scripts = soup.find_all("script")
         script_tag = None
         for script in scripts:
@@ -191,8 +198,8 @@ class HtmlTableParser(object):
         return table_list
         
 
-    def _extract_common_tables(self, html: str):
-        soup = BeautifulSoup(html, "html.parser")
+    def _extract_common_tables(self, html: str | HtmlDocument):
+        soup = get_html_document(html).soup
         tags = soup.select("table")
         tables = []
         for tag in tags:
@@ -212,10 +219,11 @@ class HtmlTableParser(object):
             )
         return tables
     
-    def extract_tables(self, html: str):
-        table_list = self._extract_common_tables(html)
+    def extract_tables(self, html: str | HtmlDocument):
+        doc = get_html_document(html)
+        table_list = self._extract_common_tables(doc)
         if table_list is None or len(table_list) == 0:
-            table_list = self._extract_epub_tables(html)
+            table_list = self._extract_epub_tables(doc)
         return table_list
 
     def _traverse_up(self, cur: Tag | None, level: int, max_level: int, check_cb: Callable):
@@ -243,7 +251,7 @@ class HtmlTableParser(object):
             return False
         return False
 
-    def extract_title(self, html: str):
+    def extract_title(self, html: str | HtmlDocument):
         def check_title_in_tag_classes(tag: Tag):
             if tag is None:
                 return False
@@ -269,7 +277,7 @@ class HtmlTableParser(object):
             else:
                 return False
         
-        soup = BeautifulSoup(html, "html.parser")
+        soup = get_html_document(html).soup
         tags = soup.select("h1")
         for tag in tags:
             if self._traverse_up(tag, 1, 5, check_title_in_tag_classes):
@@ -281,9 +289,11 @@ class HtmlTableParser(object):
 
     def _find_first_occurrence(self,
                                soup: BeautifulSoup,
-                               keywords: List[str]) -> Optional[Tag]:
+                               keywords: List[str],
+                               excluded: Optional[List[str]] = None) -> Optional[Tag]:
         """
         Yichuan 0528
+        excluded: the elements of these names, and all below them, are skipped
         """
         kw_lower = [k.lower() for k in keywords]
         valid_tags = {"section", "div", "article", "main", "h1", "h2", "h3", "p", "ul", "ol", "table", "article"}
@@ -291,6 +301,8 @@ class HtmlTableParser(object):
         for el in soup.find_all(True):
             if el.name not in valid_tags:
                 continue
+            if excluded and is_inside(el, excluded):
+                continue
             if any(kw in cls.lower() for cls in el.get("class", []) for kw in kw_lower):
                 return el
             if any(kw in (el.get("id", "").lower()) for kw in kw_lower):
@@ -300,7 +312,7 @@ class HtmlTableParser(object):
                 return el
         return None
 
-    def extract_abstract(self, html: str):
+    def extract_abstract(self, html: str | HtmlDocument):
         """
         Yichuan 0528
         """
@@ -312,7 +324,7 @@ class HtmlTableParser(object):
                 return section["content"].replace("\n", " ")
         return (sections[0]["section"] + "\n" + sections[0]["content"]).replace("\n", " ") + "\n......" or None
 
-    def extract_sections(self, html: str):
+    def extract_sections(self, html: str | HtmlDocument):
         """
         Yichuan 0528
         Generic section extraction for main body content (non-PMC).
@@ -325,11 +337,11 @@ class HtmlTableParser(object):
                 "supplementary", "supplements"
         ]
 
-        soup = BeautifulSoup(html, "html.parser")
-        for a in soup.find_all("a"):
-            a.decompose()
+        # the anchors are left out, the shared tree is walked without modifying it
+        soup = get_html_document(html).soup
+        excluded = ["a"]
 
-        start = self._find_first_occurrence(soup, ["abstract"])
+        start = self._find_first_occurrence(soup, ["abstract"], excluded)
         if not start:
             return None
 
@@ -340,9 +352,11 @@ class HtmlTableParser(object):
         block_tags = ["p", "ul", "ol", "div", "section", "article"]
 
         for el in start.find_all_next():
+            if is_inside(el, excluded):
+                continue
             # ── 1. Handle section headings ───────────────────────────────
             if el.name in heading_tags:
-                h_raw = el.get_text(strip=True)
+                h_raw = get_text_without(el, excluded, strip=True)
                 h_low = h_raw.lower()
 
                 # On encountering References/Acknowledgements → finalize and exit
@@ -367,7 +381,7 @@ class HtmlTableParser(object):
 
             if el.name == "table":
                 try:
-                    df = convert_html_table_to_dataframe(str(el))
+                    df = convert_html_table_to_dataframe(str(copy_without(el, excluded)))
                     # I use this one instead of the custom html_table_to_dataframe implementation,
                     # because it uses StringIO and is likely more robust.
                     # That said, the previous custom version hasn’t caused any major issues so far,
@@ -381,7 +395,7 @@ class HtmlTableParser(object):
                     pass
 
             if el.name in block_tags:
-                txt = el.get_text(separator="\n", strip=True)
+                txt = get_text_without(el, excluded, separator="\n", strip=True)
                 if txt and txt not in seen_global:
                     current["content"] += txt + "\n"
                     seen_global.add(txt)
@@ -399,18 +413,17 @@ class PMCHtmlTableParser(object):
     def __init__(self):
         pass
 
-    def extract_tables(self, html: str):
-        soup = BeautifulSoup(html, "html.parser")
+    def extract_tables(self, html: str | HtmlDocument):
+        soup = get_html_document(html).soup
         tags = soup.select("div.table-wrap.anchored.whole_rhythm")
         tables = []
         for tag in tags:
-            tbl_soup = BeautifulSoup(str(tag), "html.parser")
-            caption = tbl_soup.select("div.caption")
+            caption = tag.select("div.caption")
             caption = caption[0].text if len(caption) > 0 else ""
-            table = tbl_soup.select("div.xtable")
+            table = tag.select("div.xtable")
             table = str(table[0]) if len(table) > 0 else ""
             table = convert_html_table_to_dataframe(table)
-            footnote = tbl_soup.select("div.tblwrap-foot")
+            footnote = tag.select("div.tblwrap-foot")
             footnote = footnote[0].text if len(footnote) > 0 else ""
             tables.append(
                 {
@@ -423,8 +436,8 @@ class PMCHtmlTableParser(object):
 
         return tables
 
-    def extract_title(self, html: str):
-        soup = BeautifulSoup(html, "html.parser")
+    def extract_title(self, html: str | HtmlDocument):
+        soup = get_html_document(html).soup
         tags = soup.select("hgroup h1")
         for tag in tags:
             text = get_tag_text(tag)
@@ -432,11 +445,11 @@ class PMCHtmlTableParser(object):
                 return text.strip()
         return None
 
-    def extract_abstract(self, html: str):
+    def extract_abstract(self, html: str | HtmlDocument):
         """
         Yichuan 0501
         """
-        soup = BeautifulSoup(html, "html.parser")
+        soup = get_html_document(html).soup
 
         # Find a heading tag that contains the word "abstract" (case-insensitive)
         abstract_heading = soup.find(
@@ -459,7 +472,7 @@ class PMCHtmlTableParser(object):
 
         return abstract_text.strip()
 
-    def extract_sections(self, html: str):
+    def extract_sections(self, html: str | HtmlDocument):
         """
         Yichuan 0505
         Extracts sections (h2/h3) and content between 'Abstract' and 'References' headings.
@@ -469,7 +482,7 @@ class PMCHtmlTableParser(object):
             "reference", "acknowledgement", "acknowledgment", "supplementary",
             "references", "acknowledgements", "acknowledgments", "supplements"
         ]
-        soup = BeautifulSoup(html, "html.parser")
+        soup = get_html_document(html).soup
         body = soup.body
         if not body:
             return []
@@ -535,41 +548,45 @@ class HtmlTableExtractor(object):
             HtmlTableParser(),
         ]
 
-    def extract_tables(self, html: str):
+    def extract_tables(self, html: str | HtmlDocument):
+        doc = get_html_document(html)
         tables = []
         for parser in self.parsers:
-            tables = parser.extract_tables(html)
+            tables = parser.extract_tables(doc)
             if tables and len(tables) > 0:
                 break
 
         tables = HtmlTableExtractor._remove_duplicate(tables)
         return tables
     
-    def extract_title(self, html: str):
+    def extract_title(self, html: str | HtmlDocument):
+        doc = get_html_document(html)
         for parser in self.parsers:
-            title = parser.extract_title(html)
+            title = parser.extract_title(doc)
             if title is not None:
                 return escape_braces_for_format(title)
             
         return None
 
-    def extract_abstract(self, html: str):
+    def extract_abstract(self, html: str | HtmlDocument):
         """
         Yichuan 0501
         """
+        doc = get_html_document(html)
         for parser in self.parsers:
-            abstract = parser.extract_abstract(html)
+            abstract = parser.extract_abstract(doc)
             if abstract is not None:
                 return escape_braces_for_format(abstract)
 
         return None
 
-    def extract_sections(self, html: str):
+    def extract_sections(self, html: str | HtmlDocument):
         """
         Yichuan 0505
         """
+        doc = get_html_document(html)
         for parser in self.parsers:
-            sections = parser.extract_sections(html)
+            sections = parser.extract_sections(doc)
             if sections is not None:
                 # return sections
                 for s in sections:
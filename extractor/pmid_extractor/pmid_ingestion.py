@@ -0,0 +1,167 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+import time
+import logging
+
+from extractor.constants import INGESTION_BATCH_SIZE
+from extractor.database.pmid_db import PMIDDB
+from extractor.pmid_extractor.html_document import HtmlDocument
+from extractor.pmid_extractor.html_table_extractor import HtmlTableExtractor
+from extractor.pmid_extractor.section_index import SectionIndex
+from extractor.utils import (
+    convert_html_to_text_no_table,
+    convert_sections_to_full_text,
+    remove_references,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestionReport:
+    """result of ingesting html files into pmid db"""
+
+    pmids: list[str] = field(default_factory=list)  # the pmids in db, in input order
+    inserted: int = 0
+    skipped: int = 0
+    failed: int = 0
+    failures: list[tuple[str, str]] = field(default_factory=list)  # (pmid, reason)
+    elapsed: float = 0.0  # seconds
+
+    @property
+    def papers_per_second(self) -> float:
+        return self.inserted / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def parse_pmid_html_file(pmid_and_path: tuple[str, str]) -> tuple[str, dict | None, str | None]:
+    """
+    parse the html file of a paper, it runs in the worker processes
+
+    Return:
+    (pmid, pmid info or None, error message or None)
+    """
+    pmid, html_path = pmid_and_path
+    html_file = Path(html_path)
+    if not html_file.exists():
+        return pmid, None, f"HTML file not found: {html_file}"
+    try:
+        html_content = html_file.read_text(encoding="utf-8", errors="ignore")
+    except Exception as e:
+        return pmid, None, f"failed to read {html_file}: {e}"
+
+    try:
+        extractor = HtmlTableExtractor()
+        doc = HtmlDocument(html_content)
+        tables = extractor.extract_tables(doc) or []
+        sections = extractor.extract_sections(doc) or []
+        abstract = extractor.extract_abstract(doc)
+        title = extractor.extract_title(doc)
+
+        if sections:
+            full_text = convert_sections_to_full_text(sections)
+        else:
+            full_text = remove_references(convert_html_to_text_no_table(doc))
+        # build the retrieval index here, the workers share the tokenizing work
+        section_index_json = SectionIndex(sections).to_json()
+    except Exception as e:
+        return pmid, None, f"failed to parse HTML: {e}"
+
+    return pmid, {
+        "pmid": pmid,
+        "title": title,
+        "abstract": abstract,
+        "full_text": full_text,
+        "tables": tables,
+        "sections": sections,
+        "section_index_json": section_index_json,
+    }, None
+
+
+def ingest_pmid_html_files(
+    pmid_html_files: list[tuple[str, str]],
+    pmid_db: PMIDDB,
+    max_workers: int | None = None,
+    batch_size: int = INGESTION_BATCH_SIZE,
+) -> IngestionReport:
+    """
+    Parse the html files in a process pool and insert the papers into pmid db in batches.
+
+    The papers already in db are skipped. If the papers in db can't be checked, nothing is
+    ingested and every pmid is reported as failed.
+
+    Args:
+    pmid_html_files list[tuple[str, str]]: (pmid, html file path)
+    pmid_db PMIDDB: the pmid db
+    max_workers int or None: number of parsing processes, os.cpu_count() if None, 1 parses in this process
+    batch_size int: number of papers inserted in one transaction
+
+    Return:
+    IngestionReport
+    """
+    report = IngestionReport()
+    start = time.perf_counter()
+
+    existing = pmid_db.select_existing_pmids([pmid for pmid, _ in pmid_html_files])
+    if existing is None:
+        # without the existing pmids the papers in db would be overwritten, so abort
+        logger.error("Failed to check the existing PMIDs in DB, aborting the ingestion.")
+        for pmid in dict.fromkeys(pmid for pmid, _ in pmid_html_files):
+            report.failed += 1
+            report.failures.append((pmid, "failed to check the existing pmids in db"))
+        report.elapsed = time.perf_counter() - start
+        return report
+    to_parse = []
+    seen = set()
+    for pmid, html_path in pmid_html_files:
+        if pmid in existing:
+            logger.info(f"PMID {pmid} already exists in DB. Skipping.")
+            report.skipped += 1
+            continue
+        if pmid in seen:
+            report.skipped += 1
+            continue
+        seen.add(pmid)
+        to_parse.append((pmid, html_path))
+
+    ok_pmids = set(existing)
+    batch: list[dict] = []
+
+    def flush():
+        if len(batch) == 0:
+            return
+        if pmid_db.insert_pmid_infos(batch) == len(batch):
+            report.inserted += len(batch)
+            ok_pmids.update(info["pmid"] for info in batch)
+        else:
+            for info in batch:
+                report.failed += 1
+                report.failures.append((info["pmid"], "failed to insert into db"))
+        batch.clear()
+
+    def collect(results):
+        for pmid, info, error in results:
+            if info is None:
+                logger.error(f"Failed to ingest PMID {pmid}: {error}")
+                report.failed += 1
+                report.failures.append((pmid, error))
+                continue
+            batch.append(info)
+            if len(batch) >= batch_size:
+                flush()
+
+    if max_workers == 1 or len(to_parse) <= 1:
+        collect(map(parse_pmid_html_file, to_parse))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            collect(executor.map(parse_pmid_html_file, to_parse, chunksize=4))
+    flush()
+
+    report.pmids = [pmid for pmid in dict.fromkeys(pmid for pmid, _ in pmid_html_files) if pmid in ok_pmids]
+    report.elapsed = time.perf_counter() - start
+    logger.info(
+        f"Ingestion completed in {report.elapsed:.1f}s: inserted={report.inserted}, "
+        f"skipped={report.skipped}, failed={report.failed}, "
+        f"throughput={report.papers_per_second:.2f} papers/s"
+    )
+    return report
@@ -0,0 +1,164 @@
+from collections import Counter
+from dataclasses import astuple, dataclass
+import json
+import math
+import re
+import logging
+
+from extractor.constants import SECTION_PASSAGE_MAX_TOKENS
+from extractor.llm_rate_limiter import estimate_text_tokens
+from extractor.utils import convert_html_to_text_no_table
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in",
+    "is", "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "which",
+    "with", "we", "our", "these", "those", "than", "then", "there", "been", "not", "no",
+}
+
+# the sections after these headings are not indexed, same as remove_references on the full text
+EXCLUDED_SECTION_PATTERN = re.compile(
+    r"^\s*(references|bibliography|acknowledge?ments?)\b", re.IGNORECASE,
+)
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOP_WORDS]
+
+
+@dataclass
+class Passage:
+    section_index: int
+    section: str
+    text: str
+    n_tokens: int  # estimated llm tokens of the text
+
+
+def split_sections_to_passages(
+    sections: list[dict[str, str]],
+    max_passage_tokens: int = SECTION_PASSAGE_MAX_TOKENS,
+) -> list[Passage]:
+    """
+    convert the html sections to text and split them into passages of up to max_passage_tokens,
+    a passage is made of whole lines, so a line longer than max_passage_tokens is a passage
+    on its own
+    """
+    passages = []
+    for ix, sec in enumerate(sections):
+        heading = (sec.get("section") or "").strip()
+        if EXCLUDED_SECTION_PATTERN.match(heading):
+            break
+        text = convert_html_to_text_no_table(sec.get("content") or "")
+        lines: list[str] = []
+        n_tokens = 0
+        for line in text.split("\n"):
+            line_tokens = estimate_text_tokens(line)
+            if len(lines) > 0 and n_tokens + line_tokens > max_passage_tokens:
+                passages.append(Passage(ix, heading, "\n".join(lines), n_tokens))
+                lines, n_tokens = [], 0
+            lines.append(line)
+            n_tokens += line_tokens
+        if len(lines) > 0:
+            passages.append(Passage(ix, heading, "\n".join(lines), n_tokens))
+    return passages
+
+
+class SectionIndex:
+    """
+    BM25 index over the passages of the sections of one paper, it has no network or model
+    dependency. It is built when the paper is ingested and stored with it, see to_json.
+    """
+    def __init__(
+        self,
+        sections: list[dict[str, str]],
+        max_passage_tokens: int = SECTION_PASSAGE_MAX_TOKENS,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.max_passage_tokens = max_passage_tokens
+        self.passages = split_sections_to_passages(sections, max_passage_tokens)
+        self.k1 = k1
+        self.b = b
+        self._set_term_freqs([Counter(tokenize(f"{p.section}\n{p.text}")) for p in self.passages])
+
+    def _set_term_freqs(self, term_freqs: list[Counter]):
+        self._term_freqs = term_freqs
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = sum(self._lengths) / len(self._lengths) if len(self._lengths) > 0 else 0.0
+        doc_freqs = Counter(term for tf in self._term_freqs for term in tf)
+        n = len(self.passages)
+        self._idf = {
+            term: math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freqs.items()
+        }
+
+    def to_json(self) -> str:
+        """the passages and their term frequencies, the rest is derived by from_json"""
+        return json.dumps({
+            "max_passage_tokens": self.max_passage_tokens,
+            "k1": self.k1,
+            "b": self.b,
+            "passages": [astuple(p) for p in self.passages],
+            "term_freqs": [dict(tf) for tf in self._term_freqs],
+        })
+
+    @classmethod
+    def from_json(cls, index_json: str) -> "SectionIndex":
+        data = json.loads(index_json)
+        index = cls.__new__(cls)
+        index.max_passage_tokens = data["max_passage_tokens"]
+        index.passages = [Passage(*p) for p in data["passages"]]
+        index.k1 = data["k1"]
+        index.b = data["b"]
+        index._set_term_freqs([Counter(tf) for tf in data["term_freqs"]])
+        return index
+
+    @property
+    def n_tokens(self) -> int:
+        return sum(p.n_tokens for p in self.passages)
+
+    def score(self, query: str) -> list[float]:
+        """return the BM25 score of every passage"""
+        terms = [t for t in set(tokenize(query)) if t in self._idf]
+        scores = []
+        for tf, length in zip(self._term_freqs, self._lengths):
+            norm = self.k1 * (1.0 - self.b + self.b * length / self._avg_length) if self._avg_length > 0 else self.k1
+            scores.append(sum(
+                self._idf[t] * tf[t] * (self.k1 + 1.0) / (tf[t] + norm)
+                for t in terms if t in tf
+            ))
+        return scores
+
+    def retrieve(self, query: str, max_tokens: int) -> list[Passage]:
+        """
+        return the most relevant passages that fit in max_tokens, in the order of the paper.
+        The passages not matching the query fill the budget left, in the order of the paper.
+        """
+        scores = self.score(query)
+        ranked = sorted(range(len(self.passages)), key=lambda ix: (-scores[ix], ix))
+        selected = []
+        n_tokens = 0
+        for ix in ranked:
+            passage = self.passages[ix]
+            # count the section heading added in front of the first passage of a section
+            if n_tokens + passage.n_tokens + estimate_text_tokens(passage.section) > max_tokens:
+                continue
+            selected.append(ix)
+            n_tokens += passage.n_tokens + estimate_text_tokens(passage.section)
+        return [self.passages[ix] for ix in sorted(selected)]
+
+    def get_text(self, query: str, max_tokens: int) -> str:
+        """
+        return the relevant passages as article text, under the heading of their section
+        """
+        lines = []
+        section_index = None
+        for passage in self.retrieve(query, max_tokens):
+            if passage.section_index != section_index:
+                section_index = passage.section_index
+                if len(passage.section) > 0:
+                    lines.append(passage.section)
+            lines.append(passage.text)
+        return "\n".join(lines)
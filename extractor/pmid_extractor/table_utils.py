@@ -1,4 +1,5 @@
 from typing import List
+import hashlib
 from pandas import DataFrame
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
@@ -135,6 +136,22 @@ def post_process_selected_table_ids(
     return tables
 
 
+def get_tables_hash(html_tables: list[dict[str, str | DataFrame]]) -> str:
+    """the hash of the tables content that the table selection prompts are built from"""
+    table_content = generate_tables_prompts(html_tables, True)
+    return hashlib.sha256(table_content.encode("utf-8")).hexdigest()
+
+
+def select_tables_by_indexes(
+    html_tables: list[dict[str, str | DataFrame]],
+    selected_table_indexes: list[str],
+):
+    return post_process_selected_table_ids(
+        TablesSelectionResult(reasoning_process="", selected_table_indexes=selected_table_indexes),
+        html_tables,
+    )
+
+
 def select_pk_summary_tables(html_tables: list[dict[str, str | DataFrame]], llm):
     table_content = generate_tables_prompts(html_tables, True)
     system_prompt = SELECT_PK_TABLES_PROMPT.format(table_content=table_content)
@@ -11,6 +11,8 @@ from io import StringIO
 import re
 import math
 
+from extractor.pmid_extractor.html_document import HtmlDocument
+
 logger = logging.getLogger(__name__)
 
 
@@ -90,10 +92,12 @@ def convert_html_to_text(html_content: str) -> str:
     return text
 
 
-def convert_html_to_text_no_table(html_content: str) -> str:
+def convert_html_to_text_no_table(html_content: str | HtmlDocument) -> str:
     """
     Yichuan: convert_html_to_text, but no table
     """
+    if isinstance(html_content, HtmlDocument):
+        return html_content.get_text_no_table()
     soup = BeautifulSoup(html_content, "html.parser")
     for table in soup.find_all("table"):
         table.decompose()
@@ -1,5 +1,6 @@
 
 import pytest
+from TabFuncFlow.utils.table_utils import ParsedTable
 from extractor.agents.pk_summary.pk_sum_drug_info_step import DrugInfoExtractionStep
 from extractor.agents.pk_summary.pk_sum_workflow_utils import PKSumWorkflowState
 
@@ -17,7 +18,7 @@ def test_DrugInfoExtractionStep_16143486_table_4(
     step.execute(state)
 
     assert state["md_table_drug"] is not None
-    assert type(state["md_table_drug"]) == str
+    assert isinstance(state["md_table_drug"], ParsedTable)
 
 def test_DrugInfoExtractionStep_22050870_table_3(
     llm,
@@ -37,5 +38,5 @@ def test_DrugInfoExtractionStep_22050870_table_3(
     step.execute(state)
 
     assert state["md_table_drug"] is not None
-    assert type(state["md_table_drug"]) == str
+    assert isinstance(state["md_table_drug"], ParsedTable)
 
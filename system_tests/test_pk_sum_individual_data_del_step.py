@@ -1,5 +1,6 @@
 
 import pytest
+from TabFuncFlow.utils.table_utils import ParsedTable
 from extractor.agents.pk_summary.pk_sum_individual_data_del_step import (
     IndividualDataDelStep,
 )
@@ -26,7 +27,7 @@ def test_IndividualDataDelStep(
     step.execute(state)
 
     assert state["md_table_summary"] is not None
-    assert type(state["md_table_summary"]) == str
+    assert isinstance(state["md_table_summary"], ParsedTable)
 
 @pytest.mark.skip()
 def test_IndividualDataDelStep_16143486_table_2(
@@ -45,7 +46,7 @@ def test_IndividualDataDelStep_16143486_table_2(
     step.execute(state)
 
     assert state["md_table_summary"] is not None
-    assert type(state["md_table_summary"]) == str
+    assert isinstance(state["md_table_summary"], ParsedTable)
 
 def test_IndividualDataDelStep_18426260_table_0(
     llm,
@@ -63,5 +64,5 @@ def test_IndividualDataDelStep_18426260_table_0(
     step.execute(state)
 
     assert state["md_table_summary"] is not None
-    assert type(state["md_table_summary"]) == str
+    assert isinstance(state["md_table_summary"], ParsedTable)
 
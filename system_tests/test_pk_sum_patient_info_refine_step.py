@@ -1,4 +1,5 @@
 import pytest
+from TabFuncFlow.utils.table_utils import ParsedTable
 
 from extractor.agents.pk_summary.pk_sum_workflow_utils import PKSumWorkflowState
 from extractor.agents.pk_summary.pk_sum_patient_info_refine_step import (
@@ -17,7 +18,7 @@ def test_PatientInfoRefinementStep(llm, md_table, caption, md_table_patient):
     step.execute(state)
 
     assert state["md_table_patient_refined"] is not None
-    assert type(state["md_table_patient_refined"]) == str
+    assert isinstance(state["md_table_patient_refined"], ParsedTable)
 
 
 def test_PatientInfoRefinementStep_34114632_table_3(
@@ -35,4 +36,4 @@ def test_PatientInfoRefinementStep_34114632_table_3(
     step.execute(state)
 
     assert state["md_table_patient_refined"] is not None
-    assert type(state["md_table_patient_refined"]) == str
+    assert isinstance(state["md_table_patient_refined"], ParsedTable)
@@ -1,4 +1,5 @@
 import pytest
+from TabFuncFlow.utils.table_utils import ParsedTable
 
 from extractor.agents.pk_summary.pk_sum_workflow_utils import PKSumWorkflowState
 from extractor.agents.pk_summary.pk_sum_patient_info_step import (
@@ -19,7 +20,7 @@ def test_PatientInfoRefinementStep_22050870_table_3(
     step.execute(state)
 
     assert state["md_table_patient_refined"] is not None
-    assert type(state["md_table_patient_refined"]) == str
+    assert isinstance(state["md_table_patient_refined"], ParsedTable)
 
 @pytest.mark.skip()
 def test_PatientInfoRefinementStep_34183327_table_2(
@@ -35,7 +36,7 @@ def test_PatientInfoRefinementStep_34183327_table_2(
     step.execute(state)
 
     assert state["md_table_patient_refined"] is not None
-    assert type(state["md_table_patient_refined"]) == str
+    assert isinstance(state["md_table_patient_refined"], ParsedTable)
 
 def test_PatientInfoRefinementStep_34114632_table_2(
     llm, 
@@ -56,4 +57,4 @@ def test_PatientInfoRefinementStep_34114632_table_2(
     step.execute(state)
 
     assert state["md_table_patient"] is not None
-    assert type(state["md_table_patient"]) == str
+    assert isinstance(state["md_table_patient"], ParsedTable)
@@ -37,6 +37,11 @@ def get_azure_openai():
         # presence_penalty=0,
     )
 
+@pytest.fixture(autouse=True)
+def no_article_cache(monkeypatch):
+    # the retriever tests mock the network, don't read or fill the shared article cache
+    monkeypatch.setenv("ARTICLE_CACHE", "false")
+
 @pytest.fixture(scope="module")
 def azure_llm():
     return get_azure_openai()
@@ -0,0 +1,83 @@
+import time
+import pytest
+
+from extractor.database.article_cache_db import ArticleCacheDB
+
+
+@pytest.fixture
+def article_cache(tmp_path):
+    db = ArticleCacheDB(tmp_path / "article_cache")
+    yield db
+    db.close()
+
+
+def _get_blobs(db: ArticleCacheDB):
+    return sorted(p for p in (db.cache_folder / "objects").rglob("*.zst"))
+
+
+def test_article_cache(article_cache):
+    html = "<html><body>" + "paper " * 1000 + "</body></html>"
+    assert article_cache.get_article("123") is None
+    assert article_cache.insert_article("123", html)
+    assert article_cache.get_article("123") == html
+
+    # the same page under another key is stored once
+    assert article_cache.insert_article("https://publisher.example/123", html)
+    assert len(_get_blobs(article_cache)) == 1
+    assert _get_blobs(article_cache)[0].stat().st_size < len(html)
+
+    # the replaced page is removed once no key refers to it
+    assert article_cache.insert_article("123", "<html>new</html>")
+    assert article_cache.get_article("123") == "<html>new</html>"
+    assert len(_get_blobs(article_cache)) == 2
+    assert article_cache.insert_article("https://publisher.example/123", "<html>new</html>")
+    assert len(_get_blobs(article_cache)) == 1
+
+    stats = article_cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 2)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+
+def test_article_cache_eviction(tmp_path):
+    db = ArticleCacheDB(tmp_path / "article_cache", max_bytes=None, max_age_seconds=0.05)
+    assert db.insert_article("1", "<html>1</html>")
+    time.sleep(0.1)
+    assert db.get_article("1") is None
+    assert _get_blobs(db) == []
+
+    db.max_age_seconds = None
+    for i in range(5):
+        assert db.insert_article(str(i), f"<html>{i}</html>" * (i + 1))
+        time.sleep(0.01)
+    db.get_article("0")  # 0 is now the most recently used
+    size = sum(p.stat().st_size for p in _get_blobs(db))
+    db.max_bytes = size - 1
+    assert db.insert_article("5", "<html>5</html>")
+    # the least recently used pages are evicted
+    assert db.get_article("1") is None
+    assert db.get_article("0") is not None
+    assert db.get_article("5") is not None
+    db.close()
+
+
+def test_article_cache_keeps_blob_removed_during_insert(article_cache):
+    html = "<html>shared page</html>"
+    assert article_cache.insert_article("a", html)
+    # another process expires "a" and removes the page after "b" found its blob
+    other = ArticleCacheDB(article_cache.cache_folder, max_age_seconds=0)
+    write_blob = article_cache._write_blob
+    n_calls = 0
+
+    def racing_write_blob(content_hash, data):
+        nonlocal n_calls
+        size = write_blob(content_hash, data)
+        n_calls += 1
+        if n_calls == 1:
+            assert other.get_article("a") is None
+            assert _get_blobs(article_cache) == []
+        return size
+
+    article_cache._write_blob = racing_write_blob
+    assert article_cache.insert_article("b", html)
+    assert article_cache.get_article("b") == html
+    other.close()
@@ -1,7 +1,9 @@
 
 import pytest
 
-from extractor.pmid_extractor.article_retriever import ArticleRetriever
+from extractor.database import article_cache_db
+from extractor.database.article_cache_db import ArticleCacheDB
+from extractor.pmid_extractor.article_retriever import ArticleRetriever, ExtendArticleRetriever
 from extractor.pmid_extractor.html_table_extractor import HtmlTableExtractor
 from extractor.utils import convert_html_to_text_no_table, remove_references
 
@@ -22,3 +24,21 @@ def test_get_epub_data(pmid):
     full_text = remove_references(full_text)
     assert res
 
+def test_extend_article_retriever_uses_article_cache(tmp_path, monkeypatch):
+    cache = ArticleCacheDB(tmp_path / "article_cache")
+    monkeypatch.setenv("ARTICLE_CACHE", "true")
+    monkeypatch.setattr(article_cache_db, "_article_cache_db", cache)
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path / "tmp"))
+    pmid_folder = tmp_path / "tmp" / "123"
+    pmid_folder.mkdir(parents=True)
+    (pmid_folder / "123.html").write_text("<html>local paper</html>")
+
+    retriever = ExtendArticleRetriever()
+    # the local article is stored in the article cache
+    assert retriever.request_article("123") == (True, "<html>local paper</html>", 200)
+    assert cache.get_article("123") == "<html>local paper</html>"
+
+    # the article cache is read first
+    assert cache.insert_article("123", "<html>cached paper</html>")
+    assert retriever.request_article("123") == (True, "<html>cached paper</html>", 200)
+    cache.close()
@@ -0,0 +1,137 @@
+import asyncio
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+import pytest
+
+from extractor.database.article_cache_db import ArticleCacheDB
+from extractor.pmid_extractor import async_article_retriever
+from extractor.pmid_extractor.async_article_retriever import AsyncArticleRetriever, AsyncRateLimiter
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, code: int, body: str):
+        data = body.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.client_ports.add(self.client_address[1])
+            server.n_requests += 1
+        url = urlparse(self.path)
+        if url.path.startswith("/pmc/articles/pmid/"):
+            pmid = url.path.split("/")[-2]
+            # the papers with short pmids are in PMC
+            if len(pmid) < 3:
+                return self._reply(200, f"<html><body>PMC\xa0article {pmid}</body></html>")
+            return self._reply(404, "not found")
+        if url.path.startswith("/pubmed/"):
+            pmid = url.path.split("/")[-2]
+            return self._reply(200, (
+                '<div class="full-view"><div class="full-text-links-list">'
+                f'<a class="link-item" href="https://publisher.example/{pmid}">full text</a>'
+                '</div></div>'
+            ))
+        if url.path == "/api/article":
+            params = parse_qs(url.query)
+            Path(params["output"][0]).write_text(f"<html>publisher {params['url'][0]}</html>")
+            return self._reply(200, "{}")
+        return self._reply(404, "not found")
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.lock = threading.Lock()
+    server.client_ports = set()
+    server.n_requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _get_retriever(server, **kwargs):
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    return AsyncArticleRetriever(
+        pmc_base_url=base_url,
+        pubmed_base_url=f"{base_url}/pubmed",
+        article_service_url=base_url,
+        **kwargs,
+    )
+
+
+def test_async_article_retriever(stub_server, tmp_path, monkeypatch):
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+    monkeypatch.setenv("PMID_CACHE", "false")
+    pmids = [str(i) for i in range(8)] + ["123"]
+
+    async def run():
+        async with _get_retriever(stub_server, max_connections=2, rate_limiter=AsyncRateLimiter(0)) as retriever:
+            return await retriever.request_articles(pmids)
+
+    results = asyncio.run(run())
+    assert list(results.keys()) == pmids
+    assert results["3"] == (True, "<html><body>PMC article 3</body></html>", 200)
+    # the paper is not in PMC, the full-text link on the abstract page goes through the article service
+    assert results["123"] == (True, "<html>publisher https://publisher.example/123</html>", 200)
+    assert list(tmp_path.iterdir()) == []
+    # the connections are kept alive and reused
+    assert len(stub_server.client_ports) <= 2
+
+
+def test_async_article_retriever_rate_limit(stub_server):
+    async def run():
+        async with _get_retriever(stub_server, rate_limiter=AsyncRateLimiter(20)) as retriever:
+            return await retriever.request_articles([str(i) for i in range(6)])
+
+    start = time.monotonic()
+    results = asyncio.run(run())
+    assert all(res for res, _, _ in results.values())
+    # 6 requests at 20 per second
+    assert time.monotonic() - start >= 0.25
+
+
+def test_async_article_retriever_connection_error():
+    async def run():
+        async with AsyncArticleRetriever(
+            pmc_base_url="http://127.0.0.1:1",
+            pubmed_base_url="http://127.0.0.1:1",
+            article_service_url="http://127.0.0.1:1",
+            rate_limiter=AsyncRateLimiter(0),
+        ) as retriever:
+            return await retriever.request_article("123")
+
+    res, _, code = asyncio.run(run())
+    assert not res and code == -1
+
+
+def test_async_article_retriever_uses_article_cache(stub_server, tmp_path, monkeypatch):
+    article_cache = ArticleCacheDB(tmp_path / "article_cache")
+    monkeypatch.setattr(async_article_retriever, "get_article_cache_db", lambda: article_cache)
+
+    async def run():
+        async with _get_retriever(stub_server, rate_limiter=AsyncRateLimiter(0)) as retriever:
+            return await retriever.request_articles(["1", "2"])
+
+    first = asyncio.run(run())
+    n_requests = stub_server.n_requests
+    second = asyncio.run(run())
+    assert first == second
+    # the second run doesn't hit the network
+    assert stub_server.n_requests == n_requests
+    assert article_cache.get_stats()["hits"] == 2
+    article_cache.close()
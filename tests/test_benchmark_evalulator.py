@@ -1,12 +1,15 @@
+import numpy as np
 import pytest
 import pandas as pd
 
-from benchmark.evaluate import TablesEvaluator, TablesSeparateEvaluator
+from benchmark.common import ColumnType
+from benchmark.evaluate import TablesEvaluator, TablesSeparateEvaluator, TextComparer
 from benchmark.pk_summary_benchmark_with_semantic import (
     PK_SUMMARY_ANCHOR_COLUMNS,
     PK_SUMMARY_RATING_COLUMNS,
     PK_SUMMARY_COLUMNS_TYPE,
 )
+from extractor.database.embedding_cache_db import EmbeddingCacheDB
 
 
 @pytest.mark.skip("skip current due to expensive transformer installation")
@@ -58,3 +61,65 @@ def test_compare_tables():
     )
     score = evaluator.compare_tables(baseline, target)
     assert score > 0
+
+
+class FakeSentenceModel:
+    """embeds a text by its letter counts"""
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size, convert_to_numpy, normalize_embeddings):
+        self.encoded.append(list(texts))
+        embeddings = np.array([
+            [text.lower().count(c) for c in "abcdefghijklmnopqrstuvwxyz"] + [1]
+            for text in texts
+        ], dtype=np.float32)
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def test_text_comparer_encodes_each_text_once(tmp_path):
+    db = EmbeddingCacheDB(tmp_path / "embedding_cache.db")
+    model = FakeSentenceModel()
+    evaluator = TablesEvaluator(
+        rating_cols=["Drug name", "Value"],
+        anchor_cols=["Drug name"],
+        columns_type={"Drug name": ColumnType.Text, "Value": ColumnType.Numeric},
+        text_cmpr=TextComparer(model=model, embedding_cache_db=db),
+    )
+    baseline = pd.DataFrame({"Drug name": ["Lorazepam", "Morphine"], "Value": ["1.0", "2.0"]})
+    target = pd.DataFrame({"Drug name": ["lorazepam ", "Morphine sulfate"], "Value": ["1.0", "3.0"]})
+    assert evaluator.compare_tables(baseline, target) == 75
+    # the cells of both tables are encoded in one batch, the comparisons are lookups
+    assert len(model.encoded) == 1
+    assert "Morphine sulfate" in model.encoded[0]
+
+    # the embeddings are persisted
+    similarity = evaluator.text_cmpr.compare("Lorazepam", "Morphine sulfate")
+    assert 0 < similarity < 1 and len(model.encoded) == 1
+    model2 = FakeSentenceModel()
+    text_cmpr = TextComparer(model=model2, embedding_cache_db=db)
+    assert text_cmpr.compare("Lorazepam", "Morphine sulfate") == pytest.approx(similarity)
+    assert model2.encoded == []
+
+
+def test_rate_rows_pairs_rows_one_to_one(tmp_path):
+    evaluator = TablesEvaluator(
+        rating_cols=["Drug name", "Value"],
+        anchor_cols=["Drug name"],
+        columns_type={"Drug name": ColumnType.Text, "Value": ColumnType.Numeric},
+        text_cmpr=TextComparer(
+            model=FakeSentenceModel(),
+            embedding_cache_db=EmbeddingCacheDB(tmp_path / "embedding_cache.db"),
+        ),
+    )
+    baseline = pd.DataFrame({"Drug name": ["Lorazepam", "Lorazepam"], "Value": ["1.0", "2.0"]})
+    target = pd.DataFrame({"Drug name": ["Lorazepam", "Lorazepam"], "Value": ["2.0", "1.0"]})
+    # both rows are anchored to the first row by the drug name
+    much_rows = target.to_dict("records")
+    assert all(
+        evaluator.anchor_row_from_rows(row, much_rows) is much_rows[0]
+        for _, row in baseline.iterrows()
+    )
+    # the rows are paired one to one by their ratings
+    assert evaluator.compare_tables(baseline, target) == 100
+    assert evaluator.rate_row_matrix(baseline, target).tolist() == [[5, 10], [10, 5]]
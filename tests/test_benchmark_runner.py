@@ -0,0 +1,67 @@
+import json
+import pandas as pd
+import pytest
+
+from benchmark import evaluate
+from benchmark.benchmark_runner import (
+    BenchmarkRunner,
+    semantic_scorer,
+    write_benchmark_scores,
+)
+from benchmark.comm_semantic import run_semantic_benchmark
+from benchmark.common import prepare_dataset_for_benchmark
+from benchmark.constant import BenchmarkType, LLModelType
+from benchmark.evaluate import TextComparer
+from extractor.database.embedding_cache_db import EmbeddingCacheDB
+from tests.test_benchmark_evalulator import FakeSentenceModel
+
+
+@pytest.fixture
+def text_comparer(tmp_path, monkeypatch):
+    text_cmpr = TextComparer(
+        model=FakeSentenceModel(),
+        embedding_cache_db=EmbeddingCacheDB(tmp_path / "embedding_cache.db"),
+    )
+    monkeypatch.setattr(evaluate, "_text_comparer", text_cmpr)
+    return text_cmpr
+
+
+def test_benchmark_runner(text_comparer, tmp_path):
+    dataset = prepare_dataset_for_benchmark(
+        baseline_dir="./benchmark/data/pk-summary/baseline",
+        target_dir="./benchmark/data/pk-summary/2025-09-22",
+        benchmark_type=BenchmarkType.PK_SUMMARY,
+    )
+    dataset = dict(list(dataset.items())[:4])
+    # a missing target file fails on its own
+    pmid = next(iter(dataset))
+    dataset[pmid][LLModelType.GEMINI15.value] = str(tmp_path / "missing.csv")
+
+    runner = BenchmarkRunner(semantic_scorer(BenchmarkType.PK_SUMMARY), max_workers=4)
+    scores = runner.run(dataset, models=[LLModelType.GPT4O, LLModelType.GEMINI15])
+    assert [(s.model, s.pmid) for s in scores] == [
+        (LLModelType.GEMINI15.value, pmid),
+        *[(LLModelType.GPT4O.value, p) for p in sorted(dataset)],
+    ]
+    assert scores[0].score is None and scores[0].error is not None
+
+    # the same scores as the serial benchmark
+    result_file = tmp_path / "result.log"
+    run_semantic_benchmark(dataset, BenchmarkType.PK_SUMMARY, LLModelType.GPT4O, str(result_file))
+    serial = {
+        line.split(", ")[1]: int(line.split(", ")[2])
+        for line in result_file.read_text().splitlines()
+    }
+    assert {s.pmid: s.score for s in scores[1:]} == serial
+
+    json_path, csv_path = write_benchmark_scores(tmp_path, scores, metadata={"target": "2025-09-22"})
+    result = json.loads(json_path.read_text())
+    assert result["target"] == "2025-09-22"
+    assert result["summary"][LLModelType.GEMINI15.value] == {"count": 1, "failed": 1}
+    assert result["summary"][LLModelType.GPT4O.value]["mean_score"] == pytest.approx(
+        sum(serial.values()) / len(serial)
+    )
+    df = pd.read_csv(csv_path, dtype={"pmid": str})
+    assert list(df.columns) == ["pmid", "model", "score", "error"]
+    assert len(df) == len(scores)
+    assert sorted(p.name for p in tmp_path.iterdir() if p.suffix == ".tmp") == []
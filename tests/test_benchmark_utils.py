@@ -1,6 +1,10 @@
 from benchmark.constant import BenchmarkType
+import itertools
+import numpy as np
+
 from benchmark.utils import (
     generate_columns_definition,
+    max_weight_assignment,
 )
 pk_cols_definition = (
     "Drug name, is text, the name of drug mentioned in the paper.\n "
@@ -45,3 +49,25 @@ def test_generate_pe():
     res = generate_columns_definition(BenchmarkType.PE)
     assert res == pe_cols_definition
 
+
+def test_max_weight_assignment():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        n, m = rng.integers(0, 6, size=2)
+        weights = rng.integers(0, 10, size=(n, m)).astype(float)
+        pairs = max_weight_assignment(weights)
+        assert len(pairs) == min(n, m)
+        assert len({r for r, _ in pairs}) == len({c for _, c in pairs}) == len(pairs)
+        # compare with the best of all the assignments
+        if n <= m:
+            best = max(
+                sum(weights[r, c] for r, c in enumerate(cols))
+                for cols in itertools.permutations(range(m), int(n))
+            )
+        else:
+            best = max(
+                sum(weights[r, c] for c, r in enumerate(rows))
+                for rows in itertools.permutations(range(n), int(m))
+            )
+        assert sum(weights[r, c] for r, c in pairs) == best
+
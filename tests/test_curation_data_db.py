@@ -7,7 +7,9 @@ from extractor.database.curation_db import CurationDB
 def curation_db():
     db_path = Path("./tests/data/curation_data.db")
     db_path.touch()
-    yield CurationDB(db_path=Path("./tests/data/curation_data.db"))
+    db = CurationDB(db_path=Path("./tests/data/curation_data.db"))
+    yield db
+    db.close()
     db_path.unlink()
 
 
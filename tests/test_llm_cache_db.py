@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from extractor.agents.common_agent import common_agent
+from extractor.agents.common_agent.common_agent import CommonAgent, CommonAgentResult
+from extractor.database.llm_cache_db import LLMCacheDB
+
+
+def test_llm_cache_db_ttl_and_eviction(tmp_path):
+    cache_db = LLMCacheDB(tmp_path / "llm_cache.db", ttl_seconds=None, max_entries=2)
+    assert cache_db.select_response("a") is None
+    cache_db.insert_response("a", "1")
+    cache_db.insert_response("b", "2")
+    assert cache_db.select_response("a") == "1"
+    # "b" is the least recently used one
+    cache_db.insert_response("c", "3")
+    assert cache_db.select_response("b") is None
+    assert cache_db.select_response("c") == "3"
+    assert cache_db.get_stats()["hits"] == 2
+    assert cache_db.get_stats()["misses"] == 2
+
+    cache_db.ttl_seconds = -1
+    assert cache_db.select_response("a") is None
+
+
+def test_common_agent_cached_invoke(tmp_path, monkeypatch):
+    cache_db = LLMCacheDB(tmp_path / "llm_cache.db")
+    monkeypatch.setattr(common_agent, "get_llm_cache_db", lambda: cache_db)
+    calls = []
+
+    def invoke():
+        calls.append(1)
+        agent._incre_token_usage({"total_tokens": 3, "prompt_tokens": 2, "completion_tokens": 1})
+        return CommonAgentResult(reasoning_process="cached")
+
+    msgs = [SystemMessage(content="system"), HumanMessage(content="question")]
+    agent = CommonAgent(llm=SimpleNamespace(model_name="gpt-x", temperature=0.0))
+    agent._initialize()
+    res, cache_key = agent._cached_invoke(msgs, CommonAgentResult, invoke)
+    assert agent.token_usage["total_tokens"] == 3
+    # the response is cached once the caller validated it
+    assert cache_db.select_response(cache_key) is None
+    agent._cache_response(cache_key, res)
+
+    agent._initialize()
+    res, cache_key = agent._cached_invoke(msgs, CommonAgentResult, invoke)
+    assert cache_key is None
+    assert len(calls) == 1
+    assert res.reasoning_process == "cached"
+    assert agent.token_usage["total_tokens"] == 0
+
+    # another model doesn't share the response
+    agent = CommonAgent(llm=SimpleNamespace(model_name="gpt-y", temperature=0.0))
+    agent._initialize()
+    agent._cached_invoke(msgs, CommonAgentResult, invoke)
+    assert len(calls) == 2
+
+
+def test_common_agent_drops_cached_response_failing_post_process(tmp_path, monkeypatch):
+    cache_db = LLMCacheDB(tmp_path / "llm_cache.db")
+    monkeypatch.setattr(common_agent, "get_llm_cache_db", lambda: cache_db)
+    answers = ["bad", "good"]
+    calls = []
+
+    class FakeAgent:
+        def invoke(self, input, config):
+            calls.append(1)
+            handler = config["callbacks"][0]
+            handler.total_tokens, handler.prompt_tokens, handler.completion_tokens = 3, 2, 1
+            return CommonAgentResult(reasoning_process=answers[min(len(calls), len(answers)) - 1])
+
+    monkeypatch.setattr(common_agent, "structured_output_llm", lambda llm, schema, prompt: FakeAgent())
+    agent = CommonAgent(llm=SimpleNamespace(model_name="gpt-x", temperature=0.0))
+
+    # the first run accepts and caches the bad answer
+    res, processed_res, _, _ = agent.go("system", "question", CommonAgentResult)
+    assert res.reasoning_process == "bad"
+    assert len(calls) == 1
+
+    def post_process(res, **kwargs):
+        if res.reasoning_process == "bad":
+            raise ValueError("Invalid selected tables")
+        return res.reasoning_process
+
+    # the cached bad answer fails post_process, it is dropped and the retry reaches the llm
+    res, processed_res, _, _ = agent.go("system", "question", CommonAgentResult, post_process=post_process)
+    assert processed_res == "good"
+    assert len(calls) == 2
+
+    # the good answer is cached
+    res, processed_res, _, _ = agent.go("system", "question", CommonAgentResult, post_process=post_process)
+    assert processed_res == "good"
+    assert len(calls) == 2
@@ -0,0 +1,73 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import time
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from extractor.agents.common_agent import common_agent
+from extractor.agents.common_agent.common_agent import CommonAgent, CommonAgentResult
+from extractor.llm_rate_limiter import LLMRateLimiter, estimate_text_tokens, get_llm_rate_limiter
+
+
+def test_llm_rate_limiter_tokens_per_minute():
+    rate_limiter = LLMRateLimiter(tokens_per_minute=600) # 10 tokens per second
+    start = time.monotonic()
+    rate_limiter.acquire(600)
+    assert time.monotonic() - start < 0.1
+    # the budget is spent, the next call waits for 3 tokens to be refilled
+    rate_limiter.acquire(3)
+    assert time.monotonic() - start >= 0.25
+
+    # the unused tokens are returned
+    rate_limiter.record_usage(estimated_tokens=300, used_tokens=0)
+    start = time.monotonic()
+    rate_limiter.acquire(200)
+    assert time.monotonic() - start < 0.1
+
+
+def test_llm_rate_limiter_threads_and_asyncio():
+    rate_limiter = LLMRateLimiter(requests_per_minute=600) # 10 requests per second
+    rate_limiter.requests.balance = 0
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: rate_limiter.acquire(), range(2)))
+
+    async def run():
+        await asyncio.gather(*[rate_limiter.aacquire() for _ in range(2)])
+    asyncio.run(run())
+    # 4 requests at 10 per second
+    assert time.monotonic() - start >= 0.35
+
+
+def test_get_llm_rate_limiter(monkeypatch):
+    monkeypatch.setenv("LLM_RATE_LIMITS", '{"gpt-x": {"rpm": 10, "tpm": 1000}, "*": {"rpm": 5}}')
+    llm = SimpleNamespace(model_name="gpt-x")
+    rate_limiter = get_llm_rate_limiter(llm)
+    assert rate_limiter is get_llm_rate_limiter(SimpleNamespace(model_name="gpt-x"))
+    assert rate_limiter.tokens.capacity == 1000
+    other = get_llm_rate_limiter(SimpleNamespace(model_name="gpt-y"))
+    assert other is not rate_limiter and other.tokens is None
+
+    monkeypatch.setenv("LLM_RATE_LIMITS", "")
+    assert get_llm_rate_limiter(llm) is None
+
+
+def test_common_agent_rate_limited_invoke(monkeypatch):
+    monkeypatch.setattr(common_agent, "get_llm_cache_db", lambda: None)
+    monkeypatch.setenv("LLM_RATE_LIMITS", '{"gpt-rate-limited": {"rpm": 60, "tpm": 10000}}')
+    agent = CommonAgent(llm=SimpleNamespace(model_name="gpt-rate-limited"))
+    agent._initialize()
+
+    def invoke():
+        agent._incre_token_usage({"total_tokens": 100, "prompt_tokens": 80, "completion_tokens": 20})
+        return CommonAgentResult(reasoning_process="done")
+
+    msgs = [SystemMessage(content="system " * 100), HumanMessage(content="question")]
+    assert estimate_text_tokens("".join(msg.content for msg in msgs)) > 100
+    res, _ = agent._cached_invoke(msgs, CommonAgentResult, invoke)
+    assert res.reasoning_process == "done"
+    rate_limiter = get_llm_rate_limiter(agent.llm)
+    # the bucket is charged with the tokens the call used, not the estimate
+    assert rate_limiter.tokens.balance == pytest.approx(10000 - 100, abs=5)
+    assert rate_limiter.requests.balance == pytest.approx(59, abs=0.1)
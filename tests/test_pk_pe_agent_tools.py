@@ -0,0 +1,85 @@
+import time
+import pandas as pd
+import pytest
+
+from extractor.agents.pk_pe_agents.pk_pe_agent_tools import AgentTool
+from extractor.database.pmid_db import PMIDDB
+
+
+class DummyTool(AgentTool):
+    def _run(self, previous_errors: str | None = None):
+        return None, None
+
+
+def _get_tables(n: int):
+    return [
+        {"caption": f"Table {i}", "footnote": "", "table": pd.DataFrame({"a": [i]})}
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 4])
+def test_curate_tables_keeps_order_and_isolates_errors(max_concurrency):
+    tool = DummyTool(max_concurrency=max_concurrency)
+    tables = _get_tables(5)
+
+    def curate_table(table: dict) -> pd.DataFrame:
+        idx = table["table"]["a"][0]
+        # make the first tables finish last
+        time.sleep(0.01 * (5 - idx))
+        if idx == 2:
+            raise ValueError("failed to curate")
+        return table["table"]
+
+    dfs = tool._curate_tables(tables, curate_table)
+    assert len(dfs) == 5
+    assert dfs[2] is None
+    assert [df["a"][0] for df in dfs if df is not None] == [0, 1, 3, 4]
+
+
+def test_curate_tables_concurrently():
+    tool = DummyTool(max_concurrency=4)
+    tables = _get_tables(4)
+
+    def curate_table(table: dict) -> pd.DataFrame:
+        time.sleep(0.1)
+        return table["table"]
+
+    start = time.perf_counter()
+    dfs = tool._curate_tables(tables, curate_table)
+    assert time.perf_counter() - start < 0.35
+    assert all(df is not None for df in dfs)
+
+
+class DummyPMIDTool(DummyTool):
+    def __init__(self, pmid: str, pmid_db: PMIDDB, llm=None):
+        super().__init__(llm=llm)
+        self.pmid = pmid
+        self.pmid_db = pmid_db
+
+
+def test_select_tables_uses_cached_selection(tmp_path):
+    pmid_db = PMIDDB(tmp_path / "pmid_info.db")
+    tables = _get_tables(3)
+    calls = []
+
+    def select_dummy_tables(html_tables, llm):
+        calls.append(llm)
+        return [html_tables[2]], ["2"], "table 2 is relevant", {"total_tokens": 3, "prompt_tokens": 2, "completion_tokens": 1}
+
+    tool = DummyPMIDTool("12345", pmid_db)
+    selected, indexes, reasoning, token_usage = tool._select_tables(tables, select_dummy_tables)
+    assert indexes == ["2"] and token_usage["total_tokens"] == 3
+
+    # the sibling tool reuses the selection on the same tables
+    tool = DummyPMIDTool("12345", pmid_db)
+    selected, indexes, reasoning, token_usage = tool._select_tables(_get_tables(3), select_dummy_tables)
+    assert len(calls) == 1
+    assert indexes == ["2"]
+    assert reasoning == "table 2 is relevant"
+    assert selected[0]["caption"] == "Table 2"
+    assert token_usage["total_tokens"] == 0
+
+    # different tables content is selected again
+    tool._select_tables(_get_tables(4), select_dummy_tables)
+    assert len(calls) == 2
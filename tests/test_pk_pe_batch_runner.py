@@ -0,0 +1,86 @@
+import threading
+import time
+import pytest
+
+from extractor.agents_manager.pk_pe_batch_runner import AdaptiveBackpressure, PKPEBatchRunner
+from extractor.constants import PipelineTypeEnum
+from extractor.database.batch_checkpoint_db import BatchCheckpointDB
+
+
+class FakeManager:
+    def __init__(self, calls, failing, in_flight):
+        self.calls = calls
+        self.failing = failing
+        self.in_flight = in_flight
+
+    def plan_pipeline_types(self, pmid):
+        self.calls.append((pmid, "plan"))
+        if pmid == "neither":
+            return []
+        return [PipelineTypeEnum.PK_SUMMARY, PipelineTypeEnum.PE_STUDY_INFO]
+
+    def run(self, pmid, curation_end_callback=None, pipeline_types=None):
+        with self.in_flight["lock"]:
+            self.in_flight["now"] += 1
+            self.in_flight["max"] = max(self.in_flight["max"], self.in_flight["now"])
+        time.sleep(0.02)
+        res = {}
+        for pipeline_type in pipeline_types:
+            self.calls.append((pmid, pipeline_type))
+            if (pmid, pipeline_type) in self.failing:
+                continue
+            result = {"correct": True, "curated_table": "", "explanation": "", "suggested_fix": ""}
+            curation_end_callback(pmid, pipeline_type, result)
+            res[pipeline_type] = result
+        with self.in_flight["lock"]:
+            self.in_flight["now"] -= 1
+        return res
+
+
+@pytest.fixture
+def checkpoint_db(tmp_path):
+    db = BatchCheckpointDB(tmp_path / "batch_checkpoint.db")
+    yield db
+    db.close()
+
+
+def test_batch_runner_resumes_from_checkpoint(checkpoint_db):
+    calls = []
+    failing = {("2", PipelineTypeEnum.PE_STUDY_INFO)}
+    in_flight = {"lock": threading.Lock(), "now": 0, "max": 0}
+    ended = []
+    runner = PKPEBatchRunner(
+        manager_factory=lambda: FakeManager(calls, failing, in_flight),
+        checkpoint_db=checkpoint_db,
+        max_papers=3,
+        curation_end_callback=lambda pmid, pipeline_type, result: ended.append((pmid, pipeline_type)),
+        backpressure=AdaptiveBackpressure(max_limit=3, backoff_seconds=0),
+    )
+    report = runner.run(["1", "2", "3", "neither"])
+    assert sorted(report.completed) == ["1", "3", "neither"]
+    assert report.errors == [("2", "pipelines failed: pe_study_info")]
+    assert len(ended) == 5
+    assert 1 < in_flight["max"] <= 3
+
+    # the restarted run only runs the failed pipeline, without planning the paper again
+    calls.clear()
+    failing.clear()
+    report = runner.run(["1", "2", "3", "neither"])
+    assert sorted(report.skipped) == ["1", "3", "neither"]
+    assert report.completed == ["2"]
+    assert calls == [("2", PipelineTypeEnum.PE_STUDY_INFO)]
+
+
+def test_adaptive_backpressure():
+    backpressure = AdaptiveBackpressure(max_limit=4, backoff_seconds=0.05)
+    backpressure.acquire()
+    backpressure.release(False)
+    assert backpressure.limit == 2
+    start = time.monotonic()
+    backpressure.acquire()
+    assert time.monotonic() - start >= 0.04
+    backpressure.release(False)
+    assert backpressure.limit == 1
+    backpressure.acquire()
+    backpressure.release(True)
+    assert backpressure.limit == 2 and backpressure.consecutive_failures == 0
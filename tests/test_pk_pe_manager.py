@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+import pytest
+
+from extractor.agents.pk_pe_agents.pk_pe_agents_types import PaperTypeEnum
+from extractor.agents_manager.pk_pe_manager import PKPEManager
+from extractor.constants import PipelineTypeEnum
+from extractor.database.pmid_db import PMIDDB
+
+
+class FakePipeline:
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.thread_name = None
+
+    def run(self, pmid: str):
+        self.thread_name = threading.current_thread().name
+        time.sleep(self.delay)
+        if self.fail:
+            raise ValueError(f"{self.name} failed")
+        return True, f"| {self.name} |\n| --- |\n| {pmid} |", None, None
+
+
+def _get_pipelines(fail_type: PipelineTypeEnum | None = None):
+    return {
+        PipelineTypeEnum.PK_SUMMARY: FakePipeline("pk_summary", 0.2),
+        PipelineTypeEnum.PK_INDIVIDUAL: FakePipeline("pk_individual", 0.1, fail=fail_type == PipelineTypeEnum.PK_INDIVIDUAL),
+        PipelineTypeEnum.PE_STUDY_INFO: FakePipeline("pe_study_info", 0.0),
+    }
+
+
+@pytest.fixture
+def manager_factory(tmp_path):
+    def factory(max_concurrency: int):
+        return PKPEManager(
+            pipeline_llm=None,
+            agent_llm=None,
+            pmid_db=PMIDDB(tmp_path / "pmid_info.db"),
+            max_concurrency=max_concurrency,
+        )
+    return factory
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 3])
+def test_run_pipelines_keeps_order_and_isolates_errors(manager_factory, max_concurrency):
+    mgr = manager_factory(max_concurrency)
+    started = []
+    ended = []
+    res = mgr._run_pipelines(
+        "12345",
+        _get_pipelines(fail_type=PipelineTypeEnum.PK_INDIVIDUAL),
+        curation_start_callback=lambda pmid, job: started.append(job),
+        curation_end_callback=lambda pmid, job, result: ended.append(job),
+    )
+    assert list(res.keys()) == [PipelineTypeEnum.PK_SUMMARY, PipelineTypeEnum.PE_STUDY_INFO]
+    assert "pk_summary" in res[PipelineTypeEnum.PK_SUMMARY]["curated_table"]
+    assert sorted(started, key=lambda t: t.value) == sorted(
+        [PipelineTypeEnum.PK_SUMMARY, PipelineTypeEnum.PK_INDIVIDUAL, PipelineTypeEnum.PE_STUDY_INFO],
+        key=lambda t: t.value,
+    )
+    assert PipelineTypeEnum.PK_INDIVIDUAL not in ended
+    assert len(ended) == 2
+
+
+def test_run_pipelines_concurrently(manager_factory):
+    mgr = manager_factory(3)
+    pipelines = _get_pipelines()
+    start = time.perf_counter()
+    res = mgr._run_pipelines("12345", pipelines)
+    elapsed = time.perf_counter() - start
+    assert len(res) == 3
+    # serial execution would take at least 0.3 seconds
+    assert elapsed < 0.28
+    assert len(set(p.thread_name for p in pipelines.values())) > 1
+
+
+def test_run_pipelines_async(manager_factory):
+    mgr = manager_factory(2)
+    started = []
+    ended = []
+
+    async def start_callback(pmid, job):
+        started.append(job)
+
+    async def end_callback(pmid, job, result):
+        ended.append(job)
+
+    res = asyncio.run(mgr._run_pipelines_async(
+        "12345",
+        _get_pipelines(fail_type=PipelineTypeEnum.PK_INDIVIDUAL),
+        start_callback,
+        end_callback,
+    ))
+    assert list(res.keys()) == [PipelineTypeEnum.PK_SUMMARY, PipelineTypeEnum.PE_STUDY_INFO]
+    assert len(started) == 3
+    assert len(ended) == 2
+
+
+@pytest.mark.parametrize("paper_type", ["PK", "PE", "Both", "Neither"])
+def test_plan_pipeline_types_matches_run(manager_factory, monkeypatch, paper_type):
+    mgr = manager_factory(1)
+    monkeypatch.setattr(mgr, "_extract_pmid_info", lambda pmid, html_content=None: None)
+    monkeypatch.setattr(
+        mgr, "_identification_and_design_step",
+        lambda pmid: {"paper_type": PaperTypeEnum[paper_type]},
+    )
+    monkeypatch.setattr(mgr, "_get_pipeline", lambda pipeline_type: FakePipeline(pipeline_type.value))
+
+    # the checkpoint plan is what run() executes
+    assert mgr.plan_pipeline_types("12345") == list(mgr.run("12345").keys())
@@ -0,0 +1,101 @@
+from extractor.agents.pk_pe_agents.pk_pe_agents_types import FinalAnswerEnum
+from extractor.agents.pk_pe_agents.pk_pe_agents_utils import diff_table_rows, select_table_rows
+from extractor.agents.pk_pe_agents.pk_pe_verification_step import (
+    PKPECuratedTablesVerificationStep,
+    PKPEVerificationStepResult,
+)
+
+
+def _get_table(values: list[str]) -> str:
+    return "\n".join(
+        ["| Parameter | Value |", "| --- | --- |"] + [f"| p{i} | {v} |" for i, v in enumerate(values)]
+    )
+
+
+def test_diff_table_rows():
+    previous = _get_table(["1", "2", "3", "4"])
+    delta = diff_table_rows(previous, _get_table(["1", "20", "3", "4"]))
+    assert delta.changed_rows == [1] and delta.removed_rows == [1]
+    assert delta.unchanged_rows == {0: 0, 2: 2, 3: 3}
+    assert diff_table_rows(previous, previous).unchanged
+    assert diff_table_rows(previous, "| Parameter | Unit |\n| --- | --- |\n| p0 | mg |") is None
+
+    rows = select_table_rows(previous, [1, 3])
+    assert rows.split("\n")[0] == "| Row | Parameter | Value |"
+    assert "| 2 | p1 | 2 |" in rows and "| 4 | p3 | 4 |" in rows
+
+
+class FakeAgent:
+    def __init__(self, results: list[PKPEVerificationStepResult]):
+        self.results = results
+        self.system_prompts = []
+
+    def go(self, system_prompt, instruction_prompt, schema):
+        self.system_prompts.append(system_prompt)
+        return self.results.pop(0), None, {"total_tokens": 1, "prompt_tokens": 1, "completion_tokens": 0}, "reasoning"
+
+
+def _result(correct: bool, incorrect_rows: list[int] | None = None) -> PKPEVerificationStepResult:
+    return PKPEVerificationStepResult(
+        reasoning_process="reasoning",
+        correct=correct,
+        explanation="the value of p2 is wrong" if not correct else "correct",
+        suggested_fix=None,
+        incorrect_rows=incorrect_rows,
+    )
+
+
+def _get_state(curated_table: str) -> dict:
+    return {
+        "pmid": "12345",
+        "paper_title": "title",
+        "paper_abstract": "abstract",
+        "source_tables": ["| Parameter | Value |\n| --- | --- |\n| p2 | 30 |"],
+        "curated_table": curated_table,
+        "step_output_callback": None,
+    }
+
+
+def test_verification_after_correction_checks_the_changed_rows():
+    values = [str(i * 11) for i in range(20)]
+    step = PKPECuratedTablesVerificationStep(llm=None, pmid="12345", domain="PK")
+    agent = FakeAgent([_result(False, [3]), _result(True)])
+    step.get_agent = lambda llm: agent
+
+    state, _ = step._execute_directly(_get_state(_get_table(values)))
+    assert state["final_answer"] == FinalAnswerEnum.Incorrect
+    assert state["incorrect_rows"] == [2]
+    assert "#### **Curated Table**" in agent.system_prompts[0]
+
+    # the correction fixes the 3rd row
+    values[2] = "30"
+    state["curated_table"] = _get_table(values)
+    state, _ = step._execute_directly(state)
+    assert state["final_answer"] == FinalAnswerEnum.Correct
+    prompt = agent.system_prompts[1]
+    assert "#### **Rows to Verify**" in prompt
+    rows_to_verify = prompt.split("#### **Rows to Verify**")[1].split("#### **Context Rows**")[0]
+    context_rows = prompt.split("#### **Context Rows**")[1]
+    assert "| 3 | p2 | 30 |" in rows_to_verify
+    assert "| 2 | p1 | 11 |" in context_rows and "| 4 | p3 | 33 |" in context_rows
+    # the other rows passed the verification before
+    assert "p10" not in prompt
+    assert "the value of p2 is wrong" in prompt
+    assert state["incorrect_rows"] == []
+
+
+def test_verification_after_correction_falls_back_to_full_verification():
+    values = [str(i * 11) for i in range(4)]
+    step = PKPECuratedTablesVerificationStep(llm=None, pmid="12345", domain="PK")
+    agent = FakeAgent([_result(False, [1]), _result(False, [])])
+    step.get_agent = lambda llm: agent
+
+    state, _ = step._execute_directly(_get_state(_get_table(values)))
+    # the correction changed nothing, no need to ask again
+    state, _ = step._execute_directly(state)
+    assert len(agent.system_prompts) == 1 and state["final_answer"] == FinalAnswerEnum.Incorrect
+
+    # most of the rows changed
+    state["curated_table"] = _get_table(["0", "1", "2", "3"])
+    state, _ = step._execute_directly(state)
+    assert "#### **Curated Table**" in agent.system_prompts[1]
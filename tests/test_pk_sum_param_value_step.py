@@ -0,0 +1,52 @@
+import threading
+import time
+
+from TabFuncFlow.utils.table_utils import ParsedTable
+from extractor.agents.agent_utils import map_concurrently
+from extractor.agents.pk_summary import pk_sum_param_value_step
+from extractor.agents.pk_summary.pk_sum_param_value_step import ParameterValueExtractionStep
+
+
+class FakeAgent:
+    def __init__(self, llm=None):
+        self.llm = llm
+
+    def go(self, system_prompt, instruction_prompt, schema, post_process=None, **kwargs):
+        # the first sub-tables finish last
+        time.sleep(0.01 * (10 - kwargs["expected_rows"]))
+        return (
+            None,
+            [[str(kwargs["expected_rows"])]],
+            {"total_tokens": 3, "prompt_tokens": 2, "completion_tokens": 1},
+            threading.current_thread().name,
+        )
+
+
+def test_map_concurrently_keeps_order():
+    res = map_concurrently(lambda x: (time.sleep(0.01 * (5 - x)), x)[1], range(5), 3)
+    assert res == [0, 1, 2, 3, 4]
+
+
+def test_param_value_step_sums_token_usage_and_keeps_order(
+    monkeypatch,
+    md_table_aligned,
+    md_table_list,
+    caption,
+    step_callback,
+):
+    monkeypatch.setattr(pk_sum_param_value_step, "get_common_agent", lambda llm: FakeAgent(llm))
+    step = ParameterValueExtractionStep()
+    state = {
+        "md_table_aligned": md_table_aligned,
+        "md_table_list": md_table_list,
+        "caption": caption,
+        "llm": None,
+        "step_callback": step_callback,
+    }
+    _, value_list, token_usage = step.execute_directly(state)
+    # md_table_list has sub-tables of 6, 6 and 5 rows
+    assert value_list == [[["6"]], [["6"]], [["5"]]]
+    assert token_usage == {"total_tokens": 9, "prompt_tokens": 6, "completion_tokens": 3}
+    # the markdown tables are parsed once and shared by the following steps
+    assert isinstance(state["md_table_aligned"], ParsedTable)
+    assert [table.md for table in state["md_table_list"]] == md_table_list
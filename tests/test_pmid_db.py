@@ -0,0 +1,179 @@
+import json
+import sqlite3
+import pandas as pd
+import pytest
+
+from extractor.database.pmid_db import PMIDDB, pmid_info_table_insert_schema
+
+
+@pytest.fixture
+def pmid_db(tmp_path):
+    return PMIDDB(db_path=tmp_path / "pmid_info.db")
+
+
+def _get_tables():
+    dup_cols = pd.DataFrame([["1", "2"], ["3", "4"]], columns=["a", "a"])
+    return [
+        {"caption": "Table 1", "footnote": "note 1", "table": pd.DataFrame({"a": ["1", "02"], "b": ["x", None]})},
+        {"caption": "Table 2", "footnote": "", "table": dup_cols},
+        {"caption": "Table 3", "footnote": "", "table": None},
+    ]
+
+
+def test_pmid_db_stores_tables_per_row(pmid_db):
+    tables = _get_tables()
+    assert pmid_db.insert_pmid_info("123", "title", "abstract", "full text", tables, ["sec"])
+    # the input tables are not modified
+    assert isinstance(tables[0]["table"], pd.DataFrame)
+
+    pmid, title, abstract, full_text, db_tables, sections = pmid_db.select_pmid_info("123")
+    assert (pmid, title, sections) == ("123", "title", ["sec"])
+    assert len(db_tables) == 3
+    pd.testing.assert_frame_equal(db_tables[0]["table"], tables[0]["table"])
+    pd.testing.assert_frame_equal(db_tables[1]["table"], tables[1]["table"])
+    assert db_tables[2]["table"] is None
+    assert db_tables[0]["caption"] == "Table 1" and db_tables[0]["footnote"] == "note 1"
+
+    table = pmid_db.select_pmid_table("123", 1)
+    assert table["caption"] == "Table 2"
+    assert list(table["table"].columns) == ["a", "a"]
+    assert pmid_db.select_pmid_table("123", 5) is None
+
+    meta = pmid_db.select_pmid_tables_meta("123")
+    assert [(m["table_index"], m["n_rows"], m["n_cols"]) for m in meta] == [(0, 2, 2), (1, 2, 2), (2, 0, 0)]
+    assert "table" not in meta[0]
+
+
+def test_pmid_db_reads_legacy_json_tables(pmid_db):
+    pmid_db.select_pmid_info("000")  # create tables
+    tables_json = json.dumps([
+        {"caption": "Table 1", "footnote": "", "table": pd.DataFrame({"a": [1, 2]}).to_json()}
+    ])
+    conn = sqlite3.connect(pmid_db.db_path)
+    conn.execute(pmid_info_table_insert_schema, ("456", "title", "", "", tables_json, "[]"))
+    conn.commit()
+    conn.close()
+
+    info = pmid_db.select_pmid_info("456")
+    assert info[4][0]["table"]["a"].tolist() == [1, 2]
+
+
+@pytest.mark.parametrize("read", ["info", "table", "meta"])
+def test_pmid_db_migrates_legacy_json_tables(pmid_db, read):
+    pmid_db.select_pmid_info("000")  # create tables
+    tables_json = json.dumps([
+        {"caption": "Table 1", "footnote": "note", "table": pd.DataFrame({"a": [1, 2]}).to_json()},
+        {"caption": "Table 2", "footnote": "", "table": pd.DataFrame({"b": ["x"], "c": ["y"]}).to_json()},
+    ])
+    conn = sqlite3.connect(pmid_db.db_path)
+    conn.execute(pmid_info_table_insert_schema, ("456", "title", "", "", tables_json, "[]"))
+    conn.commit()
+
+    # the first read of any kind finds the legacy tables
+    if read == "info":
+        assert len(pmid_db.select_pmid_info("456")[4]) == 2
+    elif read == "table":
+        assert pmid_db.select_pmid_table("456", 1)["table"].columns.tolist() == ["b", "c"]
+    else:
+        assert [m["caption"] for m in pmid_db.select_pmid_tables_meta("456")] == ["Table 1", "Table 2"]
+
+    # the tables are moved to pmid_table
+    assert conn.execute("SELECT tables_json FROM pmid_info WHERE pmid = '456'").fetchone()[0] is None
+    assert conn.execute("SELECT COUNT(*) FROM pmid_table WHERE pmid = '456'").fetchone()[0] == 2
+    conn.close()
+    metas = pmid_db.select_pmid_tables_meta("456")
+    assert [(m["table_index"], m["n_rows"], m["n_cols"], m["footnote"]) for m in metas] == [
+        (0, 2, 1, "note"), (1, 1, 2, ""),
+    ]
+    assert pmid_db.select_pmid_table("456", 0)["table"]["a"].tolist() == [1, 2]
+
+
+def test_pmid_db_caches_pmid_info(pmid_db, monkeypatch):
+    pmid_db.insert_pmid_info("123", "title", "abstract", "full text", _get_tables(), ["sec"])
+    calls = []
+    select_from_db = pmid_db._select_pmid_info_from_db
+    def counting_select(pmid):
+        calls.append(pmid)
+        return select_from_db(pmid)
+    monkeypatch.setattr(pmid_db, "_select_pmid_info_from_db", counting_select)
+
+    info = pmid_db.select_pmid_info("123")
+    # callers can't corrupt the cached tables
+    info[4][0]["table"].iloc[0, 0] = "changed"
+    info[4][0]["caption"] = "changed"
+    info[5].append("changed")
+    info = pmid_db.select_pmid_info("123")
+    assert len(calls) == 1
+    assert info[4][0]["table"].iloc[0, 0] == "1"
+    assert info[4][0]["caption"] == "Table 1"
+    assert info[5] == ["sec"]
+    assert pmid_db.select_pmid_table("123", 0)["caption"] == "Table 1"
+    assert len(calls) == 1
+
+    # insert invalidates the cached pmid info
+    pmid_db.insert_pmid_info("123", "new title", "", "", [], [])
+    assert pmid_db.select_pmid_info("123")[1] == "new title"
+    assert len(calls) == 2
+
+
+def test_pmid_db_cache_memory_budget(tmp_path):
+    pmid_db = PMIDDB(db_path=tmp_path / "pmid_info.db", cache_max_bytes=100)
+    pmid_db.insert_pmid_info("1", "a" * 60, "", "", [], [])
+    pmid_db.insert_pmid_info("2", "b" * 60, "", "", [], [])
+    pmid_db.select_pmid_info("1")
+    pmid_db.select_pmid_info("2")
+    assert list(pmid_db._info_cache.keys()) == ["2"]
+    assert pmid_db._info_cache_bytes <= 100
+
+
+def test_pmid_db_caches_concurrent_reads(pmid_db, monkeypatch):
+    pmid_db.insert_pmid_info("1", "title 1", "", "", [], [])
+    pmid_db.insert_pmid_info("2", "title 2", "", "", [], [])
+    select_from_db = pmid_db._select_pmid_info_from_db
+    def interleaved_select(pmid):
+        info = select_from_db(pmid)
+        if pmid == "1":
+            # another paper is read and cached while paper 1 is being read
+            pmid_db.select_pmid_info("2")
+        return info
+    monkeypatch.setattr(pmid_db, "_select_pmid_info_from_db", interleaved_select)
+
+    pmid_db.select_pmid_info("1")
+    assert set(pmid_db._info_cache.keys()) == {"1", "2"}
+
+
+def test_pmid_db_skips_caching_when_written_during_read(pmid_db, monkeypatch):
+    pmid_db.insert_pmid_info("1", "old title", "", "", [], [])
+    select_from_db = pmid_db._select_pmid_info_from_db
+    def interleaved_select(pmid):
+        info = select_from_db(pmid)
+        pmid_db.insert_pmid_info("1", "new title", "", "", [], [])
+        return info
+    monkeypatch.setattr(pmid_db, "_select_pmid_info_from_db", interleaved_select)
+
+    assert pmid_db.select_pmid_info("1")[1] == "old title"
+    assert "1" not in pmid_db._info_cache
+
+
+def test_pmid_db_stores_tables_as_parquet(pmid_db):
+    tables = [
+        {"caption": "int columns", "footnote": "", "table": pd.DataFrame([["1", "2"]], columns=[0, 1])},
+        {"caption": "multi-level", "footnote": "", "table": pd.DataFrame(
+            [["1", "2"]], columns=pd.MultiIndex.from_tuples([("Cmax", "mean"), ("Cmax", "sd")])
+        )},
+        {"caption": "mixed values", "footnote": "", "table": pd.DataFrame({"a": ["1", 2, None]})},
+    ]
+    assert pmid_db.insert_pmid_info("123", "title", "", "", _get_tables() + tables, [])
+    conn = sqlite3.connect(pmid_db.db_path)
+    formats = {row[0] for row in conn.execute("SELECT table_format FROM pmid_table WHERE table_blob IS NOT NULL")}
+    conn.close()
+    assert formats == {"parquet"}
+
+    db_tables = pmid_db.select_pmid_info("123")[4]
+    assert list(db_tables[1]["table"].columns) == ["a", "a"]
+    assert list(db_tables[3]["table"].columns) == [0, 1]
+    pd.testing.assert_frame_equal(db_tables[4]["table"], tables[1]["table"])
+    assert db_tables[5]["table"]["a"].tolist() == ["1", "2", None]
+    # the original column names are not part of the table metadata
+    assert "column_names" not in db_tables[1]
+    assert all("column_names" not in meta for meta in pmid_db.select_pmid_tables_meta("123"))
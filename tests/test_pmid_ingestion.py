@@ -0,0 +1,64 @@
+from pathlib import Path
+import pytest
+
+from extractor.database.pmid_db import PMIDDB
+from extractor.pmid_extractor.pmid_ingestion import ingest_pmid_html_files, parse_pmid_html_file
+from extractor.pmid_extractor.section_index import SectionIndex
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+@pytest.fixture
+def pmid_db(tmp_path):
+    db = PMIDDB(db_path=tmp_path / "pmid_info.db")
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def pmid_html_files(tmp_path):
+    return [
+        ("17635501", str(DATA_DIR / "17635501.html")),
+        ("missing", str(tmp_path / "missing.html")),
+        ("18782787", str(DATA_DIR / "18782787.html")),
+        ("35880962", str(DATA_DIR / "35880962.html")),
+    ]
+
+
+def test_parse_pmid_html_file():
+    pmid, info, error = parse_pmid_html_file(("17635501", str(DATA_DIR / "17635501.html")))
+    assert pmid == "17635501" and error is None
+    assert info["pmid"] == "17635501"
+    assert len(info["tables"]) > 0
+    assert len(info["full_text"]) > 0
+    # the section index is built in the worker and stored with the paper
+    assert len(SectionIndex.from_json(info["section_index_json"]).passages) > 0
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_ingest_pmid_html_files(pmid_db, pmid_html_files, max_workers):
+    assert pmid_db.insert_pmid_info("18782787", "title", "abstract", "full text", [], [])
+
+    report = ingest_pmid_html_files(pmid_html_files, pmid_db, max_workers=max_workers, batch_size=1)
+    assert (report.inserted, report.skipped, report.failed) == (2, 1, 1)
+    assert report.failures[0][0] == "missing"
+    # the existing paper is kept, the failed paper is dropped, in input order
+    assert report.pmids == ["17635501", "18782787", "35880962"]
+    assert pmid_db.select_existing_pmids(["17635501", "35880962", "missing"]) == {"17635501", "35880962"}
+    # the existing paper is not overwritten
+    assert pmid_db.select_pmid_info("18782787")[1] == "title"
+
+    report = ingest_pmid_html_files(pmid_html_files, pmid_db, max_workers=max_workers)
+    assert (report.inserted, report.skipped, report.failed) == (0, 3, 1)
+
+
+def test_ingest_pmid_html_files_aborts_when_existing_check_fails(pmid_db, pmid_html_files, monkeypatch):
+    assert pmid_db.insert_pmid_info("18782787", "title", "abstract", "full text", [], [])
+    monkeypatch.setattr(pmid_db, "select_existing_pmids", lambda pmids: None)
+
+    report = ingest_pmid_html_files(pmid_html_files, pmid_db, max_workers=1)
+    assert (report.inserted, report.skipped, report.failed) == (0, 0, 4)
+    assert [pmid for pmid, _ in report.failures] == [pmid for pmid, _ in pmid_html_files]
+    assert report.pmids == []
+    # the existing paper is not overwritten
+    assert pmid_db.select_pmid_info("18782787")[1] == "title"
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+from extractor.agents.prompt_packer import (
+    PromptPacker,
+    PromptSegment,
+    get_prompt_packer,
+    truncate_text,
+)
+from extractor.constants import LLM_DEFAULT_CONTEXT_TOKENS
+from extractor.llm_rate_limiter import estimate_text_tokens
+
+TEMPLATE = """You are a {domain} assistant.
+Title: {paper_title}
+Abstract: {paper_abstract}
+Source tables: {source_tables}
+Curated table: {curated_table}
+"""
+
+def _get_table(n_rows: int) -> str:
+    return "\n".join(["| a | b |", "| --- | --- |"] + [f"| {i} | value {i} |" for i in range(n_rows)])
+
+
+def test_truncate_text():
+    table = _get_table(200)
+    assert truncate_text(table, 10000) == table
+    truncated = truncate_text(table, 100)
+    assert estimate_text_tokens(truncated) <= 100
+    lines = truncated.split("\n")
+    # the rows are kept whole
+    assert all(line.startswith("|") and line.endswith("|") for line in lines[:-1])
+    assert lines[-1].startswith("[... ") and lines[-1].endswith(" tokens truncated ...]")
+
+
+def test_pack_prompt_fits():
+    packer = PromptPacker(max_tokens=10000, reserved_tokens=1000)
+    segments = [
+        PromptSegment("paper_abstract", "abstract"),
+        PromptSegment("source_tables", _get_table(5), priority=1),
+        PromptSegment("curated_table", _get_table(3), truncatable=False),
+    ]
+    prompt, report = packer.pack(TEMPLATE, segments, domain="PK", paper_title="title")
+    assert prompt == TEMPLATE.format(
+        domain="PK", paper_title="title", paper_abstract="abstract",
+        source_tables=_get_table(5), curated_table=_get_table(3),
+    )
+    assert report.total_dropped_tokens == 0 and not report.overflow
+
+
+def test_pack_prompt_shrinks_low_priority_segments_first():
+    abstract = "word " * 400
+    source_tables = _get_table(600)
+    curated_table = _get_table(100)
+    packer = PromptPacker(max_tokens=2500, reserved_tokens=500)
+    segments = [
+        PromptSegment("paper_abstract", abstract, priority=0),
+        PromptSegment("source_tables", source_tables, priority=1, min_tokens=200),
+        PromptSegment("curated_table", curated_table, truncatable=False),
+    ]
+    prompt, report = packer.pack(TEMPLATE, segments, domain="PK", paper_title="title")
+    assert estimate_text_tokens(prompt) <= 2000 and not report.overflow
+    # the abstract is cut to nothing before the tables are cut
+    assert report.dropped_tokens["paper_abstract"] == estimate_text_tokens(abstract) - estimate_text_tokens(truncate_text(abstract, 0))
+    assert 0 < report.dropped_tokens["source_tables"] < estimate_text_tokens(source_tables) - 200
+    assert "curated_table" not in report.dropped_tokens
+    assert curated_table in prompt
+    assert "source_tables" in report.describe()
+
+    # the required segments alone don't fit
+    packer = PromptPacker(max_tokens=1000, reserved_tokens=500)
+    _, report = packer.pack(TEMPLATE, segments, domain="PK", paper_title="title")
+    assert report.overflow
+
+
+def test_pack_prompt_with_summary():
+    def summarize(text: str, max_tokens: int) -> str:
+        return "summary of the abstract"
+
+    packer = PromptPacker(max_tokens=600, reserved_tokens=100)
+    segments = [
+        PromptSegment("paper_abstract", "word " * 1000, shrink=summarize),
+        PromptSegment("source_tables", "N / A"),
+        PromptSegment("curated_table", None, truncatable=False),
+    ]
+    prompt, report = packer.pack(TEMPLATE, segments, domain="PK", paper_title="title")
+    assert "Abstract: summary of the abstract" in prompt
+    assert "Curated table: None" in prompt
+    assert report.dropped_tokens["paper_abstract"] > 1000
+
+
+def test_get_prompt_packer():
+    assert get_prompt_packer(SimpleNamespace(num_ctx=16384)).max_tokens == 16384
+    assert get_prompt_packer(SimpleNamespace(model_name="gpt-4o")).max_tokens == LLM_DEFAULT_CONTEXT_TOKENS
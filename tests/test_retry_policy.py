@@ -0,0 +1,126 @@
+from types import SimpleNamespace
+import threading
+import time
+import pytest
+from tenacity import RetryError
+
+from extractor.agents.agent_utils import map_concurrently
+from extractor.agents.common_agent.common_agent import CommonAgent, RetryException
+from extractor.agents.retry_policy import (
+    Backoff,
+    ErrorCategory,
+    RetryBudget,
+    RetryPolicy,
+    agent_retry,
+    classify_error,
+    get_retry_budget,
+    set_retry_policy,
+    use_retry_budget,
+    with_retry_budget,
+)
+
+
+class HttpError(Exception):
+    def __init__(self, status_code: int, headers: dict | None = None):
+        super().__init__(f"http error {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+class APITimeoutError(Exception):
+    pass
+
+
+def test_classify_error():
+    assert classify_error(RetryException("wrong column")) == ErrorCategory.SEMANTIC
+    assert classify_error(ValueError("can't parse")) == ErrorCategory.SEMANTIC
+    assert classify_error(HttpError(429)) == ErrorCategory.RATE_LIMIT
+    assert classify_error(Exception("Rate limit reached for gpt-4o")) == ErrorCategory.RATE_LIMIT
+    assert classify_error(HttpError(503)) == ErrorCategory.TRANSIENT
+    assert classify_error(APITimeoutError("timed out")) == ErrorCategory.TRANSIENT
+    assert classify_error(HttpError(401)) == ErrorCategory.FATAL
+    # unknown errors are retried as before
+    assert classify_error(Exception("unknown")) == ErrorCategory.TRANSIENT
+
+
+@pytest.fixture
+def fast_policy():
+    policy = RetryPolicy(backoffs={
+        ErrorCategory.SEMANTIC: Backoff(max_attempts=5),
+        ErrorCategory.TRANSIENT: Backoff(max_attempts=3, initial_wait=0.01, max_wait=0.01),
+        ErrorCategory.RATE_LIMIT: Backoff(max_attempts=4, initial_wait=0.01, max_wait=0.01),
+        ErrorCategory.FATAL: Backoff(max_attempts=1),
+    })
+    set_retry_policy(policy)
+    yield policy
+    set_retry_policy(None)
+
+
+def _failing(errors: list[Exception]):
+    calls = []
+
+    @agent_retry()
+    def call():
+        calls.append(1)
+        raise errors[min(len(calls), len(errors)) - 1]
+    return call, calls
+
+
+def test_agent_retry_by_error_category(fast_policy):
+    call, calls = _failing([RetryException("wrong")])
+    start = time.monotonic()
+    with pytest.raises(RetryError):
+        call()
+    # the semantic errors are retried at once
+    assert len(calls) == 5 and time.monotonic() - start < 0.1
+
+    call, calls = _failing([HttpError(401)])
+    with pytest.raises(HttpError):
+        call()
+    assert len(calls) == 1
+
+    call, calls = _failing([HttpError(429)])
+    with pytest.raises(RetryError):
+        call()
+    assert len(calls) == 4
+
+    # the wait asked by the provider is respected
+    call, calls = _failing([HttpError(429, {"retry-after": "0.2"}), HttpError(401)])
+    start = time.monotonic()
+    with pytest.raises(HttpError):
+        call()
+    assert len(calls) == 2 and time.monotonic() - start >= 0.2
+
+
+def test_retry_budget(fast_policy):
+    call, calls = _failing([RetryException("wrong")])
+    with use_retry_budget(RetryBudget(max_retries=3, max_tokens=None)) as budget:
+        with pytest.raises(RetryError):
+            call()
+        assert len(calls) == 4 and budget.exhausted()
+        # no retries left for the other calls of the paper
+        call, calls = _failing([RetryException("wrong")])
+        with pytest.raises(RetryError):
+            call()
+        assert len(calls) == 1
+
+    # the tokens used by the agents of the paper are counted
+    agent = CommonAgent(llm=SimpleNamespace(model_name="gpt-x"))
+    with use_retry_budget(RetryBudget(max_retries=None, max_tokens=100)) as budget:
+        agent._incre_token_usage({"total_tokens": 150, "prompt_tokens": 100, "completion_tokens": 50})
+        assert budget.tokens == 150 and budget.exhausted()
+
+
+def test_retry_budget_is_shared_by_worker_threads():
+    @with_retry_budget
+    def run_paper():
+        budget = get_retry_budget()
+        budgets = map_concurrently(lambda _: get_retry_budget(), range(4))
+        # a nested call keeps the budget of the paper
+        assert with_retry_budget(get_retry_budget)() is budget
+        return budget, budgets
+
+    budget, budgets = run_paper()
+    assert budget is not None and all(b is budget for b in budgets)
+    assert run_paper()[0] is not budget
+    assert get_retry_budget() is None
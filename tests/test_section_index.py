@@ -0,0 +1,110 @@
+import sqlite3
+
+from extractor.agents.pk_pe_agents.pk_pe_agent_tools import DRUG_QUERY, AgentTool
+from extractor.database.pmid_db import PMIDDB
+from extractor.llm_rate_limiter import estimate_text_tokens
+from extractor.pmid_extractor.section_index import SectionIndex
+
+
+FILLER = "The weather in the city was mild and the committee met twice during the season."
+
+def _get_sections() -> list[dict]:
+    return [
+        {"section": "Abstract", "content": "<p>Pharmacokinetics of a drug in pregnant women.</p>"},
+        {"section": "Introduction", "content": "".join(f"<p>{FILLER} {i}</p>" for i in range(60))},
+        {"section": "Methods", "content": (
+            "<p>Each woman received an oral dose of 5 mg/kg of the drug twice daily.</p>"
+            + "".join(f"<p>{FILLER} {i}</p>" for i in range(60))
+            + "<p>Plasma samples were collected at 1, 2 and 4 hours after the dose.</p>"
+        )},
+        {"section": "References", "content": "<p>1. Smith J. Drug dose in women.</p>"},
+    ]
+
+
+def test_section_index_retrieve():
+    index = SectionIndex(_get_sections(), max_passage_tokens=50)
+    assert all(p.section != "References" for p in index.passages)
+    assert all(p.n_tokens <= 50 for p in index.passages)
+
+    scores = index.score("oral dose mg kg")
+    best = index.passages[max(range(len(scores)), key=lambda ix: scores[ix])]
+    assert "5 mg/kg" in best.text
+
+    passages = index.retrieve("oral dose plasma samples collected", 120)
+    assert sum(p.n_tokens for p in passages) <= 120
+    # the passages are in the order of the paper
+    assert [p.section_index for p in passages] == sorted(p.section_index for p in passages)
+    text = index.get_text("oral dose plasma samples collected", 120)
+    assert "5 mg/kg" in text and "Plasma samples" in text
+    assert text.count("Methods") == 1
+
+
+class DummyTool(AgentTool):
+    def __init__(self, pmid: str, pmid_db: PMIDDB):
+        super().__init__()
+        self.pmid = pmid
+        self.pmid_db = pmid_db
+
+    def _run(self, previous_errors: str | None = None):
+        return None, None
+
+
+def test_get_article_text(tmp_path):
+    pmid_db = PMIDDB(tmp_path / "pmid_info.db")
+    sections = _get_sections()
+    pmid_db.insert_pmid_info("12345", "Drug in pregnancy", "abstract", "full text", [], sections)
+    pmid_info = pmid_db.select_pmid_info("12345")
+    tool = DummyTool("12345", pmid_db)
+
+    # the short papers are sent whole
+    tool.max_text_tokens = 100000
+    full_text = tool._get_article_text(pmid_info, DRUG_QUERY)
+    assert FILLER in full_text and "Smith" not in full_text
+
+    tool.max_text_tokens = 400
+    article_text = tool._get_article_text(pmid_info, DRUG_QUERY)
+    assert article_text.startswith("Drug in pregnancy\n")
+    assert "5 mg/kg" in article_text
+    assert estimate_text_tokens(article_text) < estimate_text_tokens(full_text) // 4
+
+    # the index is built once per paper and rebuilt after the paper is inserted again
+    index = pmid_db.select_section_index("12345")
+    assert pmid_db.select_section_index("12345") is index
+    pmid_db.insert_pmid_info("12345", "Drug in pregnancy", "abstract", "full text", [], sections[:1])
+    assert pmid_db.select_section_index("12345") is not index
+    assert pmid_db.select_section_index("00000") is None
+
+
+def test_section_index_json():
+    index = SectionIndex(_get_sections(), max_passage_tokens=50)
+    loaded = SectionIndex.from_json(index.to_json())
+    assert loaded.passages == index.passages
+    query = "oral dose plasma samples collected"
+    assert loaded.score(query) == index.score(query)
+    assert loaded.get_text(query, 120) == index.get_text(query, 120)
+
+
+def test_section_index_is_built_at_insert(tmp_path, monkeypatch):
+    pmid_db = PMIDDB(tmp_path / "pmid_info.db")
+    pmid_db.insert_pmid_info("12345", "Drug in pregnancy", "abstract", "full text", [], _get_sections())
+    builds = []
+    init = SectionIndex.__init__
+    def counting_init(self, sections, *args, **kwargs):
+        builds.append(sections)
+        init(self, sections, *args, **kwargs)
+    monkeypatch.setattr(SectionIndex, "__init__", counting_init)
+
+    # the index stored with the paper is loaded, also by another process, and kept in memory
+    index = pmid_db.select_section_index("12345")
+    assert pmid_db.select_section_index("12345") is index
+    assert PMIDDB(tmp_path / "pmid_info.db").select_section_index("12345") is not None
+    assert len(builds) == 0
+
+    # a paper stored without an index gets it built once, and stored
+    conn = sqlite3.connect(pmid_db.db_path)
+    conn.execute("DELETE FROM section_index")
+    conn.commit()
+    conn.close()
+    assert PMIDDB(tmp_path / "pmid_info.db").select_section_index("12345") is not None
+    assert PMIDDB(tmp_path / "pmid_info.db").select_section_index("12345") is not None
+    assert len(builds) == 1
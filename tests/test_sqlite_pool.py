@@ -0,0 +1,36 @@
+import threading
+
+from extractor.database.curation_db import CurationDB
+from extractor.database.sqlite_pool import get_connection_pool
+
+
+def test_connection_pool_uses_wal_and_reuses_connections(tmp_path):
+    pool = get_connection_pool(tmp_path / "test.db")
+    assert pool is get_connection_pool(tmp_path / "test.db")
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        first = conn
+    with pool.connection() as conn:
+        assert conn is first
+    pool.close()
+
+
+def test_curation_db_concurrent_writes(tmp_path):
+    db = CurationDB(db_path=tmp_path / "curation_data.db")
+    errors = []
+
+    def write(worker: int):
+        # every worker has its own db instance, like separate curation workers
+        worker_db = CurationDB(db_path=tmp_path / "curation_data.db") if worker % 2 else db
+        for i in range(20):
+            if not worker_db.insert_curation_data(f"{worker}-{i}", "", "", "", "pk_summary", ""):
+                errors.append((worker, i))
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert db.get_curation_count() == 160
+    db.close()
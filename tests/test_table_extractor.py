@@ -1,5 +1,10 @@
+import glob
+
+import pytest
 from TabFuncFlow.utils.table_utils import dataframe_to_markdown
-from extractor.pmid_extractor.html_table_extractor import HtmlTableExtractor
+from extractor.pmid_extractor.html_document import HtmlDocument
+from extractor.pmid_extractor.html_table_extractor import HtmlTableExtractor, HtmlTableParser
+from extractor.utils import convert_html_to_text_no_table
 
 
 def test_HtmlTableExtractor_31206433():
@@ -59,3 +64,70 @@ def test_HtmlTableExtractor_18782787():
     for table in tables:
         md_table = dataframe_to_markdown(table["table"])
         assert len(md_table) > 0
+
+def test_HtmlTableExtractor_shares_html_document():
+    extractor = HtmlTableExtractor()
+    with open("./tests/data/17635501.html", "r") as fobj:
+        html = fobj.read()
+    doc = HtmlDocument(html)
+    soup = doc.soup
+    n_anchors = len(soup.find_all("a"))
+
+    tables = extractor.extract_tables(doc)
+    assert len(tables) == len(extractor.extract_tables(html))
+    for table, expected in zip(tables, extractor.extract_tables(html)):
+        assert table["caption"] == expected["caption"]
+        assert table["table"].equals(expected["table"])
+    assert extractor.extract_sections(doc) == extractor.extract_sections(html)
+    assert extractor.extract_abstract(doc) == extractor.extract_abstract(html)
+    assert extractor.extract_title(doc) == extractor.extract_title(html)
+    assert convert_html_to_text_no_table(doc) == convert_html_to_text_no_table(html)
+
+    # the shared tree is not modified by the extractors
+    assert doc.soup is soup
+    assert len(soup.find_all("a")) == n_anchors
+    assert len(soup.find_all("table")) > 0
+
+def test_HtmlTableExtractor_parses_html_document_once(monkeypatch):
+    n_parses = 0
+    parse = HtmlDocument.parse
+
+    def counting_parse(self):
+        nonlocal n_parses
+        n_parses += 1
+        return parse(self)
+
+    monkeypatch.setattr(HtmlDocument, "parse", counting_parse)
+    extractor = HtmlTableExtractor()
+    with open("./tests/data/17635501.html", "r") as fobj:
+        doc = HtmlDocument(fobj.read())
+
+    assert len(extractor.extract_tables(doc)) > 0
+    assert extractor.extract_title(doc) is not None
+    assert extractor.extract_abstract(doc) is not None
+    assert len(extractor.extract_sections(doc)) > 0
+    assert len(HtmlTableParser().extract_sections(doc)) > 0
+    assert len(convert_html_to_text_no_table(doc)) > 0
+    assert n_parses == 1
+
+@pytest.mark.parametrize("path", sorted(glob.glob("./tests/data/*.html")))
+def test_HtmlDocument_parsers_are_equivalent(path):
+    """the html.parser tree gives the same results as the lxml one"""
+    extractor = HtmlTableExtractor()
+    with open(path, "r") as fobj:
+        html = fobj.read()
+    lxml_doc = HtmlDocument(html, "lxml")
+    html_parser_doc = HtmlDocument(html, "html.parser")
+
+    tables = extractor.extract_tables(lxml_doc)
+    expected_tables = extractor.extract_tables(html_parser_doc)
+    assert len(tables) == len(expected_tables)
+    for table, expected in zip(tables, expected_tables):
+        assert table["caption"] == expected["caption"]
+        assert table["table"].equals(expected["table"])
+    assert extractor.extract_sections(lxml_doc) == extractor.extract_sections(html_parser_doc)
+    assert HtmlTableParser().extract_sections(lxml_doc) == HtmlTableParser().extract_sections(html_parser_doc)
+    assert extractor.extract_abstract(lxml_doc) == extractor.extract_abstract(html_parser_doc)
+    assert extractor.extract_title(lxml_doc) == extractor.extract_title(html_parser_doc)
+    # the str path decomposes the tables of a new html.parser tree
+    assert convert_html_to_text_no_table(lxml_doc) == convert_html_to_text_no_table(html)
@@ -7,7 +7,10 @@ from extractor.utils import (
     preprocess_csv_table_string,
     remove_comma_in_number_string,
 )
-from TabFuncFlow.utils.table_utils import markdown_to_dataframe
+import pandas as pd
+
+from TabFuncFlow.utils import table_utils
+from TabFuncFlow.utils.table_utils import ParsedTable, dataframe_to_markdown, markdown_to_dataframe
 
 def test_preprocess_csv_table_string():
     with open("./tests/data/17158945-result.txt", "r") as fobj:
@@ -92,4 +95,61 @@ def test_dataframe(
 
 def test_dataframe_31112621(md_corrected_table_31112621):
     df = markdown_to_dataframe(md_corrected_table_31112621)
-    assert df.shape[0] > 0
\ No newline at end of file
+    assert df.shape[0] > 0
+
+
+def test_markdown_dataframe_conversion():
+    md_table = "| a | b | a |\n| --- | --- | --- |\n| 1 |  x y | |\n|2|3|4|"
+    df = markdown_to_dataframe(md_table)
+    assert list(df.columns) == ["a", "b", "a"]
+    assert df.values.tolist() == [["1", "x y", ""], ["2", "3", "4"]]
+    assert dataframe_to_markdown(df) == "| a | b | a |\n| --- | --- | --- |\n| 1 | x y |  |\n| 2 | 3 | 4 |"
+
+    # irregular rows are split line by line and padded
+    df = markdown_to_dataframe("| a | b |\n| --- | --- |\n| 1 | 2 |\n| 3 |")
+    assert df.shape == (2, 2)
+    assert df.iloc[1, 0] == "3"
+
+    # the cells are rendered as df.iterrows() renders them
+    df = pd.DataFrame({"a": [1, 2], "b": [1.5, None]})
+    assert dataframe_to_markdown(df) == "| a | b |\n| --- | --- |\n| 1.0 | 1.5 |\n| 2.0 | nan |"
+    df = pd.DataFrame({"a": pd.to_datetime(["2020-01-01", "2020-01-02"]), "b": ["x", None]})
+    df.loc[1, "a"] = None
+    assert dataframe_to_markdown(df) == "| a | b |\n| --- | --- |\n| 2020-01-01 00:00:00 | x |\n| NaT | NaT |"
+
+
+def test_parsed_table(monkeypatch):
+    calls = {"parse": 0, "render": 0}
+    parse, render = table_utils.markdown_to_dataframe, table_utils.dataframe_to_markdown
+
+    def count_parse(md):
+        calls["parse"] += 1
+        return parse(md)
+
+    def count_render(df):
+        calls["render"] += 1
+        return render(df)
+
+    monkeypatch.setattr(table_utils, "markdown_to_dataframe", count_parse)
+    monkeypatch.setattr(table_utils, "dataframe_to_markdown", count_render)
+
+    md_table = "| a | b |\n| --- | --- |\n|1|2|\n|3|4|"
+    table = ParsedTable.of(md_table)
+    assert ParsedTable.of(table) is table
+    assert calls["parse"] == 0
+    assert (table.n_rows, table.n_cols) == (2, 2)
+    assert table.df.values.tolist() == [["1", "2"], ["3", "4"]]
+    # parsed once, the markdown is kept as it is
+    assert calls == {"parse": 1, "render": 0}
+    assert table.md == md_table
+
+    sub_table = ParsedTable.from_dataframe(table.df[["b"]])
+    assert sub_table.n_rows == 2
+    assert calls == {"parse": 1, "render": 0}
+    assert str(sub_table) == "| b |\n| --- |\n| 2 |\n| 4 |"
+    assert sub_table.md is sub_table.md
+    assert calls == {"parse": 1, "render": 1}
+
+    # an empty table is the empty markdown
+    empty_table = ParsedTable.from_dataframe(table.df.iloc[0:0])
+    assert empty_table.md == "" and empty_table.df.shape == (0, 0)
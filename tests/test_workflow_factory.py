@@ -0,0 +1,14 @@
+from extractor.agents.pk_individual.pk_ind_workflow import PKIndWorkflow
+from extractor.agents.pk_summary.pk_sum_workflow import PKSumWorkflow
+from extractor.agents.workflow_factory import get_workflow
+
+
+def test_get_workflow_compiles_graph_once():
+    wf1 = get_workflow(PKSumWorkflow, llm="llm1")
+    wf2 = get_workflow(PKSumWorkflow, llm="llm2")
+    assert wf1.graph is wf2.graph
+    assert wf1.llm == "llm1" and wf2.llm == "llm2"
+
+    wf3 = get_workflow(PKIndWorkflow, llm="llm1", llm2="llm2")
+    assert wf3.graph is not wf1.graph
+    assert wf3.llm2 == "llm2"
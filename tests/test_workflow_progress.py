@@ -0,0 +1,71 @@
+from typing import Callable, Optional, TypedDict
+import pandas as pd
+from langgraph.graph import StateGraph, START
+
+from extractor.agents.agent_utils import map_concurrently
+from extractor.agents.workflow_progress import stream_workflow
+
+
+class DummyState(TypedDict):
+    df_combined: Optional[pd.DataFrame]
+    step_callback: Optional[Callable]
+
+
+def _build_graph():
+    def first_step(state: DummyState):
+        state["df_combined"] = pd.DataFrame({"a": [1, 2]})
+        state["step_callback"](token_usage={"total_tokens": 3, "prompt_tokens": 2, "completion_tokens": 1})
+        return state
+
+    def second_step(state: DummyState):
+        state["df_combined"] = pd.DataFrame({"a": [1, 2, 3]})
+        return state
+
+    graph = StateGraph(DummyState)
+    graph.add_node("first_step", first_step)
+    graph.add_node("second_step", second_step)
+    graph.add_edge(START, "first_step")
+    graph.add_edge("first_step", "second_step")
+    return graph.compile()
+
+
+def test_stream_workflow_reports_progress():
+    events = []
+    callbacks = []
+    s = stream_workflow(
+        _build_graph(),
+        input={"df_combined": None, "step_callback": lambda **kwargs: callbacks.append(kwargs)},
+        config={"recursion_limit": 50},
+        workflow_name="DummyWorkflow",
+        progress_sink=events.append,
+    )
+    assert s["df_combined"].shape[0] == 3
+    assert len(callbacks) == 1
+    assert [e.step_name for e in events] == ["first_step", "second_step"]
+    assert [e.row_counts["df_combined"] for e in events] == [2, 3]
+    assert events[0].token_usage["total_tokens"] == 3
+    assert events[1].token_usage["total_tokens"] == 0
+
+
+def test_stream_workflow_counts_tokens_of_concurrent_callbacks():
+    def fan_out_step(state: DummyState):
+        def call_llm(ix):
+            for _ in range(50):
+                state["step_callback"](token_usage={"total_tokens": 3, "prompt_tokens": 2, "completion_tokens": 1})
+        map_concurrently(call_llm, range(16), max_concurrency=8)
+        return state
+
+    graph = StateGraph(DummyState)
+    graph.add_node("fan_out_step", fan_out_step)
+    graph.add_edge(START, "fan_out_step")
+    events = []
+    stream_workflow(
+        graph.compile(),
+        input={"df_combined": None, "step_callback": lambda **kwargs: None},
+        config={"recursion_limit": 50},
+        workflow_name="DummyWorkflow",
+        progress_sink=events.append,
+    )
+    # no token delta is lost by the worker threads
+    assert events[0].token_usage["total_tokens"] == 16 * 50 * 3
+    assert events[0].token_usage["prompt_tokens"] == 16 * 50 * 2